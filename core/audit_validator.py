@@ -31,6 +31,10 @@ except ImportError:
             def validate_resource(self, resource_id):
                 return True
         RESOURCE_CATALOG_AVAILABLE = False
+try:
+    from core.drift.property_comparator import compare_properties
+except ImportError:
+    from drift.property_comparator import compare_properties
 try:
     from .observability_engine import ObservabilityEngine
     OBSERVABILITY_AVAILABLE = True
@@ -269,14 +273,13 @@ class AuditValidator:
     def has_configuration_drift(self, desired: Dict, current: Dict) -> bool:
         """Check if there's configuration drift between desired and current"""
         
-        # Simple drift detection - compare key properties
+        # Compare key properties canonically (tag order, Key/Value lists, etc.)
         drift_properties = ['type', 'status', 'tags']
         
-        for prop in drift_properties:
-            if desired.get(prop) != current.get(prop):
-                return True
+        desired_subset = {prop: desired.get(prop) for prop in drift_properties}
+        current_subset = {prop: current.get(prop) for prop in drift_properties}
         
-        return False
+        return bool(compare_properties(desired_subset, current_subset))
     
     def compare_state(self, desired_spec: Dict, cfn_state: Dict, catalog_resources: List[Dict]) -> Dict:
         """Compara estados: desired vs CloudFormation vs Resource Catalog"""
@@ -10,6 +10,14 @@ import glob
 import os
 from pathlib import Path
 
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+from core.static_analysis import StaticAnalysisEngine, TemplateDocument, PhaseEnterpriseRule, default_registry
+from core.validators.schema_registry import get_schema_registry
+
+# Resolvido a partir da raiz do repositório, independente do diretório atual
+CACHE_FILE = str(REPO_ROOT / "reports" / ".static_analysis_cache.json")
+
 def load_json(path):
     """Load JSON file"""
     with open(path, "r", encoding="utf-8") as f:
@@ -24,58 +32,18 @@ def load_yaml(path):
 def validate_schema(doc, schema):
     """Validate document against JSON schema"""
     try:
-        from jsonschema import Draft7Validator
-        validator = Draft7Validator(schema)
-        return list(validator.iter_errors(doc))
+        return list(get_schema_registry().compile(schema).iter_errors(doc))
     except ImportError:
         print("Warning: jsonschema not available, skipping schema validation")
         return []
 
 def validate_enterprise_rules(doc, file_path):
     """Validate enterprise-specific rules beyond schema"""
-    errors = []
-    
-    # Get document sections
-    metadata = doc.get("metadata", {})
-    outputs_contract = doc.get("outputs_contract", {})
-    
-    # Rule 1: Name must start with NN-
-    name = metadata.get("name", "")
-    if not any(name.startswith(f"{i:02d}-") for i in range(0, 100)):
-        errors.append({
-            "file": file_path,
-            "message": "metadata.name deve começar com NN- (ex: 01-networking)",
-            "path": ["metadata", "name"]
-        })
-    
-    # Rule 2: Minimum 3 WA pillars
-    wa_pillars = metadata.get("wa_pillars", [])
-    if len(wa_pillars) < 3:
-        errors.append({
-            "file": file_path,
-            "message": "mínimo de 3 pilares Well-Architected necessários",
-            "path": ["metadata", "wa_pillars"]
-        })
-    
-    # Rule 3: outputs_contract.must_exist required
-    must_exist = outputs_contract.get("must_exist", [])
-    if len(must_exist) < 1:
-        errors.append({
-            "file": file_path,
-            "message": "outputs_contract.must_exist precisa de pelo menos 1 item",
-            "path": ["outputs_contract", "must_exist"]
-        })
-    
-    # Rule 4: tags_must_include should contain ial:managed
-    tags_include = outputs_contract.get("tags_must_include", [])
-    if not any("ial:managed" in str(tag) for tag in tags_include):
-        errors.append({
-            "file": file_path,
-            "message": "tags_must_include deve conter 'ial:managed'",
-            "path": ["outputs_contract", "tags_must_include"]
-        })
-    
-    return errors
+    template = TemplateDocument.from_document(file_path, doc)
+    return [
+        {"file": file_path, "message": finding["message"], "path": finding["path"]}
+        for finding in PhaseEnterpriseRule().check_template(template)
+    ]
 
 def main():
     """Main linter function"""
@@ -85,9 +53,6 @@ def main():
         print(f"Error: Schema not found at {schema_path}")
         sys.exit(1)
     
-    schema = load_json(schema_path)
-    all_errors = []
-    
     # Find all phase.yaml files
     phase_files = []
     for pattern in ["phases/**/*.yaml", "phases/**/*.yml"]:
@@ -97,32 +62,14 @@ def main():
         print("No phase files found to validate")
         return
     
-    # Validate each file
-    for yaml_file in sorted(phase_files):
-        try:
-            doc = load_yaml(yaml_file)
-            if not doc:
-                continue
-                
-            # Schema validation
-            schema_errors = validate_schema(doc, schema)
-            for error in schema_errors:
-                all_errors.append({
-                    "file": yaml_file,
-                    "message": error.message,
-                    "path": list(error.path) if error.path else []
-                })
-            
-            # Enterprise rules validation
-            enterprise_errors = validate_enterprise_rules(doc, yaml_file)
-            all_errors.extend(enterprise_errors)
-            
-        except Exception as e:
-            all_errors.append({
-                "file": yaml_file,
-                "message": f"Failed to parse YAML: {str(e)}",
-                "path": []
-            })
+    # Schema + enterprise rules em passada única, re-lintando só arquivos alterados
+    # (prune: o cache guarda só os templates que ainda existem)
+    engine = StaticAnalysisEngine(registry=default_registry(schema_path), cache_file=CACHE_FILE)
+    results = engine.analyze_paths(sorted(phase_files), categories=("phase", "parse"), prune=True)
+    all_errors = [
+        {"file": finding["file"], "message": finding["message"], "path": finding.get("path", [])}
+        for finding in results["findings"]
+    ]
     
     # Generate report
     report = {
@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
 """
 Circuit Breaker Pattern Implementation
+Abre pela taxa de falhas numa janela deslizante de tempo (buckets por segundo),
+não por falhas consecutivas: com pelo menos `minimum_calls` chamadas na janela e
+taxa de falha >= `failure_rate_threshold`, o circuito abre por `timeout` segundos.
+Em HALF_OPEN apenas `half_open_max_calls` chamadas de prova são liberadas.
+Quem obtém uma prova e não chega a chamar record_success/record_failure
+(rejeição local, cancelamento) devolve a vaga com release_probe(); provas
+esquecidas expiram após `timeout` segundos, como o próprio OPEN.
 """
 
 import time
 import threading
 from enum import Enum
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional
 
 class CircuitState(Enum):
     CLOSED = "CLOSED"
@@ -14,69 +21,157 @@ class CircuitState(Enum):
     HALF_OPEN = "HALF_OPEN"
 
 class CircuitBreaker:
-    def __init__(self, failure_threshold: int = 5, timeout: int = 60, name: str = "circuit"):
+    def __init__(self, failure_threshold: int = 5, timeout: int = 60, name: str = "circuit",
+                 failure_rate_threshold: float = 0.5, window_seconds: int = 60,
+                 minimum_calls: Optional[int] = None, half_open_max_calls: int = 1,
+                 clock: Callable[[], float] = time.time):
         self.failure_threshold = failure_threshold
         self.timeout = timeout
         self.name = name
-        
+        self.failure_rate_threshold = failure_rate_threshold
+        self.window_seconds = max(1, int(window_seconds))
+        self.minimum_calls = minimum_calls if minimum_calls is not None else failure_threshold
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+
         # State management
         self.failure_count = 0
         self.last_failure_time = None
         self.state = CircuitState.CLOSED
         self.lock = threading.Lock()
-        
+        self._buckets: Dict[int, List[int]] = {}  # segundo -> [chamadas, falhas]
+        self._half_open_calls = 0
+        self._probe_started_at = None
+        self._listeners: List[Callable[[str, str, str], None]] = []
+
         # Metrics
         self.total_requests = 0
         self.successful_requests = 0
         self.failed_requests = 0
-        
+        self.rejected_requests = 0
+        self.times_opened = 0
+
+    def add_listener(self, callback: Callable[[str, str, str], None]):
+        """callback(nome, estado_anterior, novo_estado) a cada transição"""
+        self._listeners.append(callback)
+
+    def _transition(self, new_state: CircuitState) -> Optional[tuple]:
+        """Muda o estado (chamar com lock); retorna a transição para notificar fora do lock"""
+        if new_state == self.state:
+            return None
+        old_state, self.state = self.state, new_state
+        self._half_open_calls = 0
+        self._probe_started_at = None
+        if new_state == CircuitState.OPEN:
+            self.times_opened += 1
+        elif new_state == CircuitState.CLOSED:
+            self._buckets.clear()
+            self.failure_count = 0
+        return (self.name, old_state.value, new_state.value)
+
+    def _notify(self, transition: Optional[tuple]):
+        if transition is None:
+            return
+        for callback in list(self._listeners):
+            try:
+                callback(*transition)
+            except Exception as e:
+                print(f"⚠️ Circuit breaker listener error ({self.name}): {e}")
+
+    def _window(self, now: float) -> tuple:
+        """(chamadas, falhas) na janela; descarta buckets antigos"""
+        oldest = int(now) - self.window_seconds + 1
+        for second in [s for s in self._buckets if s < oldest]:
+            del self._buckets[second]
+        calls = sum(b[0] for b in self._buckets.values())
+        failures = sum(b[1] for b in self._buckets.values())
+        return calls, failures
+
+    def _record(self, failed: bool, now: float):
+        bucket = self._buckets.setdefault(int(now), [0, 0])
+        bucket[0] += 1
+        bucket[1] += int(failed)
+
     def can_execute(self) -> bool:
         """Check if circuit allows execution"""
+        transition = None
         with self.lock:
+            now = self._clock()
+            if self.state == CircuitState.OPEN and self._should_attempt_reset():
+                transition = self._transition(CircuitState.HALF_OPEN)
+            if (self.state == CircuitState.HALF_OPEN and self._probe_started_at is not None
+                    and now - self._probe_started_at >= self.timeout):
+                # Provas sem resultado há mais de `timeout`: considera as vagas perdidas
+                self._half_open_calls = 0
             if self.state == CircuitState.CLOSED:
-                return True
-            elif self.state == CircuitState.OPEN:
-                if self._should_attempt_reset():
-                    self.state = CircuitState.HALF_OPEN
-                    return True
-                return False
-            elif self.state == CircuitState.HALF_OPEN:
-                return True
-                
+                allowed = True
+            elif self.state == CircuitState.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                self._probe_started_at = now
+                allowed = True
+            else:
+                self.rejected_requests += 1
+                allowed = False
+        self._notify(transition)
+        return allowed
+
+    def release_probe(self):
+        """Devolve a vaga de prova de uma chamada liberada que não teve resultado"""
+        with self.lock:
+            if self.state == CircuitState.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
     def record_success(self):
         """Record successful execution"""
+        transition = None
         with self.lock:
             self.total_requests += 1
             self.successful_requests += 1
-            
+
             if self.state == CircuitState.HALF_OPEN:
-                self.state = CircuitState.CLOSED
-                self.failure_count = 0
-                
+                transition = self._transition(CircuitState.CLOSED)
+            elif self.state == CircuitState.CLOSED:
+                self._record(False, self._clock())
+        self._notify(transition)
+
     def record_failure(self):
         """Record failed execution"""
+        transition = None
         with self.lock:
+            now = self._clock()
             self.total_requests += 1
             self.failed_requests += 1
-            self.failure_count += 1
-            self.last_failure_time = time.time()
-            
-            if self.failure_count >= self.failure_threshold:
-                self.state = CircuitState.OPEN
-                
+            self.last_failure_time = now
+
+            if self.state == CircuitState.HALF_OPEN:
+                # Falha na chamada de prova: volta a abrir imediatamente
+                transition = self._transition(CircuitState.OPEN)
+            elif self.state == CircuitState.CLOSED:
+                self._record(True, now)
+                calls, failures = self._window(now)
+                self.failure_count = failures
+                if calls >= self.minimum_calls and failures / calls >= self.failure_rate_threshold:
+                    transition = self._transition(CircuitState.OPEN)
+        self._notify(transition)
+
     def _should_attempt_reset(self) -> bool:
         """Check if enough time has passed to attempt reset"""
-        return (time.time() - self.last_failure_time) >= self.timeout
-        
+        return (self._clock() - self.last_failure_time) >= self.timeout
+
     def get_metrics(self) -> Dict:
         """Get circuit breaker metrics"""
         with self.lock:
             success_rate = (self.successful_requests / self.total_requests * 100) if self.total_requests > 0 else 0
+            calls, failures = self._window(self._clock())
             return {
                 "name": self.name,
                 "state": self.state.value,
                 "failure_count": self.failure_count,
                 "total_requests": self.total_requests,
                 "success_rate": round(success_rate, 2),
-                "last_failure_time": self.last_failure_time
+                "last_failure_time": self.last_failure_time,
+                "window_calls": calls,
+                "window_failure_rate": round(failures / calls, 4) if calls else 0.0,
+                "rejected_requests": self.rejected_requests,
+                "times_opened": self.times_opened
             }
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+CloudTrail Stream - Análise de login em uma passada sobre eventos paginados
+Os eventos chegam de um iterador (LookupEvents paginado ou export local
+JSON/JSONL, opcionalmente .gz) e cada um é processado uma única vez: contadores
+por usuário/IP/país, janela deslizante de falhas por IP para brute force e
+detecções de acesso incomum são atualizados no mesmo passo. A memória é
+limitada: contadores com número máximo de chaves (descartando as menos
+frequentes) e listas de achados com teto, então janelas de 24h a 30d em
+contas movimentadas não dependem do volume de eventos.
+
+A janela de brute force tolera eventos fora de ordem: cada IP guarda os
+horários de falha ordenados dentro de um horizonte (janela + `max_lateness`)
+em torno do evento atual, o que cobre o LookupEvents (mais recente primeiro),
+exports em ordem crescente e arquivos de regiões diferentes intercalados.
+"""
+
+import bisect
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+LOGIN_EVENT_NAMES = ('ConsoleLogin',)
+
+# Geolocalização simulada (substituir por GeoIP real)
+IP_LOCATIONS = {
+    "203.0.113.12": {"country": "US", "city": "New York", "org": "Corporate Network"},
+    "1.2.3.4": {"country": "CN", "city": "Beijing", "org": "Unknown"},
+    "185.220.101.42": {"country": "DE", "city": "Frankfurt", "org": "Tor Exit Node"}
+}
+UNKNOWN_LOCATION = {"country": "Unknown", "city": "Unknown", "org": "Unknown"}
+SUSPICIOUS_COUNTRIES = ("CN", "RU", "KP")
+SUSPICIOUS_AGENTS = ("curl", "wget", "python", "bot")
+
+
+# ---------------------------------------------------------------------- fontes de eventos
+
+def normalize_event(record: Dict) -> Dict:
+    """Registro bruto do CloudTrail (eventTime, userIdentity...) -> formato do SecurityAnalyzer"""
+    if "EventName" in record:
+        return record
+
+    identity = record.get("userIdentity") or {}
+    user = identity.get("userName") or (identity.get("arn") or "").split("/")[-1] or identity.get("principalId")
+    response = record.get("responseElements") or {}
+    error_code = record.get("errorCode")
+    if not error_code and response.get("ConsoleLogin") == "Failure":
+        error_code = "SigninFailure"
+
+    event = {
+        "EventTime": record.get("eventTime"),
+        "EventName": record.get("eventName"),
+        "SourceIPAddress": record.get("sourceIPAddress"),
+        "UserIdentity": {"type": identity.get("type"), "userName": user or "unknown"},
+        "ResponseElements": response,
+        "UserAgent": record.get("userAgent", "")
+    }
+    if error_code:
+        event["ErrorCode"] = error_code
+        event["ErrorMessage"] = record.get("errorMessage", "")
+    return event
+
+
+def iter_lookup_events(client, start_time: datetime, end_time: Optional[datetime] = None,
+                       event_names: Iterable[str] = LOGIN_EVENT_NAMES) -> Iterator[Dict]:
+    """LookupEvents paginado (mais recente primeiro), um evento por vez"""
+    paginator = client.get_paginator('lookup_events')
+    for event_name in event_names:
+        kwargs = {
+            'LookupAttributes': [{'AttributeKey': 'EventName', 'AttributeValue': event_name}],
+            'StartTime': start_time,
+            'EndTime': end_time or datetime.now(timezone.utc)
+        }
+        for page in paginator.paginate(**kwargs):
+            for event in page.get('Events', []):
+                if event.get('CloudTrailEvent'):
+                    yield normalize_event(json.loads(event['CloudTrailEvent']))
+                else:
+                    yield normalize_event({
+                        'eventTime': event.get('EventTime'), 'eventName': event.get('EventName'),
+                        'userIdentity': {'userName': event.get('Username')}
+                    })
+
+
+# Nome padrão dos logs do CloudTrail: <conta>_CloudTrail_<região>_<AAAAMMDDTHHMMZ>_<id>.json.gz
+_DELIVERY_TIME = re.compile(r'_(\d{8}T\d{4})Z_')
+
+
+def _export_sort_key(file_path: str) -> Tuple[str, str]:
+    """Ordena pelo horário de entrega do nome do arquivo (não pela região no caminho)"""
+    match = _DELIVERY_TIME.search(os.path.basename(file_path))
+    return (match.group(1) if match else '', file_path)
+
+
+def _export_files(path: str) -> List[str]:
+    if os.path.isfile(path):
+        return [path]
+    suffixes = ('.json', '.jsonl', '.json.gz', '.jsonl.gz')
+    return sorted(
+        (os.path.join(root, name) for root, _, names in os.walk(path) for name in names if name.endswith(suffixes)),
+        key=_export_sort_key
+    )
+
+
+def iter_cloudtrail_export(path: str, event_names: Optional[Iterable[str]] = LOGIN_EVENT_NAMES,
+                           start_time: Optional[datetime] = None,
+                           end_time: Optional[datetime] = None) -> Iterator[Dict]:
+    """Export local: arquivos CloudTrail ({"Records": [...]}) ou JSONL, .gz opcional
+
+    Arquivos JSONL são lidos linha a linha; arquivos de log do CloudTrail (um
+    por intervalo de ~5 min) são carregados um de cada vez, em ordem de
+    entrega. Com start_time/end_time só eventos em [start_time, end_time] saem.
+    """
+    wanted = set(event_names) if event_names else None
+    start = _parse_time(start_time) if start_time is not None else None
+    end = _parse_time(end_time) if end_time is not None else None
+    for file_path in _export_files(path):
+        opener = gzip.open if file_path.endswith('.gz') else open
+        with opener(file_path, 'rt', encoding='utf-8') as handle:
+            if '.jsonl' in os.path.basename(file_path):
+                records = (json.loads(line) for line in handle if line.strip())
+            else:
+                data = json.load(handle)
+                records = data.get('Records', []) if isinstance(data, dict) else data
+            for record in records:
+                event = normalize_event(record)
+                if wanted is not None and event.get("EventName") not in wanted:
+                    continue
+                if start is not None or end is not None:
+                    event_time = _parse_time(event["EventTime"])
+                    if (start is not None and event_time < start) or (end is not None and event_time > end):
+                        continue
+                yield event
+
+
+# ---------------------------------------------------------------------- estruturas limitadas
+
+def _parse_time(value) -> datetime:
+    """ISO 8601 ou datetime -> datetime ingênuo (UTC quando havia fuso)"""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _evict_smallest(items: Dict, size, max_keys: int) -> int:
+    """Remove de uma vez os 10% de chaves com menor `size(valor)`; devolve quantas saíram"""
+    drop = max(1, max_keys // 10)
+    for key, _ in sorted(items.items(), key=lambda item: size(item[1]))[:drop]:
+        del items[key]
+    return drop
+
+
+class _BoundedCounters:
+    """Contadores {chave: {campo: n}} com no máximo `max_keys` chaves
+
+    Ao estourar, descarta de uma vez os 10% com menor total (custo amortizado
+    baixo); a ordem de inserção das demais chaves é preservada.
+    """
+
+    def __init__(self, max_keys: int, fields: Tuple[str, ...] = ("total", "success", "failed")):
+        self.max_keys = max_keys
+        self.fields = fields
+        self.items: Dict[Any, Dict[str, int]] = {}
+        self.evicted = 0
+
+    def add(self, key, **increments) -> Dict[str, int]:
+        entry = self.items.get(key)
+        if entry is None:
+            if len(self.items) >= self.max_keys:
+                self.evicted += _evict_smallest(self.items, lambda counts: counts["total"], self.max_keys)
+            entry = self.items[key] = {field: 0 for field in self.fields}
+        for field, amount in increments.items():
+            entry[field] += amount
+        return entry
+
+    def top(self, n: int) -> List[Tuple[Any, Dict[str, int]]]:
+        return sorted(self.items.items(), key=lambda x: x[1]["total"], reverse=True)[:n]
+
+
+class _DistinctCounter:
+    """Contagem de chaves distintas independente dos despejos dos contadores
+
+    Guarda hashes até `limit`; acima disso a contagem vira limite inferior
+    (approximate=True) em vez de crescer sem limite.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._hashes = set()
+        self.approximate = False
+
+    def add(self, key):
+        if len(self._hashes) < self.limit:
+            self._hashes.add(hash(key))
+        elif hash(key) not in self._hashes:
+            self.approximate = True
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+class _Findings:
+    """Lista de achados com teto; o excedente só é contado"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.items: List[Dict] = []
+        self.suppressed = 0
+
+    def append(self, finding: Dict):
+        if len(self.items) < self.limit:
+            self.items.append(finding)
+        else:
+            self.suppressed += 1
+
+
+class _FailureBurst:
+    """Falhas de um IP (ordenadas, dentro do horizonte) + maior rajada já vista"""
+    __slots__ = ('times', 'peak_count', 'peak_first', 'peak_last', 'total')
+
+    def __init__(self):
+        self.times: List[datetime] = []
+        self.peak_count = 0
+        self.peak_first = None
+        self.peak_last = None
+        self.total = 0
+
+
+# ---------------------------------------------------------------------- analisador
+
+class StreamingLoginAnalyzer:
+    """Todas as detecções de login em uma passada, com memória limitada"""
+
+    def __init__(self, brute_force_window: int = 300, ip_failure_threshold: int = 5,
+                 user_failure_threshold: int = 10, business_hours: Tuple[int, int] = (9, 17),
+                 max_keys: int = 10000, max_findings: int = 1000, max_ips_per_country: int = 1000,
+                 ip_locations: Optional[Dict[str, Dict]] = None, max_lateness: int = 900,
+                 max_distinct: int = 100000):
+        self.brute_force_window = brute_force_window
+        # Eventos até `max_lateness` s fora de ordem ainda entram na janela correta
+        self.max_lateness = max_lateness
+        self.ip_failure_threshold = ip_failure_threshold
+        self.user_failure_threshold = user_failure_threshold
+        self.business_hours = business_hours
+        self.max_keys = max_keys
+        self.max_ips_per_country = max_ips_per_country
+        self.ip_locations = ip_locations if ip_locations is not None else IP_LOCATIONS
+
+        self.total_events = 0
+        self.failed_events = 0
+        self.users = _BoundedCounters(max_keys)
+        self.ips = _BoundedCounters(max_keys)
+        self.distinct_users = _DistinctCounter(max_distinct)
+        self.distinct_ips = _DistinctCounter(max_distinct)
+        self.countries: Dict[str, Dict] = {}
+        self.suspicious_count = 0
+        self.suspicious_locations = _Findings(max_findings)
+        self.off_hours = _Findings(max_findings)
+        self.suspicious_agents = _Findings(max_findings)
+
+        self._ip_bursts: Dict[str, _FailureBurst] = {}
+        self._user_failures: Dict[str, List] = {}  # usuário -> [falhas, primeira, última]
+
+    @classmethod
+    def from_events(cls, events: Iterable[Dict], **kwargs) -> 'StreamingLoginAnalyzer':
+        analyzer = cls(**kwargs)
+        analyzer.consume(events)
+        return analyzer
+
+    def consume(self, events: Iterable[Dict]) -> int:
+        count = 0
+        for event in events:
+            self.process(event)
+            count += 1
+        return count
+
+    def process(self, event: Dict):
+        """Atualiza todas as estatísticas e detecções com um evento"""
+        failed = bool(event.get("ErrorCode"))
+        ip = event.get("SourceIPAddress", "unknown")
+        user = event.get("UserIdentity", {}).get("userName", "unknown")
+        event_time = _parse_time(event["EventTime"])
+        outcome = {"total": 1, "failed": 1} if failed else {"total": 1, "success": 1}
+
+        self.total_events += 1
+        self.failed_events += int(failed)
+        self.users.add(user, **outcome)
+        self.ips.add(ip, **outcome)
+        self.distinct_users.add(user)
+        self.distinct_ips.add(ip)
+
+        if failed:
+            self._track_failure(ip, user, event_time)
+        self._track_location(event, ip, user, failed)
+        self._track_unusual_access(event, ip, user, failed, event_time)
+
+    # ------------------------------------------------------------------ detecções
+
+    def _track_failure(self, ip: str, user: str, event_time: datetime):
+        burst = self._ip_bursts.get(ip)
+        if burst is None:
+            if len(self._ip_bursts) >= self.max_keys:
+                # Descarta os IPs com menores rajadas (os que podem virar ameaça ficam)
+                _evict_smallest(self._ip_bursts, lambda b: b.peak_count, self.max_keys)
+            burst = self._ip_bursts[ip] = _FailureBurst()
+
+        burst.total += 1
+        times = burst.times
+        bisect.insort(times, event_time)
+        # Horizonte em torno do evento atual: serve para ordem crescente, decrescente ou intercalada
+        horizon = timedelta(seconds=self.brute_force_window + self.max_lateness)
+        del times[bisect.bisect_right(times, event_time + horizon):]
+        del times[:bisect.bisect_left(times, event_time - horizon)]
+
+        window = timedelta(seconds=self.brute_force_window)
+        position = bisect.bisect_left(times, event_time)
+        before = bisect.bisect_left(times, event_time - window)
+        if bisect.bisect_right(times, event_time) == len(times) or position == 0:
+            # Evento na ponta (ordem crescente ou decrescente): basta a janela ancorada nele
+            starts = [before] if position else [position]
+        else:
+            # Evento atrasado no meio: qualquer janela iniciada em [t - janela, t] pode ter crescido
+            starts = range(before, bisect.bisect_right(times, event_time))
+        for start in starts:
+            end = bisect.bisect_right(times, times[start] + window)
+            if end - start > burst.peak_count:
+                burst.peak_count, burst.peak_first, burst.peak_last = end - start, times[start], times[end - 1]
+
+        failures = self._user_failures.get(user)
+        if failures is None:
+            if len(self._user_failures) >= self.max_keys:
+                _evict_smallest(self._user_failures, lambda f: f[0], self.max_keys)
+            failures = self._user_failures[user] = [0, event_time, event_time]
+        failures[0] += 1
+        failures[1] = min(failures[1], event_time)
+        failures[2] = max(failures[2], event_time)
+
+    def _track_location(self, event: Dict, ip: str, user: str, failed: bool):
+        location = self.ip_locations.get(ip, UNKNOWN_LOCATION)
+        country = location["country"]
+        stats = self.countries.get(country)
+        if stats is None:
+            stats = self.countries[country] = {"count": 0, "ips": set(), "success": 0, "failed": 0}
+        stats["count"] += 1
+        if len(stats["ips"]) < self.max_ips_per_country:
+            stats["ips"].add(ip)
+        stats["failed" if failed else "success"] += 1
+
+        if "Tor" in location["org"] or country in SUSPICIOUS_COUNTRIES:
+            self.suspicious_count += 1
+            self.suspicious_locations.append({
+                "ip": ip,
+                "country": country,
+                "city": location["city"],
+                "organization": location["org"],
+                "event_time": event["EventTime"],
+                "user": user,
+                "success": not failed
+            })
+
+    def _track_unusual_access(self, event: Dict, ip: str, user: str, failed: bool, event_time: datetime):
+        hour = event_time.hour
+        if not failed and (hour < self.business_hours[0] or hour > self.business_hours[1]):
+            self.off_hours.append({
+                "type": "off_hours_access",
+                "severity": "low",
+                "user": user,
+                "source_ip": ip,
+                "access_time": event["EventTime"],
+                "description": f"Successful login outside business hours at {hour:02d}:00",
+                "impact": "Potential unauthorized access, insider threat"
+            })
+
+        user_agent = event.get("UserAgent", "")
+        if any(agent in user_agent.lower() for agent in SUSPICIOUS_AGENTS):
+            self.suspicious_agents.append({
+                "type": "suspicious_user_agent",
+                "severity": "medium",
+                "user": user,
+                "source_ip": ip,
+                "user_agent": user_agent,
+                "event_time": event["EventTime"],
+                "description": f"Login attempt with suspicious User-Agent: {user_agent}",
+                "impact": "Potential automated attack, credential stuffing"
+            })
+
+    # ------------------------------------------------------------------ resultados
+
+    def login_statistics(self) -> Dict:
+        successful = self.total_events - self.failed_events
+        return {
+            "total_events": self.total_events,
+            "successful_logins": successful,
+            "failed_logins": self.failed_events,
+            "failure_rate": round((self.failed_events / self.total_events) * 100, 2) if self.total_events else 0,
+            "unique_users": len(self.distinct_users),
+            "unique_ips": len(self.distinct_ips),
+            "unique_counts_approximate": self.distinct_users.approximate or self.distinct_ips.approximate,
+            "top_users": self.users.top(5),
+            "top_ips": self.ips.top(5)
+        }
+
+    def brute_force_threats(self) -> List[Dict]:
+        threats = []
+        for ip, burst in self._ip_bursts.items():
+            if burst.peak_count >= self.ip_failure_threshold:
+                span = (burst.peak_last - burst.peak_first).total_seconds()
+                threats.append({
+                    "type": "brute_force_ip",
+                    "severity": "high",
+                    "source_ip": ip,
+                    "failure_count": burst.peak_count,
+                    "total_failures": burst.total,
+                    "time_window_seconds": span,
+                    "description": f"Brute force attack from IP {ip}: {burst.peak_count} failed attempts in {span:.0f} seconds",
+                    "impact": "Potential account compromise, service disruption",
+                    "first_seen": burst.peak_first.isoformat(),
+                    "last_seen": burst.peak_last.isoformat()
+                })
+
+        for user, (count, first_seen, last_seen) in self._user_failures.items():
+            if count >= self.user_failure_threshold:
+                threats.append({
+                    "type": "brute_force_user",
+                    "severity": "medium",
+                    "target_user": user,
+                    "failure_count": count,
+                    "time_window_seconds": (last_seen - first_seen).total_seconds(),
+                    "description": f"Multiple failed logins for user {user}: {count} attempts",
+                    "impact": "Account lockout risk, potential credential compromise",
+                    "first_seen": first_seen.isoformat(),
+                    "last_seen": last_seen.isoformat()
+                })
+        return threats
+
+    def geographic_analysis(self) -> Dict:
+        return {
+            "countries_accessed": list(self.countries),
+            "geographic_distribution": {
+                country: {**stats, "ips": list(stats["ips"])} for country, stats in self.countries.items()
+            },
+            "suspicious_locations": self.suspicious_locations.items,
+            "suspicious_locations_total": self.suspicious_count,
+            "risk_score": self.suspicious_count * 10  # 10 pontos por localização suspeita
+        }
+
+    def unusual_access_threats(self) -> List[Dict]:
+        return self.off_hours.items + self.suspicious_agents.items
+
+    def summary(self) -> Dict:
+        return {
+            "events_processed": self.total_events,
+            "tracked_users": len(self.users.items),
+            "tracked_ips": len(self.ips.items),
+            "evicted_keys": self.users.evicted + self.ips.evicted,
+            "suppressed_findings": (self.suspicious_locations.suppressed + self.off_hours.suppressed
+                                    + self.suspicious_agents.suppressed)
+        }
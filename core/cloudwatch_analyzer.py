@@ -2,17 +2,49 @@
 """
 CloudWatch Analyzer - Análise avançada de métricas e logs via MCP
 Implementa observabilidade inteligente com detecção de anomalias
+
+As métricas de todas as instâncias são analisadas em lote: cada métrica vira
+uma matriz NumPy (instâncias × timestamps) e estatísticas, tendências, status
+e health scores são calculados vetorizados (core.metric_analytics).
 """
 
 import json
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 
+import boto3
+import numpy as np
+
+try:
+    from core.inventory_store import INVENTORY_MAX_AGE, get_inventory_store
+    from core.metric_analytics import (
+        EC2_METRICS, detect_seasonality, fetch_metric_matrices, half_trend, matrix_from_series, row_stats,
+        zscore_anomalies
+    )
+except ImportError:
+    from inventory_store import INVENTORY_MAX_AGE, get_inventory_store
+    from metric_analytics import (
+        EC2_METRICS, detect_seasonality, fetch_metric_matrices, half_trend, matrix_from_series, row_stats,
+        zscore_anomalies
+    )
+
+METRICS_PERIOD_SECONDS = 300
+METRICS_WINDOW_HOURS = 3
+
+
+def _rounded(value, digits: int = 1):
+    """float arredondado; NaN (métrica sem dados) vira None"""
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
 class CloudWatchAnalyzer:
     """Analisador avançado de métricas CloudWatch"""
     
-    def __init__(self):
+    def __init__(self, inventory=None, cloudwatch=None):
         self.mcp_client = self._get_cloudwatch_mcp()
+        # Snapshot local do inventário (None se nunca coletado)
+        self.inventory = inventory if inventory is not None else get_inventory_store(create=False)
+        self.cloudwatch = cloudwatch
         self.thresholds = {
             'cpu_high': 80.0,
             'cpu_low': 10.0,
@@ -64,11 +96,10 @@ class CloudWatchAnalyzer:
             "performance_score": 0
         }
         
-        # Simular análise de instâncias (seria MCP real)
         instances_data = await self._get_ec2_instances_metrics()
         
-        for instance in instances_data:
-            instance_analysis = await self._analyze_single_ec2_instance(instance)
+        # Todas as instâncias de uma vez (matrizes), depois regras por instância
+        for instance_analysis in self._analyze_instances_batch(instances_data):
             analysis_results["instances"].append(instance_analysis)
             
             # Detectar anomalias
@@ -84,10 +115,66 @@ class CloudWatchAnalyzer:
         
         return analysis_results
     
+    def _list_running_instances(self) -> Optional[Dict[str, Dict]]:
+        """Instâncias em execução (id -> tipo/ambiente) pelo inventário local, sem describe"""
+        if self.inventory is None:
+            return None
+        try:
+            records = self.inventory.list_resources(resource_type="AWS::EC2::Instance", state="running",
+                                                    max_age=INVENTORY_MAX_AGE)
+        except Exception as e:
+            print(f"⚠️ Inventário local indisponível: {e}")
+            return None
+        if records is None:
+            return None
+        return {
+            record["resource_id"]: {
+                "instance_type": record["properties"].get("InstanceType", "unknown"),
+                "environment": record["tags"].get("Environment", "unknown")
+            }
+            for record in records
+        }
+    
     async def _get_ec2_instances_metrics(self) -> List[Dict]:
         """Obter métricas de instâncias EC2 via MCP"""
         
-        # Simulação de dados realísticos
+        running = self._list_running_instances()
+        if running:
+            try:
+                return self._fetch_instances_metrics(running)
+            except Exception as e:
+                # Instâncias reais continuam no relatório, com métricas desconhecidas
+                print(f"⚠️ GetMetricData falhou, métricas indisponíveis: {e}")
+                return [
+                    {"instance_id": instance_id, **details, "metrics": {}, "metrics_error": str(e)}
+                    for instance_id, details in running.items()
+                ]
+        if running is not None:
+            # Inventário atualizado sem instâncias em execução
+            return []
+        return self._simulated_ec2_metrics()
+    
+    def _fetch_instances_metrics(self, running: Dict[str, Dict], hours: int = METRICS_WINDOW_HOURS,
+                                 period: int = METRICS_PERIOD_SECONDS) -> List[Dict]:
+        """Métricas de todas as instâncias via GetMetricData em lote (500 queries por chamada)"""
+        if self.cloudwatch is None:
+            self.cloudwatch = boto3.client('cloudwatch')
+        
+        instance_ids = list(running)
+        end_time = datetime.utcnow()
+        _, matrices = fetch_metric_matrices(self.cloudwatch, instance_ids, end_time - timedelta(hours=hours),
+                                            end_time, period)
+        return [
+            {
+                "instance_id": instance_id,
+                **running[instance_id],
+                "metrics": {key: matrix[row] for key, matrix in matrices.items()}
+            }
+            for row, instance_id in enumerate(instance_ids)
+        ]
+    
+    def _simulated_ec2_metrics(self) -> List[Dict]:
+        """Simulação de dados realísticos"""
         return [
             {
                 "instance_id": "i-0123456789abcdef0",
@@ -119,122 +206,117 @@ class CloudWatchAnalyzer:
     
     async def _analyze_single_ec2_instance(self, instance: Dict) -> Dict:
         """Análise detalhada de uma instância"""
+        return self._analyze_instances_batch([instance])[0]
+    
+    def _analyze_instances_batch(self, instances: List[Dict], period: int = METRICS_PERIOD_SECONDS) -> List[Dict]:
+        """Análise vetorizada: uma matriz por métrica, uma linha por instância"""
         
-        metrics = instance["metrics"]
+        if not instances:
+            return []
         
-        # Calcular estatísticas
-        cpu_avg = sum(metrics["cpu_utilization"]) / len(metrics["cpu_utilization"])
-        cpu_max = max(metrics["cpu_utilization"])
-        memory_avg = sum(metrics["memory_utilization"]) / len(metrics["memory_utilization"])
+        matrices = {
+            key: matrix_from_series([instance["metrics"].get(key, []) for instance in instances])
+            for key in EC2_METRICS
+        }
         
-        # Detectar tendências
-        cpu_trend = self._calculate_trend(metrics["cpu_utilization"])
-        memory_trend = self._calculate_trend(metrics["memory_utilization"])
+        # Estatísticas e tendências de todas as instâncias de uma vez
+        cpu = row_stats(matrices["cpu_utilization"])
+        memory = row_stats(matrices["memory_utilization"])
+        cpu_trend = half_trend(matrices["cpu_utilization"])
+        memory_trend = half_trend(matrices["memory_utilization"])
+        cpu_spikes = zscore_anomalies(matrices["cpu_utilization"])
+        cpu_seasonality = detect_seasonality(matrices["cpu_utilization"], period)
         
-        # Calcular IOPS
-        read_iops = sum(metrics["disk_read_ops"]) / len(metrics["disk_read_ops"])
-        write_iops = sum(metrics["disk_write_ops"]) / len(metrics["disk_write_ops"])
+        read_iops = row_stats(matrices["disk_read_ops"])["mean"]
+        write_iops = row_stats(matrices["disk_write_ops"])["mean"]
+        total_iops = np.nan_to_num(read_iops) + np.nan_to_num(write_iops)
+        network_in = np.nan_to_num(row_stats(matrices["network_in"])["mean"]) / 1024 / 1024
+        network_out = np.nan_to_num(row_stats(matrices["network_out"])["mean"]) / 1024 / 1024
         
-        # Calcular throughput de rede
-        network_in_avg = sum(metrics["network_in"]) / len(metrics["network_in"])
-        network_out_avg = sum(metrics["network_out"]) / len(metrics["network_out"])
+        cpu_status = self._get_cpu_status(cpu["mean"], cpu["max"])
+        memory_status = self._get_memory_status(memory["mean"])
+        health_scores = self._calculate_instance_health_score(cpu["mean"], memory["mean"], total_iops)
         
-        return {
-            "instance_id": instance["instance_id"],
-            "instance_type": instance["instance_type"],
-            "environment": instance["environment"],
-            "performance_metrics": {
-                "cpu": {
-                    "average": round(cpu_avg, 1),
-                    "maximum": round(cpu_max, 1),
-                    "trend": cpu_trend,
-                    "status": self._get_cpu_status(cpu_avg, cpu_max)
-                },
-                "memory": {
-                    "average": round(memory_avg, 1),
-                    "trend": memory_trend,
-                    "status": self._get_memory_status(memory_avg)
-                },
-                "disk": {
-                    "read_iops": round(read_iops, 0),
-                    "write_iops": round(write_iops, 0),
-                    "total_iops": round(read_iops + write_iops, 0)
+        return [
+            {
+                "instance_id": instance["instance_id"],
+                "instance_type": instance["instance_type"],
+                "environment": instance["environment"],
+                "performance_metrics": {
+                    "cpu": {
+                        "average": _rounded(cpu["mean"][i]),
+                        "maximum": _rounded(cpu["max"][i]),
+                        "trend": str(cpu_trend[i]),
+                        "status": str(cpu_status[i]),
+                        "anomalous_points": int(cpu_spikes[i]),
+                        "seasonality_seconds": int(cpu_seasonality[i])
+                    },
+                    "memory": {
+                        "average": _rounded(memory["mean"][i]),
+                        "trend": str(memory_trend[i]),
+                        "status": str(memory_status[i])
+                    },
+                    "disk": {
+                        "read_iops": _rounded(np.nan_to_num(read_iops[i]), 0),
+                        "write_iops": _rounded(np.nan_to_num(write_iops[i]), 0),
+                        "total_iops": _rounded(total_iops[i], 0)
+                    },
+                    "network": {
+                        "in_mbps": _rounded(network_in[i], 2),
+                        "out_mbps": _rounded(network_out[i], 2),
+                        "total_mbps": _rounded(network_in[i] + network_out[i], 2)
+                    }
                 },
-                "network": {
-                    "in_mbps": round(network_in_avg / 1024 / 1024, 2),
-                    "out_mbps": round(network_out_avg / 1024 / 1024, 2),
-                    "total_mbps": round((network_in_avg + network_out_avg) / 1024 / 1024, 2)
-                }
-            },
-            "health_score": self._calculate_instance_health_score(cpu_avg, memory_avg, read_iops + write_iops)
-        }
+                "health_score": int(health_scores[i]),
+                **({"metrics_error": instance["metrics_error"]} if "metrics_error" in instance else {})
+            }
+            for i, instance in enumerate(instances)
+        ]
     
     def _calculate_trend(self, values: List[float]) -> str:
         """Calcular tendência dos valores"""
-        if len(values) < 2:
-            return "stable"
-        
-        first_half = sum(values[:len(values)//2]) / (len(values)//2)
-        second_half = sum(values[len(values)//2:]) / (len(values) - len(values)//2)
-        
-        diff_percent = ((second_half - first_half) / first_half) * 100
-        
-        if diff_percent > 10:
-            return "increasing"
-        elif diff_percent < -10:
-            return "decreasing"
-        else:
-            return "stable"
+        return str(half_trend(matrix_from_series([values]))[0])
     
-    def _get_cpu_status(self, avg: float, max_val: float) -> str:
-        """Determinar status da CPU"""
-        if max_val > 90 or avg > 80:
-            return "critical"
-        elif max_val > 80 or avg > 70:
-            return "warning"
-        elif avg < 10:
-            return "underutilized"
-        else:
-            return "normal"
+    @staticmethod
+    def _scalar_or_array(result: np.ndarray):
+        return result.item() if result.ndim == 0 else result
     
-    def _get_memory_status(self, avg: float) -> str:
-        """Determinar status da memória"""
-        if avg > 85:
-            return "critical"
-        elif avg > 75:
-            return "warning"
-        elif avg < 20:
-            return "underutilized"
-        else:
-            return "normal"
+    def _get_cpu_status(self, avg, max_val):
+        """Determinar status da CPU (escalar ou vetor de instâncias)"""
+        avg, max_val = np.asarray(avg, dtype=float), np.asarray(max_val, dtype=float)
+        status = np.select(
+            [np.isnan(avg), (max_val > 90) | (avg > 80), (max_val > 80) | (avg > 70), avg < 10],
+            ["unknown", "critical", "warning", "underutilized"], default="normal")
+        return self._scalar_or_array(status)
     
-    def _calculate_instance_health_score(self, cpu_avg: float, memory_avg: float, iops: float) -> int:
-        """Calcular score de saúde da instância"""
-        score = 100
+    def _get_memory_status(self, avg):
+        """Determinar status da memória (escalar ou vetor de instâncias)"""
+        avg = np.asarray(avg, dtype=float)
+        status = np.select([np.isnan(avg), avg > 85, avg > 75, avg < 20],
+                           ["unknown", "critical", "warning", "underutilized"], default="normal")
+        return self._scalar_or_array(status)
+    
+    def _calculate_instance_health_score(self, cpu_avg, memory_avg, iops):
+        """Calcular score de saúde da instância (escalar ou vetor de instâncias)"""
+        cpu_avg = np.asarray(cpu_avg, dtype=float)
+        memory_avg = np.asarray(memory_avg, dtype=float)
+        iops = np.asarray(iops, dtype=float)
+        
+        score = np.full(np.broadcast(cpu_avg, memory_avg, iops).shape, 100)
         
         # Penalizar CPU alta
-        if cpu_avg > 80:
-            score -= 30
-        elif cpu_avg > 70:
-            score -= 15
+        score -= np.select([cpu_avg > 80, cpu_avg > 70], [30, 15], default=0)
         
         # Penalizar memória alta
-        if memory_avg > 85:
-            score -= 25
-        elif memory_avg > 75:
-            score -= 10
+        score -= np.select([memory_avg > 85, memory_avg > 75], [25, 10], default=0)
         
         # Penalizar IOPS muito alto (possível gargalo)
-        if iops > 5000:
-            score -= 20
-        elif iops > 3000:
-            score -= 10
+        score -= np.select([iops > 5000, iops > 3000], [20, 10], default=0)
         
         # Penalizar recursos subutilizados
-        if cpu_avg < 10 and memory_avg < 20:
-            score -= 15
+        score -= np.where((cpu_avg < 10) & (memory_avg < 20), 15, 0)
         
-        return max(0, score)
+        return self._scalar_or_array(np.maximum(0, score))
     
     def _detect_ec2_anomalies(self, instance_analysis: Dict) -> List[Dict]:
         """Detectar anomalias na instância"""
@@ -253,6 +335,16 @@ class CloudWatchAnalyzer:
                 "impact": "Performance degradada, possível timeout de aplicações"
             })
         
+        # Picos isolados de CPU (|z-score| > 3) mesmo com média normal
+        if metrics["cpu"].get("anomalous_points", 0) > 0 and metrics["cpu"]["status"] != "critical":
+            anomalies.append({
+                "type": "cpu_spikes",
+                "instance_id": instance_id,
+                "severity": "low",
+                "description": f"{metrics['cpu']['anomalous_points']} picos de CPU fora do padrão",
+                "impact": "Possíveis rajadas de carga ou jobs agendados"
+            })
+        
         # Anomalia de memória
         if metrics["memory"]["status"] == "critical":
             anomalies.append({
@@ -340,6 +432,8 @@ class CloudWatchAnalyzer:
     def _calculate_performance_score(self, instances: List[Dict]) -> int:
         """Calcular score geral de performance"""
         
+        # Instâncias sem métricas (GetMetricData falhou) não entram na média
+        instances = [instance for instance in instances if "metrics_error" not in instance]
         if not instances:
             return 0
         
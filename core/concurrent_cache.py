@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Concurrent Cache - Cache LRU com TTL particionado em shards (lock striping)
+Cada shard tem seu próprio lock, OrderedDict e estatísticas, então leitores
+em threads diferentes só disputam o lock quando caem no mesmo shard. Expiração
+é preguiçosa (no acesso) e a evicção remove um lote de entradas antigas de uma
+vez. Suporta cache negativo ("não encontrado") com TTL próprio.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+_NOT_FOUND = object()   # marcador interno de cache negativo
+_MISSING = object()
+
+
+class _Shard:
+    __slots__ = ('lock', 'entries', 'capacity', 'stats')
+
+    def __init__(self, capacity: int):
+        self.lock = threading.Lock()
+        self.entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self.capacity = capacity
+        self.stats = {'hits': 0, 'misses': 0, 'negative_hits': 0, 'sets': 0, 'evictions': 0, 'expirations': 0}
+
+
+class ShardedLRUCache:
+    """Cache concorrente: N shards com LRU + TTL e cache negativo opcional"""
+
+    def __init__(self, max_size: int = 1000, ttl: Optional[float] = 300, shards: int = 16,
+                 negative_ttl: Optional[float] = None, evict_fraction: float = 0.1,
+                 clock: Callable[[], float] = time.monotonic):
+        # Potência de 2 para escolher o shard com máscara
+        count = 1
+        while count < max(1, shards):
+            count <<= 1
+        self._mask = count - 1
+        # Divide a capacidade sem ultrapassar max_size (resto vai para os primeiros shards)
+        per_shard, remainder = divmod(max_size, count)
+        self._shards = [_Shard(max(1, per_shard + (1 if n < remainder else 0))) for n in range(count)]
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._evict_batch = max(1, int(max(per_shard, 1) * evict_fraction))
+        self._clock = clock
+
+    def _shard(self, key: Hashable) -> _Shard:
+        return self._shards[hash(key) & self._mask]
+
+    # ------------------------------------------------------------------ leitura
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """(encontrado, valor); cache negativo retorna (True, None)"""
+        shard = self._shard(key)
+        now = self._clock()
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                shard.stats['misses'] += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at and now >= expires_at:
+                del shard.entries[key]
+                shard.stats['expirations'] += 1
+                shard.stats['misses'] += 1
+                return False, None
+            shard.entries.move_to_end(key)
+            if value is _NOT_FOUND:
+                shard.stats['negative_hits'] += 1
+                return True, None
+            shard.stats['hits'] += 1
+            return True, value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        found, value = self.lookup(key)
+        return value if found and value is not None else default
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.lookup(key)[0]
+
+    # ------------------------------------------------------------------ escrita
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float]):
+        shard = self._shard(key)
+        expires_at = self._clock() + ttl if ttl else 0.0
+        with shard.lock:
+            shard.entries[key] = (expires_at, value)
+            shard.entries.move_to_end(key)
+            shard.stats['sets'] += 1
+            if len(shard.entries) > shard.capacity:
+                self._evict(shard)
+
+    def _evict(self, shard: _Shard):
+        """Remove expirados e, se necessário, um lote das entradas menos usadas"""
+        now = self._clock()
+        expired = [k for k, (expires_at, _) in shard.entries.items() if expires_at and now >= expires_at]
+        for key in expired:
+            del shard.entries[key]
+        shard.stats['expirations'] += len(expired)
+
+        overflow = len(shard.entries) - shard.capacity
+        if overflow > 0:
+            for _ in range(min(len(shard.entries), max(overflow, self._evict_batch))):
+                shard.entries.popitem(last=False)
+                shard.stats['evictions'] += 1
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = _MISSING):
+        self._store(key, value, self.ttl if ttl is _MISSING else ttl)
+
+    def set_missing(self, key: Hashable):
+        """Cache negativo: lembra que a chave não existe (requer negative_ttl)"""
+        if self.negative_ttl:
+            self._store(key, _NOT_FOUND, self.negative_ttl)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Valor do cache ou do loader; None do loader vira cache negativo"""
+        found, value = self.lookup(key)
+        if found:
+            return value
+        value = loader()
+        if value is None:
+            self.set_missing(key)
+        else:
+            self.set(key, value)
+        return value
+
+    def delete(self, key: Hashable) -> bool:
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.entries.pop(key, None) is not None
+
+    def clear(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+
+    def cleanup_expired(self) -> int:
+        """Remove entradas expiradas de todos os shards (um shard por vez)"""
+        removed = 0
+        now = self._clock()
+        for shard in self._shards:
+            with shard.lock:
+                expired = [k for k, (expires_at, _) in shard.entries.items() if expires_at and now >= expires_at]
+                for key in expired:
+                    del shard.entries[key]
+                shard.stats['expirations'] += len(expired)
+                removed += len(expired)
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    # ------------------------------------------------------------------ estatísticas
+
+    def stats(self) -> Dict[str, Any]:
+        totals = {'hits': 0, 'misses': 0, 'negative_hits': 0, 'sets': 0, 'evictions': 0, 'expirations': 0}
+        per_shard: List[Dict[str, int]] = []
+        for shard in self._shards:
+            with shard.lock:
+                snapshot = dict(shard.stats, size=len(shard.entries))
+            per_shard.append(snapshot)
+            for name in totals:
+                totals[name] += snapshot[name]
+
+        lookups = totals['hits'] + totals['negative_hits'] + totals['misses']
+        return {
+            **totals,
+            'size': sum(s['size'] for s in per_shard),
+            'max_size': self.max_size,
+            'shards': len(self._shards),
+            'ttl_seconds': self.ttl,
+            'hit_ratio': round((totals['hits'] + totals['negative_hits']) / lookups, 4) if lookups else 0.0,
+            'per_shard': per_shard
+        }
+
+
+def contention_benchmark(cache, threads: int = 8, operations: int = 20000, keys: int = 2000,
+                         write_ratio: float = 0.1) -> Dict[str, float]:
+    """Mede ops/s com várias threads lendo/escrevendo no mesmo cache
+
+    `cache` precisa de get(key) e set(key, value).
+    """
+    barrier = threading.Barrier(threads + 1)
+    write_every = max(1, int(1 / write_ratio)) if write_ratio else 0
+
+    def worker(offset: int):
+        barrier.wait()
+        for i in range(operations):
+            key = (i * 7919 + offset) % keys
+            if write_every and i % write_every == 0:
+                cache.set(key, i)
+            else:
+                cache.get(key)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return {'threads': threads, 'operations': threads * operations, 'seconds': round(elapsed, 4),
+            'ops_per_second': round(threads * operations / elapsed)}
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Context Assembler - Montagem de contexto com orçamento de tokens
+Conta tokens com tokenizer local (tiktoken quando instalado, aproximação BPE
+caso contrário), empacota snippets RAG, memória e histórico por relevância
+dentro do orçamento do modelo e mantém resumos incrementais das conversas:
+cada novo turno resume apenas o delta desde o último resumo.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_CONTEXT_BUDGET = int(os.environ.get('IAL_CONTEXT_TOKEN_BUDGET', '3000'))
+DEFAULT_RESPONSE_RESERVE = 4096
+
+# Janela de contexto por prefixo de modelo (tokens)
+MODEL_CONTEXT_WINDOWS = {
+    'anthropic.claude-3': 200_000,
+    'anthropic.claude-v2': 100_000,
+    'anthropic.claude-instant': 100_000,
+    'amazon.titan-text': 8_000,
+    'meta.llama3': 8_000,
+    'mistral.': 32_000,
+    'gpt-4o': 128_000,
+    'gpt-4': 8_000,
+    'gpt-3.5': 16_000,
+}
+
+SUMMARY_DOMAINS = ['security', 'networking', 'compute', 'data', 'application', 'observability', 'ai-ml', 'governance']
+SUMMARY_ACTIONS = ['deploy', 'status', 'rollback', 'validate', 'create', 'delete', 'update']
+
+_PIECE_RE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]", re.UNICODE)
+
+
+class Tokenizer:
+    """Contagem/truncamento de tokens local, sem chamadas de rede"""
+
+    def __init__(self, encoding: str = 'cl100k_base'):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.get_encoding(encoding)
+            except Exception:
+                self.encoding = None
+        self.name = encoding if self.encoding is not None else 'approx-bpe'
+
+    @staticmethod
+    def _piece_tokens(piece: str) -> int:
+        # Aproximação de BPE: palavras comuns = 1 token, longas ~6 chars/token,
+        # números ~3 dígitos/token, pontuação = 1 token
+        if piece[0].isdigit():
+            return (len(piece) + 2) // 3
+        if len(piece) == 1 or not piece[0].isalpha():
+            return 1
+        return 1 + (len(piece) - 1) // 6
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return sum(self._piece_tokens(m.group()) for m in _PIECE_RE.finditer(text))
+
+    def truncate(self, text: str, max_tokens: int, marker: str = '...') -> str:
+        """Corta o texto em max_tokens (marcador incluído no limite)"""
+        if max_tokens <= 0 or not text:
+            return ''
+        if self.count(text) <= max_tokens:
+            return text
+
+        limit = max(0, max_tokens - self.count(marker))
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return self.encoding.decode(tokens[:limit]).rstrip() + marker
+
+        used, end = 0, 0
+        for match in _PIECE_RE.finditer(text):
+            cost = self._piece_tokens(match.group())
+            if used + cost > limit:
+                break
+            used += cost
+            end = match.end()
+        return text[:end].rstrip() + marker
+
+
+_tokenizers: Dict[str, Tokenizer] = {}
+
+
+def get_tokenizer(model_id: Optional[str] = None) -> Tokenizer:
+    """Tokenizer compartilhado (cl100k_base aproxima bem Claude/Titan para orçamento)"""
+    encoding = 'o200k_base' if model_id and model_id.startswith('gpt-4o') else 'cl100k_base'
+    tokenizer = _tokenizers.get(encoding)
+    if tokenizer is None:
+        tokenizer = _tokenizers[encoding] = Tokenizer(encoding)
+    return tokenizer
+
+
+def count_tokens(text: str, model_id: Optional[str] = None) -> int:
+    return get_tokenizer(model_id).count(text)
+
+
+def budget_for_model(model_id: Optional[str] = None, max_tokens: Optional[int] = None,
+                     response_reserve: int = DEFAULT_RESPONSE_RESERVE) -> int:
+    """Orçamento de contexto: o menor entre o configurado e o que cabe na janela do modelo"""
+    budget = max_tokens if max_tokens is not None else DEFAULT_CONTEXT_BUDGET
+    window = next((size for prefix, size in MODEL_CONTEXT_WINDOWS.items()
+                   if model_id and model_id.startswith(prefix)), None)
+    if window is not None:
+        budget = min(budget, max(0, window - response_reserve))
+    return budget
+
+
+# ---------------------------------------------------------------------------
+# Resumo incremental
+# ---------------------------------------------------------------------------
+
+def _turn_digest(previous: str, turn: Dict) -> str:
+    payload = json.dumps(
+        [turn.get('user_message', turn.get('role', '')), turn.get('assistant_response', turn.get('content', ''))],
+        ensure_ascii=False, default=str
+    )
+    return hashlib.sha1(f"{previous}\x1e{payload}".encode()).hexdigest()
+
+
+@dataclass
+class RollingSummary:
+    """Estado mesclável do resumo extrativo (tópicos, ações e nº de turnos)"""
+    topics: Set[str] = field(default_factory=set)
+    actions: Set[str] = field(default_factory=set)
+    turns: int = 0
+    turn_ids: List[str] = field(default_factory=list)   # digests dos últimos turnos resumidos
+    text: str = ''
+
+    def render(self) -> str:
+        parts = []
+        if self.topics:
+            parts.append(f"Discussed infrastructure domains: {', '.join(sorted(self.topics))}")
+        if self.actions:
+            parts.append(f"Performed actions: {', '.join(sorted(self.actions))}")
+        parts.append(f"Previous conversation included {self.turns} exchanges")
+        return ". ".join(parts) + "."
+
+
+def extractive_summarize(state: RollingSummary, new_turns: List[Dict]) -> str:
+    """Resumidor padrão: acumula domínios/ações dos novos turnos no estado"""
+    for turn in new_turns:
+        if 'role' in turn:
+            content = str(turn.get('content', '')).lower()
+            user_msg, assistant_msg = (content, '') if turn['role'] == 'user' else ('', content)
+        else:
+            user_msg = str(turn.get('user_message', '')).lower()
+            assistant_msg = str(turn.get('assistant_response', '')).lower()
+        for domain in SUMMARY_DOMAINS:
+            if domain in user_msg or domain in assistant_msg:
+                state.topics.add(domain)
+        for action in SUMMARY_ACTIONS:
+            if action in user_msg:
+                state.actions.add(action)
+    state.turns += len(new_turns)
+    return state.render()
+
+
+# Turnos resumidos lembrados por conversa para reencontrar o ponto de parada
+MAX_TRACKED_TURNS = 256
+
+
+def _resume_position(turn_ids: List[str], known: List[str]) -> int:
+    """Índice após o último turno já resumido dentro da janela, ou 0 se não há continuação
+
+    A janela pode ter deslizado (histórico limitado aos N mais recentes): procura
+    o último turno resumido e exige que os turnos anteriores a ele na janela
+    coincidam com os lembrados, senão o histórico mudou e o resumo é refeito.
+    """
+    if not known:
+        return 0
+    for end in range(len(turn_ids) - 1, -1, -1):
+        if turn_ids[end] != known[-1]:
+            continue
+        overlap = min(end + 1, len(known))
+        if turn_ids[end + 1 - overlap:end + 1] == known[-overlap:]:
+            return end + 1
+    return 0
+
+
+class SummaryCache:
+    """Resumos por conversa; reaproveita o que já foi resumido e resume só o delta
+
+    O ponto de parada é reencontrado pela identidade dos turnos, então funciona
+    tanto com o histórico completo quanto com uma janela dos N mais recentes.
+    summarizer(state, new_turns) -> texto; pode ser um LLM que recebe state.text
+    (resumo anterior) e apenas os turnos novos.
+    """
+
+    def __init__(self, summarizer: Callable[[RollingSummary, List[Dict]], str] = extractive_summarize,
+                 max_conversations: int = 256):
+        self.summarizer = summarizer
+        self.max_conversations = max_conversations
+        self._states: 'OrderedDict[str, RollingSummary]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'incremental': 0, 'rebuilds': 0, 'turns_summarized': 0}
+
+    def summarize(self, turns: List[Dict], conversation_id: Optional[str] = None) -> str:
+        if not turns:
+            return ''
+        key = conversation_id or _turn_digest('', turns[0])
+
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+
+        turn_ids = [_turn_digest('', turn) for turn in turns]
+        start = _resume_position(turn_ids, state.turn_ids) if state is not None else 0
+        if start == 0:
+            state = RollingSummary()
+            self.stats['rebuilds'] += 1
+        else:
+            # Cópia: o estado publicado não muda enquanto o delta é resumido
+            state = RollingSummary(set(state.topics), set(state.actions), state.turns, list(state.turn_ids),
+                                   state.text)
+
+        delta = turns[start:]
+        if not delta:
+            self.stats['hits'] += 1
+            return state.text
+
+        if start:
+            self.stats['incremental'] += 1
+        summarized = state.turns
+        state.text = self.summarizer(state, delta)
+        state.turns = summarized + len(delta)
+        state.turn_ids = (state.turn_ids + turn_ids[start:])[-MAX_TRACKED_TURNS:]
+        self.stats['turns_summarized'] += len(delta)
+
+        with self._lock:
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_conversations:
+                self._states.popitem(last=False)
+        return state.text
+
+
+# ---------------------------------------------------------------------------
+# Empacotamento por relevância
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ContextItem:
+    kind: str                 # 'history' | 'memory' | 'knowledge' | 'summary'
+    text: str
+    score: float = 0.0
+    source: str = ''
+    tokens: int = 0
+    order: int = 0            # posição original (histórico mantém ordem cronológica)
+    payload: Any = None       # objeto de origem (resultado RAG, mensagem)
+
+
+SECTION_TITLES = {
+    'summary': '## Resumo da Conversa:',
+    'history': '## Histórico de Conversas:',
+    'memory': '## Tópicos Relacionados:',
+    'knowledge': 'CONTEXTO RELEVANTE (RAG):',
+}
+SECTION_ORDER = ['summary', 'history', 'memory', 'knowledge']
+# Peso por tipo: histórico recente e resumo entram antes de conhecimento com mesmo score
+KIND_WEIGHTS = {'summary': 2.0, 'history': 1.5, 'memory': 1.0, 'knowledge': 1.0}
+
+
+class ContextAssembler:
+    """Empacota itens de contexto em ordem de relevância até o orçamento do modelo"""
+
+    def __init__(self, model_id: Optional[str] = None, max_tokens: Optional[int] = None,
+                 summary_cache: Optional[SummaryCache] = None, max_item_tokens: int = 400):
+        self.model_id = model_id
+        self.budget = budget_for_model(model_id, max_tokens)
+        self.tokenizer = get_tokenizer(model_id)
+        self.summary_cache = summary_cache or SummaryCache()
+        self.max_item_tokens = max_item_tokens
+
+    def count(self, text: str) -> int:
+        return self.tokenizer.count(text)
+
+    def pack(self, items: Iterable[ContextItem], budget: Optional[int] = None) -> Dict[str, Any]:
+        """Seleção gulosa por relevância ponderada; itens grandes são truncados"""
+        budget = self.budget if budget is None else budget
+        candidates, seen = [], set()
+        for order, item in enumerate(items):
+            text = (item.text or '').strip()
+            if not text or text in seen:
+                continue
+            seen.add(text)
+            if self.count(text) > self.max_item_tokens:
+                text = self.tokenizer.truncate(text, self.max_item_tokens)
+            item.text, item.order = text, item.order or order
+            item.tokens = self.count(text) + 1  # +1 para o separador de linha
+            candidates.append(item)
+
+        candidates.sort(key=lambda i: (-(i.score * KIND_WEIGHTS.get(i.kind, 1.0)), i.order))
+        selected, dropped, used = [], [], 0
+        for item in candidates:
+            if used + item.tokens <= budget:
+                selected.append(item)
+                used += item.tokens
+            else:
+                dropped.append(item)
+        # Saída: seções em ordem fixa; histórico cronológico, demais por relevância
+        selected.sort(key=lambda i: (SECTION_ORDER.index(i.kind) if i.kind in SECTION_ORDER else 99,
+                                     0 if i.kind in ('summary', 'history') else -i.score, i.order))
+        return {'items': selected, 'dropped': dropped, 'tokens': used, 'budget': budget}
+
+    def assemble(self, query: str = '', knowledge: Optional[List[Dict]] = None,
+                 memory: Optional[List[Dict]] = None, history: Optional[List[Dict]] = None,
+                 conversation_id: Optional[str] = None, keep_recent: int = 5,
+                 budget: Optional[int] = None) -> Dict[str, Any]:
+        """Monta o bloco de contexto (resumo + histórico + memória + RAG) dentro do orçamento
+
+        knowledge: resultados do retriever ({'text'|'content', 'score', 'source'})
+        memory:    mensagens relacionadas ({'content', 'score'?})
+        history:   turnos em ordem cronológica ({'user_message', 'assistant_response'}
+                   ou {'role', 'content'})
+        """
+        budget = self.budget if budget is None else budget
+        budget -= self.count(query)
+        items: List[ContextItem] = []
+
+        history = history or []
+        split = max(0, len(history) - keep_recent)
+        older, recent = history[:split], history[split:]
+        if older:
+            summary = self.summary_cache.summarize(older, conversation_id)
+            items.append(ContextItem('summary', summary, score=1.0, order=0))
+        for offset, turn in enumerate(recent):
+            # Turnos mais novos valem mais; ordem cronológica é preservada na saída
+            recency = (offset + 1) / len(recent)
+            items.append(ContextItem('history', format_turn(turn), score=0.5 + 0.5 * recency, order=offset + 1))
+
+        for n, msg in enumerate(memory or []):
+            items.append(ContextItem('memory', msg.get('content', ''), score=float(msg.get('score', 0.5)),
+                                     order=1000 + n, payload=msg))
+        for n, result in enumerate(knowledge or []):
+            items.append(ContextItem('knowledge', result.get('text', result.get('content', '')),
+                                     score=float(result.get('score', 0.0)), source=result.get('source', 'unknown'),
+                                     order=2000 + n, payload=result))
+
+        packed = self.pack(items, max(0, budget))
+        packed['text'] = render_sections(packed['items'])
+        packed['budget'] = budget + self.count(query)
+        packed['tokenizer'] = self.tokenizer.name
+        return packed
+
+
+def format_turn(turn: Dict) -> str:
+    if 'role' in turn:
+        role = "Você" if turn['role'] == 'user' else "IAL"
+        return f"{role}: {turn.get('content', '')}"
+    parts = []
+    if turn.get('user_message'):
+        parts.append(f"Você: {turn['user_message']}")
+    if turn.get('assistant_response'):
+        parts.append(f"IAL: {turn['assistant_response']}")
+    return "\n".join(parts)
+
+
+def render_sections(items: List[ContextItem]) -> str:
+    lines, current, knowledge_n = [], None, 0
+    for item in items:
+        if item.kind != current:
+            if lines:
+                lines.append('')
+            lines.append(SECTION_TITLES.get(item.kind, f"## {item.kind}:"))
+            current = item.kind
+        if item.kind == 'knowledge':
+            knowledge_n += 1
+            lines.append(f"[{knowledge_n}] (score: {item.score:.2f}, source: {item.source})\n{item.text}")
+        elif item.kind == 'memory':
+            lines.append(f"- {item.text}")
+        else:
+            lines.append(item.text)
+    return "\n".join(lines)
+
+
+_assemblers: Dict[Any, ContextAssembler] = {}
+
+
+def get_context_assembler(model_id: Optional[str] = None, max_tokens: Optional[int] = None) -> ContextAssembler:
+    """Assembler compartilhado por modelo (o cache de resumos vive entre chamadas)"""
+    key = (model_id, max_tokens)
+    assembler = _assemblers.get(key)
+    if assembler is None:
+        assembler = _assemblers[key] = ContextAssembler(model_id, max_tokens)
+    return assembler
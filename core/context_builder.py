@@ -1,23 +1,20 @@
 """Context Builder: orquestrador unificado de contexto."""
 from typing import Dict, Any, Optional
 from services.rag.retriever import retrieve
+from core.context_assembler import get_context_assembler, render_sections
 
-def build_enhanced_context(user_query: str, user_id: str = None, session_id: str = None) -> Dict[str, Any]:
-    """Orquestrador unificado de contexto"""
+def build_enhanced_context(user_query: str, user_id: str = None, session_id: str = None,
+                           max_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """Orquestrador unificado de contexto (limitado a max_tokens ou ao orçamento padrão)"""
     
-    # 1. Context Engine (conversational memory)
-    conversation_context = ""
+    # 1. Context Engine (conversational memory): histórico e tópicos relacionados como itens
+    conversation = {}
     try:
         from ial.core.memory.context_engine_optimized import OptimizedContextEngine
         context_engine = OptimizedContextEngine()
-        if user_id and session_id:
-            conversation_context = context_engine.build_context_for_query_optimized(
-                user_query, user_id, session_id
-            )
-        else:
-            conversation_context = context_engine.build_context_for_query_optimized(
-                user_query, "default_user", "default_session"
-            )
+        conversation = context_engine.get_context_items_optimized(
+            user_query, user_id or "default_user", session_id or "default_session"
+        )
     except Exception:
         pass
     
@@ -28,6 +25,19 @@ def build_enhanced_context(user_query: str, user_id: str = None, session_id: str
     except Exception:
         pass
     
+    # Histórico, memória e snippets RAG disputam o mesmo orçamento por relevância;
+    # turnos antigos entram como resumo incremental da conversa
+    assembler = get_context_assembler(max_tokens=max_tokens)
+    packed = assembler.assemble(
+        query=user_query,
+        knowledge=knowledge_snippets,
+        memory=conversation.get('memory'),
+        history=conversation.get('history'),
+        conversation_id=conversation.get('conversation_id')
+    )
+    conversation_context = render_sections([item for item in packed['items'] if item.kind != 'knowledge'])
+    knowledge_snippets = [item.payload for item in packed['items'] if item.kind == 'knowledge']
+    
     # 3. Intent extraction (basic)
     intent = "conversational"
     if any(word in user_query.lower() for word in ["create", "deploy", "provision"]):
@@ -39,7 +49,8 @@ def build_enhanced_context(user_query: str, user_id: str = None, session_id: str
         "conversation": conversation_context,
         "knowledge": knowledge_snippets,
         "intent": intent,
-        "query": user_query
+        "query": user_query,
+        "tokens": packed['tokens']
     }
 
 # Backward compatibility
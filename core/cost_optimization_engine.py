@@ -9,12 +9,23 @@ import asyncio
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 
+try:
+    from core.inventory_store import INVENTORY_MAX_AGE, get_inventory_store
+except ImportError:
+    from inventory_store import INVENTORY_MAX_AGE, get_inventory_store
+
+# Preço aproximado de EBS (USD por GB/mês) por tipo de volume
+EBS_GB_MONTH_PRICES = {'gp2': 0.10, 'gp3': 0.08, 'io1': 0.125, 'io2': 0.125, 'st1': 0.045, 'sc1': 0.015,
+                       'standard': 0.05}
+
 class CostOptimizationEngine:
     """Engine de otimização de custos inteligente"""
     
-    def __init__(self):
+    def __init__(self, inventory=None):
         self.cost_analyzer = self._initialize_cost_analyzer()
         self.bedrock_engine = self._initialize_bedrock_engine()
+        # Snapshot local do inventário (None se nunca coletado)
+        self.inventory = inventory if inventory is not None else get_inventory_store(create=False)
         
         # Thresholds de otimização
         self.optimization_thresholds = {
@@ -212,6 +223,10 @@ class CostOptimizationEngine:
     async def _analyze_idle_resources(self) -> List[Dict]:
         """Análise de recursos idle"""
         
+        inventory_opportunities = self._idle_resources_from_inventory()
+        if inventory_opportunities is not None:
+            return inventory_opportunities
+        
         opportunities = []
         
         # Instâncias idle
@@ -240,6 +255,56 @@ class CostOptimizationEngine:
         
         return opportunities
     
+    def _idle_resources_from_inventory(self) -> Optional[List[Dict]]:
+        """Volumes EBS soltos e instâncias paradas direto do inventário local (sem describe)"""
+        
+        if self.inventory is None:
+            return None
+        try:
+            volumes = self.inventory.list_resources(service='ebs', max_age=INVENTORY_MAX_AGE)
+            if volumes is None:
+                return None
+            stopped = self.inventory.list_resources(resource_type='AWS::EC2::Instance', state='stopped')
+        except Exception as e:
+            print(f"⚠️ Inventário local indisponível: {e}")
+            return None
+        
+        def volume_cost(volume: Dict) -> float:
+            props = volume['properties']
+            return props.get('Size', 0) * EBS_GB_MONTH_PRICES.get(props.get('VolumeType'), 0.10)
+        
+        opportunities = []
+        attached_cost: Dict[str, float] = {}
+        for volume in volumes:
+            if volume['state'] == 'available':
+                opportunities.append({
+                    'type': 'unattached_volume',
+                    'resource_id': volume['resource_id'],
+                    'region': volume['region'],
+                    'recommended_action': 'Snapshot and delete unattached EBS volume',
+                    'reason': f"{volume['properties'].get('Size', 0)}GB {volume['properties'].get('VolumeType')} not attached to any instance",
+                    'monthly_savings': round(volume_cost(volume), 2),
+                    'implementation_effort': 'low',
+                    'risk_level': 'low'
+                })
+            for instance_id in volume['properties'].get('AttachedTo', []):
+                attached_cost[instance_id] = attached_cost.get(instance_id, 0.0) + volume_cost(volume)
+        
+        for instance in stopped:
+            opportunities.append({
+                'type': 'idle_instance',
+                'resource_id': instance['resource_id'],
+                'resource_type': instance['properties'].get('InstanceType'),
+                'region': instance['region'],
+                'recommended_action': 'Terminate stopped instance (snapshot volumes first) if unused',
+                'reason': 'Instance stopped but attached EBS volumes are still billed',
+                'monthly_savings': round(attached_cost.get(instance['resource_id'], 0.0), 2),
+                'implementation_effort': 'low',
+                'risk_level': 'medium'
+            })
+        
+        return opportunities
+    
     async def _analyze_data_transfer(self) -> List[Dict]:
         """Análise de otimização de data transfer"""
         
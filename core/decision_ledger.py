@@ -2,11 +2,18 @@ import json
 import os
 import uuid
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+
+try:
+    from core.ledger_store import get_ledger_store
+except ImportError:
+    from ledger_store import get_ledger_store
 
 class DecisionLedger:
     def __init__(self):
         os.makedirs("reports", exist_ok=True)
+        # Writer único e bufferizado, com rotação e índice (reports/ledger/)
+        self.store = get_ledger_store("reports")
 
     def log(self, phase, mcp, tool, rationale, status, metadata: Optional[Dict[str, Any]] = None):
         entry = {
@@ -23,8 +30,7 @@ class DecisionLedger:
         if metadata:
             entry["metadata"] = metadata
             
-        with open("reports/decisions.log", "a") as f:
-            f.write(json.dumps(entry) + "\n")
+        self.store.append(entry)
     
     def log_context(self, phase: str, context_hash: str, snippets_count: int):
         entry = {
@@ -35,8 +41,12 @@ class DecisionLedger:
             "context_hash": context_hash,
             "snippets_count": snippets_count
         }
-        with open("reports/decisions.log", "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry) + "\n")
+        self.store.append(entry)
+    
+    def query(self, phase: Optional[str] = None, status: Optional[str] = None, since=None,
+              until=None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Consulta decisões via índice (since/until: epoch, ISO-8601 ou '24h')"""
+        return self.store.query(phase=phase, status=status, since=since, until=until, limit=limit)
     
     def log_flag_change(self, scope: str, state: str, actor: str, reason: str, 
                        ticket: str = "", duration_hours: int = 0):
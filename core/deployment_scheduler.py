@@ -0,0 +1,384 @@
+"""
+Deployment Scheduler - Deploy concorrente de stacks guiado por DAG de dependências
+Combina phases/deployment-order.yaml com referências Fn::ImportValue/outputs_contract
+e executa stacks independentes em paralelo até um limite de concorrência.
+"""
+
+import os
+import re
+import time
+import threading
+import yaml
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+try:
+    from core.resilience.registry import get_concurrency_limiter, is_overload_error
+except ImportError:
+    from resilience.registry import get_concurrency_limiter, is_overload_error
+
+
+class _TaggedLoader(yaml.SafeLoader):
+    """Loader que preserva as tags curtas do CloudFormation (!ImportValue -> Fn::ImportValue)"""
+    pass
+
+
+def _tagged_constructor(loader, tag_suffix, node):
+    if isinstance(node, yaml.ScalarNode):
+        value = loader.construct_scalar(node)
+    elif isinstance(node, yaml.SequenceNode):
+        value = loader.construct_sequence(node, deep=True)
+    else:
+        value = loader.construct_mapping(node, deep=True)
+    name = tag_suffix if tag_suffix == 'Ref' else f"Fn::{tag_suffix}"
+    return {name: value}
+
+
+_TaggedLoader.add_multi_constructor('!', _tagged_constructor)
+
+_SUB_VARIABLE = re.compile(r'\$\{([^}!]+)\}')
+
+
+class UnresolvedImportError(ValueError):
+    """Fn::ImportValue sem stack produtor no grafo (nem export já existente na conta)"""
+
+    def __init__(self, missing: Dict[str, List[str]]):
+        self.missing = missing
+        details = '; '.join(f"{key}: {', '.join(sorted(names))}" for key, names in sorted(missing.items()))
+        super().__init__(f"Unresolved Fn::ImportValue (no producer stack): {details}")
+
+
+@dataclass
+class StackNode:
+    """Um stack (arquivo de fase) no grafo de deployment"""
+    key: str
+    phase: str
+    file_path: str
+    stack_name: str
+    depends_on: Set[str] = field(default_factory=set)
+    exports: Set[str] = field(default_factory=set)
+    imports: Set[str] = field(default_factory=set)
+    unresolved_imports: Set[str] = field(default_factory=set)
+
+
+class DeploymentScheduler:
+    """Agenda deploys de stacks respeitando dependências, com paralelismo limitado"""
+
+    def __init__(self, phases_dir: str, parser=None, max_concurrency: int = 4,
+                 project_name: str = "ial-fork",
+                 event_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 order_file: str = "deployment-order.yaml", phase_barrier: bool = True,
+                 external_exports: Optional[Iterable[str]] = None):
+        self.phases_dir = phases_dir
+        self.parser = parser
+        self.max_concurrency = max(1, max_concurrency)
+        self.project_name = project_name
+        self.event_callback = event_callback or self._print_event
+        self.order_file = os.path.join(phases_dir, order_file)
+        # phase_barrier=True (padrão): paraleliza só dentro da fase (cada fase espera a anterior).
+        # Com False, a ordem vem só do grafo, que precisa declarar todas as dependências.
+        self.phase_barrier = phase_barrier
+        # Exports que já existem na conta (stacks fora deste deploy) satisfazem imports
+        self.external_exports = set(external_exports or ())
+        self._events_lock = threading.Lock()
+        self.events: List[Dict[str, Any]] = []
+
+    # ------------------------------------------------------------------
+    # Construção do grafo
+    # ------------------------------------------------------------------
+
+    def build_graph(self, phases: List[str]) -> Dict[str, StackNode]:
+        """Constrói o DAG de stacks das fases informadas"""
+        nodes: Dict[str, StackNode] = {}
+        for phase in phases:
+            for file_path in self._list_phase_files(phase):
+                name = os.path.basename(file_path).rsplit('.', 1)[0]
+                key = f"{phase}/{name}"
+                node = StackNode(key=key, phase=phase, file_path=file_path,
+                                 stack_name=f"{self.project_name}-{name}")
+                self._scan_template(node)
+                nodes[key] = node
+
+        # Dependências explícitas do deployment-order.yaml
+        for key, deps in self._load_declared_dependencies().items():
+            if key in nodes:
+                nodes[key].depends_on.update(d for d in deps if d in nodes and d != key)
+
+        # Dependências implícitas: Fn::ImportValue -> stack que exporta o nome
+        exporters: Dict[str, str] = {}
+        for node in nodes.values():
+            for export in node.exports:
+                exporters[export] = node.key
+        missing: Dict[str, List[str]] = {}
+        for node in nodes.values():
+            for imported in node.imports:
+                producer = exporters.get(imported)
+                if producer is None:
+                    if imported not in self.external_exports:
+                        missing.setdefault(node.key, []).append(imported)
+                elif producer != node.key:
+                    node.depends_on.add(producer)
+            if node.unresolved_imports:
+                missing.setdefault(node.key, []).extend(node.unresolved_imports)
+        if missing:
+            # Sem produtor o stack poderia iniciar antes de quem exporta o valor
+            raise UnresolvedImportError(missing)
+
+        if self.phase_barrier:
+            previous: List[str] = []
+            for phase in phases:
+                current = [k for k, n in nodes.items() if n.phase == phase]
+                for key in current:
+                    nodes[key].depends_on.update(previous)
+                previous = current or previous
+
+        self._check_acyclic(nodes)
+        return nodes
+
+    def _list_phase_files(self, phase: str) -> List[str]:
+        if self.parser is not None:
+            return self.parser.list_phase_files(phase)
+        phase_path = os.path.join(self.phases_dir, phase)
+        if not os.path.isdir(phase_path):
+            return []
+        return sorted(os.path.join(phase_path, f) for f in os.listdir(phase_path) if f.endswith('.yaml'))
+
+    def _load_declared_dependencies(self) -> Dict[str, List[str]]:
+        try:
+            with open(self.order_file, 'r') as f:
+                order = yaml.safe_load(f) or {}
+        except (OSError, yaml.YAMLError) as e:
+            print(f"⚠️ Could not read {self.order_file}: {e}")
+            return {}
+        return {
+            key: list((spec or {}).get('depends_on') or [])
+            for key, spec in (order.get('dependencies') or {}).items()
+        }
+
+    def _scan_template(self, node: StackNode):
+        """Coleta exports e imports cross-stack de um template"""
+        try:
+            with open(node.file_path, 'r') as f:
+                template = yaml.load(f, Loader=_TaggedLoader)
+        except Exception:
+            return
+        if not isinstance(template, dict):
+            return
+
+        variables = {'ProjectName': self.project_name, 'Environment': 'prod',
+                     'AWS::StackName': node.stack_name}
+        for name, spec in (template.get('Parameters') or {}).items():
+            if isinstance(spec, dict) and 'Default' in spec and name not in variables:
+                variables[name] = str(spec['Default'])
+
+        for output in (template.get('Outputs') or {}).values():
+            export_name = (output or {}).get('Export', {}).get('Name') if isinstance(output, dict) else None
+            resolved = self._resolve_name(export_name, variables)
+            if resolved:
+                node.exports.add(resolved)
+
+        # Contrato de saída IAL: outputs obrigatórios também podem ser importados
+        for output_name in (template.get('outputs_contract') or {}).get('must_exist', []) or []:
+            if isinstance(output_name, str):
+                node.exports.update({output_name, f"{self.project_name}-{output_name}"})
+
+        self._collect_imports(template.get('Resources'), variables, node)
+        self._collect_imports(template.get('resources'), variables, node)
+
+    def _collect_imports(self, value: Any, variables: Dict[str, str], node: StackNode):
+        if isinstance(value, dict):
+            if 'Fn::ImportValue' in value:
+                resolved = self._resolve_name(value['Fn::ImportValue'], variables)
+                if resolved:
+                    node.imports.add(resolved)
+                else:
+                    # Nome dinâmico: não dá para saber o produtor estaticamente
+                    node.unresolved_imports.add(str(value['Fn::ImportValue']))
+                return
+            for child in value.values():
+                self._collect_imports(child, variables, node)
+        elif isinstance(value, list):
+            for child in value:
+                self._collect_imports(child, variables, node)
+
+    @staticmethod
+    def _resolve_name(value: Any, variables: Dict[str, str]) -> Optional[str]:
+        """Resolve nomes literais ou Fn::Sub simples; None se não resolvível estaticamente"""
+        if isinstance(value, dict) and 'Fn::Sub' in value:
+            value = value['Fn::Sub']
+            if isinstance(value, list):
+                value = value[0] if value else None
+        if not isinstance(value, str):
+            return None
+        unresolved = []
+
+        def substitute(match):
+            name = match.group(1)
+            if name in variables:
+                return variables[name]
+            unresolved.append(name)
+            return match.group(0)
+
+        resolved = _SUB_VARIABLE.sub(substitute, value)
+        return None if unresolved else resolved
+
+    @staticmethod
+    def _check_acyclic(nodes: Dict[str, StackNode]):
+        state: Dict[str, int] = {}
+
+        def visit(key: str, path: List[str]):
+            state[key] = 1
+            for dep in nodes[key].depends_on:
+                if state.get(dep) == 1:
+                    cycle = path[path.index(dep):] + [dep] if dep in path else [key, dep]
+                    raise ValueError(f"Dependency cycle detected: {' -> '.join(cycle)}")
+                if dep not in state:
+                    visit(dep, path + [dep])
+            state[key] = 2
+
+        for key in nodes:
+            if key not in state:
+                visit(key, [key])
+
+    def critical_path(self, nodes: Dict[str, StackNode],
+                      durations: Optional[Dict[str, float]] = None) -> List[str]:
+        """Caminho mais longo do DAG (por duração estimada ou número de stacks)"""
+        durations = durations or {}
+        memo: Dict[str, tuple] = {}
+
+        def longest(key: str) -> tuple:
+            if key not in memo:
+                best = (0.0, [])
+                for dep in nodes[key].depends_on:
+                    candidate = longest(dep)
+                    if candidate[0] > best[0]:
+                        best = candidate
+                memo[key] = (best[0] + durations.get(key, 1.0), best[1] + [key])
+            return memo[key]
+
+        return max((longest(k) for k in nodes), default=(0.0, []), key=lambda item: item[0])[1]
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+
+    def deploy(self, phases: List[str],
+               deploy_fn: Optional[Callable[[StackNode], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Deploy concorrente: cada stack inicia assim que suas dependências concluem"""
+        nodes = self.build_graph(phases)
+        deploy_fn = deploy_fn or (lambda node: self.parser.deploy_file(node.file_path))
+
+        remaining = {key: set(node.depends_on) for key, node in nodes.items()}
+        dependents: Dict[str, Set[str]] = {key: set() for key in nodes}
+        for key, node in nodes.items():
+            for dep in node.depends_on:
+                dependents[dep].add(key)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        durations: Dict[str, float] = {}
+        started_at = time.time()
+
+        for key in nodes:
+            self._emit(key, nodes[key], 'QUEUED', depends_on=sorted(nodes[key].depends_on))
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            running = {}
+
+            def submit_ready():
+                for key in [k for k, deps in remaining.items() if not deps]:
+                    del remaining[key]
+                    self._emit(key, nodes[key], 'STARTED')
+                    running[executor.submit(self._run_node, nodes[key], deploy_fn)] = key
+
+            submit_ready()
+            while running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    result, elapsed = future.result()
+                    results[key] = result
+                    durations[key] = elapsed
+
+                    if result.get('success', False):
+                        self._emit(key, nodes[key], 'SUCCEEDED', elapsed=elapsed, action=result.get('action'))
+                        for child in dependents[key]:
+                            if child in remaining:
+                                remaining[child].discard(key)
+                    else:
+                        self._emit(key, nodes[key], 'FAILED', elapsed=elapsed, error=result.get('error'))
+                        self._block_dependents(key, nodes, dependents, remaining, results)
+                submit_ready()
+
+        # Qualquer nó restante ficou preso atrás de uma falha
+        for key in list(remaining):
+            self._block_dependents(key, nodes, dependents, remaining, results, include_self=True)
+
+        wall_clock = time.time() - started_at
+        critical = self.critical_path(nodes, durations)
+        return {
+            'success': all(r.get('success', False) for r in results.values()),
+            'total_stacks': len(nodes),
+            'successful': len([r for r in results.values() if r.get('success', False)]),
+            'results': results,
+            'wall_clock_seconds': round(wall_clock, 2),
+            'sum_of_stack_seconds': round(sum(durations.values()), 2),
+            'critical_path': critical,
+            'critical_path_seconds': round(sum(durations.get(k, 0.0) for k in critical), 2),
+            'max_concurrency': self.max_concurrency
+        }
+
+    def _run_node(self, node: StackNode, deploy_fn) -> tuple:
+        # Limite adaptativo compartilhado: throttling do CloudFormation reduz as stacks simultâneas
+        limiter = get_concurrency_limiter('cloudformation')
+        limiter.acquire()
+        start = time.time()
+        try:
+            result = deploy_fn(node) or {'success': False, 'error': 'Deploy returned no result'}
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        overloaded = not result.get('success', False) and is_overload_error(Exception(result.get('error', '')))
+        limiter.release(dropped=overloaded)
+        return result, time.time() - start
+
+    def _block_dependents(self, failed_key: str, nodes: Dict[str, StackNode], dependents: Dict[str, Set[str]],
+                          remaining: Dict[str, Set[str]], results: Dict[str, Dict], include_self: bool = False):
+        pending = [failed_key] if include_self else list(dependents[failed_key])
+        while pending:
+            key = pending.pop()
+            if key not in remaining:
+                continue
+            del remaining[key]
+            results[key] = {'success': False, 'action': 'blocked',
+                            'error': f'Blocked by failed dependency {failed_key}'}
+            self._emit(key, nodes[key], 'BLOCKED', blocked_by=failed_key)
+            pending.extend(dependents[key])
+
+    def _emit(self, key: str, node: StackNode, status: str, **details):
+        event = {
+            'stack': node.stack_name,
+            'key': key,
+            'phase': node.phase,
+            'status': status,
+            'timestamp': datetime.utcnow().isoformat(),
+            **details
+        }
+        with self._events_lock:
+            self.events.append(event)
+        try:
+            self.event_callback(event)
+        except Exception as e:
+            print(f"⚠️ Event callback failed: {e}")
+
+    @staticmethod
+    def _print_event(event: Dict[str, Any]):
+        icons = {'QUEUED': '⏸️', 'STARTED': '🔄', 'SUCCEEDED': '✅', 'FAILED': '❌', 'BLOCKED': '⛔'}
+        if event['status'] == 'QUEUED':
+            return
+        suffix = f" ({event['elapsed']:.1f}s)" if 'elapsed' in event else ''
+        if event.get('error'):
+            suffix += f" - {event['error']}"
+        if event.get('blocked_by'):
+            suffix += f" - blocked by {event['blocked_by']}"
+        print(f"   {icons.get(event['status'], '•')} [{event['phase']}] {event['stack']} {event['status']}{suffix}")
@@ -3,6 +3,7 @@ import boto3
 from typing import Dict, List, Any
 from core.desired_state import DesiredStateBuilder
 from core.audit_validator import AuditValidator
+from core.drift.property_comparator import compare_properties
 
 class DriftDetector:
     def __init__(self, region: str = "us-east-1"):
@@ -113,32 +114,12 @@ class DriftDetector:
     
     def _compare_resource_config(self, desired: Dict, current: Dict) -> List[Dict]:
         """Compare individual resource configuration"""
-        differences = []
-        
-        # Compare tags
-        desired_tags = desired.get('tags', {})
-        current_tags = current.get('tags', {})
-        
-        for tag_key, tag_value in desired_tags.items():
-            if current_tags.get(tag_key) != tag_value:
-                differences.append({
-                    'property': f'tags.{tag_key}',
-                    'desired': tag_value,
-                    'current': current_tags.get(tag_key),
-                    'type': 'tag_drift'
-                })
-        
-        # Compare other properties (simplified)
-        for prop in ['description', 'name', 'state']:
-            if prop in desired and desired.get(prop) != current.get(prop):
-                differences.append({
-                    'property': prop,
-                    'desired': desired.get(prop),
-                    'current': current.get(prop),
-                    'type': 'property_drift'
-                })
-        
-        return differences
+        # Canonical comparison: only properties declared in the desired state count
+        return compare_properties(
+            desired, current,
+            resource_type=desired.get('type'),
+            ignore_unspecified=True
+        )
     
     def _calculate_severity(self, differences: List[Dict]) -> str:
         """Calculate drift severity based on differences"""
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Drift Prefilter - Triagem determinística de drift antes da análise com IA
+Regras locais para diffs cosméticos e padrões conhecidos, cache de veredictos
+por fingerprint do diff e métricas de chamadas ao LLM evitadas.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Propriedades cuja alteração não muda o comportamento do recurso
+COSMETIC_PROPERTIES = {'tags', 'Tags', 'description', 'Description'}
+
+# Padrões já classificados: (regex sobre o caminho da propriedade, veredicto)
+CLASSIFIED_PATTERNS = [
+    (re.compile(r'(^|\.)(SecurityGroupIngress|SecurityGroupEgress|ingress_rules|egress_rules)\b'), {
+        'severity': 'critical', 'drift_type': 'security',
+        'recommended_action': 'review', 'auto_remediable': False,
+        'reasoning': 'Regras de security group alteradas fora do IaC'
+    }),
+    (re.compile(r'(^|\.)(PolicyDocument|AssumeRolePolicyDocument|Policies|ManagedPolicyArns|iam_policy|access_policy)\b'), {
+        'severity': 'critical', 'drift_type': 'security',
+        'recommended_action': 'review', 'auto_remediable': False,
+        'reasoning': 'Permissões IAM alteradas fora do IaC'
+    }),
+    (re.compile(r'(^|\.)(BucketEncryption|KmsKeyId|StorageEncrypted|SSESpecification|encryption)\b'), {
+        'severity': 'critical', 'drift_type': 'security',
+        'recommended_action': 'update', 'auto_remediable': False,
+        'reasoning': 'Configuração de criptografia divergente'
+    }),
+    (re.compile(r'(^|\.)(PublicAccessBlockConfiguration|PubliclyAccessible|public_access)\b'), {
+        'severity': 'critical', 'drift_type': 'security',
+        'recommended_action': 'update', 'auto_remediable': False,
+        'reasoning': 'Exposição pública divergente do desired state'
+    }),
+    (re.compile(r'(^|\.)(DeletionProtection|DeletionProtectionEnabled|deletion_protection|BackupRetentionPeriod)\b'), {
+        'severity': 'critical', 'drift_type': 'data',
+        'recommended_action': 'update', 'auto_remediable': False,
+        'reasoning': 'Proteção de dados divergente do desired state'
+    })
+]
+
+
+def _top_segment(path: str) -> str:
+    # "Properties.Tags.Env" -> considera a primeira propriedade após "Properties"
+    segments = [s.split('[', 1)[0] for s in path.split('.')]
+    if segments and segments[0] in ('Properties', 'properties') and len(segments) > 1:
+        return segments[1]
+    return segments[0]
+
+
+def diff_fingerprint(resource_type: str, changes: List[Dict]) -> str:
+    """Fingerprint estável de um diff (tipo de recurso + mudanças por caminho)"""
+    normalized = sorted(
+        json.dumps([c['property'], c.get('change'), c.get('desired'), c.get('current')],
+                   sort_keys=True, default=str)
+        for c in changes
+    )
+    payload = json.dumps([resource_type, normalized])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class DriftRuleEngine:
+    """Classifica localmente diffs cosméticos e padrões conhecidos"""
+
+    def __init__(self, cosmetic_properties: Optional[set] = None, patterns: Optional[List] = None):
+        self.cosmetic_properties = COSMETIC_PROPERTIES if cosmetic_properties is None else cosmetic_properties
+        self.patterns = CLASSIFIED_PATTERNS if patterns is None else patterns
+
+    def classify(self, resource_type: str, changes: List[Dict]) -> Optional[Dict]:
+        """Retorna um veredicto local ou None quando o diff é ambíguo"""
+        if not changes:
+            return {
+                'drift_detected': False,
+                'severity': 'info',
+                'drift_type': 'none',
+                'recommended_action': 'none',
+                'confidence': 1.0,
+                'reasoning': 'Estados equivalentes após canonicalização',
+                'auto_remediable': False,
+                'analysis_method': 'rule_engine'
+            }
+
+        if all(_top_segment(c['property']) in self.cosmetic_properties for c in changes):
+            return {
+                'drift_detected': True,
+                'severity': 'info',
+                'drift_type': 'metadata',
+                'recommended_action': 'update',
+                'confidence': 0.95,
+                'reasoning': 'Apenas mudanças cosméticas (tags/descrição)',
+                'auto_remediable': True,
+                'analysis_method': 'rule_engine'
+            }
+
+        for pattern, verdict in self.patterns:
+            if any(pattern.search(c['property']) for c in changes):
+                return dict(verdict, drift_detected=True, confidence=0.9, analysis_method='rule_engine')
+
+        return None
+
+
+class VerdictCache:
+    """Cache LRU de veredictos de drift por fingerprint do diff"""
+
+    def __init__(self, max_size: int = 5000):
+        self.max_size = max_size
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        with self._lock:
+            verdict = self._entries.get(fingerprint)
+            if verdict is not None:
+                self._entries.move_to_end(fingerprint)
+            return verdict
+
+    def put(self, fingerprint: str, verdict: Dict):
+        with self._lock:
+            self._entries[fingerprint] = verdict
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TriageMetrics:
+    """Contadores da triagem de drift (thread-safe)"""
+
+    FIELDS = ('resources_analyzed', 'resolved_by_rules', 'cache_hits',
+              'sent_to_llm', 'llm_calls', 'llm_failures')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {field: 0 for field in self.FIELDS}
+            self.started_at = datetime.utcnow().isoformat()
+
+    def incr(self, field: str, amount: int = 1):
+        with self._lock:
+            self.counters[field] += amount
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+        analyzed = counters['resources_analyzed']
+        # Baseline: uma chamada ao LLM por recurso analisado
+        counters['llm_calls_saved'] = max(analyzed - counters['llm_calls'], 0)
+        counters['llm_call_reduction'] = (
+            round(analyzed / counters['llm_calls'], 2) if counters['llm_calls'] else float(analyzed)
+        )
+        counters['since'] = self.started_at
+        return counters
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Incremental Drift - Detecção de drift orientada a eventos do CloudTrail
+Mantém um dirty-set de recursos tocados por chamadas de API mutáveis e
+re-verifica apenas esses, com varredura completa periódica como rede de segurança.
+
+Entradas só saem do dirty-set depois de verificadas (pending() + ack()): o ack
+compara o contador de eventos lido, então um recurso marcado de novo durante a
+verificação continua pendente; a varredura completa remove apenas entradas
+marcadas antes de ela começar.
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# Prefixos de eventos somente-leitura (não causam drift)
+READ_ONLY_PREFIXES = ('Get', 'Describe', 'List', 'Head', 'Lookup', 'BatchGet', 'Search', 'Scan', 'Query')
+
+# Identificadores conhecidos em requestParameters/responseElements -> tipo CloudFormation
+RESOURCE_ID_KEYS = [
+    ('bucketName', 'AWS::S3::Bucket'),
+    ('groupId', 'AWS::EC2::SecurityGroup'),
+    ('instanceId', 'AWS::EC2::Instance'),
+    ('vpcId', 'AWS::EC2::VPC'),
+    ('subnetId', 'AWS::EC2::Subnet'),
+    ('volumeId', 'AWS::EC2::Volume'),
+    ('roleName', 'AWS::IAM::Role'),
+    ('policyArn', 'AWS::IAM::ManagedPolicy'),
+    ('userName', 'AWS::IAM::User'),
+    ('dBInstanceIdentifier', 'AWS::RDS::DBInstance'),
+    ('dBClusterIdentifier', 'AWS::RDS::DBCluster'),
+    ('functionName', 'AWS::Lambda::Function'),
+    ('tableName', 'AWS::DynamoDB::Table'),
+    ('keyId', 'AWS::KMS::Key'),
+    ('queueUrl', 'AWS::SQS::Queue'),
+    ('topicArn', 'AWS::SNS::Topic'),
+    ('loadBalancerArn', 'AWS::ElasticLoadBalancingV2::LoadBalancer'),
+    ('stackName', 'AWS::CloudFormation::Stack')
+]
+
+# Tipos cujo PhysicalResourceId no CloudFormation já é o próprio ARN
+ARN_PHYSICAL_ID_TYPES = {
+    'AWS::IAM::ManagedPolicy', 'AWS::SNS::Topic',
+    'AWS::ElasticLoadBalancingV2::LoadBalancer', 'AWS::CloudFormation::Stack'
+}
+
+
+def _parse_event_time(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def normalize_cloudtrail_event(event: Dict) -> Dict:
+    """Aceita evento EventBridge ('detail') ou registro CloudTrail bruto"""
+    if 'detail' in event and isinstance(event['detail'], dict):
+        return event['detail']
+    return event
+
+
+def is_mutating_event(record: Dict) -> bool:
+    """Verifica se a chamada de API pode ter alterado um recurso"""
+    if record.get('errorCode'):
+        return False
+    if 'readOnly' in record:
+        return not record['readOnly']
+    event_name = record.get('eventName', '')
+    return bool(event_name) and not event_name.startswith(READ_ONLY_PREFIXES)
+
+
+def physical_id_from_arn(resource_type: str, arn: str) -> str:
+    """Converte o ARN de `resources[]` no PhysicalResourceId usado pelo CloudFormation"""
+    parts = arn.split(':', 5)
+    if not arn.startswith('arn:') or len(parts) < 6 or resource_type in ARN_PHYSICAL_ID_TYPES:
+        return arn
+    _, _, service, region, account, resource = parts
+    if service == 'sqs':
+        return f"https://sqs.{region}.amazonaws.com/{account}/{resource}"
+    if service == 's3':
+        return resource.split('/', 1)[0]
+    if service in ('lambda', 'rds'):
+        # function:nome[:versão] / db:nome / cluster:nome
+        return resource.split(':')[1] if ':' in resource else resource
+    # ec2 (instance/i-...), iam (role/caminho/nome), dynamodb (table/nome), kms (key/id)
+    return resource.rsplit('/', 1)[-1]
+
+
+def extract_touched_resources(event: Dict) -> List[Dict]:
+    """Extrai os recursos tocados por um evento CloudTrail mutável"""
+    record = normalize_cloudtrail_event(event)
+    if not is_mutating_event(record):
+        return []
+
+    region = record.get('awsRegion', 'us-east-1')
+    touched: Dict[str, Dict] = {}
+
+    def add(resource_type: str, resource_id: Any):
+        if not resource_id or not isinstance(resource_id, str):
+            return
+        resource = {'resource_type': resource_type, 'resource_id': resource_id, 'region': region}
+        touched[resource_key(resource)] = resource
+
+    for section in (record.get('requestParameters') or {}, record.get('responseElements') or {}):
+        if not isinstance(section, dict):
+            continue
+        for id_key, resource_type in RESOURCE_ID_KEYS:
+            add(resource_type, section.get(id_key))
+        # EC2 agrupa IDs em "instancesSet.items"
+        for item in (section.get('instancesSet') or {}).get('items', []) or []:
+            add('AWS::EC2::Instance', item.get('instanceId'))
+
+    # resources[] repete o recurso dos parâmetros como ARN: só entra o que ainda não foi identificado
+    identified_types = {resource['resource_type'] for resource in touched.values()}
+    for resource in record.get('resources', []) or []:
+        resource_type = resource.get('type') or resource.get('resourceType', 'unknown')
+        if resource_type in identified_types:
+            continue
+        resource_id = resource.get('ARN') or resource.get('resourceName')
+        if isinstance(resource_id, str):
+            resource_id = physical_id_from_arn(resource_type, resource_id)
+        add(resource_type, resource_id)
+
+    event_time = _parse_event_time(record.get('eventTime'))
+    for resource in touched.values():
+        resource['event_name'] = record.get('eventName')
+        resource['event_time'] = event_time
+    return list(touched.values())
+
+
+def resource_key(resource: Dict) -> str:
+    return f"{resource['resource_type']}|{resource.get('region', 'us-east-1')}|{resource['resource_id']}"
+
+
+def iter_events_from_file(path: str) -> Iterator[Dict]:
+    """Lê eventos de um arquivo JSONL (opcionalmente .gz) ou export CloudTrail ({'Records': [...]})"""
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            payload = json.loads(line)
+            if isinstance(payload, dict) and 'Records' in payload:
+                yield from payload['Records']
+            else:
+                yield payload
+
+
+class DirtySet:
+    """Dirty-set local (arquivo JSON) de recursos pendentes de verificação"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self.last_full_sweep: float = 0.0
+        self._load()
+
+    def _load(self):
+        if self.path and self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+                self._entries = data.get('entries', {})
+                self.last_full_sweep = data.get('last_full_sweep', 0.0)
+            except (ValueError, OSError) as e:
+                print(f"⚠️ Dirty-set corrompido, reiniciando: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'entries': self._entries, 'last_full_sweep': self.last_full_sweep}))
+        os.replace(tmp_path, self.path)
+
+    def mark(self, resources: Iterable[Dict]) -> int:
+        """Marca recursos como sujos, retornando quantos eram novos"""
+        added = 0
+        with self._lock:
+            for resource in resources:
+                key = resource_key(resource)
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = dict(resource, first_event_time=resource.get('event_time'), events=0)
+                    self._entries[key] = entry
+                    added += 1
+                entry['events'] += 1
+                entry['event_name'] = resource.get('event_name')
+                entry['marked_at'] = time.time()
+            self._save()
+        return added
+
+    def pending(self) -> List[Dict]:
+        """Retorna (sem remover) os recursos sujos"""
+        with self._lock:
+            return [dict(entry) for entry in self._entries.values()]
+
+    def ack(self, entries: Iterable[Dict]) -> int:
+        """Remove entradas verificadas, exceto as marcadas de novo desde a leitura"""
+        removed = 0
+        with self._lock:
+            for entry in entries:
+                key = resource_key(entry)
+                current = self._entries.get(key)
+                if current is not None and current['events'] == entry['events']:
+                    del self._entries[key]
+                    removed += 1
+            if removed:
+                self._save()
+        return removed
+
+    def record_full_sweep(self, timestamp: Optional[float] = None):
+        """Registra uma varredura completa iniciada em `timestamp`"""
+        with self._lock:
+            self.last_full_sweep = timestamp or time.time()
+            # A varredura cobre o que estava pendente quando começou; marcas posteriores ficam
+            self._entries = {key: entry for key, entry in self._entries.items()
+                             if entry.get('marked_at', 0) > self.last_full_sweep}
+            self._save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DynamoDBDirtySet(DirtySet):
+    """Dirty-set compartilhado entre invocações Lambda (tabela DynamoDB)"""
+
+    SWEEP_KEY = '__full_sweep__'
+
+    def __init__(self, table_name: str, region: str = 'us-east-1'):
+        import boto3
+        from boto3.dynamodb.conditions import Attr
+        self._attr = Attr
+        self.path = None
+        self.table = boto3.resource('dynamodb', region_name=region).Table(table_name)
+        self._lock = threading.Lock()
+        self._entries = {}
+        item = self.table.get_item(Key={'resource_key': self.SWEEP_KEY}).get('Item', {})
+        self.last_full_sweep = float(item.get('timestamp', 0))
+
+    def mark(self, resources: Iterable[Dict]) -> int:
+        added = 0
+        for resource in resources:
+            response = self.table.update_item(
+                Key={'resource_key': resource_key(resource)},
+                UpdateExpression=('SET resource_type = :t, resource_id = :i, #r = :r, event_name = :e, '
+                                  'marked_at = :now, '
+                                  'first_event_time = if_not_exists(first_event_time, :ts) ADD events :one'),
+                ExpressionAttributeNames={'#r': 'region'},
+                ExpressionAttributeValues={
+                    ':t': resource['resource_type'], ':i': resource['resource_id'],
+                    ':r': resource.get('region', 'us-east-1'), ':e': resource.get('event_name') or 'unknown',
+                    ':ts': str(resource.get('event_time') or time.time()), ':one': 1,
+                    ':now': Decimal(str(time.time()))
+                },
+                ReturnValues='UPDATED_OLD'
+            )
+            if not response.get('Attributes'):
+                added += 1
+        return added
+
+    def _scan_entries(self) -> List[Dict]:
+        entries = []
+        kwargs = {'ConsistentRead': True}
+        while True:
+            response = self.table.scan(**kwargs)
+            entries.extend(i for i in response.get('Items', []) if i['resource_key'] != self.SWEEP_KEY)
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        return entries
+
+    def _delete_if(self, key: str, condition) -> bool:
+        try:
+            self.table.delete_item(Key={'resource_key': key}, ConditionExpression=condition)
+            return True
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            # Marcado de novo depois da leitura: continua pendente
+            return False
+
+    def pending(self) -> List[Dict]:
+        entries = self._scan_entries()
+        for entry in entries:
+            entry['first_event_time'] = float(entry.get('first_event_time') or 0) or None
+        return entries
+
+    def ack(self, entries: Iterable[Dict]) -> int:
+        return sum(
+            self._delete_if(entry['resource_key'], self._attr('events').eq(entry['events']))
+            for entry in entries
+        )
+
+    def record_full_sweep(self, timestamp: Optional[float] = None):
+        self.last_full_sweep = timestamp or time.time()
+        started = Decimal(str(self.last_full_sweep))
+        for entry in self._scan_entries():
+            self._delete_if(entry['resource_key'],
+                            self._attr('marked_at').not_exists() | self._attr('marked_at').lte(started))
+        self.table.put_item(Item={'resource_key': self.SWEEP_KEY, 'timestamp': str(self.last_full_sweep)})
+
+    def __len__(self) -> int:
+        return self.table.scan(Select='COUNT').get('Count', 0)
+
+
+class IncrementalDriftDetector:
+    """Re-verifica apenas recursos sujos, com varredura completa periódica"""
+
+    def __init__(self, dirty_set: DirtySet, check_resource: Callable[[Dict], Optional[Dict]],
+                 full_sweep: Optional[Callable[[], List[Dict]]] = None,
+                 full_sweep_interval: int = 24 * 3600):
+        self.dirty_set = dirty_set
+        self.check_resource = check_resource
+        self.full_sweep = full_sweep
+        self.full_sweep_interval = full_sweep_interval
+        self.stats = {'events_processed': 0, 'events_ignored': 0, 'resources_marked': 0}
+
+    def record_event(self, event: Dict) -> List[Dict]:
+        """Registra um evento EventBridge/CloudTrail no dirty-set"""
+        resources = extract_touched_resources(event)
+        if resources:
+            self.stats['events_processed'] += 1
+            self.stats['resources_marked'] += self.dirty_set.mark(resources)
+        else:
+            self.stats['events_ignored'] += 1
+        return resources
+
+    def replay(self, events: Iterable[Dict]) -> int:
+        """Reaplica uma sequência de eventos (ex.: arquivo JSONL em testes)"""
+        count = 0
+        for event in events:
+            self.record_event(event)
+            count += 1
+        return count
+
+    def full_sweep_due(self, now: Optional[float] = None) -> bool:
+        now = now or time.time()
+        return self.full_sweep is not None and now - self.dirty_set.last_full_sweep >= self.full_sweep_interval
+
+    def run(self, force_full: bool = False) -> Dict:
+        """Executa um ciclo: varredura completa se vencida, senão apenas o dirty-set"""
+        started = time.time()
+        if force_full and self.full_sweep is None:
+            raise ValueError("force_full=True requires a full_sweep callable")
+
+        if force_full or self.full_sweep_due(started):
+            # Só registra a varredura (limpando o dirty-set) se ela terminar sem erro
+            drifts = self.full_sweep()
+            self.dirty_set.record_full_sweep(started)
+            return {
+                'mode': 'full_sweep',
+                'drifts': drifts,
+                'resources_checked': None,
+                'duration_seconds': round(time.time() - started, 3)
+            }
+
+        dirty = self.dirty_set.pending()
+        drifts = []
+        failed = []
+        checked = 0
+        detect_latencies = []
+        for resource in dirty:
+            try:
+                result = self.check_resource(resource)
+            except Exception as e:
+                # Continua no dirty-set para o próximo ciclo
+                failed.append({'resource_id': resource['resource_id'], 'error': str(e)})
+                continue
+            self.dirty_set.ack([resource])
+            checked += 1
+            if result and result.get('drift_detected'):
+                drifts.append(result)
+            if resource.get('first_event_time'):
+                detect_latencies.append(time.time() - resource['first_event_time'])
+
+        return {
+            'mode': 'incremental',
+            'drifts': drifts,
+            'resources_checked': checked,
+            'failed_checks': failed,
+            'max_time_to_detect_seconds': round(max(detect_latencies), 3) if detect_latencies else None,
+            'duration_seconds': round(time.time() - started, 3),
+            'event_stats': dict(self.stats)
+        }
+
+
+def check_resource_drift_cfn(resource: Dict, cf_client=None) -> Optional[Dict]:
+    """Verifica drift de um único recurso via CloudFormation (2 chamadas de API)"""
+    import boto3
+    from botocore.exceptions import ClientError
+    cf_client = cf_client or boto3.client('cloudformation', region_name=resource.get('region', 'us-east-1'))
+
+    try:
+        stack_resources = cf_client.describe_stack_resources(
+            PhysicalResourceId=resource['resource_id']
+        ).get('StackResources', [])
+    except ClientError as e:
+        # Throttling, AccessDenied etc. propagam: o recurso continua no dirty-set e é re-tentado
+        error = e.response.get('Error', {})
+        if error.get('Code') != 'ValidationError' or 'does not exist' not in error.get('Message', ''):
+            raise
+        # Recurso fora de stacks gerenciadas: candidato a reverse sync
+        return {
+            'resource_id': resource['resource_id'],
+            'resource_type': resource['resource_type'],
+            'drift_detected': True,
+            'drift_status': 'UNMANAGED',
+            'event_name': resource.get('event_name')
+        }
+
+    for stack_resource in stack_resources:
+        drift = cf_client.detect_stack_resource_drift(
+            StackName=stack_resource['StackName'],
+            LogicalResourceId=stack_resource['LogicalResourceId']
+        )['StackResourceDrift']
+        status = drift.get('StackResourceDriftStatus')
+        if status not in ('IN_SYNC', 'NOT_CHECKED'):
+            return {
+                'resource_id': resource['resource_id'],
+                'resource_type': resource['resource_type'],
+                'stack_name': stack_resource['StackName'],
+                'logical_id': stack_resource['LogicalResourceId'],
+                'drift_detected': True,
+                'drift_status': status,
+                'property_differences': drift.get('PropertyDifferences', []),
+                'event_name': resource.get('event_name')
+            }
+
+    return {'resource_id': resource['resource_id'], 'drift_detected': False}
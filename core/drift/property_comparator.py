@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Property Comparator - Comparação canônica de propriedades CloudFormation
+Canonicaliza árvores de propriedades (listas sem ordem, defaults, intrinsics)
+e produz diferenças por caminho, pulando subárvores idênticas via hash.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Listas cuja ordem não tem significado na semântica do CloudFormation/IAM
+UNORDERED_LIST_KEYS = {
+    'Statement', 'Action', 'NotAction', 'Resource', 'NotResource',
+    'AWS', 'Service', 'Federated', 'CanonicalUser',
+    'SecurityGroupIngress', 'SecurityGroupEgress', 'SecurityGroupIds', 'SecurityGroups',
+    'SubnetIds', 'Subnets', 'ManagedPolicyArns', 'Policies', 'Tags',
+    'AllowedOrigins', 'AllowedMethods', 'AllowedHeaders', 'ExposedHeaders',
+    'security_groups', 'subnets', 'tags'
+}
+
+# Chaves cujo valor é case-insensitive (nomes de ações IAM)
+CASE_INSENSITIVE_KEYS = {'Action', 'NotAction'}
+
+# Chaves IAM que aceitam string ou lista equivalente ("s3:GetObject" == ["s3:GetObject"])
+SINGLETON_LIST_KEYS = {'Action', 'NotAction', 'Resource', 'NotResource', 'AWS', 'Service', 'Federated'}
+
+# Valores default do CloudFormation que podem ser omitidos no template
+CFN_PROPERTY_DEFAULTS = {
+    'AWS::EC2::SecurityGroup': {
+        'SecurityGroupEgress': [{'IpProtocol': '-1', 'CidrIp': '0.0.0.0/0'}]
+    },
+    'AWS::EC2::VPC': {
+        'EnableDnsSupport': True,
+        'EnableDnsHostnames': False,
+        'InstanceTenancy': 'default'
+    },
+    'AWS::IAM::Role': {
+        'Path': '/',
+        'MaxSessionDuration': 3600
+    },
+    'AWS::IAM::ManagedPolicy': {
+        'Path': '/'
+    },
+    'AWS::Lambda::Function': {
+        'MemorySize': 128,
+        'Timeout': 3,
+        'PackageType': 'Zip'
+    },
+    'AWS::SQS::Queue': {
+        'DelaySeconds': 0,
+        'VisibilityTimeout': 30,
+        'MessageRetentionPeriod': 345600
+    },
+    'AWS::DynamoDB::Table': {
+        'BillingMode': 'PROVISIONED'
+    }
+}
+
+# Campos voláteis que nunca representam drift
+VOLATILE_KEYS = {'timestamp', 'updated_at', 'created_at', 'last_modified'}
+
+_SCALAR = 's'
+_MAP = 'm'
+_LIST = 'l'
+_SET = 'u'
+
+
+class CanonicalNode:
+    """Nó de uma árvore canônica com digest memoizado da subárvore"""
+
+    __slots__ = ('kind', 'value', 'digest')
+
+    def __init__(self, kind: str, value: Any, digest: bytes):
+        self.kind = kind
+        self.value = value
+        self.digest = digest
+
+    def to_python(self) -> Any:
+        """Converte o nó de volta para estruturas Python simples"""
+        if self.kind == _MAP:
+            return {k: v.to_python() for k, v in self.value.items()}
+        if self.kind in (_LIST, _SET):
+            return [v.to_python() for v in self.value]
+        return self.value
+
+    @property
+    def hexdigest(self) -> str:
+        return self.digest.hex()
+
+
+def _hash(kind: str, parts: Iterable[bytes]) -> bytes:
+    h = hashlib.blake2b(kind.encode(), digest_size=16)
+    for part in parts:
+        h.update(part)
+    return h.digest()
+
+
+def _normalize_intrinsic(value: Dict) -> Any:
+    """Normaliza formas equivalentes de funções intrínsecas"""
+    if len(value) != 1:
+        return value
+    fn, arg = next(iter(value.items()))
+    if fn == 'Fn::GetAtt' and isinstance(arg, str) and '.' in arg:
+        return {fn: arg.split('.', 1)}
+    if fn == 'Fn::Sub' and isinstance(arg, list) and len(arg) == 1:
+        return {fn: arg[0]}
+    if fn == 'Fn::Join' and isinstance(arg, list) and len(arg) == 2:
+        delimiter, items = arg
+        if isinstance(items, list) and all(isinstance(i, (str, int, float)) for i in items):
+            return delimiter.join(str(i) for i in items)
+    return value
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == [] or value == {}
+
+
+class PropertyComparator:
+    """Canonicalizador + comparador compartilhado para árvores de propriedades"""
+
+    def __init__(self, unordered_keys: Optional[set] = None,
+                 ignore_keys: Optional[set] = None,
+                 defaults: Optional[Dict[str, Dict]] = None):
+        self.unordered_keys = UNORDERED_LIST_KEYS if unordered_keys is None else unordered_keys
+        self.ignore_keys = VOLATILE_KEYS if ignore_keys is None else ignore_keys
+        self.defaults = CFN_PROPERTY_DEFAULTS if defaults is None else defaults
+
+    # ------------------------------------------------------------------
+    # Canonicalização
+    # ------------------------------------------------------------------
+
+    def canonicalize(self, value: Any, resource_type: Optional[str] = None) -> CanonicalNode:
+        """Canonicaliza uma árvore calculando o digest de cada subárvore uma única vez"""
+        if resource_type and isinstance(value, dict) and resource_type in self.defaults:
+            if isinstance(value.get('Properties'), dict):
+                value = dict(value, Properties=self._elide_defaults(value['Properties'], resource_type))
+            else:
+                value = self._elide_defaults(value, resource_type)
+        return self._canon(value, None)
+
+    def _elide_defaults(self, properties: Dict, resource_type: str) -> Dict:
+        defaults = self.defaults[resource_type]
+        elided = {}
+        for key, item in properties.items():
+            if key in defaults and self._canon(item, key).digest == self._canon(defaults[key], key).digest:
+                continue
+            elided[key] = item
+        return elided
+
+    def _canon(self, value: Any, key: Optional[str]) -> CanonicalNode:
+        if isinstance(value, dict):
+            value = _normalize_intrinsic(value)
+            if not isinstance(value, dict):
+                return self._canon(value, key)
+
+            children = {}
+            for child_key, child in value.items():
+                if child_key in self.ignore_keys or _is_empty(child):
+                    continue
+                children[str(child_key)] = self._canon(child, str(child_key))
+
+            ordered = sorted(children.items())
+            digest = _hash(_MAP, (k.encode() + b'\0' + node.digest for k, node in ordered))
+            return CanonicalNode(_MAP, dict(ordered), digest)
+
+        if isinstance(value, (list, tuple)):
+            if key in ('Tags', 'tags') and all(isinstance(t, dict) and 'Key' in t for t in value):
+                return self._canon({self._tag_key(t['Key']): t.get('Value') for t in value}, key)
+
+            items = [self._scalar_node(item, key) if isinstance(item, str) else self._canon(item, key)
+                     for item in value if not _is_empty(item)]
+            if key in self.unordered_keys:
+                items.sort(key=lambda node: node.digest)
+                return CanonicalNode(_SET, items, _hash(_SET, (n.digest for n in items)))
+            return CanonicalNode(_LIST, items, _hash(_LIST, (n.digest for n in items)))
+
+        if isinstance(value, str) and key in SINGLETON_LIST_KEYS:
+            return self._canon([value], key)
+
+        if isinstance(value, str) and key and key.endswith('PolicyDocument'):
+            try:
+                return self._canon(json.loads(value), key)
+            except ValueError:
+                pass
+
+        return self._scalar_node(value, key)
+
+    def _tag_key(self, key: Any) -> str:
+        """Chave de tag canônica; intrinsics ({"Ref": ...}) viram JSON estável"""
+        node = self._canon(key, 'Key')
+        if node.kind == _SCALAR:
+            return node.value
+        return json.dumps(node.to_python(), sort_keys=True, separators=(',', ':'))
+
+    def _scalar_node(self, value: Any, key: Optional[str]) -> CanonicalNode:
+        scalar = self._canon_scalar(value, key)
+        return CanonicalNode(_SCALAR, scalar, _hash(_SCALAR, (scalar.encode(),)))
+
+    @staticmethod
+    def _canon_scalar(value: Any, key: Optional[str]) -> str:
+        # CloudFormation trata números e booleanos como strings
+        if isinstance(value, bool):
+            scalar = 'true' if value else 'false'
+        elif isinstance(value, float) and value.is_integer():
+            scalar = str(int(value))
+        else:
+            scalar = str(value)
+        if key in CASE_INSENSITIVE_KEYS:
+            scalar = scalar.lower()
+        return scalar
+
+    # ------------------------------------------------------------------
+    # Comparação
+    # ------------------------------------------------------------------
+
+    def fingerprint(self, value: Any, resource_type: Optional[str] = None) -> str:
+        """Digest canônico de uma árvore de propriedades"""
+        return self.canonicalize(value, resource_type).hexdigest
+
+    def compare(self, desired: Any, current: Any, resource_type: Optional[str] = None,
+                ignore_unspecified: bool = False) -> List[Dict]:
+        """Compara duas árvores e retorna diferenças por caminho
+
+        Com ignore_unspecified=True, chaves presentes apenas no estado atual
+        são ignoradas (semântica de drift do CloudFormation).
+        """
+        desired_node = desired if isinstance(desired, CanonicalNode) else self.canonicalize(desired, resource_type)
+        current_node = current if isinstance(current, CanonicalNode) else self.canonicalize(current, resource_type)
+
+        differences = []
+        self._diff(desired_node, current_node, '', ignore_unspecified, differences)
+        return differences
+
+    def _diff(self, desired: CanonicalNode, current: CanonicalNode, path: str,
+              ignore_unspecified: bool, out: List[Dict]):
+        if desired.digest == current.digest:
+            return
+
+        if desired.kind != current.kind or desired.kind == _SCALAR:
+            out.append(_difference(path, desired, current, 'modified'))
+            return
+
+        if desired.kind == _MAP:
+            for key, desired_child in desired.value.items():
+                child_path = f"{path}.{key}" if path else key
+                current_child = current.value.get(key)
+                if current_child is None:
+                    out.append(_difference(child_path, desired_child, None, 'removed'))
+                else:
+                    self._diff(desired_child, current_child, child_path, ignore_unspecified, out)
+            if not ignore_unspecified:
+                for key, current_child in current.value.items():
+                    if key not in desired.value:
+                        child_path = f"{path}.{key}" if path else key
+                        out.append(_difference(child_path, None, current_child, 'added'))
+            return
+
+        if desired.kind == _SET:
+            missing, extra = _multiset_difference(desired.value, current.value)
+            for node in missing:
+                out.append(_difference(f"{path}[{node.hexdigest[:8]}]", node, None, 'removed'))
+            for node in extra:
+                out.append(_difference(f"{path}[{node.hexdigest[:8]}]", None, node, 'added'))
+            return
+
+        for index in range(max(len(desired.value), len(current.value))):
+            child_path = f"{path}[{index}]"
+            if index >= len(current.value):
+                out.append(_difference(child_path, desired.value[index], None, 'removed'))
+            elif index >= len(desired.value):
+                out.append(_difference(child_path, None, current.value[index], 'added'))
+            else:
+                self._diff(desired.value[index], current.value[index], child_path, ignore_unspecified, out)
+
+
+def _multiset_difference(desired: List[CanonicalNode],
+                         current: List[CanonicalNode]) -> Tuple[List[CanonicalNode], List[CanonicalNode]]:
+    remaining: Dict[bytes, int] = {}
+    for node in current:
+        remaining[node.digest] = remaining.get(node.digest, 0) + 1
+
+    missing = []
+    for node in desired:
+        if remaining.get(node.digest):
+            remaining[node.digest] -= 1
+        else:
+            missing.append(node)
+
+    extra = []
+    for node in current:
+        if remaining.get(node.digest):
+            remaining[node.digest] -= 1
+            extra.append(node)
+    return missing, extra
+
+
+def _difference(path: str, desired: Optional[CanonicalNode], current: Optional[CanonicalNode],
+                change: str) -> Dict:
+    return {
+        'property': path,
+        'desired': desired.to_python() if desired is not None else None,
+        'current': current.to_python() if current is not None else None,
+        'type': 'tag_drift' if any(seg in ('tags', 'Tags') for seg in path.split('.')) else 'property_drift',
+        'change': change
+    }
+
+
+_default_comparator = PropertyComparator()
+
+
+def compare_properties(desired: Any, current: Any, resource_type: Optional[str] = None,
+                       ignore_unspecified: bool = False) -> List[Dict]:
+    """Compara árvores de propriedades usando o comparador padrão"""
+    return _default_comparator.compare(desired, current, resource_type, ignore_unspecified)
+
+
+def properties_fingerprint(value: Any, resource_type: Optional[str] = None) -> str:
+    """Fingerprint canônico usando o comparador padrão"""
+    return _default_comparator.fingerprint(value, resource_type)
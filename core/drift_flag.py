@@ -12,6 +12,11 @@ from datetime import datetime, timedelta
 from typing import Dict, Optional, List
 from enum import Enum
 
+try:
+    from core.flag_client import get_flag_client
+except ImportError:
+    from flag_client import get_flag_client
+
 class DriftState(Enum):
     ENABLED = "ENABLED"      # Normal drift detection + auto-reconcile
     PAUSED = "PAUSED"        # Detect + record + PR, but no auto-reconcile
@@ -31,6 +36,13 @@ class DriftFlag:
         except Exception as e:
             logging.warning(f"DynamoDB table {self.table_name} not accessible: {e}")
             self.table = None
+        
+        # Todas as flags drift_control (flag_name é a partition key) em uma
+        # Query, compartilhadas entre instâncias do processo
+        self.flags = get_flag_client(
+            self.table_name, ("scope",), match={"flag_name": "drift_control"},
+            use_query=True, region=region
+        )
     
     def set_flag(self, scope: str, state: DriftState, reason: str, 
                  ticket: str = "", approved_by: List[str] = None, 
@@ -68,6 +80,7 @@ class DriftFlag:
         
         try:
             self.table.put_item(Item=item)
+            self.flags.put_local(item)
             logging.info(f"Drift flag set: {scope} -> {state.value} (TTL: {duration_hours}h)")
             return item
         except Exception as e:
@@ -88,11 +101,10 @@ class DriftFlag:
             }
         
         try:
-            response = self.table.get_item(
-                Key={"scope": scope, "flag_name": "drift_control"}
-            )
+            item = self.flags.get(scope)
+            if not item and not self.flags.loaded and self.flags.last_error:
+                raise self.flags.last_error
             
-            item = response.get("Item")
             if not item:
                 # No flag set, default to ENABLED
                 return {
@@ -106,6 +118,7 @@ class DriftFlag:
             # Check if TTL expired (DynamoDB TTL might have delay)
             current_time = int(time.time())
             expire_at = item.get("expire_at")
+            expire_at = int(expire_at) if expire_at is not None else None
             
             if expire_at and current_time >= expire_at:
                 # TTL expired, auto-resume to ENABLED
@@ -168,13 +181,8 @@ class DriftFlag:
             return []
         
         try:
-            # Scan for all drift_control flags
-            response = self.table.scan(
-                FilterExpression="flag_name = :flag_name",
-                ExpressionAttributeValues={":flag_name": "drift_control"}
-            )
-            
-            items = response.get("Items", [])
+            # Snapshot em memória de todas as flags drift_control
+            items = list(self.flags.snapshot().values())
             
             # Filter by state if specified
             if state_filter:
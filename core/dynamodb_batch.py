@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+DynamoDB Batch - Rate limiting adaptativo e pipeline BatchWriteItem/BatchGetItem
+Token bucket não bloqueante (reserva de tokens sob lock, espera fora dele) que
+reduz a taxa ao receber ProvisionedThroughputExceeded/UnprocessedItems e se
+recupera aos poucos em sucessos (AIMD). O pipeline divide os itens em lotes de
+25 (escrita) / 100 (leitura), executa em paralelo e reenvia itens não
+processados com backoff exponencial e jitter.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from botocore.exceptions import ClientError
+
+BATCH_WRITE_LIMIT = 25
+BATCH_GET_LIMIT = 100
+
+THROTTLE_ERROR_CODES = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'TooManyRequestsException',
+}
+
+
+def is_throttle_error(error: Exception) -> bool:
+    return isinstance(error, ClientError) and \
+        error.response.get('Error', {}).get('Code') in THROTTLE_ERROR_CODES
+
+
+def _chunks(items: Sequence, size: int) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class AdaptiveTokenBucket:
+    """Token bucket com reserva: quem chega primeiro é atendido primeiro, sem dormir com lock"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None, min_rate: float = 1.0,
+                 max_rate: Optional[float] = None, decrease_factor: float = 0.5, recovery_steps: int = 20,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else rate)
+        self.min_rate = min(float(min_rate), self.rate)
+        self.max_rate = float(max_rate if max_rate is not None else rate)
+        self.decrease_factor = decrease_factor
+        self.recovery_step = max(self.max_rate / max(recovery_steps, 1), 0.1)
+        self._clock = clock
+        self._sleep = sleep
+
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.stats = {'acquired': 0, 'waited_seconds': 0.0, 'throttles': 0}
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Consome tokens se disponíveis agora; nunca espera"""
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.stats['acquired'] += tokens
+                return True
+            return False
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Reserva tokens (saldo pode ficar negativo) e retorna quanto esperar"""
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= tokens
+            self.stats['acquired'] += tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens: float = 1) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            self.stats['waited_seconds'] += wait
+            self._sleep(wait)
+        return wait
+
+    def on_throttle(self):
+        """Redução multiplicativa: a tabela recusou capacidade"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self.capacity = max(1.0, min(self.capacity, self.rate))
+            self._tokens = min(self._tokens, 0.0)
+            self.stats['throttles'] += 1
+
+    def on_success(self):
+        """Aumento aditivo até max_rate"""
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.recovery_step)
+            self.capacity = max(self.capacity, self.rate)
+
+
+class DynamoDBBatchPipeline:
+    """Escrita/leitura em lote com retry de itens não processados"""
+
+    def __init__(self, client, table_name: str, key_attributes: Tuple[str, ...],
+                 write_bucket: Optional[AdaptiveTokenBucket] = None,
+                 read_bucket: Optional[AdaptiveTokenBucket] = None,
+                 max_workers: int = 4, max_attempts: int = 8, base_delay: float = 0.05,
+                 max_delay: float = 2.0, sleep: Callable[[float], None] = time.sleep, concurrency=None):
+        self.client = client
+        self.concurrency = concurrency  # limite adaptativo de chamadas simultâneas (opcional)
+        self.table_name = table_name
+        self.key_attributes = tuple(key_attributes)
+        self.write_bucket = write_bucket
+        self.read_bucket = read_bucket
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+
+    def _backoff(self, attempt: int):
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        self._sleep(random.uniform(0, delay))  # full jitter
+
+    def _call(self, operation: str, **kwargs) -> Dict[str, Any]:
+        if self.concurrency is None:
+            return getattr(self.client, operation)(**kwargs)
+        with self.concurrency.slot(is_drop=is_throttle_error):
+            return getattr(self.client, operation)(**kwargs)
+
+    def _key_of(self, item: Dict[str, Any]) -> Tuple:
+        return tuple(str(item.get(attr)) for attr in self.key_attributes)
+
+    def _run(self, func, batches: List) -> List:
+        if len(batches) <= 1 or self.max_workers <= 1:
+            return [func(batch) for batch in batches]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            return list(executor.map(func, batches))
+
+    # ------------------------------------------------------------------ escrita
+
+    def write_items(self, items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """BatchWriteItem (itens no formato do cliente, ex. {'resource_id': {'S': ...}})"""
+        # Chaves repetidas no mesmo lote são rejeitadas; vale a última versão
+        unique = list({self._key_of(item): item for item in items}.values())
+        batches = [list(chunk) for chunk in _chunks(unique, BATCH_WRITE_LIMIT)]
+        results = self._run(self._write_batch, batches)
+
+        summary = {'written': 0, 'failed': [], 'batches': len(batches), 'retries': 0, 'throttles': 0}
+        for result in results:
+            summary['written'] += result['written']
+            summary['failed'].extend(result['failed'])
+            summary['retries'] += result['retries']
+            summary['throttles'] += result['throttles']
+        return summary
+
+    def _write_batch(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        pending = [{'PutRequest': {'Item': item}} for item in items]
+        result = {'written': 0, 'failed': [], 'retries': 0, 'throttles': 0}
+
+        for attempt in range(self.max_attempts):
+            if self.write_bucket:
+                self.write_bucket.acquire(len(pending))
+            try:
+                response = self._call('batch_write_item', RequestItems={self.table_name: pending})
+            except ClientError as e:
+                if not is_throttle_error(e):
+                    result['failed'].extend(r['PutRequest']['Item'] for r in pending)
+                    result['error'] = str(e)
+                    return result
+                unprocessed = pending
+            else:
+                unprocessed = response.get('UnprocessedItems', {}).get(self.table_name, [])
+
+            result['written'] += len(pending) - len(unprocessed)
+            if not unprocessed:
+                if self.write_bucket:
+                    self.write_bucket.on_success()
+                return result
+
+            result['throttles'] += 1
+            result['retries'] += 1
+            if self.write_bucket:
+                self.write_bucket.on_throttle()
+            pending = unprocessed
+            self._backoff(attempt)
+
+        result['failed'].extend(r['PutRequest']['Item'] for r in pending)
+        return result
+
+    # ------------------------------------------------------------------ leitura
+
+    def get_items(self, keys: Iterable[Dict[str, Any]], projection: Optional[str] = None,
+                  consistent: bool = False) -> Dict[str, Any]:
+        """BatchGetItem; chaves no formato do cliente"""
+        unique = list({self._key_of(key): key for key in keys}.values())
+        batches = [list(chunk) for chunk in _chunks(unique, BATCH_GET_LIMIT)]
+
+        def run(batch):
+            return self._get_batch(batch, projection, consistent)
+
+        summary = {'items': [], 'unprocessed': [], 'batches': len(batches), 'retries': 0, 'throttles': 0}
+        for result in self._run(run, batches):
+            summary['items'].extend(result['items'])
+            summary['unprocessed'].extend(result['unprocessed'])
+            summary['retries'] += result['retries']
+            summary['throttles'] += result['throttles']
+        return summary
+
+    def _get_batch(self, keys: List[Dict[str, Any]], projection: Optional[str], consistent: bool) -> Dict[str, Any]:
+        request: Dict[str, Any] = {'Keys': keys, 'ConsistentRead': consistent}
+        if projection:
+            request['ProjectionExpression'] = projection
+        result = {'items': [], 'unprocessed': [], 'retries': 0, 'throttles': 0}
+
+        for attempt in range(self.max_attempts):
+            if self.read_bucket:
+                # Leitura eventual consome 0,5 RCU por item de até 4KB
+                self.read_bucket.acquire(len(request['Keys']) * (1.0 if consistent else 0.5))
+            try:
+                response = self._call('batch_get_item', RequestItems={self.table_name: request})
+            except ClientError as e:
+                if not is_throttle_error(e):
+                    result['unprocessed'].extend(request['Keys'])
+                    result['error'] = str(e)
+                    return result
+                response = {'UnprocessedKeys': {self.table_name: request}}
+
+            result['items'].extend(response.get('Responses', {}).get(self.table_name, []))
+            unprocessed = response.get('UnprocessedKeys', {}).get(self.table_name)
+            if not unprocessed or not unprocessed.get('Keys'):
+                if self.read_bucket:
+                    self.read_bucket.on_success()
+                return result
+
+            result['throttles'] += 1
+            result['retries'] += 1
+            if self.read_bucket:
+                self.read_bucket.on_throttle()
+            request = unprocessed
+            self._backoff(attempt)
+
+        result['unprocessed'].extend(request['Keys'])
+        return result
@@ -9,6 +9,11 @@ import time
 from typing import Dict, Any, Optional
 from botocore.exceptions import ClientError
 
+try:
+    from core.flag_client import get_flag_client
+except ImportError:
+    from flag_client import get_flag_client
+
 class FeatureFlagsManager:
     def __init__(self, table_name: str = "ial-feature-flags", environment: str = "default"):
         self.dynamodb = boto3.client('dynamodb')
@@ -23,32 +28,35 @@ class FeatureFlagsManager:
             'DRIFT_DETECTION_ENABLED': True,
             'BUDGET_ENFORCEMENT_ENABLED': True  # Enabled by default with IAM protection
         }
+        
+        # Todas as flags do ambiente ficam em memória (uma leitura por TTL)
+        self.flags = get_flag_client(
+            self.table_name, ('flag_name',), match={'environment': environment}
+        )
+    
+    def _load_flags(self) -> Dict[str, Dict]:
+        """Snapshot das flags do ambiente; cria a tabela só se ela não existir"""
+        flags = self.flags.snapshot()
+        error = self.flags.last_error
+        if not flags and isinstance(error, ClientError) and \
+                error.response['Error']['Code'] == 'ResourceNotFoundException' and \
+                not hasattr(self, '_table_checked'):
+            self._table_checked = True
+            if self.ensure_table_exists():
+                self.flags.refresh()
+                flags = self.flags.snapshot()
+        elif error and not hasattr(self, '_load_warned'):
+            self._load_warned = True
+            print(f"⚠️ Error loading feature flags: {error}")
+        return flags
     
     def get_flag(self, flag_name: str) -> bool:
         """Get feature flag value"""
-        # Ensure table exists first
-        if not hasattr(self, '_table_checked'):
-            self.ensure_table_exists()
-            self._table_checked = True
-            
-        try:
-            response = self.dynamodb.get_item(
-                TableName=self.table_name,
-                Key={
-                    'flag_name': {'S': flag_name},
-                    'environment': {'S': self.environment}
-                }
-            )
-            
-            if 'Item' in response:
-                return response['Item']['enabled']['BOOL']
-            else:
-                # Return default if not found
-                return self.defaults.get(flag_name, False)
-                
-        except ClientError as e:
-            print(f"⚠️ Error getting feature flag {flag_name}: {e}")
-            return self.defaults.get(flag_name, False)
+        item = self._load_flags().get(flag_name)
+        if item is not None and 'enabled' in item:
+            return bool(item['enabled'])
+        # Return default if not found
+        return self.defaults.get(flag_name, False)
     
     def set_flag(self, flag_name: str, enabled: bool, description: str = "") -> bool:
         """Set feature flag value with IAM protection and audit trail"""
@@ -75,6 +83,12 @@ class FeatureFlagsManager:
                     'updated_at': {'S': boto3.Session().region_name}  # Timestamp placeholder
                 }
             )
+            self.flags.put_local({
+                'flag_name': flag_name,
+                'environment': self.environment,
+                'enabled': enabled,
+                'description': description
+            })
             
             # Log to audit trail if budget-related
             if self._is_budget_flag(flag_name):
@@ -103,24 +117,13 @@ class FeatureFlagsManager:
     
     def get_all_flags(self) -> Dict[str, bool]:
         """Get all feature flags"""
-        flags = {}
-        
-        try:
-            response = self.dynamodb.query(
-                TableName=self.table_name,
-                KeyConditionExpression='environment = :env',
-                ExpressionAttributeValues={
-                    ':env': {'S': self.environment}
-                }
-            )
-            
-            for item in response.get('Items', []):
-                flag_name = item['flag_name']['S']
-                enabled = item['enabled']['BOOL']
-                flags[flag_name] = enabled
-                
-        except ClientError as e:
-            print(f"⚠️ Error getting all flags: {e}")
+        # environment é a sort key: a carga do cliente filtra por ambiente (a
+        # antiga Query em 'environment' era rejeitada pelo DynamoDB)
+        flags = {
+            flag_name: bool(item['enabled'])
+            for flag_name, item in self._load_flags().items()
+            if 'enabled' in item
+        }
         
         # Merge with defaults
         for flag, default_value in self.defaults.items():
@@ -11,6 +11,7 @@ from datetime import datetime
 from typing import Dict, Any, Optional, List
 from enum import Enum
 from .drift_flag import DriftFlag, DriftState
+from .flag_client import get_flag_client
 
 class FeatureState(Enum):
     ENABLED = "enabled"
@@ -31,6 +32,13 @@ class FeatureFlagsManager:
             logging.warning(f"Feature flags table not available: {e}")
             self.table = None
     
+    def _flags_for(self, scope: str):
+        """Cliente em memória com todas as flags do escopo (environment)"""
+        return get_flag_client(
+            self.table_name, ("flag_name",), match={"environment": scope},
+            region=self.region
+        )
+    
     def is_enabled(self, feature_name: str, scope: str = "global") -> bool:
         """Check if feature is enabled"""
         try:
@@ -38,11 +46,7 @@ class FeatureFlagsManager:
                 return self._get_default_state(feature_name)
             
             # CORREÇÃO: Usar schema do foundation deployer (pk: flag_name, sk: environment)
-            response = self.table.get_item(
-                Key={"flag_name": feature_name, "environment": scope}
-            )
-            
-            item = response.get("Item")
+            item = self._flags_for(scope).get(feature_name)
             if not item:
                 return self._get_default_state(feature_name)
             
@@ -76,6 +80,7 @@ class FeatureFlagsManager:
             item["expire_at"] = current_time + (duration_hours * 3600)
         
         self.table.put_item(Item=item)
+        self._flags_for(scope).put_local(item)
         logging.info(f"Feature flag set: {feature_name} -> {state}")
         return item
     
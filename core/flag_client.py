@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Flag Client - Leitura de feature flags em memória com carga em lote
+Carrega todas as flags de um ambiente numa única leitura paginada do backend
+(DynamoDB ou arquivo JSON local), serve as consultas da memória e revalida em
+background quando o snapshot passa do TTL (stale-while-revalidate). Eventos de
+mudança (SSM Parameter Store / EventBridge) forçam o recarregamento.
+
+Backend local para testes/offline:
+    IAL_FLAGS_FILE=flags.json  ->  [{"flag_name": "X", "environment": "default", "enabled": true}, ...]
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import boto3
+
+try:
+    from boto3.dynamodb.types import TypeDeserializer
+except ImportError:
+    TypeDeserializer = None
+
+DEFAULT_TTL = float(os.environ.get('IAL_FLAGS_TTL', '30'))
+MAX_STALE_FACTOR = 10      # snapshot mais velho que ttl * fator é recarregado de forma síncrona
+SSM_FLAGS_PREFIX = os.environ.get('IAL_FLAGS_SSM_PREFIX', '/ial/feature-flags')
+
+Listener = Callable[[Dict[Any, Tuple[Optional[Dict], Optional[Dict]]]], None]
+
+
+def _item_key(item: Dict, key_attributes: Tuple[str, ...]):
+    if len(key_attributes) == 1:
+        return item.get(key_attributes[0])
+    return tuple(item.get(attr) for attr in key_attributes)
+
+
+class DynamoDBFlagBackend:
+    """Carrega os itens de uma tabela de flags numa leitura paginada
+
+    Com use_query=True o atributo de `match` é a partition key e a leitura é
+    um Query; caso contrário é um Scan com FilterExpression (tabela pequena).
+    """
+
+    def __init__(self, table_name: str, match: Optional[Dict[str, str]] = None,
+                 use_query: bool = False, region: Optional[str] = None, client=None):
+        self.table_name = table_name
+        self.match = dict(match or {})
+        self.use_query = use_query
+        self.region = region
+        self._client = client
+        self._deserializer = TypeDeserializer() if TypeDeserializer else None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = boto3.client('dynamodb', region_name=self.region) if self.region \
+                else boto3.client('dynamodb')
+        return self._client
+
+    def describe(self) -> str:
+        return f"dynamodb:{self.table_name}"
+
+    def _request_params(self) -> Dict[str, Any]:
+        params: Dict[str, Any] = {'TableName': self.table_name}
+        if not self.match:
+            return params
+
+        names, values, conditions = {}, {}, []
+        for i, (attr, value) in enumerate(sorted(self.match.items())):
+            names[f'#k{i}'] = attr
+            values[f':v{i}'] = {'S': str(value)}
+            conditions.append(f'#k{i} = :v{i}')
+        params['ExpressionAttributeNames'] = names
+        params['ExpressionAttributeValues'] = values
+        params['KeyConditionExpression' if self.use_query else 'FilterExpression'] = ' AND '.join(conditions)
+        return params
+
+    def _deserialize(self, item: Dict) -> Dict:
+        if self._deserializer is None:
+            return {k: list(v.values())[0] for k, v in item.items()}
+        return {k: self._deserializer.deserialize(v) for k, v in item.items()}
+
+    def load(self) -> List[Dict]:
+        operation = 'query' if self.use_query and self.match else 'scan'
+        paginator = self.client.get_paginator(operation)
+        items = []
+        for page in paginator.paginate(**self._request_params()):
+            items.extend(self._deserialize(item) for item in page.get('Items', []))
+        return items
+
+
+class FileFlagBackend:
+    """Backend local: arquivo JSON com lista de itens (ou dict nome -> item)"""
+
+    def __init__(self, path: str, match: Optional[Dict[str, str]] = None, key_attribute: str = 'flag_name'):
+        self.path = path
+        self.match = dict(match or {})
+        self.key_attribute = key_attribute
+
+    def describe(self) -> str:
+        return f"file:{self.path}"
+
+    def load(self) -> List[Dict]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as f:
+            data = json.load(f)
+
+        if isinstance(data, dict):
+            items = []
+            for name, value in data.items():
+                item = dict(value) if isinstance(value, dict) else {'enabled': value}
+                item.setdefault(self.key_attribute, name)
+                items.append(item)
+        else:
+            items = list(data)
+
+        return [item for item in items
+                if all(str(item.get(attr, value)) == str(value) for attr, value in self.match.items())]
+
+
+class FlagClient:
+    """Snapshot em memória das flags de um backend, com TTL e revalidação em background"""
+
+    def __init__(self, backend, key_attributes: Iterable[str] = ('flag_name',), ttl: float = DEFAULT_TTL,
+                 background_refresh: bool = True, clock: Callable[[], float] = time.monotonic):
+        self.backend = backend
+        self.key_attributes = tuple(key_attributes)
+        self.ttl = ttl
+        self.background_refresh = background_refresh
+        self._clock = clock
+
+        self._flags: Dict[Any, Dict] = {}
+        self._loaded_at: Optional[float] = None
+        self._initialized = False
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+        self._listeners: List[Listener] = []
+
+        self.last_error: Optional[Exception] = None
+        self.stats = {'loads': 0, 'load_errors': 0, 'hits': 0, 'background_refreshes': 0, 'change_events': 0}
+
+    # ------------------------------------------------------------------ leitura
+
+    @property
+    def loaded(self) -> bool:
+        """Já houve ao menos uma carga bem-sucedida"""
+        return self._initialized
+
+    def get(self, key, default: Optional[Dict] = None) -> Optional[Dict]:
+        """Item da flag (ou default), sem I/O enquanto o snapshot estiver fresco"""
+        self._ensure_fresh()
+        self.stats['hits'] += 1
+        item = self._flags.get(key)
+        return dict(item) if item is not None else default
+
+    def snapshot(self) -> Dict[Any, Dict]:
+        self._ensure_fresh()
+        return {key: dict(item) for key, item in self._flags.items()}
+
+    def _ensure_fresh(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            self.refresh()
+            return
+
+        age = self._clock() - loaded_at
+        if age < self.ttl:
+            return
+        if self.background_refresh and age < self.ttl * MAX_STALE_FACTOR:
+            self._refresh_in_background()
+        else:
+            self.refresh()
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.stats['background_refreshes'] += 1
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name='ial-flag-refresh', daemon=True).start()
+
+    # ------------------------------------------------------------------ carga
+
+    def refresh(self) -> bool:
+        """Recarrega todas as flags numa leitura; mantém o último snapshot se falhar"""
+        with self._load_lock:
+            try:
+                items = self.backend.load()
+            except Exception as e:
+                self.stats['load_errors'] += 1
+                self.last_error = e
+                # Evita repetir a leitura a cada consulta enquanto o backend está fora
+                self._loaded_at = self._clock()
+                logging.warning(f"Feature flags load failed ({self.backend.describe()}): {e}")
+                return False
+
+            flags = {_item_key(item, self.key_attributes): item for item in items}
+            self.stats['loads'] += 1
+            self.last_error = None
+            self._replace(flags)
+            self._loaded_at = self._clock()
+            return True
+
+    def _replace(self, flags: Dict[Any, Dict]):
+        with self._lock:
+            old = self._flags
+            self._flags = flags
+
+        changes = {key: (old.get(key), flags.get(key))
+                   for key in set(old) | set(flags) if old.get(key) != flags.get(key)}
+        if changes and self._initialized:
+            self._notify(changes)
+        self._initialized = True
+
+    def put_local(self, item: Dict):
+        """Write-through: reflete no snapshot uma flag gravada por este processo"""
+        key = _item_key(item, self.key_attributes)
+        with self._lock:
+            old = self._flags.get(key)
+            self._flags = {**self._flags, key: dict(item)}
+        if old != item:
+            self._notify({key: (old, dict(item))})
+
+    def invalidate(self):
+        """Próxima leitura recarrega do backend de forma síncrona"""
+        self._loaded_at = None
+
+    # ------------------------------------------------------------------ notificação
+
+    def subscribe(self, listener: Listener):
+        """Registra callback chamado com {chave: (antigo, novo)} a cada mudança"""
+        self._listeners.append(listener)
+
+    def _notify(self, changes: Dict):
+        for listener in list(self._listeners):
+            try:
+                listener(changes)
+            except Exception as e:
+                logging.warning(f"Feature flag listener failed: {e}")
+
+    def handle_change_event(self, event: Dict) -> bool:
+        """Recarrega ao receber evento de mudança relevante (SSM ou EventBridge)"""
+        if not is_flag_change_event(event):
+            return False
+        self.stats['change_events'] += 1
+        return self.refresh()
+
+
+def is_flag_change_event(event: Dict) -> bool:
+    """Identifica eventos que indicam mudança de flags
+
+    - EventBridge 'Parameter Store Change' para parâmetros sob IAL_FLAGS_SSM_PREFIX
+    - Eventos próprios (source 'ial.feature-flags') ou sem source (invocação manual)
+    """
+    if not isinstance(event, dict):
+        return False
+    source = event.get('source')
+    if source == 'aws.ssm':
+        name = (event.get('detail') or {}).get('name', '')
+        return name.startswith(SSM_FLAGS_PREFIX)
+    return source in (None, 'ial.feature-flags')
+
+
+# Clientes compartilhados por processo (mesma tabela/filtro => mesmo snapshot)
+_clients: Dict[Tuple, FlagClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_flag_client(table_name: str, key_attributes: Iterable[str] = ('flag_name',),
+                    match: Optional[Dict[str, str]] = None, use_query: bool = False,
+                    region: Optional[str] = None, client=None) -> FlagClient:
+    """Cliente compartilhado; com IAL_FLAGS_FILE definido usa o backend de arquivo"""
+    key_attributes = tuple(key_attributes)
+    flags_file = os.environ.get('IAL_FLAGS_FILE')
+    cache_key = (flags_file or table_name, key_attributes, tuple(sorted((match or {}).items())), region)
+
+    with _clients_lock:
+        flag_client = _clients.get(cache_key)
+        if flag_client is None:
+            if flags_file:
+                backend = FileFlagBackend(flags_file, match, key_attribute=key_attributes[0])
+            else:
+                backend = DynamoDBFlagBackend(table_name, match, use_query=use_query, region=region, client=client)
+            flag_client = FlagClient(backend, key_attributes)
+            _clients[cache_key] = flag_client
+        return flag_client
+
+
+def handle_change_event(event: Dict, context=None) -> Dict:
+    """Handler para regra EventBridge: recarrega todos os clientes do processo"""
+    with _clients_lock:
+        clients = list(_clients.values())
+    refreshed = sum(1 for flag_client in clients if flag_client.handle_change_event(event))
+    return {'refreshed': refreshed, 'clients': len(clients)}
+
+
+def reset_flag_clients():
+    """Descarta clientes compartilhados (testes / troca de backend)"""
+    with _clients_lock:
+        _clients.clear()
@@ -84,7 +84,7 @@ class FoundationDeployer:
         """Deploy uma fase específica"""
         print(f"\n🚀 Deploying Phase: {phase}")
         
-        result = deploy_phase_resources(phase)
+        result = deploy_phase_resources(phase, parser=self.parser)
         
         # Resumo dos resultados
         successful = result['successful']
@@ -99,6 +99,8 @@ class FoundationDeployer:
                 resource_type = r.get('type', 'unknown')
                 print(f"   {status} {name} ({resource_type})")
         
+        return result
+        
     def delete_phase(self, phase: str) -> Dict[str, Any]:
         """Exclui uma fase específica (todos os stacks CloudFormation)"""
         print(f"\n🗑️ Deleting Phase: {phase}")
@@ -224,8 +226,8 @@ class FoundationDeployer:
                 'error': str(e)
             }
     
-    def deploy_all_phases(self) -> Dict[str, Any]:
-        """Deploy todas as fases em ordem"""
+    def deploy_all_phases(self, parallel: bool = True, max_concurrency: int = 4) -> Dict[str, Any]:
+        """Deploy todas as fases (DAG concorrente por padrão, ou sequencial em ordem)"""
         print("🎯 Starting IAL Foundation Complete Deployment")
         print("=" * 50)
         
@@ -235,22 +237,32 @@ class FoundationDeployer:
         
         available_phases = self.list_all_phases()
         
-        for phase in self.phase_order:
-            if phase in available_phases:
-                try:
-                    result = self.deploy_phase(phase)
-                    all_results[phase] = result
-                    total_successful += result['successful']
-                    total_resources += result['total_resources']
-                except Exception as e:
-                    print(f"   ❌ Phase {phase} failed: {str(e)}")
-                    all_results[phase] = {
-                        'error': str(e),
-                        'successful': 0,
-                        'total_resources': 0
-                    }
-            else:
-                print(f"   ⚠️  Phase {phase} not found, skipping")
+        if parallel:
+            for phase in self.phase_order:
+                if phase not in available_phases:
+                    print(f"   ⚠️  Phase {phase} not found, skipping")
+            
+            phases = [p for p in self.phase_order if p in available_phases]
+            all_results, total_successful, total_resources = self._deploy_phases_concurrently(
+                phases, max_concurrency
+            )
+        else:
+            for phase in self.phase_order:
+                if phase in available_phases:
+                    try:
+                        result = self.deploy_phase(phase)
+                        all_results[phase] = result
+                        total_successful += result['successful']
+                        total_resources += result['total_resources']
+                    except Exception as e:
+                        print(f"   ❌ Phase {phase} failed: {str(e)}")
+                        all_results[phase] = {
+                            'error': str(e),
+                            'successful': 0,
+                            'total_resources': 0
+                        }
+                else:
+                    print(f"   ⚠️  Phase {phase} not found, skipping")
         
         print("\n" + "=" * 50)
         print(f"🎉 IAL Foundation Deployment Complete!")
@@ -269,6 +281,63 @@ class FoundationDeployer:
             'agent_configured': agent_config_result.get('success', False)
         }
     
+    def _deploy_phases_concurrently(self, phases: List[str], max_concurrency: int):
+        """Deploy das fases via DAG de stacks, limitado pelo caminho crítico"""
+        from core.deployment_scheduler import DeploymentScheduler, UnresolvedImportError
+        
+        scheduler = DeploymentScheduler(self.phases_dir, parser=self.parser, max_concurrency=max_concurrency,
+                                        external_exports=self._existing_exports())
+        try:
+            self.parser.prefetch_stacks()
+        except Exception as e:
+            print(f"   ⚠️  Could not prefetch stacks: {e}")
+        try:
+            summary = scheduler.deploy(phases)
+        except ValueError as e:
+            # Ciclo ou import sem produtor: o grafo não é confiável, volta ao deploy sequencial por fase
+            icon = "❌" if isinstance(e, UnresolvedImportError) else "⚠️ "
+            print(f"   {icon} {e} - falling back to sequential deployment")
+            all_results, total_successful, total_resources = {}, 0, 0
+            for phase in phases:
+                result = self.deploy_phase(phase)
+                all_results[phase] = result
+                total_successful += result['successful']
+                total_resources += result['total_resources']
+            return all_results, total_successful, total_resources
+        
+        all_results = {}
+        for key, result in summary['results'].items():
+            phase, name = key.split('/', 1)
+            phase_result = all_results.setdefault(phase, {'successful': 0, 'total_resources': 0, 'results': []})
+            phase_result['total_resources'] += 1
+            if result.get('success', False):
+                phase_result['successful'] += 1
+            phase_result['results'].append({
+                'name': f"{name}.yaml",
+                'success': result.get('success', False),
+                'error': result.get('error'),
+                'type': 'CloudFormation Stack'
+            })
+        for phase_result in all_results.values():
+            phase_result['success'] = phase_result['successful'] == phase_result['total_resources']
+        
+        print(f"   ⏱️  Wall clock: {summary['wall_clock_seconds']}s "
+              f"(sum of stacks: {summary['sum_of_stack_seconds']}s, "
+              f"critical path: {summary['critical_path_seconds']}s over {len(summary['critical_path'])} stacks)")
+        
+        return all_results, summary['successful'], summary['total_stacks']
+    
+    def _existing_exports(self) -> List[str]:
+        """Exports CloudFormation já existentes na conta (satisfazem Fn::ImportValue)"""
+        exports = []
+        try:
+            paginator = self.parser.cf_client.get_paginator('list_exports')
+            for page in paginator.paginate():
+                exports.extend(export['Name'] for export in page.get('Exports', []))
+        except Exception as e:
+            print(f"   ⚠️  Could not list CloudFormation exports: {e}")
+        return exports
+    
     def deploy_foundation_core(self) -> Dict[str, Any]:
         """Deploy Foundation (00) + Security apenas - Governance quando necessário"""
         print("🎯 Deploying IAL Foundation + Security")
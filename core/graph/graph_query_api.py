@@ -8,7 +8,6 @@ import sys
 import os
 from typing import Dict, List, Optional, Set
 from dataclasses import dataclass
-from datetime import datetime, timedelta
 
 # Add core path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -16,9 +15,11 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 try:
     from .dependency_graph import DependencyGraph, ResourceState, BlastRadius
     from ..resource_catalog import ResourceCatalog
+    from ..concurrent_cache import ShardedLRUCache
 except ImportError:
     from .dependency_graph import DependencyGraph, ResourceState, BlastRadius
     from resource_catalog import ResourceCatalog
+    from concurrent_cache import ShardedLRUCache
 
 @dataclass
 class ImpactAnalysisResult:
@@ -49,8 +50,8 @@ class GraphQueryAPI:
         self.resource_catalog = resource_catalog
         
         # Cache para queries frequentes (TTL: 5 minutos)
-        self._cache = {}
         self._cache_ttl = 300
+        self._cache = ShardedLRUCache(max_size=100, ttl=self._cache_ttl, shards=8)
         
         #print("✅ GraphQueryAPI inicializada")
     
@@ -418,29 +419,18 @@ class GraphQueryAPI:
     
     def _get_cached_result(self, cache_key: str):
         """Obtém resultado do cache se válido"""
-        if cache_key in self._cache:
-            cached_time, result = self._cache[cache_key]
-            if (datetime.now() - cached_time).seconds < self._cache_ttl:
-                return result
-        return None
+        return self._cache.get(cache_key)
     
     def _cache_result(self, cache_key: str, result):
-        """Armazena resultado no cache"""
-        self._cache[cache_key] = (datetime.now(), result)
-        
-        # Limpeza básica do cache
-        if len(self._cache) > 100:
-            # Remove entradas mais antigas
-            oldest_keys = sorted(self._cache.keys(), 
-                               key=lambda k: self._cache[k][0])[:20]
-            for key in oldest_keys:
-                del self._cache[key]
+        """Armazena resultado no cache (LRU limita o tamanho)"""
+        self._cache.set(cache_key, result)
     
     def get_api_statistics(self) -> Dict:
         """Retorna estatísticas da API"""
         return {
             'cache_size': len(self._cache),
             'cache_ttl_seconds': self._cache_ttl,
+            'cache_hit_ratio': self._cache.stats()['hit_ratio'],
             'graph_nodes': len(self.graph.nodes),
             'graph_edges': len(self.graph.edges)
         }
@@ -12,6 +12,11 @@ import hashlib
 import platform
 import getpass
 from core.path_utils import get_phases_path, get_base_path
+from core.tracing import traced
+from core.context_assembler import get_context_assembler
+
+# Modelo usado no Converse; define o orçamento de tokens do contexto
+CONTEXT_MODEL_ID = 'anthropic.claude-3-sonnet-20240229-v1:0'
 
 class IALMasterEngineIntegrated:
     """Master Engine usando componentes robustos existentes"""
@@ -323,6 +328,7 @@ class IALMasterEngineIntegrated:
             ]
         }
     
+    @traced('rag.enrich_prompt', category='rag')
     async def _enrich_prompt_with_rag(self, nl_intent: str) -> str:
         """
         Enriquece prompt com contexto RAG antes de chamar LLM
@@ -342,18 +348,15 @@ class IALMasterEngineIntegrated:
             if not rag_results:
                 return nl_intent
             
-            # Construir contexto
-            context_snippets = []
-            for i, result in enumerate(rag_results, 1):
-                snippet = result.get('text', result.get('content', ''))
-                source = result.get('source', 'unknown')
-                score = result.get('score', 0)
-                
-                context_snippets.append(f"[{i}] (score: {score:.2f}, source: {source})\n{snippet}")
+            # Snippets por relevância dentro de metade do orçamento (o resto fica
+            # para o histórico da conversa)
+            assembler = get_context_assembler(CONTEXT_MODEL_ID)
+            packed = assembler.assemble(query=nl_intent, knowledge=rag_results, budget=assembler.budget // 2)
+            if not packed['items']:
+                return nl_intent
             
             # Prompt enriquecido
-            enriched_prompt = f"""CONTEXTO RELEVANTE (RAG):
-{chr(10).join(context_snippets)}
+            enriched_prompt = f"""{packed['text']}
 
 ---
 
@@ -642,6 +645,18 @@ O pipeline está rodando em background. Você receberá notificações sobre o p
             print(f"❌ Erro na descoberta de fases: {e}")
             return False
     
+    def _conversation_items(self, query: str) -> Dict[str, Any]:
+        """Histórico e mensagens relacionadas do ContextEngine como itens ({} sem engine)"""
+        if not self.context_engine:
+            return {}
+        try:
+            if hasattr(self.context_engine, 'get_context_items_optimized'):
+                return self.context_engine.get_context_items_optimized(query, self.user_id)
+            return self.context_engine.get_context_items(query)
+        except Exception:
+            return {}
+    
+    @traced('engine.process_user_input', category='routing')
     async def process_user_input(self, user_input: str) -> str:
         """Interface única: LLM com MCP nativo + RAG enrichment"""
         
@@ -677,13 +692,20 @@ O pipeline está rodando em background. Você receberá notificações sobre o p
                 if phase_result:
                     return phase_result
             
-            # 2. Construir contexto de conversação
+            # 2. Construir contexto de conversação: histórico e memória empacotados por
+            # relevância (turnos antigos viram resumo incremental) no orçamento que sobra do RAG
             context = ""
-            if self.context_engine:
-                try:
-                    context = self.context_engine.build_context_for_query(normalized_input)
-                except Exception as e:
-                    pass
+            conversation = self._conversation_items(normalized_input)
+            if conversation.get('history') or conversation.get('memory'):
+                assembler = get_context_assembler(CONTEXT_MODEL_ID)
+                remaining = assembler.budget - assembler.count(rag_context)
+                context = assembler.assemble(
+                    query=normalized_input,
+                    history=conversation.get('history'),
+                    memory=conversation.get('memory'),
+                    conversation_id=conversation.get('conversation_id'),
+                    budget=max(0, remaining)
+                )['text']
             
             # 3. Preparar prompt
             if context or rag_context:
@@ -777,6 +799,7 @@ REGRA DE OURO: NUNCA invente informações sobre phases. SEMPRE use discover_pha
         except Exception as e:
             return f"❌ Erro: {str(e)}"
     
+    @traced('llm.bedrock_converse', category='llm')
     async def _invoke_bedrock_converse_mcp(self, prompt: str, user_input: str) -> str:
         """PRIMÁRIO: Bedrock Converse API com tool calling"""
         import boto3
@@ -929,6 +952,7 @@ REGRA DE OURO: NUNCA invente informações sobre phases. SEMPRE use discover_pha
         except Exception as e:
             return {'error': str(e)}
     
+    @traced('mcp.query', category='mcp')
     async def _execute_mcp_query(self, service: str, query: str) -> dict:
         """Executar query via AWS CLI"""
         
@@ -970,6 +994,7 @@ REGRA DE OURO: NUNCA invente informações sobre phases. SEMPRE use discover_pha
         except Exception as e:
             return {'error': str(e)}
     
+    @traced('llm.cli_fallback', category='llm')
     async def _invoke_with_cli_fallback(self, prompt: str, user_input: str) -> str:
         """FALLBACK: Tools hard-coded com AWS CLI"""
         
@@ -1112,6 +1137,7 @@ Responda usando o histórico acima. Se precisar consultar AWS, use as tools disp
         except Exception as e:
             return f"❌ Erro: {str(e)}"
     
+    @traced('mcp.tool', category='mcp')
     async def _execute_tool(self, tool_name: str, tool_input: dict) -> dict:
         """Executar tool via MCP servers (dados reais AWS)"""
         
@@ -1140,6 +1166,7 @@ Responda usando o histórico acima. Se precisar consultar AWS, use as tools disp
         except Exception as e:
             return {"success": False, "error": f"Erro: {str(e)}"}
     
+    @traced('llm.classify_intent', category='llm')
     async def _classify_intent(self, user_input: str) -> Dict:
         """Classificar intenção do usuário"""
         
@@ -1404,6 +1431,14 @@ Formate este diagnóstico de forma conversacional e acionável, explicando o pro
             current = result.get('current_month', '0')
             return f"💰 **Custo atual:** ${current} este mês"
         
+        elif result_type == 'multi_source':
+            sections = [self._format_query_result_simple(sub_result)
+                        for sub_result in result.get('results', {}).values()
+                        if sub_result.get('type') != 'error']
+            for source, error in result.get('errors', {}).items():
+                sections.append(f"⚠️ **{source}:** {error}")
+            return "\n\n".join(sections)
+        
         return f"📊 **Resultado:** {result.get('message', 'Query processada')}"
     
     def get_system_status(self) -> Dict:
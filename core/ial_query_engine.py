@@ -2,14 +2,35 @@
 """
 IAL Query Engine - Consultas AWS via MCP Servers
 Implementa chamadas reais para MCP servers configurados
+
+Perguntas com vários assuntos ("buckets, EC2 e custo do mês") são decompostas
+pelo QueryPlanner em sub-queries independentes, executadas em paralelo (cada
+fonte com seu timeout) e combinadas numa única resposta. Inventário somente
+leitura (listagem S3, describe EC2) fica em cache curto por conta/região.
 """
 
+import os
 import json
+import time
 import subprocess
 import asyncio
-from typing import Dict, List, Optional, Any
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Callable, Awaitable
 from datetime import datetime, timedelta
 
+try:
+    from core.concurrent_cache import ShardedLRUCache
+    from core.inventory_store import INVENTORY_MAX_AGE, get_inventory_store
+    from core.resilience.registry import get_concurrency_limiter
+except ImportError:
+    from concurrent_cache import ShardedLRUCache
+    from inventory_store import INVENTORY_MAX_AGE, get_inventory_store
+    from resilience.registry import get_concurrency_limiter
+
+# Timeout padrão por fonte (segundos) e TTL do cache de inventário
+QUERY_SOURCE_TIMEOUT = float(os.getenv('IAL_QUERY_SOURCE_TIMEOUT', '10'))
+INVENTORY_CACHE_TTL = float(os.getenv('IAL_QUERY_INVENTORY_TTL', '60'))
+
 class MCPClient:
     """Cliente para comunicação com MCP servers"""
     
@@ -247,13 +268,109 @@ class MCPClient:
         
         return {"Events": [], "NextToken": None, "status": "success"}
 
+
+@dataclass
+class SubQuery:
+    """Sub-query independente: uma fonte, um MCP server, um handler"""
+    source: str
+    server: str
+    run: Callable[[], Awaitable[Dict]]
+    timeout: float = QUERY_SOURCE_TIMEOUT
+    cacheable: bool = False
+
+
+@dataclass
+class QuerySource:
+    """Fonte consultável: palavras-chave que a ativam e como consultá-la"""
+    name: str
+    server: str
+    keywords: List[str]
+    handler: str
+    needs_query: bool = False
+    cacheable: bool = False
+    timeout: Optional[float] = None
+
+
+# Ordem = prioridade na resposta combinada (mesma ordem do roteamento antigo)
+QUERY_SOURCES = [
+    QuerySource('s3', 'aws-core', ['bucket', 's3', 'storage'], '_query_s3_resources', cacheable=True),
+    QuerySource('ec2', 'aws-core', ['ec2', 'instance', 'compute'], '_query_ec2_resources', cacheable=True),
+    QuerySource('cost', 'aws-cost-explorer', ['cost', 'custo', 'billing', 'price'], '_query_cost_data'),
+    QuerySource('cloudtrail', 'aws-cloudtrail', ['cloudtrail', 'audit', 'log', 'security'],
+                '_query_cloudtrail_events', needs_query=True),
+    QuerySource('cloudwatch', 'aws-cloudwatch', ['cloudwatch', 'metric', 'monitor'],
+                '_query_cloudwatch_metrics', needs_query=True),
+]
+
+
+class QueryPlanner:
+    """Decompõe uma pergunta em sub-queries independentes (uma por fonte citada)"""
+
+    def __init__(self, sources: Optional[List[QuerySource]] = None,
+                 source_timeouts: Optional[Dict[str, float]] = None):
+        self.sources = sources or QUERY_SOURCES
+        self.source_timeouts = source_timeouts or {}
+
+    def match_sources(self, query: str) -> List[QuerySource]:
+        query_lower = query.lower()
+        return [source for source in self.sources
+                if any(keyword in query_lower for keyword in source.keywords)]
+
+    def plan(self, query: str, engine: 'IALQueryEngine') -> List[SubQuery]:
+        """Sub-queries para a pergunta; sem fonte reconhecida cai na query geral"""
+        sub_queries = []
+        for source in self.match_sources(query):
+            handler = getattr(engine, source.handler)
+            run = (lambda h=handler: h(query)) if source.needs_query else handler
+            timeout = self.source_timeouts.get(source.name, source.timeout or QUERY_SOURCE_TIMEOUT)
+            sub_queries.append(SubQuery(source.name, source.server, run, timeout, source.cacheable))
+
+        if not sub_queries:
+            sub_queries.append(SubQuery('general', '', lambda: engine._query_general_resources(query)))
+        return sub_queries
+
+
+def merge_results(results: Dict[str, Dict], elapsed: float) -> Dict:
+    """Combina os resultados das fontes; falhas parciais não derrubam a resposta"""
+    errors = {name: result.get('error', 'unknown error')
+              for name, result in results.items() if result.get('type') == 'error'}
+    succeeded = [name for name in results if name not in errors]
+
+    if not succeeded:
+        status = 'failed'
+    elif errors:
+        status = 'partial'
+    else:
+        status = 'success'
+
+    return {
+        "type": "multi_source",
+        "sources": list(results),
+        "results": results,
+        "errors": errors,
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "status": status
+    }
+
+
 class IALQueryEngine:
     """Engine principal para queries AWS via MCP servers"""
     
-    def __init__(self):
+    def __init__(self, account_id: Optional[str] = None, region: Optional[str] = None,
+                 source_timeouts: Optional[Dict[str, float]] = None,
+                 inventory_ttl: float = INVENTORY_CACHE_TTL, inventory=None):
         self.mcp_config = self._load_mcp_config()
         self.mcp_clients = {}
         self._initialize_clients()
+
+        self.account_id = account_id or os.getenv('AWS_ACCOUNT_ID')
+        self.region = region or os.getenv('AWS_REGION') or os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
+        self.planner = QueryPlanner(source_timeouts=source_timeouts)
+        # Cache curto de inventário por (conta, região, fonte)
+        self.inventory_cache = ShardedLRUCache(max_size=256, ttl=inventory_ttl, shards=4)
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        # Snapshot local do inventário (InventoryCollector); None se nunca coletado
+        self.inventory = inventory if inventory is not None else get_inventory_store(create=False)
     
     def _load_mcp_config(self) -> Dict:
         """Carregar configuração dos MCP servers"""
@@ -268,35 +385,117 @@ class IALQueryEngine:
         for server_name, config in self.mcp_config.get("mcpServers", {}).items():
             self.mcp_clients[server_name] = MCPClient(server_name, config)
     
-    async def process_query(self, query: str) -> Dict:
-        """Processar query via MCP servers apropriados"""
-        
-        query_lower = query.lower()
-        
-        # Detectar tipo de query e rotear para MCP apropriado
-        if any(keyword in query_lower for keyword in ['bucket', 's3', 'storage']):
-            return await self._query_s3_resources()
-        elif any(keyword in query_lower for keyword in ['ec2', 'instance', 'compute']):
-            return await self._query_ec2_resources()
-        elif any(keyword in query_lower for keyword in ['cost', 'custo', 'billing', 'price']):
-            return await self._query_cost_data()
-        elif any(keyword in query_lower for keyword in ['cloudtrail', 'audit', 'log', 'security']):
-            return await self._query_cloudtrail_events(query)
-        elif any(keyword in query_lower for keyword in ['cloudwatch', 'metric', 'monitor']):
-            return await self._query_cloudwatch_metrics(query)
-        else:
-            return await self._query_general_resources(query)
+    async def process_query(self, query: str, account_id: Optional[str] = None,
+                            region: Optional[str] = None) -> Dict:
+        """Processar query via MCP servers apropriados
+
+        Uma fonte: devolve o resultado dela, como antes. Várias fontes: executa
+        todas em paralelo e devolve um resultado "multi_source" combinado.
+        """
+        sub_queries = self.planner.plan(query, self)
+        scope = (account_id or self.account_id or 'default', region or self.region)
+
+        if len(sub_queries) == 1:
+            return await self._execute_sub_query(sub_queries[0], scope)
+
+        start = time.monotonic()
+        outcomes = await asyncio.gather(*(self._execute_sub_query(sq, scope) for sq in sub_queries))
+        results = {sq.source: outcome for sq, outcome in zip(sub_queries, outcomes)}
+        return merge_results(results, time.monotonic() - start)
+
+    async def _execute_sub_query(self, sub_query: SubQuery, scope: tuple) -> Dict:
+        """Executa uma sub-query com cache (inventário), limite por MCP e timeout"""
+        if not sub_query.cacheable:
+            return await self._run_with_timeout(sub_query)
+
+        key = scope + (sub_query.source,)
+        found, cached = self.inventory_cache.lookup(key)
+        if found:
+            return {**cached, "cached": True}
+
+        # Perguntas simultâneas sobre o mesmo inventário compartilham uma chamada
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._run_with_timeout(sub_query)
+            if result.get("status") == "success":
+                self.inventory_cache.set(key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # marcado como tratado quando ninguém mais aguarda
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _run_with_timeout(self, sub_query: SubQuery) -> Dict:
+        try:
+            if not sub_query.server:
+                return await asyncio.wait_for(sub_query.run(), sub_query.timeout)
+            limiter = get_concurrency_limiter(f"mcp-{sub_query.server}")
+            async with limiter.async_slot(timeout=sub_query.timeout):
+                return await asyncio.wait_for(sub_query.run(), sub_query.timeout)
+        except asyncio.TimeoutError:
+            return {"error": f"Timeout após {sub_query.timeout}s em {sub_query.server}",
+                    "type": "error", "source": sub_query.source}
+        except Exception as e:
+            print(f"❌ Erro na sub-query {sub_query.source}: {e}")
+            return {"error": str(e), "type": "error", "source": sub_query.source}
+
+    def invalidate_inventory(self, account_id: Optional[str] = None, region: Optional[str] = None):
+        """Descarta o inventário em cache (ex. após um deploy na conta/região)"""
+        if account_id is None and region is None:
+            self.inventory_cache.clear()
+            return
+        scope = (account_id or self.account_id or 'default', region or self.region)
+        for source in self.planner.sources:
+            if source.cacheable:
+                self.inventory_cache.delete(scope + (source.name,))
     
-    async def _query_s3_resources(self) -> Dict:
-        """Query S3 buckets via MCP"""
-        
+    def _list_from_inventory(self, resource_type: str, region: Optional[str]) -> Optional[Dict]:
+        """list_resources respondido pelo snapshot local, se estiver atualizado"""
+        if self.inventory is None:
+            return None
+        try:
+            records = self.inventory.list_resources(resource_type=resource_type, account_id=self.account_id,
+                                                    region=region, max_age=INVENTORY_MAX_AGE)
+        except Exception as e:
+            print(f"⚠️ Inventário local indisponível: {e}")
+            return None
+        if records is None:
+            return None
+        return {
+            "resources": [{"properties": r["properties"], "region": r["region"]} for r in records],
+            "total_count": len(records),
+            "source": "inventory",
+            "status": "success"
+        }
+
+    async def _list_resources(self, resource_type: str, region: Optional[str] = None) -> Dict:
+        """Inventário local quando atualizado; senão list_resources via MCP aws-core"""
+        result = self._list_from_inventory(resource_type, region)
+        if result is not None:
+            return result
+
         client = self.mcp_clients.get("aws-core")
         if not client:
             return {"error": "MCP aws-core não disponível", "type": "error"}
+        return await client.call_tool("list_resources", {"resource_type": resource_type})
+
+    async def _query_s3_resources(self) -> Dict:
+        """Query S3 buckets via inventário local ou MCP"""
         
-        result = await client.call_tool("list_resources", {
-            "resource_type": "AWS::S3::Bucket"
-        })
+        result = await self._list_resources("AWS::S3::Bucket")
+        if result.get("type") == "error":
+            return result
         
         if result.get("status") == "success":
             # Processar e enriquecer dados
@@ -328,21 +527,18 @@ class IALQueryEngine:
                 "buckets": buckets,
                 "total_size": f"{total_size:.1f}GB",
                 "total_cost": f"${total_cost:.2f}",
+                "source": result.get("source", "mcp"),
                 "status": "success"
             }
         
         return {"error": result.get("error", "Falha na query S3"), "type": "error"}
     
     async def _query_ec2_resources(self) -> Dict:
-        """Query EC2 instances via MCP"""
+        """Query EC2 instances via inventário local ou MCP"""
         
-        client = self.mcp_clients.get("aws-core")
-        if not client:
-            return {"error": "MCP aws-core não disponível", "type": "error"}
-        
-        result = await client.call_tool("list_resources", {
-            "resource_type": "AWS::EC2::Instance"
-        })
+        result = await self._list_resources("AWS::EC2::Instance", region=self.region)
+        if result.get("type") == "error":
+            return result
         
         if result.get("status") == "success":
             # Processar instâncias por ambiente
@@ -406,6 +602,7 @@ class IALQueryEngine:
                 "staging": staging,
                 "total_cost": f"{total_cost:.2f}",
                 "alerts": alerts,
+                "source": result.get("source", "mcp"),
                 "status": "success"
             }
         
@@ -634,7 +831,8 @@ if __name__ == "__main__":
             "quantas EC2 eu tenho",
             "qual o custo atual",
             "verifique logs cloudtrail login",
-            "métricas cloudwatch cpu"
+            "métricas cloudwatch cpu",
+            "buckets s3, instâncias ec2 e custo atual"
         ]
         
         for query in test_queries:
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+IAL Transpiler - Conversão pura e memoizada de metadados IAL para CloudFormation
+A conversão é uma função pura do conteúdo da fonte; resultados ficam em cache
+em memória e em disco (chave = hash da fonte + versão do transpiler) e a
+substituição de placeholders é compilada uma única vez por modo.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import yaml
+
+# Incrementar sempre que a saída do transpiler mudar (invalida o cache em disco)
+TRANSPILER_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'IAL_TRANSPILER_CACHE_DIR', os.path.join(os.path.expanduser('~/.ial'), 'transpiler_cache')
+)
+
+# Placeholders de referência entre recursos (valor exato -> Ref)
+REFERENCE_PLACEHOLDERS = {
+    '[VPC_ID]': 'Resource03vpc',
+    '[IGW_ID]': 'Resource03igw',
+    '[PUBLIC_RT_ID]': 'Resource03publicrt',
+    '[PRIVATE_RT_ID]': 'Resource03privatert',
+    '[SG_APP_ID]': 'Resource03sgapp',
+    '[SG_ALB_ID]': 'Resource03sgalb',
+    '[SG_ENDPOINTS_ID]': 'Resource03sgendpoints',
+    '[SG_LAMBDA_ID]': 'Resource03sglambda',
+    '[PUBLIC_SUBNET_1A_ID]': 'Resource03publicsubnet1a',
+    '[PUBLIC_SUBNET_1B_ID]': 'Resource03publicsubnet1b',
+    '[PUBLIC_SUBNET_1C_ID]': 'Resource03publicsubnet1c',
+    '[PRIVATE_SUBNET_1A_ID]': 'Resource03privatesubnet1a',
+    '[PRIVATE_SUBNET_1B_ID]': 'Resource03privatesubnet1b',
+    '[PRIVATE_SUBNET_1C_ID]': 'Resource03privatesubnet1c'
+}
+
+_PROJECT = '{{PROJECT_NAME}}'
+_REGION = '{{AWS_REGION}}'
+_DEFAULT_RESOURCE_TYPE = 'AWS::CloudFormation::WaitConditionHandle'
+_NON_ALNUM = re.compile(r'[^a-zA-Z0-9]')
+
+
+def _compile_string_rule(legacy_workflow: bool) -> Callable[[str], Any]:
+    """Compila a regra de substituição de strings para um modo de conversão"""
+    exact = {} if legacy_workflow else dict(
+        {_PROJECT: {'Ref': 'ProjectName'}, _REGION: {'Ref': 'AWS::Region'}},
+        **{placeholder: {'Ref': target} for placeholder, target in REFERENCE_PLACEHOLDERS.items()}
+    )
+
+    def substitute(value: str) -> Any:
+        ref = exact.get(value)
+        if ref is not None:
+            return dict(ref)
+        if _PROJECT in value:
+            new_str = value.replace(_PROJECT, '${ProjectName}')
+            # Formato workflow antigo não substituía a região junto com o projeto
+            if not legacy_workflow:
+                new_str = new_str.replace(_REGION, '${AWS::Region}')
+            return {'Fn::Sub': new_str}
+        if _REGION in value:
+            return {'Fn::Sub': value.replace(_REGION, '${AWS::Region}')}
+        return value
+
+    return substitute
+
+
+class PlaceholderSubstitution:
+    """Substituição de placeholders compilada uma vez e aplicada a árvores inteiras"""
+
+    def __init__(self, legacy_workflow: bool = False):
+        self._substitute = _compile_string_rule(legacy_workflow)
+
+    def apply(self, obj: Any) -> Any:
+        if isinstance(obj, dict):
+            return {k: self.apply(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self.apply(item) for item in obj]
+        if isinstance(obj, str) and ('{{' in obj or obj in REFERENCE_PLACEHOLDERS):
+            return self._substitute(obj)
+        return obj
+
+
+_RESOURCE_PLACEHOLDERS = PlaceholderSubstitution()
+_WORKFLOW_PLACEHOLDERS = PlaceholderSubstitution(legacy_workflow=True)
+
+
+def _logical_name(name: str) -> str:
+    # Garantir nome alfanumérico começando com letra
+    name = _NON_ALNUM.sub('', name)
+    if not name or not name[0].isalpha():
+        name = 'Resource' + name
+    return name
+
+
+def is_ial_metadata_doc(content: Any) -> bool:
+    """Detecta se um documento já parseado é metadado IAL (e não CloudFormation)"""
+    if not isinstance(content, dict):
+        return False
+
+    # Se tem 'resources' com 'mcp_workflow', é metadado IAL
+    resources = content.get('resources')
+    if isinstance(resources, dict):
+        if any(isinstance(r, dict) and 'mcp_workflow' in r for r in resources.values()):
+            return True
+
+    # Se tem estrutura de workflow (formato antigo), também é IAL
+    return any(isinstance(value, dict) and 'workflow' in value for value in content.values())
+
+
+def transpile(ial_metadata: Dict) -> Dict:
+    """Converte metadado IAL (já parseado) em um template CloudFormation (dict)"""
+    cf_template = {
+        'AWSTemplateFormatVersion': '2010-09-09',
+        'Description': f"Generated from IAL metadata: {ial_metadata.get('description', 'IAL Phase')}",
+        'Parameters': {
+            'ProjectName': {
+                'Type': 'String',
+                'Default': 'ial-project',
+                'Description': 'Project name for resource naming'
+            },
+            'Environment': {
+                'Type': 'String',
+                'Default': 'dev',
+                'Description': 'Environment name'
+            }
+        },
+        'Resources': {}
+    }
+    resources = cf_template['Resources']
+
+    if 'resources' in ial_metadata:
+        for resource_key, resource_config in ial_metadata['resources'].items():
+            if not isinstance(resource_config, dict):
+                continue
+
+            # Recursos com mcp_workflow (formato completo)
+            if 'mcp_workflow' in resource_config:
+                gen_config = resource_config['mcp_workflow'].get('generate_code', {})
+                params = gen_config.get('parameters', {})
+                properties = params.get('properties', {})
+                resource_type = params.get('resource_type', _DEFAULT_RESOURCE_TYPE)
+            # Recursos IAL simples (sem mcp_workflow)
+            elif 'type' in resource_config:
+                properties = resource_config.get('properties', {})
+                resource_type = resource_config.get('type', _DEFAULT_RESOURCE_TYPE)
+            else:
+                continue
+
+            cf_resource = {
+                'Type': resource_type,
+                'Properties': _RESOURCE_PLACEHOLDERS.apply(properties)
+            }
+            # DependsOn para quebrar dependências circulares
+            if resource_type == 'AWS::EC2::VPCEndpoint':
+                cf_resource['DependsOn'] = ['Resource03vpc']
+
+            name = resource_config.get('resource_name', resource_key.replace('-', '').replace('_', ''))
+            resources[_logical_name(name)] = cf_resource
+
+    # Formato workflow (formato antigo)
+    else:
+        for resource_key, resource_config in ial_metadata.items():
+            if not (isinstance(resource_config, dict) and 'workflow' in resource_config):
+                continue
+
+            # Procurar step com generate_infrastructure_code
+            resource_type = _DEFAULT_RESOURCE_TYPE
+            properties = {}
+            for step_config in resource_config['workflow'].values():
+                if isinstance(step_config, dict) and step_config.get('action') == 'generate_infrastructure_code':
+                    resource_type = step_config.get('resource_type', resource_type)
+                    properties = step_config.get('properties', {})
+                    break
+
+            resources[_logical_name(resource_key)] = {
+                'Type': resource_type,
+                'Properties': _WORKFLOW_PLACEHOLDERS.apply(properties)
+            }
+
+    # Se não tem recursos, criar um placeholder
+    if not resources:
+        resources['PlaceholderResource'] = {'Type': _DEFAULT_RESOURCE_TYPE, 'Properties': {}}
+
+    return cf_template
+
+
+def render(cf_template: Dict) -> str:
+    return yaml.dump(cf_template, default_flow_style=False)
+
+
+def source_key(source: str) -> str:
+    """Chave de cache: versão do transpiler + hash da fonte"""
+    return hashlib.sha256(f"v{TRANSPILER_VERSION}\0{source}".encode('utf-8')).hexdigest()
+
+
+class IALTranspiler:
+    """Transpiler com cache em memória (LRU) e em disco"""
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, memory_size: int = 512):
+        self.cache_dir = cache_dir
+        self.memory_size = memory_size
+        self._memory: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, key[:2], f"{key}.yaml")
+
+    def _remember(self, key: str, template_body: str):
+        with self._lock:
+            self._memory[key] = template_body
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def transpile_source(self, source: str) -> str:
+        """Template CloudFormation (YAML) para o texto-fonte IAL"""
+        key = source_key(source)
+
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return cached
+
+        disk_path = self._disk_path(key)
+        if disk_path and os.path.exists(disk_path):
+            try:
+                with open(disk_path, 'r') as f:
+                    template_body = f.read()
+                self.stats['disk_hits'] += 1
+                self._remember(key, template_body)
+                return template_body
+            except OSError:
+                pass
+
+        template_body = render(transpile(yaml.safe_load(source)))
+        self.stats['misses'] += 1
+        self._remember(key, template_body)
+
+        if disk_path:
+            try:
+                os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+                tmp_path = f"{disk_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    f.write(template_body)
+                os.replace(tmp_path, disk_path)
+            except OSError as e:
+                print(f"⚠️ Could not write transpiler cache: {e}")
+
+        return template_body
+
+    def transpile_file(self, file_path: str) -> str:
+        with open(file_path, 'r') as f:
+            return self.transpile_source(f.read())
+
+
+_default_transpiler: Optional[IALTranspiler] = None
+
+
+def get_transpiler() -> IALTranspiler:
+    """Transpiler compartilhado do processo"""
+    global _default_transpiler
+    if _default_transpiler is None:
+        _default_transpiler = IALTranspiler()
+    return _default_transpiler
@@ -12,7 +12,8 @@ from core.mcp_mesh_loader import MCPMeshLoader
 from core.service_detector_enhanced import ServiceDetectorEnhanced
 from core.domain_mapper_sophisticated import DomainMapperSophisticated
 from core.mcp_orchestrator_upgraded import MCPOrchestratorUpgraded
-from core.circuit_breaker import CircuitBreaker
+from core.resilience.registry import get_circuit_breaker, get_registry
+from core.tracing import span, traced
 
 class IntelligentMCPRouterSophisticated:
     def __init__(self):
@@ -28,10 +29,10 @@ class IntelligentMCPRouterSophisticated:
         self.clarification_engine = LLMClarificationEngine(self.llm_provider, self.orchestrator)
         
         # Circuit breaker for overall routing
-        self.routing_circuit = CircuitBreaker(
+        self.routing_circuit = get_circuit_breaker(
+            "routing",
             failure_threshold=10,
-            timeout=120,
-            name="routing"
+            timeout=120
         )
         
         print(f"✅ LLM Provider: {self.llm_provider.current_provider}")
@@ -42,6 +43,7 @@ class IntelligentMCPRouterSophisticated:
             print(f"📋 Available domains: {domains_list}")
         print(f"✅ Circuit Breakers: Ativo")
         
+    @traced('router.route_request', category='routing')
     async def route_request_async(self, request: str) -> Dict[str, Any]:
         """Main async routing method with circuit breaker and SECURITY VALIDATION"""
         start_time = time.time()
@@ -118,7 +120,8 @@ class IntelligentMCPRouterSophisticated:
             # Step 2: Service Detection (sync, fast)
             detection_start = time.time()
             processed_text = llm_result.get('processed_text', request)
-            detection_result = self.service_detector.detect_services(processed_text)
+            with span('router.service_detection', category='routing'):
+                detection_result = self.service_detector.detect_services(processed_text)
             detection_time = time.time() - detection_start
             
             # Debug disabled in production
@@ -126,8 +129,9 @@ class IntelligentMCPRouterSophisticated:
             
             # Step 3: Domain Mapping (sync, fast)
             mapping_start = time.time()
-            domains = self.domain_mapper.map_to_domains(detection_result['detected_services'])
-            required_mcps = self.domain_mapper.get_required_mcps(domains)
+            with span('router.domain_mapping', category='routing'):
+                domains = self.domain_mapper.map_to_domains(detection_result['detected_services'])
+                required_mcps = self.domain_mapper.get_required_mcps(domains)
             
             # Debug disabled in production
             # print(f"🔍 DEBUG: Required MCPs: {required_mcps}")
@@ -204,6 +208,7 @@ class IntelligentMCPRouterSophisticated:
             self.routing_circuit.record_failure()
             return self._fallback_response(f"Routing failed: {str(e)}", start_time)
             
+    @traced('mcp.execute_all', category='mcp')
     async def _execute_mcps_async(self, loaded_mcps: Dict, request: str) -> Dict:
         """Execute MCPs - direct execution for queries, GitOps for infrastructure creation"""
         if not loaded_mcps:
@@ -929,6 +934,7 @@ Outputs:
     Value: !Ref PlaceholderResource
 """
         
+    @traced('mcp.execute', category='mcp')
     async def _execute_single_mcp_async(self, mcp_name: str, mcp_instance: Any, request: str) -> Dict:
         """Execute single MCP async"""
         try:
@@ -973,6 +979,9 @@ Outputs:
         # MCP circuit breaker metrics
         for mcp_name, circuit in self.orchestrator.circuit_breakers.items():
             metrics['mcp_circuits'][mcp_name] = circuit.get_metrics()
+        
+        # Limites de concorrência adaptativos por dependência
+        metrics['concurrency_limits'] = get_registry().snapshot()['concurrency_limiters']
             
         return metrics
         
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Inventory Store - Snapshot local (SQLite) do inventário da conta
+O InventoryCollector descreve cada serviço em cada região em paralelo e grava
+o resultado por escopo (conta, região, serviço). A atualização é incremental:
+escopos ainda dentro de `max_age` não são recoletados, recursos inalterados só
+têm `last_seen` atualizado (hash do conteúdo) e recursos que sumiram da conta
+são removidos. As engines de consulta leem daqui com SQL e índices em vez de
+repetir dezenas de chamadas describe/list a cada pergunta.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import boto3
+
+INVENTORY_DB_PATH = os.getenv('IAL_INVENTORY_DB', os.path.expanduser('~/.ial/inventory.db'))
+INVENTORY_MAX_AGE = float(os.getenv('IAL_INVENTORY_MAX_AGE', '900'))
+GLOBAL_REGION = 'global'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    account_id    TEXT NOT NULL,
+    region        TEXT NOT NULL,
+    service       TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    resource_id   TEXT NOT NULL,
+    name          TEXT,
+    state         TEXT,
+    tags          TEXT NOT NULL DEFAULT '{}',
+    properties    TEXT NOT NULL,
+    content_hash  TEXT NOT NULL,
+    first_seen    REAL NOT NULL,
+    last_seen     REAL NOT NULL,
+    last_changed  REAL NOT NULL,
+    PRIMARY KEY (account_id, region, resource_type, resource_id)
+);
+CREATE INDEX IF NOT EXISTS idx_resources_scope ON resources (account_id, region, service);
+CREATE INDEX IF NOT EXISTS idx_resources_type_state ON resources (resource_type, state);
+CREATE INDEX IF NOT EXISTS idx_resources_name ON resources (name);
+CREATE INDEX IF NOT EXISTS idx_resources_changed ON resources (last_changed);
+
+CREATE TABLE IF NOT EXISTS collections (
+    account_id     TEXT NOT NULL,
+    region         TEXT NOT NULL,
+    service        TEXT NOT NULL,
+    collected_at   REAL NOT NULL,
+    duration       REAL NOT NULL DEFAULT 0,
+    resource_count INTEGER NOT NULL DEFAULT 0,
+    status         TEXT NOT NULL,
+    error          TEXT,
+    PRIMARY KEY (account_id, region, service)
+);
+"""
+
+
+def _content_hash(record: Dict) -> str:
+    payload = json.dumps([record.get('name'), record.get('state'), record.get('tags'), record.get('properties')],
+                         sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class InventoryStore:
+    """Inventário em SQLite: uma linha por recurso, uma linha por coleta (escopo)"""
+
+    def __init__(self, db_path: str = INVENTORY_DB_PATH, clock: Callable[[], float] = time.time):
+        self.db_path = db_path
+        self._clock = clock
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # Uma conexão compartilhada; o lock serializa o acesso entre threads
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if db_path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+
+    # ------------------------------------------------------------------ escrita
+
+    def replace_scope(self, account_id: str, region: str, service: str, records: Iterable[Dict],
+                      collected_at: Optional[float] = None, duration: float = 0.0) -> Dict[str, int]:
+        """Grava a coleta completa de um escopo; devolve added/updated/unchanged/removed"""
+        now = collected_at if collected_at is not None else self._clock()
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+        seen = set()
+
+        with self._lock, self._conn:
+            existing = {
+                (row['resource_type'], row['resource_id']): row['content_hash']
+                for row in self._conn.execute(
+                    'SELECT resource_type, resource_id, content_hash FROM resources '
+                    'WHERE account_id = ? AND region = ? AND service = ?', (account_id, region, service))
+            }
+
+            for record in records:
+                key = (record['resource_type'], record['resource_id'])
+                if key in seen:
+                    continue
+                seen.add(key)
+                digest = _content_hash(record)
+                previous = existing.get(key)
+
+                if previous == digest:
+                    counts['unchanged'] += 1
+                    self._conn.execute(
+                        'UPDATE resources SET last_seen = ? WHERE account_id = ? AND region = ? '
+                        'AND resource_type = ? AND resource_id = ?', (now, account_id, region) + key)
+                    continue
+
+                counts['updated' if previous else 'added'] += 1
+                self._conn.execute(
+                    'INSERT INTO resources (account_id, region, service, resource_type, resource_id, name, state, '
+                    'tags, properties, content_hash, first_seen, last_seen, last_changed) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (account_id, region, resource_type, resource_id) DO UPDATE SET '
+                    'name = excluded.name, state = excluded.state, tags = excluded.tags, '
+                    'properties = excluded.properties, content_hash = excluded.content_hash, '
+                    'last_seen = excluded.last_seen, last_changed = excluded.last_changed',
+                    (account_id, region, service, record['resource_type'], record['resource_id'],
+                     record.get('name'), record.get('state'), json.dumps(record.get('tags') or {}, default=str),
+                     json.dumps(record.get('properties') or {}, default=str), digest, now, now, now))
+
+            # Recursos que não apareceram nesta coleta não existem mais
+            for resource_type, resource_id in set(existing) - seen:
+                counts['removed'] += 1
+                self._conn.execute(
+                    'DELETE FROM resources WHERE account_id = ? AND region = ? AND resource_type = ? '
+                    'AND resource_id = ?', (account_id, region, resource_type, resource_id))
+
+            self._conn.execute(
+                'INSERT OR REPLACE INTO collections VALUES (?, ?, ?, ?, ?, ?, ?, NULL)',
+                (account_id, region, service, now, duration, len(seen), 'success'))
+        return counts
+
+    def record_failure(self, account_id: str, region: str, service: str, error: str):
+        """Registra a falha mantendo o snapshot anterior (e sua idade) intacto"""
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                'UPDATE collections SET status = ?, error = ? WHERE account_id = ? AND region = ? AND service = ?',
+                ('failed', error, account_id, region, service)).rowcount
+            if not updated:
+                self._conn.execute('INSERT INTO collections VALUES (?, ?, ?, 0, 0, 0, ?, ?)',
+                                   (account_id, region, service, 'failed', error))
+
+    # ------------------------------------------------------------------ leitura
+
+    def last_collected(self, account_id: str, region: str, service: str) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT collected_at FROM collections WHERE account_id = ? AND region = ? AND service = ?',
+                (account_id, region, service)).fetchone()
+        return row['collected_at'] if row and row['collected_at'] else None
+
+    def is_fresh(self, service: str, max_age: float = INVENTORY_MAX_AGE, account_id: Optional[str] = None,
+                 region: Optional[str] = None) -> bool:
+        """Há coleta do serviço (no escopo filtrado) mais nova que `max_age`?"""
+        where, params = self._filters(service=service, account_id=account_id, region=region)
+        with self._lock:
+            row = self._conn.execute(f'SELECT MAX(collected_at) AS newest FROM collections{where}', params).fetchone()
+        return bool(row['newest']) and self._clock() - row['newest'] <= max_age
+
+    def list_resources(self, resource_type: Optional[str] = None, service: Optional[str] = None,
+                       account_id: Optional[str] = None, region: Optional[str] = None,
+                       state: Optional[str] = None, max_age: Optional[float] = None) -> Optional[List[Dict]]:
+        """Recursos filtrados; com `max_age`, None quando o snapshot está velho ou ausente"""
+        if max_age is not None:
+            fresh_service = service or self._service_for_type(resource_type)
+            if fresh_service is None or not self.is_fresh(fresh_service, max_age, account_id, region):
+                return None
+
+        where, params = self._filters(resource_type=resource_type, service=service, account_id=account_id,
+                                      region=region, state=state)
+        return self.query(f'SELECT * FROM resources{where} ORDER BY region, resource_type, resource_id', params)
+
+    def names(self, service: Optional[str] = None) -> set:
+        where, params = self._filters(service=service)
+        return {row['name'] for row in self.query(f'SELECT name FROM resources{where}', params) if row['name']}
+
+    def changed_since(self, timestamp: float) -> List[Dict]:
+        """Recursos criados ou alterados depois de `timestamp` (usa o índice last_changed)"""
+        return self.query('SELECT * FROM resources WHERE last_changed > ? ORDER BY last_changed', (timestamp,))
+
+    def query(self, sql: str, params: Tuple = ()) -> List[Dict]:
+        """SELECT livre (somente leitura); colunas JSON já decodificadas"""
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            raise ValueError("InventoryStore.query only accepts SELECT statements")
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        results = []
+        for row in rows:
+            item = dict(row)
+            for column in ('tags', 'properties'):
+                if isinstance(item.get(column), str):
+                    item[column] = json.loads(item[column])
+            results.append(item)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_service = {row['service']: row['total'] for row in self._conn.execute(
+                'SELECT service, COUNT(*) AS total FROM resources GROUP BY service')}
+            collections = [dict(row) for row in self._conn.execute(
+                'SELECT * FROM collections ORDER BY service, region')]
+        return {
+            'db_path': self.db_path,
+            'total_resources': sum(by_service.values()),
+            'by_service': by_service,
+            'collections': collections,
+            'failed_scopes': [c for c in collections if c['status'] != 'success']
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------ helpers
+
+    @staticmethod
+    def _filters(**filters) -> Tuple[str, Tuple]:
+        clauses = [(f'{column} = ?', value) for column, value in filters.items() if value is not None]
+        if not clauses:
+            return '', ()
+        return ' WHERE ' + ' AND '.join(c for c, _ in clauses), tuple(v for _, v in clauses)
+
+    @staticmethod
+    def _service_for_type(resource_type: Optional[str]) -> Optional[str]:
+        for service, (_, types, _) in SERVICE_COLLECTORS.items():
+            if resource_type in types:
+                return service
+        return None
+
+
+# ---------------------------------------------------------------------- coletores por serviço
+
+def _tags(tag_list: Optional[List[Dict]]) -> Dict[str, str]:
+    return {tag.get('Key'): tag.get('Value') for tag in tag_list or [] if tag.get('Key')}
+
+
+def _collect_ec2(client) -> List[Dict]:
+    records = []
+    for page in client.get_paginator('describe_instances').paginate():
+        for reservation in page.get('Reservations', []):
+            for instance in reservation.get('Instances', []):
+                tags = _tags(instance.get('Tags'))
+                records.append({
+                    'resource_type': 'AWS::EC2::Instance',
+                    'resource_id': instance['InstanceId'],
+                    'name': tags.get('Name', instance['InstanceId']),
+                    'state': instance.get('State', {}).get('Name'),
+                    'tags': tags,
+                    'properties': {
+                        'InstanceId': instance['InstanceId'],
+                        'InstanceType': instance.get('InstanceType'),
+                        'State': instance.get('State', {}).get('Name'),
+                        'PrivateIpAddress': instance.get('PrivateIpAddress'),
+                        'PublicIpAddress': instance.get('PublicIpAddress', 'N/A'),
+                        'LaunchTime': str(instance.get('LaunchTime', '')),
+                        'Tags': instance.get('Tags', [])
+                    }
+                })
+    return records
+
+
+def _collect_ebs(client) -> List[Dict]:
+    records = []
+    for page in client.get_paginator('describe_volumes').paginate():
+        for volume in page.get('Volumes', []):
+            tags = _tags(volume.get('Tags'))
+            records.append({
+                'resource_type': 'AWS::EC2::Volume',
+                'resource_id': volume['VolumeId'],
+                'name': tags.get('Name', volume['VolumeId']),
+                'state': volume.get('State'),
+                'tags': tags,
+                'properties': {
+                    'VolumeId': volume['VolumeId'],
+                    'Size': volume.get('Size', 0),
+                    'VolumeType': volume.get('VolumeType'),
+                    'AttachedTo': [a.get('InstanceId') for a in volume.get('Attachments', [])]
+                }
+            })
+    return records
+
+
+def _collect_s3(client) -> List[Dict]:
+    return [{
+        'resource_type': 'AWS::S3::Bucket',
+        'resource_id': bucket['Name'],
+        'name': bucket['Name'],
+        'state': 'available',
+        'properties': {'BucketName': bucket['Name'], 'CreationDate': str(bucket.get('CreationDate', ''))}
+    } for bucket in client.list_buckets().get('Buckets', [])]
+
+
+def _collect_dynamodb(client) -> List[Dict]:
+    return [{
+        'resource_type': 'AWS::DynamoDB::Table',
+        'resource_id': name,
+        'name': name,
+        'state': 'available',
+        'properties': {'TableName': name}
+    } for page in client.get_paginator('list_tables').paginate() for name in page.get('TableNames', [])]
+
+
+def _collect_lambda(client) -> List[Dict]:
+    return [{
+        'resource_type': 'AWS::Lambda::Function',
+        'resource_id': function['FunctionArn'],
+        'name': function['FunctionName'],
+        'state': function.get('State', 'Active'),
+        'properties': {'FunctionName': function['FunctionName'], 'Runtime': function.get('Runtime', 'unknown'),
+                       'MemorySize': function.get('MemorySize')}
+    } for page in client.get_paginator('list_functions').paginate() for function in page.get('Functions', [])]
+
+
+def _collect_sns(client) -> List[Dict]:
+    return [{
+        'resource_type': 'AWS::SNS::Topic',
+        'resource_id': topic['TopicArn'],
+        'name': topic['TopicArn'].split(':')[-1],
+        'state': 'available',
+        'properties': {'TopicName': topic['TopicArn'].split(':')[-1], 'TopicArn': topic['TopicArn']}
+    } for page in client.get_paginator('list_topics').paginate() for topic in page.get('Topics', [])]
+
+
+def _collect_sqs(client) -> List[Dict]:
+    return [{
+        'resource_type': 'AWS::SQS::Queue',
+        'resource_id': url,
+        'name': url.rstrip('/').split('/')[-1],
+        'state': 'available',
+        'properties': {'QueueName': url.rstrip('/').split('/')[-1], 'QueueUrl': url}
+    } for url in client.list_queues().get('QueueUrls', [])]
+
+
+def _collect_rds(client) -> List[Dict]:
+    return [{
+        'resource_type': 'AWS::RDS::DBInstance',
+        'resource_id': db['DBInstanceIdentifier'],
+        'name': db['DBInstanceIdentifier'],
+        'state': db.get('DBInstanceStatus'),
+        'tags': _tags(db.get('TagList')),
+        'properties': {'DBInstanceIdentifier': db['DBInstanceIdentifier'], 'DBInstanceClass': db.get('DBInstanceClass'),
+                       'Engine': db.get('Engine'), 'MultiAZ': db.get('MultiAZ', False)}
+    } for page in client.get_paginator('describe_db_instances').paginate() for db in page.get('DBInstances', [])]
+
+
+def _collect_elbv2(client) -> List[Dict]:
+    return [{
+        'resource_type': 'AWS::ElasticLoadBalancingV2::LoadBalancer',
+        'resource_id': lb['LoadBalancerArn'],
+        'name': lb['LoadBalancerName'],
+        'state': lb.get('State', {}).get('Code'),
+        'properties': {'LoadBalancerName': lb['LoadBalancerName'], 'LoadBalancerArn': lb['LoadBalancerArn'],
+                       'Type': lb.get('Type'), 'Scheme': lb.get('Scheme')}
+    } for page in client.get_paginator('describe_load_balancers').paginate() for lb in page.get('LoadBalancers', [])]
+
+
+# serviço -> (cliente boto3, tipos produzidos, função de coleta)
+SERVICE_COLLECTORS = {
+    'ec2': ('ec2', ('AWS::EC2::Instance',), _collect_ec2),
+    'ebs': ('ec2', ('AWS::EC2::Volume',), _collect_ebs),
+    's3': ('s3', ('AWS::S3::Bucket',), _collect_s3),
+    'dynamodb': ('dynamodb', ('AWS::DynamoDB::Table',), _collect_dynamodb),
+    'lambda': ('lambda', ('AWS::Lambda::Function',), _collect_lambda),
+    'sns': ('sns', ('AWS::SNS::Topic',), _collect_sns),
+    'sqs': ('sqs', ('AWS::SQS::Queue',), _collect_sqs),
+    'rds': ('rds', ('AWS::RDS::DBInstance',), _collect_rds),
+    'elbv2': ('elbv2', ('AWS::ElasticLoadBalancingV2::LoadBalancer',), _collect_elbv2),
+}
+GLOBAL_SERVICES = {'s3'}  # list_buckets devolve todos os buckets da conta
+
+
+class InventoryCollector:
+    """Coleta paralela por (serviço, região) com atualização incremental"""
+
+    def __init__(self, store: InventoryStore, services: Optional[List[str]] = None,
+                 regions: Optional[List[str]] = None, account_id: Optional[str] = None,
+                 session: Optional[boto3.session.Session] = None, max_workers: int = 8,
+                 max_age: float = INVENTORY_MAX_AGE):
+        unknown = set(services or []) - set(SERVICE_COLLECTORS)
+        if unknown:
+            raise ValueError(f"Unknown inventory services: {sorted(unknown)}")
+        self.store = store
+        self.session = session or boto3.session.Session()
+        self.services = list(services or SERVICE_COLLECTORS)
+        self.regions = list(regions or [self.session.region_name or 'us-east-1'])
+        self.max_workers = max_workers
+        self.max_age = max_age
+        self._account_id = account_id
+
+    @property
+    def account_id(self) -> str:
+        if self._account_id is None:
+            try:
+                self._account_id = self.session.client('sts').get_caller_identity()['Account']
+            except Exception as e:
+                print(f"⚠️ Não foi possível identificar a conta AWS: {e}")
+                self._account_id = 'default'
+        return self._account_id
+
+    def scopes(self) -> List[Tuple[str, str]]:
+        """(serviço, região) a coletar; serviços globais uma única vez"""
+        scopes = []
+        for service in self.services:
+            regions = [GLOBAL_REGION] if service in GLOBAL_SERVICES else self.regions
+            scopes.extend((service, region) for region in regions)
+        return scopes
+
+    def refresh(self, force: bool = False) -> Dict[str, Any]:
+        """Recoleta os escopos vencidos (ou todos com force) em paralelo"""
+        start = time.monotonic()
+        account_id = self.account_id
+        now = time.time()
+        pending, skipped = [], []
+        for service, region in self.scopes():
+            collected_at = self.store.last_collected(account_id, region, service)
+            if not force and collected_at and now - collected_at <= self.max_age:
+                skipped.append(f"{service}/{region}")
+            else:
+                pending.append((service, region))
+
+        # Clientes criados na thread principal: boto3.Session não é thread-safe
+        clients = {}
+        for service, region in pending:
+            client_name = SERVICE_COLLECTORS[service][0]
+            client_region = self.regions[0] if region == GLOBAL_REGION else region
+            key = (client_name, client_region)
+            if key not in clients:
+                clients[key] = self.session.client(client_name, region_name=client_region)
+
+        summary = {'account_id': account_id, 'collected': {}, 'skipped': skipped, 'failed': {}}
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+                futures = {
+                    executor.submit(self._collect_scope, account_id, service, region,
+                                    clients[(SERVICE_COLLECTORS[service][0],
+                                             self.regions[0] if region == GLOBAL_REGION else region)]):
+                    (service, region)
+                    for service, region in pending
+                }
+                for future, (service, region) in futures.items():
+                    scope = f"{service}/{region}"
+                    try:
+                        summary['collected'][scope] = future.result()
+                    except Exception as e:
+                        self.store.record_failure(account_id, region, service, str(e))
+                        summary['failed'][scope] = str(e)
+                        print(f"⚠️ Inventory collection failed for {scope}: {e}")
+
+        summary['duration'] = round(time.monotonic() - start, 3)
+        return summary
+
+    def _collect_scope(self, account_id: str, service: str, region: str, client) -> Dict[str, int]:
+        started = time.monotonic()
+        records = SERVICE_COLLECTORS[service][2](client)
+        return self.store.replace_scope(account_id, region, service, records,
+                                        duration=time.monotonic() - started)
+
+
+_stores: Dict[str, InventoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_inventory_store(db_path: Optional[str] = None, create: bool = True) -> Optional[InventoryStore]:
+    """Store compartilhado por caminho; create=False devolve None se ainda não há snapshot"""
+    path = db_path or INVENTORY_DB_PATH
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            if not create and not os.path.exists(path):
+                return None
+            store = _stores[path] = InventoryStore(path)
+        return store
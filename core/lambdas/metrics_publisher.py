@@ -10,9 +10,15 @@ from datetime import datetime
 from typing import Dict, Any
 
 # Initialize AWS clients
-cloudwatch = boto3.client('cloudwatch')
 ssm = boto3.client('ssm')
 
+# Metrics emitter: EMF no stdout dentro do Lambda (sem chamada síncrona à API)
+try:
+    from utils.metrics_emitter import MetricsEmitter
+    cloudwatch = MetricsEmitter("IAL/CircuitBreaker")
+except ImportError:
+    cloudwatch = boto3.client('cloudwatch')
+
 def lambda_handler(event, context):
     """
     Lambda function handler for SSM Parameter Store changes
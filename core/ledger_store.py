@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+"""
+Ledger Store - Backend append-only e segmentado para o DecisionLedger
+Um único writer por processo grava lotes (com flock entre processos) no
+segmento ativo (reports/decisions.log). Ao atingir o tamanho limite, o
+segmento é selado em reports/ledger/ como blocos gzip independentes, com um
+índice lateral por bloco (intervalo de ts, phases, status). Consultas usam o
+manifesto e os índices para pular segmentos e blocos inteiros.
+
+Uso:
+    python -m core.ledger_store query --phase 10-security --since 24h
+    python -m core.ledger_store stats
+    python -m core.ledger_store bench --entries 1000000
+"""
+
+import argparse
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEFAULT_SEGMENT_BYTES = int(os.environ.get('IAL_LEDGER_SEGMENT_BYTES', 64 * 1024 * 1024))
+DEFAULT_BLOCK_RECORDS = 1000
+MAX_BLOCK_KEYS = 32        # acima disso o bloco não filtra pelo campo (None = qualquer)
+HEAD_BYTES = 256
+
+Record = Tuple[int, int, Optional[int], Optional[str], Optional[str]]  # offset, length, ts, phase, status
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Lock exclusivo entre processos (no-op sem fcntl)"""
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_json_atomic(path: str, data: Any):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _record_meta(entry: Dict[str, Any]) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+    ts = entry.get('ts')
+    phase = entry.get('phase')
+    status = entry.get('status')
+    return (int(ts) if isinstance(ts, (int, float)) else None,
+            str(phase) if phase is not None else None,
+            str(status) if status is not None else None)
+
+
+def _add_key(keys: Optional[List[str]], value: Optional[str]) -> Optional[List[str]]:
+    if keys is None or value is None or value in keys:
+        return keys
+    if len(keys) >= MAX_BLOCK_KEYS:
+        return None
+    keys.append(value)
+    return keys
+
+
+def _extend_blocks(blocks: List[Dict[str, Any]], records: List[Record], block_records: int):
+    """Acrescenta registros ao índice de blocos (blocos contíguos de até block_records linhas)"""
+    for offset, length, ts, phase, status in records:
+        last = blocks[-1] if blocks else None
+        if last is None or last['count'] >= block_records or last['offset'] + last['length'] != offset:
+            last = {'offset': offset, 'length': 0, 'count': 0, 'ts_min': None, 'ts_max': None,
+                    'phases': [], 'statuses': []}
+            blocks.append(last)
+        last['length'] += length
+        last['count'] += 1
+        if ts is not None:
+            last['ts_min'] = ts if last['ts_min'] is None else min(last['ts_min'], ts)
+            last['ts_max'] = ts if last['ts_max'] is None else max(last['ts_max'], ts)
+        last['phases'] = _add_key(last['phases'], phase)
+        last['statuses'] = _add_key(last['statuses'], status)
+
+
+def _summarize(blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Resumo de um segmento a partir dos blocos (usado no manifesto)"""
+    summary = {'count': 0, 'ts_min': None, 'ts_max': None, 'phases': [], 'statuses': []}
+    for block in blocks:
+        summary['count'] += block['count']
+        for bound, pick in (('ts_min', min), ('ts_max', max)):
+            if block[bound] is not None:
+                summary[bound] = block[bound] if summary[bound] is None else pick(summary[bound], block[bound])
+        for field in ('phases', 'statuses'):
+            if summary[field] is not None:
+                if block[field] is None:
+                    summary[field] = None
+                else:
+                    for value in block[field]:
+                        summary[field] = _add_key(summary[field], value)
+                        if summary[field] is None:
+                            break
+    return summary
+
+
+def _scan_records(path: str, start: int = 0) -> Tuple[List[Record], int]:
+    """Lê linhas completas a partir de start; retorna registros e o offset final indexado"""
+    records: List[Record] = []
+    offset = start
+    try:
+        with open(path, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # linha parcial (escrita em andamento)
+                try:
+                    meta = _record_meta(json.loads(line))
+                except (ValueError, AttributeError):
+                    meta = (None, None, None)
+                records.append((offset, len(line), *meta))
+                offset += len(line)
+    except FileNotFoundError:
+        pass
+    return records, offset
+
+
+def parse_time(value: Any) -> Optional[int]:
+    """Converte epoch (s ou ms), ISO-8601 ou relativo (30m, 24h, 7d) para epoch ms"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return int(value * 1000) if value < 1e11 else int(value)
+    text = str(value).strip()
+    if re.fullmatch(r'\d+(\.\d+)?', text):
+        return parse_time(float(text))
+    relative = re.fullmatch(r'(\d+)([smhd])', text)
+    if relative:
+        seconds = int(relative.group(1)) * {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[relative.group(2)]
+        return int((time.time() - seconds) * 1000)
+    parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+class LedgerStore:
+    """Ledger append-only com writer único, rotação comprimida e índice lateral"""
+
+    def __init__(self, directory: str = 'reports', active_name: str = 'decisions.log',
+                 segment_bytes: int = DEFAULT_SEGMENT_BYTES, block_records: int = DEFAULT_BLOCK_RECORDS,
+                 flush_interval: float = 0.5, max_pending: int = 1000):
+        self.directory = directory
+        self.active_path = os.path.join(directory, active_name)
+        self.ledger_dir = os.path.join(directory, 'ledger')
+        self.active_index_path = os.path.join(self.ledger_dir, 'active.idx.json')
+        self.manifest_path = os.path.join(self.ledger_dir, 'manifest.json')
+        self.lock_path = os.path.join(self.ledger_dir, '.lock')
+        self.segment_bytes = segment_bytes
+        self.block_records = block_records
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending: List[Tuple[str, Tuple]] = []
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_query_stats: Dict[str, int] = {}
+
+        os.makedirs(self.ledger_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def append(self, entry: Dict[str, Any]):
+        """Enfileira uma entrada (serializada no chamador) para o writer"""
+        line = json.dumps(entry) + '\n'
+        with self._pending_lock:
+            self._pending.append((line, _record_meta(entry)))
+            full = len(self._pending) >= self.max_pending
+        self._ensure_started()
+        if full:
+            self._wake.set()
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._pending_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ial-ledger-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Erro gravando decision ledger: {e}")
+
+    def close(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(5)
+        self.flush()
+
+    def flush(self) -> int:
+        """Grava todas as entradas pendentes em um único write"""
+        with self._write_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+
+            data = ''.join(line for line, _ in pending).encode('utf-8')
+            with _file_lock(self.lock_path):
+                index = self._load_active_index()
+                with open(self.active_path, 'ab') as f:
+                    offset = f.tell()
+                    f.write(data)
+
+                # Linhas gravadas fora do store (ou por versões antigas) entram no índice primeiro
+                if offset > index['indexed_bytes']:
+                    records, _ = _scan_records(self.active_path, index['indexed_bytes'])
+                    _extend_blocks(index['blocks'], [r for r in records if r[0] < offset], self.block_records)
+
+                records = []
+                for line, meta in pending:
+                    length = len(line.encode('utf-8'))
+                    records.append((offset, length, *meta))
+                    offset += length
+                _extend_blocks(index['blocks'], records, self.block_records)
+                index['indexed_bytes'] = offset
+                index['head'] = self._head_digest(offset)
+
+                if offset >= self.segment_bytes:
+                    self._rotate(index)
+                else:
+                    _write_json_atomic(self.active_index_path, index)
+            return len(pending)
+
+    # ------------------------------------------------------------------
+    # Índice do segmento ativo
+    # ------------------------------------------------------------------
+
+    def _head_digest(self, length: int) -> str:
+        """Digest dos primeiros bytes já indexados (detecta arquivo substituído)"""
+        try:
+            with open(self.active_path, 'rb') as f:
+                return hashlib.sha1(f.read(min(length, HEAD_BYTES))).hexdigest()
+        except FileNotFoundError:
+            return ''
+
+    def _load_active_index(self) -> Dict[str, Any]:
+        """Índice do segmento ativo, reconstruído se o arquivo foi truncado/substituído"""
+        index = _read_json(self.active_index_path)
+        size = os.path.getsize(self.active_path) if os.path.exists(self.active_path) else 0
+        if (index is None or index.get('indexed_bytes', 0) > size or
+                index.get('head', '') != self._head_digest(index.get('indexed_bytes', 0))):
+            index = {'indexed_bytes': 0, 'head': self._head_digest(0), 'blocks': []}
+        return index
+
+    def reindex(self):
+        """Reconstrói o índice do segmento ativo a partir do arquivo"""
+        with self._write_lock, _file_lock(self.lock_path):
+            records, end = _scan_records(self.active_path)
+            index = {'indexed_bytes': end, 'head': self._head_digest(end), 'blocks': []}
+            _extend_blocks(index['blocks'], records, self.block_records)
+            _write_json_atomic(self.active_index_path, index)
+            return index
+
+    # ------------------------------------------------------------------
+    # Rotação
+    # ------------------------------------------------------------------
+
+    def _manifest(self) -> Dict[str, Any]:
+        return _read_json(self.manifest_path) or {'next_seq': 1, 'segments': []}
+
+    def rotate(self) -> Optional[str]:
+        """Sela o segmento ativo imediatamente (se tiver conteúdo)"""
+        self.flush()
+        with self._write_lock, _file_lock(self.lock_path):
+            index = self._load_active_index()
+            records, end = _scan_records(self.active_path, index['indexed_bytes'])
+            _extend_blocks(index['blocks'], records, self.block_records)
+            index['indexed_bytes'] = end
+            if not index['blocks']:
+                return None
+            return self._rotate(index)
+
+    def _rotate(self, index: Dict[str, Any]) -> str:
+        """Comprime o ativo em blocos gzip independentes e zera o ativo (chamado sob lock)"""
+        manifest = self._manifest()
+        seq = manifest['next_seq']
+        name = f"segment-{seq:06d}.log.gz"
+        path = os.path.join(self.ledger_dir, name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        sealed_blocks = []
+        with open(self.active_path, 'rb') as source, open(tmp_path, 'wb') as target:
+            for block in index['blocks']:
+                source.seek(block['offset'])
+                compressed = gzip.compress(source.read(block['length']), compresslevel=6)
+                sealed_blocks.append(dict(block, offset=target.tell(), length=len(compressed)))
+                target.write(compressed)
+        os.replace(tmp_path, path)
+
+        _write_json_atomic(f"{path}.idx.json", {'segment': name, 'blocks': sealed_blocks})
+        summary = _summarize(sealed_blocks)
+        summary.update({'name': name, 'bytes': os.path.getsize(path), 'raw_bytes': index['indexed_bytes']})
+        manifest['segments'].append(summary)
+        manifest['next_seq'] = seq + 1
+        _write_json_atomic(self.manifest_path, manifest)
+
+        open(self.active_path, 'w').close()
+        _write_json_atomic(self.active_index_path, {'indexed_bytes': 0, 'head': self._head_digest(0), 'blocks': []})
+        return name
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _meta_matches(meta: Dict[str, Any], phase, status, since, until) -> bool:
+        if since is not None and meta.get('ts_max') is not None and meta['ts_max'] < since:
+            return False
+        if until is not None and meta.get('ts_min') is not None and meta['ts_min'] > until:
+            return False
+        if phase is not None and meta.get('phases') is not None and phase not in meta['phases']:
+            return False
+        if status is not None and meta.get('statuses') is not None and status not in meta['statuses']:
+            return False
+        return True
+
+    @staticmethod
+    def _entry_matches(entry: Dict[str, Any], filters: Dict[str, Any], since, until) -> bool:
+        ts = entry.get('ts')
+        if since is not None and (ts is None or ts < since):
+            return False
+        if until is not None and (ts is None or ts > until):
+            return False
+        return all(value is None or str(entry.get(key)) == str(value) for key, value in filters.items())
+
+    def _iter_lines(self, data: bytes, filters, since, until) -> Iterator[Dict[str, Any]]:
+        for line in data.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and self._entry_matches(entry, filters, since, until):
+                yield entry
+
+    def iter_query(self, phase: Optional[str] = None, status: Optional[str] = None, since: Any = None,
+                   until: Any = None, mcp: Optional[str] = None, tool: Optional[str] = None
+                   ) -> Iterator[Dict[str, Any]]:
+        """Entradas que atendem aos filtros, em ordem de gravação"""
+        self.flush()
+        since, until = parse_time(since), parse_time(until)
+        filters = {'phase': phase, 'status': status, 'mcp': mcp, 'tool': tool}
+        stats = {'segments_total': 0, 'segments_scanned': 0, 'blocks_scanned': 0,
+                 'blocks_skipped': 0, 'bytes_read': 0}
+        self.last_query_stats = stats
+
+        for segment in self._manifest()['segments']:
+            stats['segments_total'] += 1
+            if not self._meta_matches(segment, phase, status, since, until):
+                continue
+            stats['segments_scanned'] += 1
+            path = os.path.join(self.ledger_dir, segment['name'])
+            index = _read_json(f"{path}.idx.json") or {'blocks': []}
+            with open(path, 'rb') as f:
+                for block in index['blocks']:
+                    if not self._meta_matches(block, phase, status, since, until):
+                        stats['blocks_skipped'] += 1
+                        continue
+                    stats['blocks_scanned'] += 1
+                    f.seek(block['offset'])
+                    raw = f.read(block['length'])
+                    stats['bytes_read'] += len(raw)
+                    yield from self._iter_lines(gzip.decompress(raw), filters, since, until)
+
+        # Segmento ativo: blocos indexados + cauda ainda não indexada
+        index = self._load_active_index()
+        if not os.path.exists(self.active_path):
+            return
+        with open(self.active_path, 'rb') as f:
+            for block in index['blocks']:
+                if not self._meta_matches(block, phase, status, since, until):
+                    stats['blocks_skipped'] += 1
+                    continue
+                stats['blocks_scanned'] += 1
+                f.seek(block['offset'])
+                raw = f.read(block['length'])
+                stats['bytes_read'] += len(raw)
+                yield from self._iter_lines(raw, filters, since, until)
+            f.seek(index['indexed_bytes'])
+            tail = f.read()
+            stats['bytes_read'] += len(tail)
+            yield from self._iter_lines(tail, filters, since, until)
+
+    def query(self, limit: Optional[int] = None, **filters) -> List[Dict[str, Any]]:
+        results = []
+        for entry in self.iter_query(**filters):
+            results.append(entry)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def scan_all(self) -> Iterator[Dict[str, Any]]:
+        """Leitura completa sem índice (referência para benchmark)"""
+        self.flush()
+        for segment in self._manifest()['segments']:
+            with gzip.open(os.path.join(self.ledger_dir, segment['name']), 'rb') as f:
+                for line in f:
+                    yield json.loads(line)
+        if os.path.exists(self.active_path):
+            with open(self.active_path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def stats(self) -> Dict[str, Any]:
+        manifest = self._manifest()
+        index = self._load_active_index()
+        return {
+            'segments': len(manifest['segments']),
+            'sealed_entries': sum(s['count'] for s in manifest['segments']),
+            'sealed_bytes': sum(s['bytes'] for s in manifest['segments']),
+            'sealed_raw_bytes': sum(s.get('raw_bytes', 0) for s in manifest['segments']),
+            'active_entries': sum(b['count'] for b in index['blocks']),
+            'active_bytes': os.path.getsize(self.active_path) if os.path.exists(self.active_path) else 0
+        }
+
+
+_stores: Dict[str, LedgerStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_ledger_store(directory: str = 'reports') -> LedgerStore:
+    """Store compartilhado por diretório (um writer por processo)"""
+    key = os.path.abspath(directory)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = LedgerStore(directory)
+            atexit.register(store.close)
+        return store
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+def _benchmark(args) -> int:
+    import random
+    import shutil
+    import tempfile
+
+    directory = args.dir or tempfile.mkdtemp(prefix='ial-ledger-bench-')
+    shutil.rmtree(directory, ignore_errors=True)
+    store = LedgerStore(directory, segment_bytes=args.segment_mb * 1024 * 1024, max_pending=10000)
+    phases = [f"{i:02d}-phase" for i in range(0, 100, 10)]
+    statuses = ['ROUTED', 'SUCCESS', 'ERROR', 'BLOCKED']
+    start_ts = int(time.time() * 1000) - args.entries * 1000
+
+    started = time.perf_counter()
+    rng = random.Random(42)
+    for i in range(args.entries):
+        store.append({'id': f"bench-{i}", 'ts': start_ts + i * 1000, 'phase': rng.choice(phases),
+                      'mcp': 'bench', 'tool': 'write', 'rationale': 'x' * args.payload,
+                      'status': rng.choice(statuses)})
+    store.close()
+    write_s = time.perf_counter() - started
+    stats = store.stats()
+
+    since = start_ts + int(args.entries * 1000 * 0.9)
+    started = time.perf_counter()
+    indexed = store.query(phase=phases[3], since=since)
+    indexed_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scanned = [e for e in store.scan_all() if e['phase'] == phases[3] and e['ts'] >= since]
+    scan_s = time.perf_counter() - started
+
+    raw_gb = (stats['sealed_raw_bytes'] + stats['active_bytes']) / 1e9
+    print(f"📦 {args.entries} entradas ({raw_gb:.2f} GB brutos, {stats['segments']} segmentos) em {write_s:.1f}s")
+    print(f"🔎 query indexada: {len(indexed)} resultados em {indexed_s * 1000:.1f}ms {store.last_query_stats}")
+    print(f"🐢 scan completo: {len(scanned)} resultados em {scan_s * 1000:.1f}ms")
+    if not args.keep:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0 if len(indexed) == len(scanned) else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='ledger', description='IAL Decision Ledger')
+    parser.add_argument('--dir', default='reports', help='Diretório do ledger (padrão: reports)')
+    subparsers = parser.add_subparsers(dest='command')
+
+    query_parser = subparsers.add_parser('query', help='Consultar decisões')
+    query_parser.add_argument('--phase')
+    query_parser.add_argument('--status')
+    query_parser.add_argument('--mcp')
+    query_parser.add_argument('--tool')
+    query_parser.add_argument('--since', help='epoch, ISO-8601 ou relativo (30m, 24h, 7d)')
+    query_parser.add_argument('--until')
+    query_parser.add_argument('--limit', type=int)
+    query_parser.add_argument('--json', action='store_true', help='Saída em JSON lines')
+
+    subparsers.add_parser('stats', help='Estatísticas de segmentos')
+    subparsers.add_parser('rotate', help='Selar o segmento ativo')
+    subparsers.add_parser('reindex', help='Reconstruir índice do segmento ativo')
+
+    bench_parser = subparsers.add_parser('bench', help='Benchmark de query indexada vs scan')
+    bench_parser.add_argument('--entries', type=int, default=200000)
+    bench_parser.add_argument('--payload', type=int, default=200, help='Bytes de rationale por entrada')
+    bench_parser.add_argument('--segment-mb', type=int, default=64)
+    bench_parser.add_argument('--dir', dest='bench_dir')
+    bench_parser.add_argument('--keep', action='store_true')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        args.dir = args.bench_dir
+        return _benchmark(args)
+
+    store = LedgerStore(args.dir)
+    if args.command == 'query':
+        entries = store.query(phase=args.phase, status=args.status, mcp=args.mcp, tool=args.tool,
+                              since=args.since, until=args.until, limit=args.limit)
+        for entry in entries:
+            if args.json:
+                print(json.dumps(entry, ensure_ascii=False))
+            else:
+                # Campos presentes com valor None imprimem o padrão
+                ts = datetime.fromtimestamp((entry.get('ts') or 0) / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                status = entry.get('status') or entry.get('type') or '-'
+                print(f"{ts}  {entry.get('phase') or '-':<20} {status:<12} "
+                      f"{entry.get('mcp') or '-'}/{entry.get('tool') or '-'}  {(entry.get('rationale') or '')[:80]}")
+        print(f"📊 {len(entries)} entradas | {store.last_query_stats}", file=sys.stderr)
+    elif args.command == 'stats':
+        print(json.dumps(store.stats(), indent=2))
+    elif args.command == 'rotate':
+        name = store.rotate()
+        print(f"✅ Segmento selado: {name}" if name else "ℹ️ Segmento ativo vazio")
+    elif args.command == 'reindex':
+        index = store.reindex()
+        print(f"✅ Índice reconstruído: {sum(b['count'] for b in index['blocks'])} entradas")
+    else:
+        parser.print_help()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,10 +10,13 @@ import time
 import aiohttp
 from pathlib import Path
 from typing import Dict, List, Optional, Any
-from core.circuit_breaker import CircuitBreaker
+from core.resilience.registry import ConcurrencyLimitExceeded, get_circuit_breaker, get_concurrency_limiter
+from core.tracing import current_span, traced
 
 from core.path_utils import get_config_path
 
+LLM_QUEUE_TIMEOUT = 30.0  # espera máxima por vaga de concorrência
+
 class LLMProvider:
     def __init__(self, config_path: str = None):
         # CORREÇÃO: Usar caminho dinâmico
@@ -57,10 +60,11 @@ class LLMProvider:
     def _init_circuit_breakers(self):
         """Initialize circuit breakers for each provider"""
         for provider in self.config.get('providers', {}):
-            self.circuit_breakers[provider] = CircuitBreaker(
+            # Breaker compartilhado no processo (router, engines e providers veem o mesmo estado)
+            self.circuit_breakers[provider] = get_circuit_breaker(
+                f"llm-{provider}",
                 failure_threshold=5,
-                timeout=60,
-                name=f"llm-{provider}"
+                timeout=60
             )
             
     async def generate_response(self, prompt: str) -> str:
@@ -78,39 +82,68 @@ class LLMProvider:
             print(f"⚠️ LLM generate_response error: {e}")
             raise e
     
+    @traced('llm.process_natural_language', category='llm')
     async def process_natural_language_async(self, text: str) -> Dict:
         """Async processing with circuit breaker protection"""
         # Try current provider first
         if self.current_provider in self.circuit_breakers:
             circuit = self.circuit_breakers[self.current_provider]
             if circuit.can_execute():
+                recorded = False
                 try:
-                    result = await self._call_provider_async(self.current_provider, text)
+                    result = await self._call_limited_async(self.current_provider, text)
                     circuit.record_success()
+                    recorded = True
                     return result
+                except ConcurrencyLimitExceeded as e:
+                    print(f"⚠️ LLM {self.current_provider} sem vaga de concorrência: {e}")
                 except Exception as e:
                     circuit.record_failure()
+                    recorded = True
                     print(f"⚠️ LLM {self.current_provider} falhou: {e}")
+                finally:
+                    # Rejeitada localmente ou cancelada: a vaga de prova (HALF_OPEN) volta ao breaker
+                    if not recorded:
+                        circuit.release_probe()
         
         # Try fallback providers
         for provider in self.fallback_order:
             if provider in self.circuit_breakers:
                 circuit = self.circuit_breakers[provider]
                 if circuit.can_execute():
+                    recorded = False
                     try:
-                        result = await self._call_provider_async(provider, text)
+                        result = await self._call_limited_async(provider, text)
                         circuit.record_success()
+                        recorded = True
                         return result
+                    except ConcurrencyLimitExceeded as e:
+                        print(f"⚠️ LLM fallback {provider} sem vaga de concorrência: {e}")
+                        continue
                     except Exception as e:
                         circuit.record_failure()
+                        recorded = True
                         print(f"⚠️ LLM fallback {provider} falhou: {e}")
                         continue
+                    finally:
+                        if not recorded:
+                            circuit.release_probe()
                         
         # Final fallback to pattern matching
         return self._pattern_fallback(text)
         
+    async def _call_limited_async(self, provider: str, text: str) -> Dict:
+        """Chamada limitada pelo limite de concorrência adaptativo do provider"""
+        if provider == 'pattern':
+            return await self._call_provider_async(provider, text)
+        limiter = get_concurrency_limiter(f"llm-{provider}")
+        async with limiter.async_slot(timeout=LLM_QUEUE_TIMEOUT):
+            return await self._call_provider_async(provider, text)
+
+    @traced('llm.call', category='llm')
     async def _call_provider_async(self, provider: str, text: str) -> Dict:
         """Async call to specific LLM provider"""
+        current_span().set_attribute('provider', provider)
         if provider == "bedrock":
             return await self._call_bedrock_async(text)
         elif provider == "deepseek":
@@ -9,6 +9,8 @@ import subprocess
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 
+from core.tracing import traced
+
 class MCPClient:
     """Cliente para conectar e usar servidores MCP"""
     
@@ -187,6 +189,7 @@ class MCPClient:
         except:
             pass
     
+    @traced('mcp.call_tool', category='mcp')
     async def call_tool(self, server_name: str, tool_name: str, arguments: Dict) -> Dict:
         """Chamar tool em servidor MCP"""
         try:
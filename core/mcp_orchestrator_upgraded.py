@@ -8,8 +8,9 @@ import time
 from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 from core.mcp_mesh_loader import MCPMeshLoader
-from core.circuit_breaker import CircuitBreaker
+from core.resilience.registry import ConcurrencyLimitExceeded, get_circuit_breaker, get_concurrency_limiter
 from core.mcp_connection_pool import MCPConnectionPool
+from core.tracing import traced
 
 class MCPOrchestratorUpgraded:
     def __init__(self, mesh_loader: MCPMeshLoader):
@@ -119,6 +120,7 @@ class MCPOrchestratorUpgraded:
                 'error': str(e)
             }
 
+    @traced('mcp.lazy_load', category='mcp')
     async def lazy_load_mcps_async(self, required_mcps: List[Dict]) -> Dict[str, Any]:
         """Async lazy loading with circuit breaker protection"""
         tasks = []
@@ -128,16 +130,16 @@ class MCPOrchestratorUpgraded:
             
             # Initialize circuit breaker if needed
             if mcp_name not in self.circuit_breakers:
-                self.circuit_breakers[mcp_name] = CircuitBreaker(
+                self.circuit_breakers[mcp_name] = get_circuit_breaker(
+                    f"mcp-{mcp_name}",
                     failure_threshold=3,
-                    timeout=30,
-                    name=f"mcp-{mcp_name}"
+                    timeout=30
                 )
                 
             circuit = self.circuit_breakers[mcp_name]
             
             if circuit.can_execute():
-                task = self._load_mcp_async(mcp_config)
+                task = self._load_mcp_limited_async(mcp_config)
                 tasks.append((mcp_name, task))
                 
         # Execute all loading tasks concurrently
@@ -145,14 +147,24 @@ class MCPOrchestratorUpgraded:
             return {}
             
         task_names, task_coroutines = zip(*tasks)
-        results = await asyncio.gather(*task_coroutines, return_exceptions=True)
+        try:
+            results = await asyncio.gather(*task_coroutines, return_exceptions=True)
+        except asyncio.CancelledError:
+            # Cancelado antes de qualquer resultado: as vagas de prova (HALF_OPEN) voltam aos breakers
+            for mcp_name in task_names:
+                self.circuit_breakers[mcp_name].release_probe()
+            raise
         
         loaded = {}
         for i, result in enumerate(results):
             mcp_name = task_names[i]
             circuit = self.circuit_breakers[mcp_name]
             
-            if isinstance(result, Exception):
+            if isinstance(result, (ConcurrencyLimitExceeded, asyncio.CancelledError)):
+                # Rejeição local ou cancelamento não é falha do servidor MCP
+                circuit.release_probe()
+                print(f"⚠️ MCP {mcp_name} não carregado (sem vaga de concorrência ou cancelado): {result!r}")
+            elif isinstance(result, BaseException):
                 circuit.record_failure()
                 print(f"❌ Failed to load MCP {mcp_name}: {result}")
             else:
@@ -162,6 +174,12 @@ class MCPOrchestratorUpgraded:
                 
         return loaded
         
+    async def _load_mcp_limited_async(self, mcp_config: Dict) -> Any:
+        """Carregamento limitado pela concorrência adaptativa do servidor MCP"""
+        limiter = get_concurrency_limiter(f"mcp-{mcp_config['name']}")
+        async with limiter.async_slot(timeout=mcp_config.get('load_timeout', 5.0)):
+            return await self._load_mcp_async(mcp_config)
+        
     async def _load_mcp_async(self, mcp_config: Dict) -> Any:
         """Async MCP loading with timeout and caching"""
         mcp_name = mcp_config['name']
@@ -13,6 +13,8 @@ import time
 from typing import List, Dict, Optional
 from boto3.dynamodb.conditions import Key
 
+from core.tracing import traced
+
 class OptimizedBedrockEmbeddings:
     def __init__(self, project_name: str = "ial-fork"):
         self.project_name = project_name
@@ -109,6 +111,7 @@ class OptimizedBedrockEmbeddings:
             print(f"Error storing embedding: {e}")
             return False
     
+    @traced('rag.semantic_search', category='rag')
     def find_similar_conversations_optimized(self, query_text: str, user_id: str, 
                                            limit: int = 3) -> List[Dict]:
         """Optimized similarity search using simplified approach"""
@@ -8,6 +8,8 @@ from .memory_manager_optimized import OptimizedMemoryManager
 from .bedrock_embeddings_optimized import OptimizedBedrockEmbeddings
 import time
 
+from core.tracing import traced
+
 class OptimizedContextEngine:
     def __init__(self, project_name: str = "ial-fork"):
         self.memory = OptimizedMemoryManager(project_name)
@@ -20,6 +22,7 @@ class OptimizedContextEngine:
             'cache_hit_rate': 0.0
         }
     
+    @traced('rag.build_context', category='rag')
     def build_context_for_query_optimized(self, user_query: str, user_id: str, 
                                          session_id: str = None) -> str:
         """Constrói contexto otimizado para query do usuário"""
@@ -85,6 +88,24 @@ class OptimizedContextEngine:
         
         return result
     
+    def get_context_items_optimized(self, user_query: str, user_id: str, session_id: str = None,
+                                    history_limit: int = 50) -> Dict:
+        """Histórico (cronológico) e tópicos relacionados como itens para o ContextAssembler"""
+        
+        self.memory.user_id = user_id
+        self.memory.session_id = session_id
+        
+        messages = self.memory.get_recent_context_optimized(limit=history_limit)
+        messages = sorted(messages, key=lambda msg: str(msg.get('timestamp', '')))
+        history = [{'role': msg.get('role'), 'content': msg.get('content_summary', '')}
+                   for msg in messages if msg.get('content_summary')]
+        
+        related = self.embeddings.find_similar_conversations_optimized(user_query, user_id, limit=3)
+        memory = [{'content': item.get('text_preview', ''), 'score': float(item.get('similarity', 0.5))}
+                  for item in related]
+        
+        return {'history': history, 'memory': memory, 'conversation_id': f"{user_id}:all"}
+    
     def save_interaction_optimized(self, user_input: str, assistant_response: str, 
                                   user_id: str, session_id: str, metadata: Dict = None):
         """Salva interação com embeddings otimizados"""
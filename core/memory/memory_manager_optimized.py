@@ -14,6 +14,8 @@ from boto3.dynamodb.conditions import Key
 from decimal import Decimal
 import redis
 
+from core.tracing import traced
+
 class OptimizedMemoryManager:
     def __init__(self, project_name: str = "ial-fork"):
         self.project_name = project_name
@@ -72,6 +74,7 @@ class OptimizedMemoryManager:
             # Fallback to in-memory cache
             return {}
     
+    @traced('dynamodb.recent_context', category='dynamodb')
     def get_recent_context_optimized(self, limit: int = 10) -> List[Dict]:
         """Optimized context retrieval with caching and projection"""
         
@@ -145,6 +148,7 @@ class OptimizedMemoryManager:
             print(f"Error in optimized context retrieval: {e}")
             return []
     
+    @traced('dynamodb.session_context', category='dynamodb')
     def get_session_context_optimized(self, session_id: str, limit: int = 20) -> List[Dict]:
         """Get context for specific session using GSI"""
         
@@ -169,6 +173,7 @@ class OptimizedMemoryManager:
             print(f"Error in session context retrieval: {e}")
             return []
     
+    @traced('dynamodb.save_conversation', category='dynamodb')
     def save_conversation_optimized(self, user_input: str, assistant_response: str, 
                                   session_id: str, metadata: Dict = None) -> bool:
         """Save conversation with optimized structure"""
@@ -239,6 +244,7 @@ class OptimizedMemoryManager:
             print(f"Error saving conversation: {e}")
             return False
     
+    @traced('dynamodb.user_stats', category='dynamodb')
     def get_user_stats(self) -> Dict:
         """Get user statistics using GSI"""
         
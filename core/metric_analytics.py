@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Metric Analytics - Métricas CloudWatch em lote como matrizes NumPy
+Busca uma métrica para muitas instâncias com GetMetricData (até 500 queries
+por chamada, com paginação), alinha tudo numa matriz instâncias × timestamps
+(NaN onde não há ponto) e calcula estatísticas, tendência, sazonalidade e
+pontos anômalos para todas as linhas de uma vez, sem laços por instância.
+
+A detecção de sazonalidade segue o MetricDataDecomposer do cloudwatch-mcp-server
+(winsorização, padrão sazonal pela média dos ciclos, força = 1 - Var(resto) /
+Var(sem tendência)), reescrita para operar sobre a matriz inteira.
+"""
+
+import warnings
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+GET_METRIC_DATA_MAX_QUERIES = 500
+NUMERICAL_STABILITY_THRESHOLD = 1e-10
+SEASONALITY_STRENGTH_THRESHOLD = 0.6
+SEASONAL_PERIODS_SECONDS = (15 * 60, 3600, 6 * 3600, 86400, 7 * 86400)
+
+# chave interna -> (namespace, métrica, estatística, dividir pelo período p/ taxa por segundo)
+EC2_METRICS = {
+    'cpu_utilization': ('AWS/EC2', 'CPUUtilization', 'Average', False),
+    'memory_utilization': ('CWAgent', 'mem_used_percent', 'Average', False),
+    'disk_read_ops': ('AWS/EC2', 'DiskReadOps', 'Sum', True),
+    'disk_write_ops': ('AWS/EC2', 'DiskWriteOps', 'Sum', True),
+    'network_in': ('AWS/EC2', 'NetworkIn', 'Sum', True),
+    'network_out': ('AWS/EC2', 'NetworkOut', 'Sum', True),
+}
+
+
+def _epoch(timestamp) -> int:
+    return int(timestamp.timestamp()) if isinstance(timestamp, datetime) else int(timestamp)
+
+
+def fetch_metric_matrices(cloudwatch, instance_ids: Sequence[str], start_time: datetime, end_time: datetime,
+                          period: int = 300, metrics: Optional[Dict[str, Tuple]] = None
+                          ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """GetMetricData em lotes de 500 queries; devolve (timestamps, {métrica: matriz})
+
+    Cada matriz tem uma linha por instância (na ordem de `instance_ids`) e uma
+    coluna por timestamp da grade comum; pontos ausentes ficam NaN.
+    """
+    metrics = metrics or EC2_METRICS
+    queries, targets = [], {}
+    for m, (key, (namespace, name, stat, _)) in enumerate(metrics.items()):
+        for i, instance_id in enumerate(instance_ids):
+            query_id = f"m{m}i{i}"
+            targets[query_id] = (key, i)
+            queries.append({
+                'Id': query_id,
+                'MetricStat': {
+                    'Metric': {'Namespace': namespace, 'MetricName': name,
+                               'Dimensions': [{'Name': 'InstanceId', 'Value': instance_id}]},
+                    'Period': period,
+                    'Stat': stat
+                },
+                'ReturnData': True
+            })
+
+    series: Dict[str, Dict[int, float]] = {}
+    for offset in range(0, len(queries), GET_METRIC_DATA_MAX_QUERIES):
+        batch = queries[offset:offset + GET_METRIC_DATA_MAX_QUERIES]
+        kwargs = {'MetricDataQueries': batch, 'StartTime': start_time, 'EndTime': end_time,
+                  'ScanBy': 'TimestampAscending'}
+        while True:
+            response = cloudwatch.get_metric_data(**kwargs)
+            for result in response.get('MetricDataResults', []):
+                points = series.setdefault(result['Id'], {})
+                for timestamp, value in zip(result.get('Timestamps', []), result.get('Values', [])):
+                    points[_epoch(timestamp)] = value
+            if not response.get('NextToken'):
+                break
+            kwargs['NextToken'] = response['NextToken']
+
+    timestamps = np.array(sorted({ts for points in series.values() for ts in points}), dtype=np.int64)
+    column = {int(ts): c for c, ts in enumerate(timestamps)}
+    matrices = {key: np.full((len(instance_ids), len(timestamps)), np.nan) for key in metrics}
+    for query_id, points in series.items():
+        key, row = targets[query_id]
+        if points:
+            cols = [column[ts] for ts in points]
+            matrices[key][row, cols] = list(points.values())
+
+    for key, (_, _, _, per_second) in metrics.items():
+        if per_second:
+            matrices[key] /= period
+    return timestamps, matrices
+
+
+def matrix_from_series(rows: Sequence[Sequence[float]]) -> np.ndarray:
+    """Listas de tamanhos diferentes -> matriz alinhada à direita (pontos mais recentes), NaN à esquerda"""
+    width = max((len(r) for r in rows), default=0)
+    matrix = np.full((len(rows), width), np.nan)
+    for i, row in enumerate(rows):
+        if len(row):
+            matrix[i, width - len(row):] = row
+    return matrix
+
+
+def _nan_reduce(func, matrix: np.ndarray) -> np.ndarray:
+    # Linhas só com NaN (métrica sem dados) viram NaN sem RuntimeWarning
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if matrix.shape[1] == 0:
+            return np.full(matrix.shape[0], np.nan)
+        return func(matrix, axis=1)
+
+
+def row_stats(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """Média, máximo, mínimo, desvio e número de pontos válidos por linha"""
+    return {
+        'mean': _nan_reduce(np.nanmean, matrix),
+        'max': _nan_reduce(np.nanmax, matrix),
+        'min': _nan_reduce(np.nanmin, matrix),
+        'std': _nan_reduce(np.nanstd, matrix),
+        'count': np.sum(~np.isnan(matrix), axis=1)
+    }
+
+
+def half_trend(matrix: np.ndarray, threshold_percent: float = 10.0) -> np.ndarray:
+    """Tendência por linha: média da 2ª metade vs 1ª metade (increasing/decreasing/stable)"""
+    rows, width = matrix.shape
+    if width < 2:
+        return np.full(rows, 'stable', dtype=object)
+    split = width // 2
+    first = _nan_reduce(np.nanmean, matrix[:, :split])
+    second = _nan_reduce(np.nanmean, matrix[:, split:])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        diff_percent = (second - first) / first * 100
+    valid = np.isfinite(diff_percent)
+    return np.select([valid & (diff_percent > threshold_percent), valid & (diff_percent < -threshold_percent)],
+                     ['increasing', 'decreasing'], default='stable').astype(object)
+
+
+def zscore_anomalies(matrix: np.ndarray, threshold: float = 3.0) -> np.ndarray:
+    """Número de pontos com |z| > threshold por linha"""
+    stats = row_stats(matrix)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (matrix - stats['mean'][:, None]) / stats['std'][:, None]
+    return np.sum(np.abs(np.nan_to_num(z, nan=0.0, posinf=0.0, neginf=0.0)) > threshold, axis=1)
+
+
+def _fill_gaps(matrix: np.ndarray) -> np.ndarray:
+    """Interpolação linear dos NaN internos de cada linha (bordas repetem o valor válido)"""
+    filled = matrix.copy()
+    index = np.arange(matrix.shape[1])
+    for row in np.nonzero(np.isnan(matrix).any(axis=1))[0]:
+        valid = ~np.isnan(matrix[row])
+        if valid.any():
+            filled[row] = np.interp(index, index[valid], matrix[row, valid])
+    return filled
+
+
+def _centered_rolling_mean(matrix: np.ndarray, window: int) -> np.ndarray:
+    """Média móvel centrada com min_periods=1 (mesma semântica do pandas rolling)"""
+    width = matrix.shape[1]
+    cumsum = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(matrix, axis=1)], axis=1)
+    positions = np.arange(width)
+    lo = np.clip(positions - window // 2, 0, width)
+    hi = np.clip(positions - window // 2 + window, 0, width)
+    return (cumsum[:, hi] - cumsum[:, lo]) / (hi - lo)
+
+
+def seasonal_strength(matrix: np.ndarray, seasonal_period: int) -> np.ndarray:
+    """Força sazonal (0..1) de cada linha para um período em número de pontos"""
+    rows, width = matrix.shape
+    if seasonal_period <= 0 or width < seasonal_period * 2:
+        return np.zeros(rows)
+
+    cycles = width // seasonal_period
+    values = matrix[:, :cycles * seasonal_period]
+    pattern = values.reshape(rows, cycles, seasonal_period).mean(axis=1)
+    detrended = values - _centered_rolling_mean(values, seasonal_period)
+    remainder = detrended - np.tile(pattern, cycles)
+
+    var_detrended = detrended.var(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        strength = 1 - remainder.var(axis=1) / var_detrended
+    strength = np.where(var_detrended > NUMERICAL_STABILITY_THRESHOLD, strength, 0.0)
+    return np.clip(np.nan_to_num(strength, nan=0.0), 0.0, None)
+
+
+def detect_seasonality(matrix: np.ndarray, period_seconds: int) -> np.ndarray:
+    """Período sazonal mais forte por linha (em segundos; 0 = sem sazonalidade)"""
+    rows = matrix.shape[0]
+    if rows == 0 or matrix.shape[1] < 2:
+        return np.zeros(rows, dtype=np.int64)
+
+    values = _fill_gaps(matrix)
+    values = np.nan_to_num(values, nan=0.0)
+    lo, hi = np.quantile(values, [0.001, 0.999], axis=1)
+    values = np.clip(values, lo[:, None], hi[:, None])
+
+    best_strength = np.zeros(rows)
+    best_period = np.zeros(rows, dtype=np.int64)
+    for seasonal_seconds in SEASONAL_PERIODS_SECONDS:
+        points = int(seasonal_seconds / period_seconds)
+        strength = seasonal_strength(values, points)
+        better = strength > best_strength
+        best_strength = np.where(better, strength, best_strength)
+        best_period = np.where(better, seasonal_seconds, best_period)
+    return np.where(best_strength > SEASONALITY_STRENGTH_THRESHOLD, best_period, 0)
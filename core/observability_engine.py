@@ -11,6 +11,11 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import time
 
+try:
+    from core.telemetry_sink import get_telemetry_sink
+except ImportError:
+    from telemetry_sink import get_telemetry_sink
+
 class ObservabilityEngine:
     def __init__(self, region: str = "us-east-1"):
         self.region = region
@@ -19,6 +24,9 @@ class ObservabilityEngine:
         self.cloudwatch = boto3.client('cloudwatch', region_name=region)
         self.logs = boto3.client('logs', region_name=region)
         
+        # Sink assíncrono: métricas e eventos são publicados em lote em background
+        self.telemetry = get_telemetry_sink(region)
+        
         # Namespace para métricas customizadas
         self.namespace = 'IAL/StateManagement'
         
@@ -50,23 +58,7 @@ class ObservabilityEngine:
                       dimensions: Optional[Dict[str, str]] = None) -> bool:
         """Publica métrica customizada no CloudWatch"""
         try:
-            metric_data = {
-                'MetricName': metric_name,
-                'Value': value,
-                'Unit': unit,
-                'Timestamp': datetime.utcnow()
-            }
-            
-            if dimensions:
-                metric_data['Dimensions'] = [
-                    {'Name': k, 'Value': v} for k, v in dimensions.items()
-                ]
-            
-            self.cloudwatch.put_metric_data(
-                Namespace=self.namespace,
-                MetricData=[metric_data]
-            )
-            
+            self.telemetry.put_metric(self.namespace, metric_name, value, unit, dimensions)
             return True
             
         except Exception as e:
@@ -84,25 +76,14 @@ class ObservabilityEngine:
                 'source': 'ial_state_management'
             }
             
-            # Criar log stream se necessário
             log_stream = f"state-events-{datetime.utcnow().strftime('%Y-%m-%d')}"
             
-            try:
-                self.logs.create_log_stream(
-                    logGroupName=self.log_group,
-                    logStreamName=log_stream
-                )
-            except self.logs.exceptions.ResourceAlreadyExistsException:
-                pass  # Log stream já existe
-            
-            # Enviar log
-            self.logs.put_log_events(
-                logGroupName=self.log_group,
-                logStreamName=log_stream,
-                logEvents=[{
-                    'timestamp': int(time.time() * 1000),
-                    'message': json.dumps(log_entry, ensure_ascii=False)
-                }]
+            # Enfileirar log (stream criado uma única vez pelo sink)
+            self.telemetry.put_log_event(
+                self.log_group,
+                log_stream,
+                json.dumps(log_entry, ensure_ascii=False),
+                int(time.time() * 1000)
             )
             
             return True
@@ -399,6 +380,8 @@ class ObservabilityEngine:
     def get_metrics_summary(self, hours: int = 24) -> Dict:
         """Recupera resumo de métricas das últimas horas"""
         try:
+            # Publicar o que ainda está no buffer antes de consultar
+            self.telemetry.flush()
             end_time = datetime.utcnow()
             start_time = end_time - timedelta(hours=hours)
             
@@ -453,6 +436,7 @@ class ObservabilityEngine:
     def get_recent_audit_logs(self, hours: int = 24, limit: int = 100) -> List[Dict]:
         """Recupera logs de auditoria recentes"""
         try:
+            self.telemetry.flush()
             end_time = int(time.time() * 1000)
             start_time = int((time.time() - (hours * 3600)) * 1000)
             
@@ -7,10 +7,15 @@ import json
 import time
 from typing import Dict, List, Optional
 
+try:
+    from core.concurrent_cache import ShardedLRUCache
+except ImportError:
+    from concurrent_cache import ShardedLRUCache
+
 class PhaseDiscoveryTool:
     def __init__(self):
-        self.cache = {}
         self.cache_ttl = 300  # 5 minutes
+        self.cache = ShardedLRUCache(max_size=64, ttl=self.cache_ttl, shards=4)
         self.repo_owner = "Diego-Nardoni"
         self.repo_name = "ial-infrastructure"
         
@@ -19,8 +24,9 @@ class PhaseDiscoveryTool:
         
         # Check cache first
         cache_key = "available_phases"
-        if self._is_cached(cache_key):
-            return self.cache[cache_key]['data']
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         try:
             # Use MCP GitHub Server
@@ -170,18 +176,11 @@ class PhaseDiscoveryTool:
     
     def _is_cached(self, key: str) -> bool:
         """Check if result is cached and valid"""
-        if key not in self.cache:
-            return False
-        
-        cached_time = self.cache[key]['timestamp']
-        return (time.time() - cached_time) < self.cache_ttl
+        return key in self.cache
     
     def _cache_result(self, key: str, data: Dict):
-        """Cache result with timestamp"""
-        self.cache[key] = {
-            'data': data,
-            'timestamp': time.time()
-        }
+        """Cache result with TTL"""
+        self.cache.set(key, data)
     
     def format_phases_response(self, phases_data: Dict) -> str:
         """Format phases data for user display"""
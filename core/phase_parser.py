@@ -4,13 +4,28 @@ Phase Parser - Deploy automatizado de templates CloudFormation
 
 import os
 import sys
+import json
 import boto3
 import time
 import yaml
-import tempfile
+import hashlib
+import threading
 import re
 from typing import Dict, List, Any, Optional
 
+try:
+    from core.tracing import traced
+except ImportError:
+    from tracing import traced
+
+try:
+    from core.ial_transpiler import get_transpiler, is_ial_metadata_doc
+except ImportError:
+    from ial_transpiler import get_transpiler, is_ial_metadata_doc
+
+# Tag com o fingerprint do template+parâmetros deployado
+TEMPLATE_FINGERPRINT_TAG = "ial:template-fingerprint"
+
 def get_resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
     try:
@@ -20,6 +35,12 @@ def get_resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+def template_fingerprint(template_body: str, parameters: Optional[List[Dict]] = None) -> str:
+    """Fingerprint determinístico de template + parâmetros"""
+    params = sorted((p['ParameterKey'], str(p.get('ParameterValue'))) for p in (parameters or []))
+    payload = template_body + "\n" + json.dumps(params)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
 class PhaseParser:
     def __init__(self, phases_dir: str = None):
         if phases_dir is None:
@@ -27,19 +48,84 @@ class PhaseParser:
         self.phases_dir = phases_dir
         self.session = boto3.Session()
         self.cf_client = self.session.client('cloudformation')
+        # Cache de describe_stacks em lote (None = não carregado)
+        self._stack_cache = None
+        self._stale_stacks = set()
+        self._stack_cache_lock = threading.Lock()
+        self.transpiler = get_transpiler()
+
+    @traced('cloudformation.prefetch_stacks', category='cloudformation')
+    def prefetch_stacks(self, force: bool = False) -> int:
+        """Carrega todos os stacks em poucas chamadas paginadas (describe_stacks em lote)
+        
+        Feito uma vez por execução: chamadas seguintes (uma por fase) reutilizam o
+        cache; stacks alterados desde então são marcados stale e relidos.
+        """
+        with self._stack_cache_lock:
+            if self._stack_cache is not None and not force:
+                return len(self._stack_cache)
+        stacks = {}
+        paginator = self.cf_client.get_paginator('describe_stacks')
+        for page in paginator.paginate():
+            for stack in page.get('Stacks', []):
+                stacks[stack['StackName']] = stack
+        with self._stack_cache_lock:
+            self._stack_cache = stacks
+        return len(stacks)
+
+    def _get_stack(self, stack_name):
+        """Retorna o stack do cache pré-carregado (None se não existe) ou via describe_stacks"""
+        with self._stack_cache_lock:
+            if self._stack_cache is not None and stack_name not in self._stale_stacks:
+                return self._stack_cache.get(stack_name)
+        try:
+            return self.cf_client.describe_stacks(StackName=stack_name)["Stacks"][0]
+        except self.cf_client.exceptions.ClientError as e:
+            if "does not exist" in str(e):
+                return None
+            raise
+
+    def _mark_stack_stale(self, stack_name):
+        with self._stack_cache_lock:
+            self._stale_stacks.add(stack_name)
+
+    @staticmethod
+    def _stack_tags(project_name, fingerprint):
+        return [
+            {"Key": "Project", "Value": project_name},
+            {"Key": "Component", "Value": "IAL-Foundation"},
+            {"Key": "DeployedBy", "Value": "IAL-MCP-System"},
+            {"Key": "Idempotent", "Value": "true"},
+            {"Key": TEMPLATE_FINGERPRINT_TAG, "Value": fingerprint}
+        ]
 
     def _create_or_update_stack_idempotent(self, stack_name, template_body, parameters, project_name):
-        """Create stack if not exists, skip if exists and complete"""
+        """Create stack if not exists, skip if unchanged, update via change set otherwise"""
+        fingerprint = template_fingerprint(template_body, parameters)
         stack_id = None
         try:
-            response = self.cf_client.describe_stacks(StackName=stack_name)
-            stack_status = response["Stacks"][0]["StackStatus"]
-            stack_id = response["Stacks"][0]["StackId"]
-            
-            if stack_status in ["CREATE_COMPLETE", "UPDATE_COMPLETE"]:
-                return {"success": True, "action": "skipped", "stack_name": stack_name}
+            stack = self._get_stack(stack_name)
+        except Exception as e:
+            return {"success": False, "action": "failed", "error": str(e)}
+        
+        if stack is None:
+            print(f"📦 Creating new stack: {stack_name}")
+        else:
+            stack_status = stack["StackStatus"]
+            stack_id = stack["StackId"]
+            
+            if stack_status in ["CREATE_COMPLETE", "UPDATE_COMPLETE", "UPDATE_ROLLBACK_COMPLETE"]:
+                deployed_fingerprint = next(
+                    (t["Value"] for t in stack.get("Tags", []) if t["Key"] == TEMPLATE_FINGERPRINT_TAG), None
+                )
+                if deployed_fingerprint == fingerprint:
+                    return {"success": True, "action": "skipped", "stack_name": stack_name}
+                
+                return self._update_stack_with_change_set(
+                    stack_name, stack_id, template_body, parameters, project_name, fingerprint
+                )
             
-            elif stack_status in ["ROLLBACK_COMPLETE", "CREATE_FAILED", "UPDATE_ROLLBACK_COMPLETE", "ROLLBACK_FAILED", "DELETE_FAILED"]:
+            elif stack_status in ["ROLLBACK_COMPLETE", "CREATE_FAILED", "ROLLBACK_FAILED", "DELETE_FAILED"]:
                 print(f"🔧 Stack {stack_name} in failed state ({stack_status}) - AUTO-FIXING...")
                 
                 # Deletar stack falho automaticamente
@@ -59,11 +145,6 @@ class PhaseParser:
             
             else:
                 return {"success": False, "action": "failed", "error": f"Stack in {stack_status} state"}
-        except self.cf_client.exceptions.ClientError as e:
-            if "does not exist" in str(e):
-                print(f"📦 Creating new stack: {stack_name}")
-            else:
-                return {"success": False, "action": "failed", "error": str(e)}
         
         # Cleanup órfãos antes de criar
         self._cleanup_orphaned_stacks(stack_name)
@@ -72,21 +153,80 @@ class PhaseParser:
             "StackName": stack_name,
             "TemplateBody": template_body,
             "Capabilities": ["CAPABILITY_IAM", "CAPABILITY_NAMED_IAM"],
-            "Tags": [
-                {"Key": "Project", "Value": project_name},
-                {"Key": "Component", "Value": "IAL-Foundation"},
-                {"Key": "DeployedBy", "Value": "IAL-MCP-System"},
-                {"Key": "Idempotent", "Value": "true"}
-            ]
+            "Tags": self._stack_tags(project_name, fingerprint)
         }
         if parameters:
             create_args["Parameters"] = parameters
         try:
             response = self.cf_client.create_stack(**create_args)
+            self._mark_stack_stale(stack_name)
             return {"success": True, "action": "created", "stack_id": response["StackId"], "stack_name": stack_name}
         except Exception as e:
             return {"success": False, "action": "failed", "error": str(e)}
 
+    @traced('cloudformation.change_set', category='cloudformation')
+    def _update_stack_with_change_set(self, stack_name, stack_id, template_body, parameters, project_name, fingerprint):
+        """Aplica mudanças de template via change set; change set vazio = no-op"""
+        change_set_name = f"ial-{fingerprint[:12]}-{int(time.time())}"
+        change_set_args = {
+            "StackName": stack_name,
+            "ChangeSetName": change_set_name,
+            "ChangeSetType": "UPDATE",
+            "TemplateBody": template_body,
+            "Capabilities": ["CAPABILITY_IAM", "CAPABILITY_NAMED_IAM"],
+            "Tags": self._stack_tags(project_name, fingerprint)
+        }
+        if parameters:
+            change_set_args["Parameters"] = parameters
+        
+        try:
+            self.cf_client.create_change_set(**change_set_args)
+            waiter = self.cf_client.get_waiter("change_set_create_complete")
+            try:
+                waiter.wait(StackName=stack_name, ChangeSetName=change_set_name,
+                            WaiterConfig={"Delay": 5, "MaxAttempts": 60})
+            except Exception:
+                change_set = self.cf_client.describe_change_set(StackName=stack_name, ChangeSetName=change_set_name)
+                reason = change_set.get("StatusReason", "")
+                if "didn't contain changes" in reason or "No updates are to be performed" in reason:
+                    self.cf_client.delete_change_set(StackName=stack_name, ChangeSetName=change_set_name)
+                    # Sem a tag (ex.: stack anterior ao fingerprint) o próximo deploy criaria outro change set
+                    recorded = self._record_fingerprint(stack_name, parameters, project_name, fingerprint)
+                    return {"success": True, "action": "skipped", "stack_name": stack_name,
+                            "fingerprint_recorded": recorded}
+                return {"success": False, "action": "failed", "error": f"Change set failed: {reason}"}
+            
+            changes = self.cf_client.describe_change_set(
+                StackName=stack_name, ChangeSetName=change_set_name
+            ).get("Changes", [])
+            print(f"🔁 Updating stack {stack_name} via change set ({len(changes)} changes)")
+            
+            self.cf_client.execute_change_set(StackName=stack_name, ChangeSetName=change_set_name)
+            self._mark_stack_stale(stack_name)
+            return {"success": True, "action": "updated", "stack_id": stack_id,
+                    "stack_name": stack_name, "changes": len(changes)}
+        except Exception as e:
+            return {"success": False, "action": "failed", "error": str(e)}
+
+    def _record_fingerprint(self, stack_name, parameters, project_name, fingerprint) -> bool:
+        """Grava só as tags (template anterior) para o próximo deploy cair no skip rápido"""
+        update_args = {
+            "StackName": stack_name,
+            "UsePreviousTemplate": True,
+            "Capabilities": ["CAPABILITY_IAM", "CAPABILITY_NAMED_IAM"],
+            "Tags": self._stack_tags(project_name, fingerprint)
+        }
+        if parameters:
+            update_args["Parameters"] = parameters
+        try:
+            self.cf_client.update_stack(**update_args)
+        except Exception as e:
+            if "No updates are to be performed" not in str(e):
+                print(f"⚠️ Could not record template fingerprint on {stack_name}: {e}")
+                return False
+        self._mark_stack_stale(stack_name)
+        return True
+
     def _cleanup_orphaned_stacks(self, base_stack_name):
         """Remove stacks órfãos com timestamps"""
         try:
@@ -119,13 +259,27 @@ class PhaseParser:
     
     def deploy_cloudformation_stack(self, file_path: str, project_name: str = "ial-fork") -> Dict[str, Any]:
         """Deploy real via CloudFormation com idempotência"""
+        file_name = os.path.basename(file_path).replace('.yaml', '')
         try:
-            file_name = os.path.basename(file_path).replace('.yaml', '')
-            stack_name = f"{project_name}-{file_name}"
-            
             # Ler template
             with open(file_path, 'r') as f:
                 template_body = f.read()
+        except Exception as e:
+            return {
+                'success': False,
+                'stack_name': f"{project_name}-{file_name}",
+                'error': str(e),
+                'file_path': file_path,
+                'idempotent': True
+            }
+        return self.deploy_template_body(template_body, file_name, file_path, project_name)
+    
+    @traced('cloudformation.deploy', category='cloudformation')
+    def deploy_template_body(self, template_body: str, file_name: str, file_path: Optional[str] = None,
+                             project_name: str = "ial-fork") -> Dict[str, Any]:
+        """Deploy idempotente de um template CloudFormation em memória"""
+        try:
+            stack_name = f"{project_name}-{file_name}"
             
             # Verificar se template tem parâmetros
             import yaml
@@ -156,7 +310,7 @@ class PhaseParser:
                 stack_name = actual_stack_name
             
             if deployment_result['action'] == 'skipped':
-                print(f"✅ Stack {stack_name} already exists and is complete")
+                print(f"✅ Stack {stack_name} unchanged (template fingerprint match)")
                 return {'success': True, 'stack_name': stack_name, 'action': 'skipped'}
             elif deployment_result['action'] == 'failed':
                 print(f"❌ Stack {stack_name} deployment failed: {deployment_result.get('error', 'Unknown error')}")
@@ -165,11 +319,16 @@ class PhaseParser:
             response = {'StackId': deployment_result.get('stack_id', stack_name)}
             
             stack_id = response['StackId']
+            action = deployment_result['action']
+            waiter_name, expected_status = (
+                ('stack_update_complete', 'UPDATE_COMPLETE') if action == 'updated'
+                else ('stack_create_complete', 'CREATE_COMPLETE')
+            )
             
-            # Aguardar criação (timeout 5 minutos)
-            print(f"⏳ Aguardando criação do stack {actual_stack_name}...")
+            # Aguardar criação/atualização (timeout 5 minutos)
+            print(f"⏳ Aguardando {'atualização' if action == 'updated' else 'criação'} do stack {actual_stack_name}...")
             
-            waiter = self.cf_client.get_waiter('stack_create_complete')
+            waiter = self.cf_client.get_waiter(waiter_name)
             try:
                 waiter.wait(
                     StackName=deployment_result.get("stack_id", actual_stack_name),
@@ -180,13 +339,13 @@ class PhaseParser:
                 stack_info = self.cf_client.describe_stacks(StackName=actual_stack_name)
                 stack_status = stack_info['Stacks'][0]['StackStatus']
                 
-                if stack_status == 'CREATE_COMPLETE':
-                    print(f"✅ Stack {actual_stack_name} criado com sucesso")
+                if stack_status == expected_status:
+                    print(f"✅ Stack {actual_stack_name} {'atualizado' if action == 'updated' else 'criado'} com sucesso")
                     return {
                         'success': True,
                         'stack_name': actual_stack_name,
                         'file_path': file_path,
-                        'action': 'created',
+                        'action': action,
                         'idempotent': True
                     }
                 else:
@@ -215,239 +374,44 @@ class PhaseParser:
                 'idempotent': True
             }
                 
+    def deploy_file(self, file_path: str) -> Dict[str, Any]:
+        """Deploy de um arquivo da fase (metadado IAL ou CloudFormation direto)"""
+        # OPÇÃO 3: Detectar se é metadado IAL e converter para CloudFormation
+        if self.is_ial_metadata(file_path):
+            print(f"🔧 Converting IAL metadata to CloudFormation...")
+            cf_template = self.convert_ial_to_cloudformation(file_path)
+            if cf_template:
+                return self.deploy_cloudformation_from_template(cf_template, os.path.basename(file_path))
+            return {'success': False, 'error': 'Failed to convert IAL metadata to CloudFormation'}
+        
+        # CloudFormation template direto
+        return self.deploy_cloudformation_stack(file_path)
+    
     def is_ial_metadata(self, file_path: str) -> bool:
         """Detecta se arquivo é metadado IAL ou CloudFormation direto"""
         try:
             with open(file_path, 'r') as f:
-                content = yaml.safe_load(f)
-            
-            # Se tem 'resources' com 'mcp_workflow', é metadado IAL
-            if isinstance(content, dict) and 'resources' in content:
-                resources = content['resources']
-                if isinstance(resources, dict):
-                    for resource in resources.values():
-                        if isinstance(resource, dict) and 'mcp_workflow' in resource:
-                            return True
-            
-            # Se tem estrutura de workflow (formato antigo), também é IAL
-            if isinstance(content, dict):
-                for key, value in content.items():
-                    if isinstance(value, dict) and 'workflow' in value:
-                        return True
-            
-            return False
+                return is_ial_metadata_doc(yaml.safe_load(f))
         except:
             return False
     
     def convert_ial_to_cloudformation(self, file_path: str) -> Optional[str]:
-        """Converte metadado IAL para template CloudFormation"""
+        """Converte metadado IAL para template CloudFormation (memoizado por hash da fonte)"""
         try:
-            with open(file_path, 'r') as f:
-                ial_metadata = yaml.safe_load(f)
-            
-            # Template CloudFormation básico
-            cf_template = {
-                'AWSTemplateFormatVersion': '2010-09-09',
-                'Description': f"Generated from IAL metadata: {ial_metadata.get('description', 'IAL Phase')}",
-                'Parameters': {
-                    'ProjectName': {
-                        'Type': 'String',
-                        'Default': 'ial-project',
-                        'Description': 'Project name for resource naming'
-                    },
-                    'Environment': {
-                        'Type': 'String',
-                        'Default': 'dev',
-                        'Description': 'Environment name'
-                    }
-                },
-                'Resources': {}
-            }
-            
-            # Processar recursos IAL
-            if 'resources' in ial_metadata:
-                for resource_key, resource_config in ial_metadata['resources'].items():
-                    if isinstance(resource_config, dict):
-                        # Processar recursos com mcp_workflow (formato completo)
-                        if 'mcp_workflow' in resource_config:
-                            mcp_config = resource_config['mcp_workflow']
-                            if 'generate_code' in mcp_config:
-                                gen_config = mcp_config['generate_code']
-                                if 'parameters' in gen_config:
-                                    params = gen_config['parameters']
-                                    properties = params.get('properties', {})
-                                    resource_type = params.get('resource_type', 'AWS::CloudFormation::WaitConditionHandle')
-                        
-                        # Processar recursos IAL simples (sem mcp_workflow)
-                        elif 'type' in resource_config:
-                            properties = resource_config.get('properties', {})
-                            resource_type = resource_config.get('type', 'AWS::CloudFormation::WaitConditionHandle')
-                        
-                        else:
-                            continue  # Pular recursos sem type
-                        
-                        # Processar placeholders recursivamente como objetos
-                        def process_placeholders(obj):
-                            if isinstance(obj, dict):
-                                return {k: process_placeholders(v) for k, v in obj.items()}
-                            elif isinstance(obj, list):
-                                return [process_placeholders(item) for item in obj]
-                            elif isinstance(obj, str):
-                                if '{{PROJECT_NAME}}' in obj:
-                                    if obj == '{{PROJECT_NAME}}':
-                                        return {'Ref': 'ProjectName'}
-                                    else:
-                                        # Substituição com !Sub para concatenação
-                                        new_str = obj.replace('{{PROJECT_NAME}}', '${ProjectName}')
-                                        new_str = new_str.replace('{{AWS_REGION}}', '${AWS::Region}')
-                                        return {'Fn::Sub': new_str}
-                                elif '{{AWS_REGION}}' in obj:
-                                    if obj == '{{AWS_REGION}}':
-                                        return {'Ref': 'AWS::Region'}
-                                    else:
-                                        new_str = obj.replace('{{AWS_REGION}}', '${AWS::Region}')
-                                        return {'Fn::Sub': new_str}
-                                # Placeholders de referência entre recursos
-                                elif obj == '[VPC_ID]':
-                                    return {'Ref': 'Resource03vpc'}
-                                elif obj == '[IGW_ID]':
-                                    return {'Ref': 'Resource03igw'}
-                                elif obj == '[PUBLIC_RT_ID]':
-                                    return {'Ref': 'Resource03publicrt'}
-                                elif obj == '[PRIVATE_RT_ID]':
-                                    return {'Ref': 'Resource03privatert'}
-                                elif obj == '[SG_APP_ID]':
-                                    return {'Ref': 'Resource03sgapp'}
-                                elif obj == '[SG_ALB_ID]':
-                                    return {'Ref': 'Resource03sgalb'}
-                                elif obj == '[SG_ENDPOINTS_ID]':
-                                    return {'Ref': 'Resource03sgendpoints'}
-                                elif obj == '[SG_LAMBDA_ID]':
-                                    return {'Ref': 'Resource03sglambda'}
-                                elif obj == '[PUBLIC_SUBNET_1A_ID]':
-                                    return {'Ref': 'Resource03publicsubnet1a'}
-                                elif obj == '[PUBLIC_SUBNET_1B_ID]':
-                                    return {'Ref': 'Resource03publicsubnet1b'}
-                                elif obj == '[PUBLIC_SUBNET_1C_ID]':
-                                    return {'Ref': 'Resource03publicsubnet1c'}
-                                elif obj == '[PRIVATE_SUBNET_1A_ID]':
-                                    return {'Ref': 'Resource03privatesubnet1a'}
-                                elif obj == '[PRIVATE_SUBNET_1B_ID]':
-                                    return {'Ref': 'Resource03privatesubnet1b'}
-                                elif obj == '[PRIVATE_SUBNET_1C_ID]':
-                                    return {'Ref': 'Resource03privatesubnet1c'}
-                                return obj
-                            else:
-                                return obj
-                        
-                        processed_properties = process_placeholders(properties)
-                        
-                        cf_resource = {
-                            'Type': resource_type,
-                            'Properties': processed_properties
-                        }
-                        
-                        # Adicionar DependsOn para quebrar dependências circulares
-                        if resource_type == 'AWS::EC2::VPCEndpoint':
-                            cf_resource['DependsOn'] = ['Resource03vpc']
-                        elif 'SecurityGroup' in resource_type and 'endpoints' in resource_key.lower():
-                            # Security groups de endpoints não dependem de VPC endpoints
-                            pass
-                        
-                        # Usar resource_name se disponível, senão usar key
-                        resource_name = resource_config.get('resource_name', resource_key.replace('-', '').replace('_', ''))
-                        # Garantir que nome é alfanumérico
-                        resource_name = re.sub(r'[^a-zA-Z0-9]', '', resource_name)
-                        # Garantir que nome começa com letra
-                        if not resource_name or not resource_name[0].isalpha():
-                            resource_name = 'Resource' + resource_name
-                            
-                        cf_template['Resources'][resource_name] = cf_resource
-            
-            # Processar formato workflow (formato antigo)
-            else:
-                for resource_key, resource_config in ial_metadata.items():
-                    if isinstance(resource_config, dict) and 'workflow' in resource_config:
-                        workflow = resource_config['workflow']
-                        
-                        # Procurar step com generate_infrastructure_code
-                        resource_type = 'AWS::CloudFormation::WaitConditionHandle'
-                        properties = {}
-                        
-                        for step_key, step_config in workflow.items():
-                            if isinstance(step_config, dict) and step_config.get('action') == 'generate_infrastructure_code':
-                                resource_type = step_config.get('resource_type', resource_type)
-                                properties = step_config.get('properties', {})
-                                break
-                        
-                        # Processar placeholders
-                        def process_placeholders(obj):
-                            if isinstance(obj, dict):
-                                return {k: process_placeholders(v) for k, v in obj.items()}
-                            elif isinstance(obj, list):
-                                return [process_placeholders(item) for item in obj]
-                            elif isinstance(obj, str):
-                                if '{{PROJECT_NAME}}' in obj:
-                                    return {'Fn::Sub': obj.replace('{{PROJECT_NAME}}', '${ProjectName}')}
-                                elif '{{AWS_REGION}}' in obj:
-                                    return {'Fn::Sub': obj.replace('{{AWS_REGION}}', '${AWS::Region}')}
-                                return obj
-                            else:
-                                return obj
-                        
-                        processed_properties = process_placeholders(properties)
-                        
-                        cf_resource = {
-                            'Type': resource_type,
-                            'Properties': processed_properties
-                        }
-                        
-                        # Nome do recurso
-                        resource_name = re.sub(r'[^a-zA-Z0-9]', '', resource_key)
-                        if not resource_name or not resource_name[0].isalpha():
-                            resource_name = 'Resource' + resource_name
-                            
-                        cf_template['Resources'][resource_name] = cf_resource
-            
-            # Se não tem recursos, criar um placeholder
-            if not cf_template['Resources']:
-                cf_template['Resources']['PlaceholderResource'] = {
-                    'Type': 'AWS::CloudFormation::WaitConditionHandle',
-                    'Properties': {}
-                }
-                
-            return yaml.dump(cf_template, default_flow_style=False)
-            
+            return self.transpiler.transpile_file(file_path)
         except Exception as e:
             print(f"❌ Error converting IAL metadata: {e}")
             return None
     
     def deploy_cloudformation_from_template(self, template_content: str, file_name: str) -> Dict[str, Any]:
-        """Deploy CloudFormation a partir de template string"""
+        """Deploy CloudFormation a partir de template string (sem arquivo temporário)"""
         try:
-            # Criar arquivo temporário com nome válido
-            import tempfile
-            import re
-            
             # Gerar nome de stack válido baseado no arquivo
             base_name = re.sub(r'[^a-zA-Z0-9-]', '', file_name.replace('.yaml', '').replace('.yml', ''))
-            if not base_name:
-                base_name = 'converted'
             # Garantir que não termina com hífen
-            base_name = base_name.rstrip('-')
-            stack_suffix = f"ial-{base_name}-temp"
-            
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as temp_file:
-                temp_file.write(template_content)
-                temp_file_path = temp_file.name
-            
-            # Deploy usando método existente
-            result = self.deploy_cloudformation_stack(temp_file_path)
-            
-            # Limpar arquivo temporário
-            os.unlink(temp_file_path)
+            base_name = base_name.rstrip('-') or 'converted'
             
-            return result
+            return self.deploy_template_body(template_content, base_name)
             
         except Exception as e:
             return {
@@ -455,13 +419,19 @@ class PhaseParser:
                 'error': f'Error deploying from template: {str(e)}'
             }
 
-def deploy_phase_resources(phase: str = "00-foundation") -> Dict[str, Any]:
+def deploy_phase_resources(phase: str = "00-foundation", parser: Optional[PhaseParser] = None) -> Dict[str, Any]:
     """Deploy todos os recursos de uma fase"""
-    parser = PhaseParser()
+    parser = parser or PhaseParser()
     
     # Listar todos os arquivos da fase
     phase_files = parser.list_phase_files(phase)
     
+    # Um describe_stacks paginado por execução (reutilizado pelas fases seguintes do mesmo parser)
+    try:
+        parser.prefetch_stacks()
+    except Exception as e:
+        print(f"⚠️ Could not prefetch stacks: {e}")
+    
     if not phase_files:
         return {
             'success': False,
@@ -481,17 +451,7 @@ def deploy_phase_resources(phase: str = "00-foundation") -> Dict[str, Any]:
         print(f"🔄 Deploying {file_name}...")
         
         try:
-            # OPÇÃO 3: Detectar se é metadado IAL e converter para CloudFormation
-            if parser.is_ial_metadata(file_path):
-                print(f"🔧 Converting IAL metadata to CloudFormation...")
-                cf_template = parser.convert_ial_to_cloudformation(file_path)
-                if cf_template:
-                    result = parser.deploy_cloudformation_from_template(cf_template, file_name)
-                else:
-                    result = {'success': False, 'error': 'Failed to convert IAL metadata to CloudFormation'}
-            else:
-                # CloudFormation template direto
-                result = parser.deploy_cloudformation_stack(file_path)
+            result = parser.deploy_file(file_path)
             
             if result.get('success', False):
                 successful += 1
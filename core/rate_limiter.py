@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter - Janela deslizante local com reconciliação em store compartilhado
+Cada chave (ex. usuário) tem um contador por janela (minuto/hora/dia) no modelo
+"sliding window counter": contagem da janela fixa atual + contagem da anterior
+ponderada pelo tempo restante. O caminho quente é só memória (microssegundos).
+
+Modos:
+- local:  apenas memória (um processo)
+- shared: memória + reconciliação periódica com DynamoDB (deltas via ADD), para
+          vários processos enxergarem o consumo uns dos outros
+- strict: cada requisição faz um TransactWriteItems condicional em todas as
+          janelas (tudo ou nada) - limite exato ao custo de uma ida ao DynamoDB
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import boto3
+from botocore.exceptions import ClientError
+
+BucketKey = Tuple[str, str, int]  # (chave, janela, início da janela fixa)
+BATCH_GET_LIMIT = 100
+
+
+class PartialCountsError(Exception):
+    """add_counts interrompido: `totals` traz os buckets já gravados (e seus totais globais)"""
+
+    def __init__(self, totals: Dict[BucketKey, int], cause: Exception):
+        super().__init__(f"{len(totals)} bucket(s) written before failure: {cause}")
+        self.totals = totals
+
+
+@dataclass(frozen=True)
+class RateLimitWindow:
+    name: str
+    seconds: int
+    limit: int
+
+
+class _WindowCounter:
+    """Contagens da janela fixa atual e da anterior (locais + de outros processos)"""
+    __slots__ = ('start', 'current', 'previous', 'remote_current', 'remote_previous', 'unsynced', 'synced',
+                 'previous_known')
+
+    def __init__(self, start: int):
+        self.start = start
+        self.current = 0
+        self.previous = 0
+        self.remote_current = 0
+        self.remote_previous = 0
+        self.unsynced = 0   # incrementos locais ainda não enviados ao store
+        self.synced = 0     # parte da contagem local já enviada (janela atual)
+        self.previous_known = False  # strict: contagem global da janela anterior já lida
+
+    def roll(self, start: int, seconds: int):
+        if start == self.start:
+            return
+        adjacent = start - self.start == seconds
+        self.previous = self.current if adjacent else 0
+        self.remote_previous = self.remote_current if adjacent else 0
+        self.current = self.remote_current = self.synced = self.unsynced = 0
+        self.previous_known = False
+        self.start = start
+
+    def idle(self) -> bool:
+        return not (self.current or self.previous or self.remote_current or self.remote_previous or self.unsynced)
+
+    def estimate(self, now: float, seconds: int) -> float:
+        weight = 1.0 - (now - self.start) / seconds
+        return (self.current + self.remote_current) + (self.previous + self.remote_previous) * max(weight, 0.0)
+
+
+class DynamoDBRateLimitStore:
+    """Contadores por janela fixa no DynamoDB (item por chave#janela#início, com TTL)"""
+
+    def __init__(self, table_name: str = 'ial-rate-limits', region: Optional[str] = None, client: Any = None):
+        self.table_name = table_name
+        self.client = client or boto3.client('dynamodb', region_name=region)
+
+    @staticmethod
+    def _item_key(bucket: BucketKey) -> Dict[str, Dict[str, str]]:
+        key, window, start = bucket
+        return {'limiter_key': {'S': f"{key}#{window}#{start}"}}
+
+    def add_counts(self, deltas: Dict[BucketKey, int], expires_at: Dict[BucketKey, int]) -> Dict[BucketKey, int]:
+        """Soma deltas (ADD atômico) e retorna o total global de cada bucket
+
+        Falha no meio levanta PartialCountsError com os buckets já gravados.
+        """
+        totals = {}
+        for bucket, delta in deltas.items():
+            try:
+                response = self.client.update_item(
+                    TableName=self.table_name,
+                    Key=self._item_key(bucket),
+                    UpdateExpression='ADD request_count :delta SET expires_at = :ttl',
+                    ExpressionAttributeValues={':delta': {'N': str(delta)}, ':ttl': {'N': str(expires_at[bucket])}},
+                    ReturnValues='UPDATED_NEW'
+                )
+            except Exception as e:
+                raise PartialCountsError(totals, e) from e
+            totals[bucket] = int(response['Attributes']['request_count']['N'])
+        return totals
+
+    def get_counts(self, buckets: List[BucketKey]) -> Dict[BucketKey, int]:
+        by_id = {self._item_key(b)['limiter_key']['S']: b for b in buckets}
+        ids = list(by_id)
+        counts = {bucket: 0 for bucket in buckets}
+        for start in range(0, len(ids), BATCH_GET_LIMIT):
+            request = {'Keys': [{'limiter_key': {'S': item_id}} for item_id in ids[start:start + BATCH_GET_LIMIT]],
+                       'ProjectionExpression': 'limiter_key, request_count'}
+            while request:
+                response = self.client.batch_get_item(RequestItems={self.table_name: request})
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    counts[by_id[item['limiter_key']['S']]] = int(item['request_count']['N'])
+                request = response.get('UnprocessedKeys', {}).get(self.table_name)
+        return counts
+
+    def increment_if_below(self, checks: List[Tuple[BucketKey, int, int]], cost: int = 1) -> Optional[int]:
+        """Incrementa todos os buckets se todos ficarem <= máximo (transação)
+
+        checks: [(bucket, máximo permitido após o incremento, expires_at)].
+        Retorna None se aceito ou o índice do primeiro bucket que excederia.
+        """
+        items = [{'Update': {
+            'TableName': self.table_name,
+            'Key': self._item_key(bucket),
+            'UpdateExpression': 'ADD request_count :cost SET expires_at = :ttl',
+            'ConditionExpression': 'attribute_not_exists(request_count) OR request_count <= :max',
+            'ExpressionAttributeValues': {':cost': {'N': str(cost)}, ':max': {'N': str(maximum - cost)},
+                                          ':ttl': {'N': str(expires_at)}}
+        }} for bucket, maximum, expires_at in checks]
+        try:
+            self.client.transact_write_items(TransactItems=items)
+            return None
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons', [])
+            for index, reason in enumerate(reasons):
+                if reason.get('Code') == 'ConditionalCheckFailed':
+                    return index
+            return 0
+
+    def ensure_table(self):
+        try:
+            self.client.describe_table(TableName=self.table_name)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ResourceNotFoundException':
+                raise
+            self.client.create_table(
+                TableName=self.table_name,
+                KeySchema=[{'AttributeName': 'limiter_key', 'KeyType': 'HASH'}],
+                AttributeDefinitions=[{'AttributeName': 'limiter_key', 'AttributeType': 'S'}],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            self.client.get_waiter('table_exists').wait(TableName=self.table_name)
+            self.client.update_time_to_live(
+                TableName=self.table_name,
+                TimeToLiveSpecification={'Enabled': True, 'AttributeName': 'expires_at'}
+            )
+
+
+class SlidingWindowRateLimiter:
+    """Limites por janela deslizante; acquire() consome apenas se todas as janelas permitirem"""
+
+    def __init__(self, windows: List[RateLimitWindow], store: Optional[DynamoDBRateLimitStore] = None,
+                 mode: str = 'local', sync_interval: float = 5.0, clock: Callable[[], float] = time.time):
+        if mode not in ('local', 'shared', 'strict'):
+            raise ValueError(f"Invalid rate limit mode: {mode}")
+        if mode != 'local' and store is None:
+            raise ValueError(f"Mode '{mode}' requires a store")
+        self.windows = list(windows)
+        self._windows_by_name = {w.name: w for w in self.windows}
+        self.store = store
+        self.mode = mode
+        self.sync_interval = sync_interval
+        self._clock = clock
+
+        self._counters: Dict[Tuple[str, str], _WindowCounter] = {}
+        self._closed: Dict[BucketKey, int] = {}   # deltas não sincronizados de janelas encerradas
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'allowed': 0, 'limited': 0, 'syncs': 0, 'sync_errors': 0, 'store_calls': 0,
+                      'store_errors': 0}
+
+    def _counter(self, key: str, window: RateLimitWindow, now: float) -> _WindowCounter:
+        start = int(now // window.seconds * window.seconds)
+        counter = self._counters.get((key, window.name))
+        if counter is None:
+            counter = self._counters[(key, window.name)] = _WindowCounter(start)
+        elif counter.start != start:
+            if counter.unsynced:
+                bucket = (key, window.name, counter.start)
+                self._closed[bucket] = self._closed.get(bucket, 0) + counter.unsynced
+            counter.roll(start, window.seconds)
+        return counter
+
+    def _decision(self, window: RateLimitWindow, counter: _WindowCounter, now: float, allowed: bool,
+                  count: float) -> Dict[str, Any]:
+        reset = counter.start + window.seconds
+        result = {
+            'rate_limited': not allowed,
+            'window': window.name,
+            'limit': window.limit,
+            'current_count': int(math.ceil(count)),
+            'reset_time': datetime.fromtimestamp(reset).isoformat()
+        }
+        if not allowed:
+            result['retry_after'] = round(max(0.0, reset - now), 3)
+        return result
+
+    # ------------------------------------------------------------------ caminho quente
+
+    def acquire(self, key: str, cost: int = 1) -> Dict[str, Any]:
+        """Consome `cost` de todas as janelas, ou nenhuma se alguma estiver no limite"""
+        if self.mode == 'strict':
+            return self._acquire_strict(key, cost)
+
+        result = self._acquire_local(key, cost, self._clock())
+        if self.mode == 'shared' and not result['rate_limited']:
+            self._ensure_started()
+        return result
+
+    def _acquire_local(self, key: str, cost: int, now: float) -> Dict[str, Any]:
+        """Decisão só com as contagens em memória (modo local/shared e fallback do strict)"""
+        with self._lock:
+            counters = [(w, self._counter(key, w, now)) for w in self.windows]
+            for window, counter in counters:
+                count = counter.estimate(now, window.seconds)
+                if count + cost > window.limit:
+                    self.stats['limited'] += 1
+                    return self._decision(window, counter, now, False, count)
+            for _, counter in counters:
+                counter.current += cost
+                if self.mode == 'shared':
+                    # Só o modo shared envia deltas; nos demais _closed cresceria sem nunca ser drenado
+                    counter.unsynced += cost
+            self.stats['allowed'] += 1
+        return {'rate_limited': False}
+
+    def peek(self, key: str) -> Dict[str, float]:
+        """Contagem estimada por janela, sem consumir"""
+        now = self._clock()
+        with self._lock:
+            return {w.name: round(self._counter(key, w, now).estimate(now, w.seconds), 3) for w in self.windows}
+
+    # ------------------------------------------------------------------ strict
+
+    def _acquire_strict(self, key: str, cost: int) -> Dict[str, Any]:
+        now = self._clock()
+        try:
+            return self._acquire_strict_store(key, cost, now)
+        except Exception as e:
+            # Store indisponível não derruba a requisição: decide pela janela local
+            self.stats['store_errors'] += 1
+            print(f"⚠️ Rate limit store unavailable, using local window: {e}")
+            return self._acquire_local(key, cost, now)
+
+    def _acquire_strict_store(self, key: str, cost: int, now: float) -> Dict[str, Any]:
+        with self._lock:
+            counters = [(w, self._counter(key, w, now)) for w in self.windows]
+            unknown_previous = [(key, w.name, c.start - w.seconds) for w, c in counters if not c.previous_known]
+
+        # Contagem global da janela anterior (já fechada, estável) - uma leitura por janela
+        if unknown_previous:
+            previous = self.store.get_counts(unknown_previous)
+            self.stats['store_calls'] += 1
+            with self._lock:
+                for window, counter in counters:
+                    bucket = (key, window.name, counter.start - window.seconds)
+                    if bucket in previous:
+                        # O total global já inclui o que este processo consumiu
+                        counter.remote_previous, counter.previous = previous[bucket], 0
+                        counter.previous_known = True
+
+        checks = []
+        for window, counter in counters:
+            weight = max(0.0, 1.0 - (now - counter.start) / window.seconds)
+            carried = int(math.ceil((counter.previous + counter.remote_previous) * weight))
+            checks.append(((key, window.name, counter.start), window.limit - carried,
+                           counter.start + 2 * window.seconds))
+
+        failed = self.store.increment_if_below(checks, cost)
+        self.stats['store_calls'] += 1
+        with self._lock:
+            if failed is not None:
+                self.stats['limited'] += 1
+                window, counter = counters[failed]
+                return self._decision(window, counter, now, False, window.limit)
+            for _, counter in counters:
+                counter.current += cost
+            self.stats['allowed'] += 1
+        return {'rate_limited': False}
+
+    # ------------------------------------------------------------------ reconciliação
+
+    def sync(self) -> int:
+        """Envia deltas locais ao store e incorpora as contagens dos outros processos"""
+        if self.store is None or self.mode != 'shared':
+            return 0
+        with self._sync_lock:
+            now = self._clock()
+            with self._lock:
+                # Fecha janelas vencidas (deltas pendentes vão para _closed) e descarta contadores ociosos
+                for (key, window_name), counter in list(self._counters.items()):
+                    self._counter(key, self._windows_by_name[window_name], now)
+                    if counter.idle():
+                        del self._counters[(key, window_name)]
+                deltas, self._closed = self._closed, {}
+                current = []
+                for (key, window_name), counter in self._counters.items():
+                    bucket = (key, window_name, counter.start)
+                    if counter.unsynced:
+                        deltas[bucket] = deltas.get(bucket, 0) + counter.unsynced
+                        counter.unsynced = 0
+                    current.append(bucket)
+
+            # Buckets sem delta local também são lidos para ver consumo de outros processos
+            expires = {b: b[2] + 2 * self._windows_by_name[b[1]].seconds for b in deltas}
+            totals, written, failed = {}, {}, False
+            try:
+                if deltas:
+                    self.stats['store_calls'] += 1
+                    totals = self.store.add_counts(deltas, expires)
+                written = deltas
+                idle = [b for b in current if b not in totals]
+                self.stats['store_calls'] += 1
+                totals.update(self.store.get_counts(idle))
+            except Exception as e:
+                failed = True
+                self.stats['sync_errors'] += 1
+                print(f"⚠️ Rate limit sync failed, keeping local counts: {e}")
+                if isinstance(e, PartialCountsError):
+                    totals = e.totals
+                    written = {bucket: deltas[bucket] for bucket in totals}
+                with self._lock:
+                    # Só volta para a fila o que não chegou ao store (reenviar o resto contaria duas vezes)
+                    for bucket, delta in deltas.items():
+                        if bucket not in written:
+                            self._closed[bucket] = self._closed.get(bucket, 0) + delta
+
+            with self._lock:
+                for bucket, total in totals.items():
+                    counter = self._counters.get(bucket[:2])
+                    if counter is None or counter.start != bucket[2]:
+                        continue
+                    counter.synced += written.get(bucket, 0)
+                    counter.remote_current = max(0, total - counter.synced)
+            if failed:
+                return 0
+            self.stats['syncs'] += 1
+            return len(deltas)
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._sync_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ial-rate-limit-sync', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.sync_interval):
+            self.sync()
+
+    def close(self):
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(self.sync_interval + 1)
+        self.sync()
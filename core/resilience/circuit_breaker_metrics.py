@@ -1,33 +1,34 @@
 """
 Circuit Breaker Metrics Publisher Lambda
+Também exporta o estado do registro de resiliência do processo (breakers e
+limites de concorrência) via telemetry sink assíncrono. Contadores cumulativos
+(rejeições, drops) saem como deltas desde a última publicação.
 """
-import boto3
 import json
 import os
+import weakref
+from typing import Dict, List, Optional
+
+try:
+    from core.resilience.registry import get_registry
+except ImportError:
+    from registry import get_registry
+
+# Mesma escala do publisher de transições (core/lambdas/metrics_publisher.py)
+STATE_VALUES = {'CLOSED': 0.0, 'HALF_OPEN': 0.5, 'OPEN': 1.0}
+
+# Último total publicado de cada contador cumulativo, por registro
+_published_totals = weakref.WeakKeyDictionary()
 
 def lambda_handler(event, context):
     """Lambda handler for publishing circuit breaker metrics"""
     try:
-        cloudwatch = boto3.client('cloudwatch')
-        namespace = os.environ.get('NAMESPACE', 'IAL/CircuitBreaker')
-        
-        # Publish sample metrics
-        cloudwatch.put_metric_data(
-            Namespace=namespace,
-            MetricData=[
-                {
-                    'MetricName': 'CircuitBreakerState',
-                    'Dimensions': [
-                        {
-                            'Name': 'Service',
-                            'Value': 'bedrock'
-                        }
-                    ],
-                    'Value': 1.0,
-                    'Unit': 'Count'
-                }
-            ]
-        )
+        from core.telemetry_sink import get_telemetry_sink
+        sink = get_telemetry_sink()
+        if not publish_metrics(sink=sink):
+            raise RuntimeError('circuit breaker metrics not published')
+        # Ambiente do Lambda congela após o retorno: envia agora em vez de esperar o flush em background
+        sink.flush()
         
         return {
             'statusCode': 200,
@@ -40,10 +41,83 @@ def lambda_handler(event, context):
             'body': json.dumps(f'Error: {str(e)}')
         }
 
-def publish_metrics():
-    """Publish circuit breaker metrics to CloudWatch"""
-    print("Circuit breaker metrics published")
-    return True
+def collect_metric_data(registry=None, previous: Optional[Dict] = None) -> List[Dict]:
+    """Datapoints (name, value, unit, dimensions) do estado atual do registro
+
+    Contadores cumulativos viram deltas em relação a `previous` (atualizado
+    in-place com os novos totais); sem `previous` o delta é o total.
+    """
+    snapshot = (registry or get_registry()).snapshot()
+    previous = {} if previous is None else previous
+
+    def delta(metric: str, service: str, total: float) -> float:
+        last = previous.get((metric, service), 0)
+        previous[(metric, service)] = total
+        # Total menor que o publicado: contador reiniciado (breaker recriado)
+        return total - last if total >= last else total
+
+    points = []
+    for name, metrics in snapshot['circuit_breakers'].items():
+        dims = {'Service': name}
+        points.extend([
+            {'name': 'CircuitBreakerState', 'value': STATE_VALUES.get(metrics['state'], -1.0), 'unit': 'None', 'dimensions': dims},
+            {'name': 'WindowFailureRate', 'value': metrics['window_failure_rate'], 'unit': 'None', 'dimensions': dims},
+            {'name': 'RejectedRequests', 'value': delta('RejectedRequests', name, metrics['rejected_requests']),
+             'unit': 'Count', 'dimensions': dims},
+        ])
+    for name, metrics in snapshot['concurrency_limiters'].items():
+        dims = {'Service': name}
+        points.extend([
+            {'name': 'ConcurrencyLimit', 'value': metrics['limit'], 'unit': 'Count', 'dimensions': dims},
+            {'name': 'InFlight', 'value': metrics['in_flight'], 'unit': 'Count', 'dimensions': dims},
+            {'name': 'ConcurrencyRejected', 'value': delta('ConcurrencyRejected', name, metrics['rejected']),
+             'unit': 'Count', 'dimensions': dims},
+            {'name': 'ConcurrencyDropped', 'value': delta('ConcurrencyDropped', name, metrics['dropped']),
+             'unit': 'Count', 'dimensions': dims},
+        ])
+    return points
+
+
+def publish_metrics(registry=None, sink=None) -> bool:
+    """Publish circuit breaker metrics to CloudWatch (enfileira no telemetry sink)"""
+    namespace = os.environ.get('NAMESPACE', 'IAL/CircuitBreaker')
+    try:
+        if sink is None:
+            from core.telemetry_sink import get_telemetry_sink
+            sink = get_telemetry_sink()
+        registry = registry or get_registry()
+        previous = _published_totals.setdefault(registry, {})
+        points = collect_metric_data(registry, previous)
+        for point in points:
+            sink.put_metric(namespace, point['name'], point['value'], unit=point['unit'],
+                            dimensions=point['dimensions'])
+        print(f"Circuit breaker metrics published ({len(points)} datapoints)")
+        return True
+    except Exception as e:
+        print(f"Error publishing circuit breaker metrics: {e}")
+        return False
+
+
+def enable_transition_metrics(registry=None, sink=None):
+    """Contabiliza transições de estado dos breakers (StateTransition / CircuitBreakerOpened)
+
+    Sem `sink`, o telemetry sink do processo só é criado na primeira transição.
+    """
+    namespace = os.environ.get('NAMESPACE', 'IAL/CircuitBreaker')
+    sinks = [sink]
+
+    def on_transition(name: str, old_state: str, new_state: str):
+        sink = sinks[0]
+        if sink is None:
+            from core.telemetry_sink import get_telemetry_sink
+            sink = sinks[0] = get_telemetry_sink()
+        sink.put_metric(namespace, 'StateTransition', 1, unit='Count',
+                        dimensions={'Service': name, 'FromState': old_state, 'ToState': new_state})
+        if new_state == 'OPEN':
+            sink.put_metric(namespace, 'CircuitBreakerOpened', 1, unit='Count', dimensions={'Service': name})
+
+    (registry or get_registry()).add_transition_listener(on_transition)
+    return on_transition
 
 if __name__ == "__main__":
     publish_metrics()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Resilience Registry - Circuit breakers e limites de concorrência compartilhados
+Um registro por processo, indexado por nome da dependência (ex. "llm-bedrock",
+"mcp-aws-cloudformation", "dynamodb", "cloudformation"): todas as partes do
+código que falam com a mesma dependência enxergam o mesmo breaker e o mesmo
+limite. O limite de concorrência é adaptativo (AIMD ou gradiente de latência):
+cresce enquanto a dependência responde bem e encolhe com throttling/timeout.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from core.circuit_breaker import CircuitBreaker
+except ImportError:
+    from circuit_breaker import CircuitBreaker
+
+# Limites iniciais por dependência (prefixo do nome): (inicial, mínimo, máximo)
+DEFAULT_CONCURRENCY = {
+    'llm-bedrock': (8, 1, 32),
+    'bedrock': (8, 1, 32),
+    'mcp': (4, 1, 16),
+    'dynamodb': (32, 4, 128),
+    'cloudformation': (4, 1, 10),
+}
+FALLBACK_CONCURRENCY = (8, 1, 64)
+
+OVERLOAD_MARKERS = ('throttling', 'toomanyrequests', 'serviceunavailable', 'requestlimitexceeded',
+                    'provisionedthroughputexceeded', 'rate exceeded', 'timeout')
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Sem vaga no limite de concorrência dentro do tempo de espera"""
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Throttling/timeout indicam dependência saturada (reduzem o limite); outros erros não"""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in OVERLOAD_MARKERS)
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limite de chamadas simultâneas ajustado pelo resultado de cada chamada
+
+    - aimd: +1 a cada sucesso com uso >= metade do limite; * backoff_ratio em drop
+    - gradient: limite * (latência mínima / latência atual) + fila de sqrt(limite)
+    Drops = throttling, timeout ou latência acima de `latency_threshold`.
+    """
+
+    def __init__(self, name: str, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 algorithm: str = 'aimd', backoff_ratio: float = 0.9, latency_threshold: Optional[float] = None,
+                 smoothing: float = 0.2, clock: Callable[[], float] = time.monotonic):
+        if algorithm not in ('aimd', 'gradient'):
+            raise ValueError(f"Unknown concurrency algorithm: {algorithm}")
+        self.name = name
+        self.algorithm = algorithm
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_threshold = latency_threshold
+        self.smoothing = smoothing
+        self._clock = clock
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._min_latency: Optional[float] = None
+        self._condition = threading.Condition()
+        self.stats = {'acquired': 0, 'rejected': 0, 'dropped': 0, 'successes': 0, 'max_in_flight': 0}
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    # ------------------------------------------------------------------ aquisição
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            return self._try_acquire_locked()
+
+    def _try_acquire_locked(self) -> bool:
+        if self._in_flight >= int(self._limit):
+            return False
+        self._in_flight += 1
+        self.stats['acquired'] += 1
+        self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self._in_flight)
+        return True
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Bloqueia até haver vaga; ConcurrencyLimitExceeded após `timeout`"""
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._condition:
+            while not self._try_acquire_locked():
+                remaining = None if deadline is None else deadline - self._clock()
+                if remaining is not None and remaining <= 0:
+                    self.stats['rejected'] += 1
+                    raise ConcurrencyLimitExceeded(f"{self.name}: {self._in_flight}/{int(self._limit)} in flight")
+                self._condition.wait(remaining)
+
+    def release(self, latency: Optional[float] = None, dropped: bool = False):
+        """Libera a vaga e ajusta o limite com o resultado da chamada"""
+        with self._condition:
+            in_flight = self._in_flight
+            self._in_flight = max(0, self._in_flight - 1)
+            if dropped or (self.latency_threshold is not None and latency is not None
+                           and latency > self.latency_threshold):
+                self.stats['dropped'] += 1
+                self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+            else:
+                self.stats['successes'] += 1
+                self._on_success(in_flight, latency)
+            self._condition.notify_all()
+
+    def _on_success(self, in_flight: int, latency: Optional[float]):
+        if self.algorithm == 'aimd' or latency is None or latency <= 0:
+            # Só cresce quando o limite está de fato sendo usado
+            if in_flight * 2 >= self._limit:
+                self._limit = min(self.max_limit, self._limit + 1)
+            return
+
+        self._min_latency = latency if self._min_latency is None else min(self._min_latency, latency)
+        gradient = max(0.5, min(1.0, self._min_latency / latency))
+        target = self._limit * gradient + math.sqrt(self._limit)
+        new_limit = (1 - self.smoothing) * self._limit + self.smoothing * target
+        self._limit = max(self.min_limit, min(self.max_limit, new_limit))
+
+    # ------------------------------------------------------------------ context managers
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None, is_drop: Callable[[BaseException], bool] = None):
+        """with limiter.slot(): chamada  (exceções de sobrecarga contam como drop)"""
+        self.acquire(timeout)
+        start = self._clock()
+        dropped = False
+        try:
+            yield self
+        except BaseException as e:
+            dropped = bool((is_drop or is_overload_error)(e))
+            raise
+        finally:
+            self.release(self._clock() - start, dropped=dropped)
+
+    @asynccontextmanager
+    async def async_slot(self, timeout: Optional[float] = None, is_drop: Callable[[BaseException], bool] = None,
+                         poll_interval: float = 0.01):
+        """Versão asyncio: espera cedendo o event loop em vez de bloquear a thread"""
+        deadline = None if timeout is None else self._clock() + timeout
+        while not self.try_acquire():
+            if deadline is not None and self._clock() >= deadline:
+                with self._condition:
+                    self.stats['rejected'] += 1
+                raise ConcurrencyLimitExceeded(f"{self.name}: {self._in_flight}/{int(self._limit)} in flight")
+            await asyncio.sleep(poll_interval)
+        start = self._clock()
+        dropped = False
+        try:
+            yield self
+        except BaseException as e:
+            dropped = bool((is_drop or is_overload_error)(e))
+            raise
+        finally:
+            self.release(self._clock() - start, dropped=dropped)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._condition:
+            return {'name': self.name, 'limit': int(self._limit), 'in_flight': self._in_flight,
+                    'algorithm': self.algorithm, **self.stats}
+
+
+class ResilienceRegistry:
+    """Breakers e limiters nomeados, compartilhados pelo processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+        self._listeners = []
+
+    def circuit_breaker(self, name: str, **kwargs) -> CircuitBreaker:
+        """Breaker existente ou criado com kwargs (a configuração do primeiro registro vale)"""
+        breaker = self._breakers.get(name)
+        if breaker is not None:
+            return breaker
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name=name, **kwargs)
+                for callback in self._listeners:
+                    breaker.add_listener(callback)
+                self._breakers[name] = breaker
+            return breaker
+
+    def concurrency_limiter(self, name: str, **kwargs) -> AdaptiveConcurrencyLimiter:
+        limiter = self._limiters.get(name)
+        if limiter is not None:
+            return limiter
+        with self._lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                defaults = DEFAULT_CONCURRENCY.get(name) or DEFAULT_CONCURRENCY.get(name.split('-')[0],
+                                                                                  FALLBACK_CONCURRENCY)
+                initial, minimum, maximum = defaults
+                options = {'initial_limit': initial, 'min_limit': minimum, 'max_limit': maximum, **kwargs}
+                limiter = AdaptiveConcurrencyLimiter(name, **options)
+                self._limiters[name] = limiter
+            return limiter
+
+    def add_transition_listener(self, callback: Callable[[str, str, str], None]):
+        """Listener aplicado aos breakers atuais e aos criados depois"""
+        with self._lock:
+            self._listeners.append(callback)
+            for breaker in self._breakers.values():
+                breaker.add_listener(callback)
+
+    def breakers(self) -> Dict[str, CircuitBreaker]:
+        return dict(self._breakers)
+
+    def limiters(self) -> Dict[str, AdaptiveConcurrencyLimiter]:
+        return dict(self._limiters)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'circuit_breakers': {name: b.get_metrics() for name, b in self.breakers().items()},
+            'concurrency_limiters': {name: l.get_metrics() for name, l in self.limiters().items()}
+        }
+
+    def reset(self):
+        with self._lock:
+            self._breakers.clear()
+            self._limiters.clear()
+            self._listeners.clear()
+
+
+_registry = ResilienceRegistry()
+
+
+def get_registry() -> ResilienceRegistry:
+    return _registry
+
+
+def get_circuit_breaker(name: str, **kwargs) -> CircuitBreaker:
+    return _registry.circuit_breaker(name, **kwargs)
+
+
+def get_concurrency_limiter(name: str, **kwargs) -> AdaptiveConcurrencyLimiter:
+    return _registry.concurrency_limiter(name, **kwargs)
+
+
+def _enable_default_transition_metrics():
+    """Transições dos breakers do registro do processo vão para o telemetry sink"""
+    try:
+        from core.resilience.circuit_breaker_metrics import enable_transition_metrics
+    except ImportError:
+        try:
+            from circuit_breaker_metrics import enable_transition_metrics
+        except ImportError:
+            return
+    enable_transition_metrics(_registry)
+
+
+_enable_default_transition_metrics()
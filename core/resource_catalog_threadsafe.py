@@ -14,7 +14,29 @@ from botocore.config import Config
 from botocore.exceptions import ClientError, BotoCoreError
 import hashlib
 from pathlib import Path
-from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import zlib
+
+try:
+    from core.dynamodb_batch import AdaptiveTokenBucket, DynamoDBBatchPipeline, is_throttle_error
+    from core.concurrent_cache import ShardedLRUCache
+    from core.resilience.registry import get_concurrency_limiter
+except ImportError:
+    from dynamodb_batch import AdaptiveTokenBucket, DynamoDBBatchPipeline, is_throttle_error
+    from concurrent_cache import ShardedLRUCache
+    from resilience.registry import get_concurrency_limiter
+
+# Taxas iniciais para tabelas on-demand (itens/s); provisionadas usam RCU/WCU
+ON_DEMAND_WRITE_RATE = 1000
+ON_DEMAND_READ_RATE = 3000
+BURST_SECONDS = 300  # DynamoDB retém até 5 min de capacidade não usada como burst
+
+# Projeção "estado atual": um item ponteiro por recurso (sort key fixa) mantido
+# na escrita, indexado por um GSI esparso (shard, last_updated)
+LATEST_SORT_KEY = "LATEST"
+LATEST_INDEX_NAME = "latest-updated-index"
+LATEST_SHARDS = 8
+WATERMARK_OVERLAP_SECONDS = 5  # tolera relógios diferentes entre writers
 
 class ThreadSafeResourceCatalog:
     def __init__(self, table_name: str = "ial-state", region: str = "us-east-1"):
@@ -31,74 +53,86 @@ class ThreadSafeResourceCatalog:
         self.dynamodb = boto3.client('dynamodb', config=config)
         self.dynamodb_resource = boto3.resource('dynamodb', config=config)
         
-        # Thread-safe cache with TTL and size limits
-        self._cache = OrderedDict()
+        # Thread-safe cache with TTL and size limits (lock striping por shard)
         self._cache_ttl = 300  # 5 minutes
         self._cache_max_size = 1000  # Prevent memory leaks
-        self._cache_lock = threading.RLock()  # Reentrant lock
-        
-        # Rate limiting for DynamoDB
-        self._rate_limiter = threading.Semaphore(10)  # Max 10 concurrent operations
-        self._last_request_time = {}
-        self._min_request_interval = 0.1  # 100ms between requests
+        self._cache = ShardedLRUCache(max_size=self._cache_max_size, ttl=self._cache_ttl,
+                                      negative_ttl=30)  # "não encontrado" expira antes
         
         # Initialize table
-        self._ensure_table_exists()
+        table_description = self._ensure_table_exists()
+        
+        # Rate limiting adaptativo por capacidade (token bucket por tipo de operação)
+        write_rate, read_rate, burst_seconds = self._initial_rates(table_description)
+        self._write_bucket = AdaptiveTokenBucket(write_rate, burst=write_rate * burst_seconds,
+                                                 min_rate=1, max_rate=write_rate * 4)
+        self._read_bucket = AdaptiveTokenBucket(read_rate, burst=read_rate * burst_seconds,
+                                                min_rate=1, max_rate=read_rate * 4)
+        self._batch = DynamoDBBatchPipeline(
+            self.dynamodb, self.table_name, ('resource_id', 'timestamp'),
+            write_bucket=self._write_bucket, read_bucket=self._read_bucket,
+            concurrency=get_concurrency_limiter('dynamodb')
+        )
+        
+        # Projeção em memória do estado atual + watermark da última leitura
+        self._current: Dict[str, Dict] = {}
+        self._current_versions: Dict[str, str] = {}
+        self._current_lock = threading.RLock()
+        self._current_loaded_at: Optional[float] = None
+        self._watermark = ""
+        self._has_latest_index = self._index_exists(table_description, LATEST_INDEX_NAME)
+        self.projection_stats = {"cold_loads": 0, "incremental_refreshes": 0, "items_read": 0}
     
     def _get_cache_key(self, resource_id: str, operation: str = "get") -> str:
         """Generate cache key"""
         return f"{operation}:{resource_id}"
     
-    def _is_cache_valid(self, cache_entry: Dict) -> bool:
-        """Check if cache entry is still valid"""
-        return time.time() - cache_entry["timestamp"] < self._cache_ttl
-    
     def _get_from_cache(self, cache_key: str) -> Optional[Any]:
         """Thread-safe cache retrieval"""
-        with self._cache_lock:
-            if cache_key in self._cache:
-                entry = self._cache[cache_key]
-                if self._is_cache_valid(entry):
-                    # Move to end (LRU)
-                    self._cache.move_to_end(cache_key)
-                    return entry["data"]
-                else:
-                    # Remove expired entry
-                    del self._cache[cache_key]
-            return None
+        return self._cache.get(cache_key)
     
     def _set_cache(self, cache_key: str, data: Any) -> None:
         """Thread-safe cache storage with size management"""
-        with self._cache_lock:
-            # Remove oldest entries if cache is full
-            while len(self._cache) >= self._cache_max_size:
-                self._cache.popitem(last=False)
-            
-            self._cache[cache_key] = {
-                "data": data,
-                "timestamp": time.time()
-            }
+        self._cache.set(cache_key, data)
     
-    def _rate_limit(self, operation: str) -> None:
-        """Rate limiting for DynamoDB operations"""
-        with self._rate_limiter:
-            current_time = time.time()
-            last_time = self._last_request_time.get(operation, 0)
-            
-            if current_time - last_time < self._min_request_interval:
-                time.sleep(self._min_request_interval - (current_time - last_time))
-            
-            self._last_request_time[operation] = time.time()
+    def _bucket_for(self, operation: str) -> AdaptiveTokenBucket:
+        return self._write_bucket if operation == "write" else self._read_bucket
+    
+    def _rate_limit(self, operation: str, units: float = 1) -> None:
+        """Rate limiting for DynamoDB operations (token bucket, sem lock durante a espera)"""
+        self._bucket_for(operation).acquire(units)
+    
+    def _record_outcome(self, operation: str, error: Optional[Exception] = None) -> None:
+        """Realimenta o limiter: throttling reduz a taxa, sucesso recupera"""
+        bucket = self._bucket_for(operation)
+        if error is None:
+            bucket.on_success()
+        elif is_throttle_error(error):
+            bucket.on_throttle()
+    
+    @staticmethod
+    def _initial_rates(table_description: Optional[Dict]) -> tuple:
+        """Taxas iniciais (escrita, leitura, segundos de burst) pela capacidade da tabela"""
+        table = (table_description or {}).get('Table', {})
+        throughput = table.get('ProvisionedThroughput', {})
+        billing = table.get('BillingModeSummary', {}).get('BillingMode', 'PROVISIONED')
+        write = throughput.get('WriteCapacityUnits') or 0
+        read = throughput.get('ReadCapacityUnits') or 0
+        if billing == 'PAY_PER_REQUEST' or not write or not read:
+            return ON_DEMAND_WRITE_RATE, ON_DEMAND_READ_RATE, 1
+        return write, read, BURST_SECONDS
     
-    def _ensure_table_exists(self):
+    def _ensure_table_exists(self) -> Optional[Dict]:
         """Ensure DynamoDB table exists with proper error handling"""
         try:
-            self.dynamodb.describe_table(TableName=self.table_name)
+            description = self.dynamodb.describe_table(TableName=self.table_name)
             print(f"✅ Table {self.table_name} found")
+            return description
         except ClientError as e:
             if e.response['Error']['Code'] == 'ResourceNotFoundException':
                 print(f"⚠️ Table {self.table_name} not found, creating...")
                 self._create_table()
+                return self.dynamodb.describe_table(TableName=self.table_name)
             else:
                 raise
     
@@ -115,9 +149,12 @@ class ThreadSafeResourceCatalog:
                     {'AttributeName': 'resource_id', 'AttributeType': 'S'},
                     {'AttributeName': 'timestamp', 'AttributeType': 'S'},
                     {'AttributeName': 'resource_type', 'AttributeType': 'S'},
-                    {'AttributeName': 'status', 'AttributeType': 'S'}
+                    {'AttributeName': 'status', 'AttributeType': 'S'},
+                    {'AttributeName': 'latest_shard', 'AttributeType': 'S'},
+                    {'AttributeName': 'last_updated', 'AttributeType': 'S'}
                 ],
                 GlobalSecondaryIndexes=[
+                    self._latest_index_definition(),
                     {
                         'IndexName': 'type-timestamp-index',
                         'KeySchema': [
@@ -145,44 +182,173 @@ class ThreadSafeResourceCatalog:
             print(f"❌ Failed to create table: {e}")
             raise
     
+    @staticmethod
+    def _latest_index_definition() -> Dict:
+        """GSI esparso: só itens ponteiro têm latest_shard"""
+        return {
+            'IndexName': LATEST_INDEX_NAME,
+            'KeySchema': [
+                {'AttributeName': 'latest_shard', 'KeyType': 'HASH'},
+                {'AttributeName': 'last_updated', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'},
+            'ProvisionedThroughput': {
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        }
+    
+    @staticmethod
+    def _index_exists(table_description: Optional[Dict], index_name: str) -> bool:
+        indexes = (table_description or {}).get('Table', {}).get('GlobalSecondaryIndexes', [])
+        return any(index.get('IndexName') == index_name for index in indexes)
+    
+    def ensure_latest_index(self) -> bool:
+        """Adiciona o GSI de estado atual a uma tabela existente (migração)"""
+        description = self.dynamodb.describe_table(TableName=self.table_name)
+        if self._index_exists(description, LATEST_INDEX_NAME):
+            self._has_latest_index = True
+            return False
+        
+        index = self._latest_index_definition()
+        if description['Table'].get('BillingModeSummary', {}).get('BillingMode') == 'PAY_PER_REQUEST':
+            index.pop('ProvisionedThroughput')
+        self.dynamodb.update_table(
+            TableName=self.table_name,
+            AttributeDefinitions=[
+                {'AttributeName': 'latest_shard', 'AttributeType': 'S'},
+                {'AttributeName': 'last_updated', 'AttributeType': 'S'}
+            ],
+            GlobalSecondaryIndexUpdates=[{'Create': index}]
+        )
+        self._has_latest_index = True
+        print(f"✅ Index {LATEST_INDEX_NAME} created on {self.table_name}")
+        return True
+    
+    @staticmethod
+    def _latest_shard(resource_id: str) -> str:
+        return str(zlib.crc32(resource_id.encode()) % LATEST_SHARDS)
+    
+    @classmethod
+    def _build_latest_item(cls, resource_id: str, resource_data: Dict, timestamp: str) -> Dict:
+        """Item ponteiro com a versão atual (sem resource_type, fica fora do type-timestamp-index)"""
+        return {
+            'resource_id': {'S': resource_id},
+            'timestamp': {'S': LATEST_SORT_KEY},
+            'item_kind': {'S': 'latest'},
+            'latest_shard': {'S': cls._latest_shard(resource_id)},
+            'version_timestamp': {'S': timestamp},
+            'status': {'S': resource_data.get('status', 'active')},
+            'metadata': {'S': json.dumps(resource_data)},
+            'last_updated': {'S': timestamp}
+        }
+    
+    @staticmethod
+    def _build_item(resource_id: str, resource_data: Dict, timestamp: str) -> Dict:
+        return {
+            'resource_id': {'S': resource_id},
+            'timestamp': {'S': timestamp},
+            'resource_type': {'S': resource_data.get('type', 'unknown')},
+            'status': {'S': resource_data.get('status', 'active')},
+            'metadata': {'S': json.dumps(resource_data)},
+            'last_updated': {'S': timestamp}
+        }
+    
     def register_resource(self, resource_id: str, resource_data: Dict) -> bool:
         """Thread-safe resource registration"""
         try:
             self._rate_limit("write")
             
             timestamp = datetime.utcnow().isoformat()
-            
-            item = {
-                'resource_id': {'S': resource_id},
-                'timestamp': {'S': timestamp},
-                'resource_type': {'S': resource_data.get('type', 'unknown')},
-                'status': {'S': resource_data.get('status', 'active')},
-                'metadata': {'S': json.dumps(resource_data)},
-                'last_updated': {'S': timestamp}
-            }
+            item = self._build_item(resource_id, resource_data, timestamp)
             
             self.dynamodb.put_item(
                 TableName=self.table_name,
                 Item=item
             )
+            self._put_latest_pointer(resource_id, resource_data, timestamp)
+            self._record_outcome("write")
             
             # Update cache
             cache_key = self._get_cache_key(resource_id)
             self._set_cache(cache_key, resource_data)
+            self._apply_current(resource_id, resource_data, timestamp)
             
             return True
             
         except Exception as e:
+            self._record_outcome("write", e)
             print(f"❌ Failed to register resource {resource_id}: {e}")
             return False
     
+    def _put_latest_pointer(self, resource_id: str, resource_data: Dict, timestamp: str) -> None:
+        """Atualiza o ponteiro só se a versão for mais nova (writers concorrentes)"""
+        self._rate_limit("write")
+        try:
+            self.dynamodb.put_item(
+                TableName=self.table_name,
+                Item=self._build_latest_item(resource_id, resource_data, timestamp),
+                ConditionExpression='attribute_not_exists(version_timestamp) OR version_timestamp <= :ts',
+                ExpressionAttributeValues={':ts': {'S': timestamp}}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+    
+    def register_resources(self, resources: Dict[str, Dict]) -> Dict[str, Any]:
+        """Registro em lote (BatchWriteItem, 25 itens/lote, retry de não processados)
+        
+        Args:
+            resources: {resource_id: resource_data}, ex. saída de uma descoberta
+        
+        Returns:
+            Dict com registered, failed (resource_ids), batches, retries e duration
+        """
+        start = time.time()
+        timestamp = datetime.utcnow().isoformat()
+        items = [self._build_item(rid, data, timestamp) for rid, data in resources.items()]
+        # Ponteiros de estado atual no mesmo pipeline (BatchWriteItem não aceita condição)
+        items += [self._build_latest_item(rid, data, timestamp) for rid, data in resources.items()]
+        
+        result = self._batch.write_items(items)
+        failed = sorted({item['resource_id']['S'] for item in result['failed']})
+        failed_set = set(failed)
+        
+        for resource_id, resource_data in resources.items():
+            if resource_id not in failed_set:
+                self._set_cache(self._get_cache_key(resource_id), resource_data)
+                self._apply_current(resource_id, resource_data, timestamp)
+        
+        if failed:
+            print(f"❌ Failed to register {len(failed)} resources: {result.get('error', 'unprocessed after retries')}")
+        
+        return {
+            "registered": len(resources) - len(failed),
+            "failed": failed,
+            "batches": result['batches'],
+            "retries": result['retries'],
+            "throttles": result['throttles'],
+            "duration": round(time.time() - start, 3)
+        }
+    
+    def get_resource_versions(self, keys: List[tuple]) -> Dict[tuple, Dict]:
+        """Leitura em lote (BatchGetItem) de versões específicas: [(resource_id, timestamp)]"""
+        request_keys = [{'resource_id': {'S': rid}, 'timestamp': {'S': ts}} for rid, ts in keys]
+        result = self._batch.get_items(request_keys)
+        if result['unprocessed']:
+            print(f"⚠️ {len(result['unprocessed'])} versions not retrieved after retries")
+        return {
+            (item['resource_id']['S'], item['timestamp']['S']): json.loads(item['metadata']['S'])
+            for item in result['items']
+        }
+    
     def get_resource(self, resource_id: str) -> Optional[Dict]:
         """Thread-safe resource retrieval with caching"""
         cache_key = self._get_cache_key(resource_id)
         
-        # Check cache first
-        cached_data = self._get_from_cache(cache_key)
-        if cached_data:
+        # Check cache first (inclui cache negativo de recursos inexistentes)
+        found, cached_data = self._cache.lookup(cache_key)
+        if found:
             return cached_data
         
         try:
@@ -204,80 +370,243 @@ class ThreadSafeResourceCatalog:
                 
                 # Cache the result
                 self._set_cache(cache_key, metadata)
+                self._record_outcome("read")
                 
                 return metadata
             
+            self._cache.set_missing(cache_key)
             return None
             
         except Exception as e:
+            self._record_outcome("read", e)
             print(f"❌ Failed to get resource {resource_id}: {e}")
             return None
     
-    def get_all_resources(self) -> Dict[str, Dict]:
-        """Thread-safe retrieval of all resources with caching"""
-        cache_key = "all_resources"
+    def get_resources(self, resource_ids: List[str]) -> Dict[str, Dict]:
+        """Estado atual de vários recursos: cache, BatchGetItem nos ponteiros e Query como fallback"""
+        found, missing = {}, []
+        for resource_id in dict.fromkeys(resource_ids):
+            cached = self._get_from_cache(self._get_cache_key(resource_id))
+            if cached:
+                found[resource_id] = cached
+            else:
+                missing.append(resource_id)
         
-        # Check cache first
-        cached_data = self._get_from_cache(cache_key)
-        if cached_data:
-            return cached_data
+        if missing:
+            keys = [{'resource_id': {'S': rid}, 'timestamp': {'S': LATEST_SORT_KEY}} for rid in missing]
+            for item in self._batch.get_items(keys)['items']:
+                resource_id = item['resource_id']['S']
+                found[resource_id] = json.loads(item['metadata']['S'])
+                self._set_cache(self._get_cache_key(resource_id), found[resource_id])
         
-        try:
-            self._rate_limit("scan")
-            
-            resources = {}
-            
-            # Use paginated scan for large datasets
-            paginator = self.dynamodb.get_paginator('scan')
-            
-            for page in paginator.paginate(TableName=self.table_name):
-                for item in page['Items']:
-                    resource_id = item['resource_id']['S']
-                    metadata = json.loads(item['metadata']['S'])
-                    
-                    # Keep only the latest version of each resource
-                    if resource_id not in resources:
-                        resources[resource_id] = metadata
-                    else:
-                        # Compare timestamps
-                        current_ts = item['timestamp']['S']
-                        existing_ts = resources[resource_id].get('timestamp', '')
-                        if current_ts > existing_ts:
-                            resources[resource_id] = metadata
-            
-            # Cache the result
-            self._set_cache(cache_key, resources)
-            
-            return resources
+        # Recursos gravados antes dos ponteiros existirem
+        for resource_id in missing:
+            if resource_id not in found:
+                metadata = self.get_resource(resource_id)
+                if metadata is not None:
+                    found[resource_id] = metadata
+        return found
+    
+    @staticmethod
+    def _item_version(item: Dict) -> str:
+        """Timestamp da versão de um item (ponteiro ou linha de histórico)"""
+        if 'version_timestamp' in item:
+            return item['version_timestamp']['S']
+        return item['timestamp']['S']
+    
+    def _apply_current(self, resource_id: str, resource_data: Dict, version: str) -> bool:
+        """Atualiza a projeção se a versão não for mais antiga que a conhecida"""
+        with self._current_lock:
+            if self._current_versions.get(resource_id, '') > version:
+                return False
+            self._current[resource_id] = resource_data
+            self._current_versions[resource_id] = version
+            return True
+    
+    def _merge_items(self, items: List[Dict]) -> int:
+        merged = 0
+        for item in items:
+            version = self._item_version(item)
+            if self._apply_current(item['resource_id']['S'], json.loads(item['metadata']['S']), version):
+                merged += 1
+            last_updated = item.get('last_updated', {}).get('S', version)
+            with self._current_lock:
+                if last_updated > self._watermark:
+                    self._watermark = last_updated
+        self.projection_stats["items_read"] += len(items)
+        return merged
+    
+    def _scan_segment(self, segment: int, total_segments: int, params: Dict) -> List[Dict]:
+        kwargs = dict(params, TableName=self.table_name)
+        if total_segments > 1:
+            kwargs.update(Segment=segment, TotalSegments=total_segments)
+        
+        items = []
+        paginator = self.dynamodb.get_paginator('scan')
+        for page in paginator.paginate(**kwargs):
+            # Cada página consome capacidade proporcional aos itens lidos (não aos filtrados)
+            self._rate_limit("scan", max(1, page.get('ScannedCount', len(page['Items'])) * 0.5))
+            items.extend(page['Items'])
+        return items
+    
+    def _parallel_scan(self, segments: int = 1, **params) -> List[Dict]:
+        """Scan segmentado (Segment/TotalSegments) em paralelo para cargas a frio"""
+        if segments <= 1:
+            return self._scan_segment(0, 1, params)
+        with ThreadPoolExecutor(max_workers=segments) as executor:
+            parts = executor.map(lambda seg: self._scan_segment(seg, segments, params), range(segments))
+        return [item for part in parts for item in part]
+    
+    def _query_latest_index(self, since: str = "") -> List[Dict]:
+        """Ponteiros de todos os shards do GSI, opcionalmente só os atualizados após `since`"""
+        def query_shard(shard: int) -> List[Dict]:
+            params = {
+                'TableName': self.table_name,
+                'IndexName': LATEST_INDEX_NAME,
+                'KeyConditionExpression': 'latest_shard = :shard',
+                'ExpressionAttributeValues': {':shard': {'S': str(shard)}}
+            }
+            if since:
+                params['KeyConditionExpression'] += ' AND last_updated > :since'
+                params['ExpressionAttributeValues'][':since'] = {'S': since}
             
+            items = []
+            for page in self.dynamodb.get_paginator('query').paginate(**params):
+                self._rate_limit("read", max(1, len(page['Items']) * 0.5))
+                items.extend(page['Items'])
+            return items
+        
+        with ThreadPoolExecutor(max_workers=LATEST_SHARDS) as executor:
+            parts = executor.map(query_shard, range(LATEST_SHARDS))
+        return [item for part in parts for item in part]
+    
+    def _refresh_since(self) -> str:
+        """Watermark recuado alguns segundos (relógios de writers diferentes)"""
+        with self._current_lock:
+            watermark = self._watermark
+        if not watermark:
+            return ""
+        try:
+            return (datetime.fromisoformat(watermark) - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)).isoformat()
+        except ValueError:
+            return watermark
+    
+    def refresh_current_state(self, parallel_segments: int = 4, full: bool = False) -> Dict[str, Any]:
+        """Atualiza a projeção do estado atual
+        
+        - Carga a frio: GSI de ponteiros (se existir) ou scan segmentado paralelo
+          da tabela inteira (full=True força o scan, inclusive do histórico)
+        - Incremental: apenas ponteiros com last_updated > watermark
+        """
+        start = time.time()
+        with self._current_lock:
+            cold = full or self._current_loaded_at is None
+        
+        if cold:
+            self.projection_stats["cold_loads"] += 1
+            if self._has_latest_index and not full:
+                source, items = "index", self._query_latest_index()
+            else:
+                source, items = "scan", self._parallel_scan(parallel_segments)
+        else:
+            self.projection_stats["incremental_refreshes"] += 1
+            since = self._refresh_since()
+            if self._has_latest_index:
+                source, items = "index", self._query_latest_index(since)
+            else:
+                source, items = "scan", self._parallel_scan(
+                    parallel_segments,
+                    FilterExpression='item_kind = :latest AND last_updated > :since',
+                    ExpressionAttributeValues={':latest': {'S': 'latest'}, ':since': {'S': since}}
+                )
+        
+        merged = self._merge_items(items)
+        with self._current_lock:
+            self._current_loaded_at = time.time()
+            total = len(self._current)
+        
+        return {
+            "mode": "cold" if cold else "incremental",
+            "source": source,
+            "items_read": len(items),
+            "updated": merged,
+            "resources": total,
+            "watermark": self._watermark,
+            "duration": round(time.time() - start, 3)
+        }
+    
+    def get_all_resources(self, parallel_segments: int = 4, refresh: bool = False) -> Dict[str, Dict]:
+        """Thread-safe retrieval of all resources (projeção do estado atual)
+        
+        A primeira chamada carrega a projeção; depois do TTL (ou com refresh=True)
+        só os recursos alterados desde o último watermark são lidos. Escritas deste
+        processo atualizam a projeção diretamente.
+        """
+        with self._current_lock:
+            loaded_at = self._current_loaded_at
+        
+        try:
+            if loaded_at is None or refresh or time.time() - loaded_at > self._cache_ttl:
+                self.refresh_current_state(parallel_segments)
         except Exception as e:
             print(f"❌ Failed to get all resources: {e}")
-            return {}
+            if loaded_at is None:
+                return {}
+        
+        with self._current_lock:
+            return dict(self._current)
+    
+    def backfill_latest_pointers(self, parallel_segments: int = 4) -> Dict[str, Any]:
+        """Migração: cria ponteiros de estado atual a partir do histórico existente"""
+        start = time.time()
+        newest: Dict[str, Dict] = {}
+        pointers: Dict[str, str] = {}
+        for item in self._parallel_scan(parallel_segments):
+            resource_id = item['resource_id']['S']
+            if item['timestamp']['S'] == LATEST_SORT_KEY:
+                pointers[resource_id] = self._item_version(item)
+            elif resource_id not in newest or item['timestamp']['S'] > newest[resource_id]['timestamp']['S']:
+                newest[resource_id] = item
+        
+        missing = [
+            self._build_latest_item(rid, json.loads(item['metadata']['S']), item['timestamp']['S'])
+            for rid, item in newest.items()
+            if pointers.get(rid, '') < item['timestamp']['S']
+        ]
+        result = self._batch.write_items(missing) if missing else {'written': 0, 'failed': []}
+        return {
+            "resources": len(newest),
+            "pointers_written": result['written'],
+            "failed": [item['resource_id']['S'] for item in result['failed']],
+            "duration": round(time.time() - start, 3)
+        }
+    
+    def get_rate_limit_stats(self) -> Dict:
+        """Taxa atual e feedback de throttling dos limiters"""
+        return {
+            operation: {"rate": round(bucket.rate, 2), "max_rate": bucket.max_rate, **bucket.stats}
+            for operation, bucket in (("write", self._write_bucket), ("read", self._read_bucket))
+        }
     
     def cleanup_cache(self) -> None:
         """Manual cache cleanup for memory management"""
-        with self._cache_lock:
-            current_time = time.time()
-            expired_keys = []
-            
-            for key, entry in self._cache.items():
-                if current_time - entry["timestamp"] > self._cache_ttl:
-                    expired_keys.append(key)
-            
-            for key in expired_keys:
-                del self._cache[key]
-            
-            print(f"🧹 Cleaned up {len(expired_keys)} expired cache entries")
+        removed = self._cache.cleanup_expired()
+        print(f"🧹 Cleaned up {removed} expired cache entries")
     
     def get_cache_stats(self) -> Dict:
         """Get cache statistics for monitoring"""
-        with self._cache_lock:
-            return {
-                "cache_size": len(self._cache),
-                "max_size": self._cache_max_size,
-                "ttl_seconds": self._cache_ttl,
-                "hit_ratio": getattr(self, '_cache_hits', 0) / max(getattr(self, '_cache_requests', 1), 1)
-            }
+        stats = self._cache.stats()
+        return {
+            "cache_size": stats["size"],
+            "max_size": self._cache_max_size,
+            "ttl_seconds": self._cache_ttl,
+            "hit_ratio": stats["hit_ratio"],
+            "hits": stats["hits"],
+            "negative_hits": stats["negative_hits"],
+            "misses": stats["misses"],
+            "evictions": stats["evictions"],
+            "shards": stats["per_shard"]
+        }
 
 # Backward compatibility alias
 ResourceCatalog = ThreadSafeResourceCatalog
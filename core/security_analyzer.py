@@ -2,19 +2,32 @@
 """
 Security Analyzer - Análise de segurança via CloudTrail e MCP Well-Architected
 Implementa detecção de ameaças e análise de postura de segurança
+
+A análise de login é feita em uma única passada sobre o fluxo de eventos
+(core.cloudtrail_stream): LookupEvents paginado, export local do CloudTrail
+(IAL_CLOUDTRAIL_EXPORT) ou, sem nenhum dos dois, eventos simulados.
 """
 
+import os
 import json
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Any
+from datetime import datetime, timedelta, timezone
 import hashlib
 
+try:
+    from core.cloudtrail_stream import StreamingLoginAnalyzer, iter_cloudtrail_export, iter_lookup_events
+except ImportError:
+    from cloudtrail_stream import StreamingLoginAnalyzer, iter_cloudtrail_export, iter_lookup_events
+
 class SecurityAnalyzer:
     """Analisador de segurança com CloudTrail e Well-Architected Framework"""
     
-    def __init__(self):
+    def __init__(self, cloudtrail=None, export_path: Optional[str] = None):
         self.mcp_cloudtrail = self._get_cloudtrail_mcp()
         self.mcp_security = self._get_security_mcp()
+        # Fontes reais de eventos (opcionais): cliente boto3 cloudtrail ou export local
+        self.cloudtrail = cloudtrail
+        self.export_path = export_path or os.getenv('IAL_CLOUDTRAIL_EXPORT')
         
         # Padrões de ameaças conhecidas
         self.threat_patterns = {
@@ -72,22 +85,22 @@ class SecurityAnalyzer:
             "recommendations": []
         }
         
-        # Obter eventos de login via CloudTrail
-        login_events = await self._get_login_events(time_window)
+        # Uma única passada sobre os eventos de login (sem materializar a lista)
+        stream = self._new_stream_analyzer()
+        stream.consume(await self._iter_login_events(time_window))
         
         # Análise estatística de logins
-        analysis_result["login_statistics"] = self._analyze_login_statistics(login_events)
+        analysis_result["login_statistics"] = stream.login_statistics()
         
         # Detectar tentativas de brute force
-        brute_force_threats = self._detect_brute_force_attacks(login_events)
-        analysis_result["threats_detected"].extend(brute_force_threats)
+        analysis_result["threats_detected"].extend(stream.brute_force_threats())
         
         # Análise geográfica
-        analysis_result["geographic_analysis"] = self._analyze_geographic_patterns(login_events)
+        analysis_result["geographic_analysis"] = stream.geographic_analysis()
         
         # Detectar acessos incomuns
-        unusual_access = self._detect_unusual_access_patterns(login_events)
-        analysis_result["threats_detected"].extend(unusual_access)
+        analysis_result["threats_detected"].extend(stream.unusual_access_threats())
+        analysis_result["stream_summary"] = stream.summary()
         
         # Calcular security score
         analysis_result["security_score"] = self._calculate_security_score(analysis_result["threats_detected"])
@@ -97,6 +110,22 @@ class SecurityAnalyzer:
         
         return analysis_result
     
+    def _new_stream_analyzer(self) -> StreamingLoginAnalyzer:
+        brute_force = self.threat_patterns['brute_force']
+        return StreamingLoginAnalyzer(brute_force_window=brute_force['time_window'],
+                                      ip_failure_threshold=brute_force['failure_threshold'])
+    
+    async def _iter_login_events(self, hours: int) -> Iterable[Dict]:
+        """Fonte dos eventos: export local > CloudTrail LookupEvents > simulação"""
+        
+        end_time = datetime.now(timezone.utc)
+        start_time = end_time - timedelta(hours=hours)
+        if self.export_path:
+            return iter_cloudtrail_export(self.export_path, start_time=start_time, end_time=end_time)
+        if self.cloudtrail is not None:
+            return iter_lookup_events(self.cloudtrail, start_time, end_time)
+        return await self._get_login_events(hours)
+    
     async def _get_login_events(self, hours: int) -> List[Dict]:
         """Obter eventos de login do CloudTrail"""
         
@@ -152,208 +181,24 @@ class SecurityAnalyzer:
     
     def _analyze_login_statistics(self, events: List[Dict]) -> Dict:
         """Análise estatística dos logins"""
-        
-        total_events = len(events)
-        successful_logins = len([e for e in events if not e.get("ErrorCode")])
-        failed_logins = total_events - successful_logins
-        
-        # Análise por usuário
-        users = {}
-        for event in events:
-            username = event.get("UserIdentity", {}).get("userName", "unknown")
-            if username not in users:
-                users[username] = {"total": 0, "success": 0, "failed": 0}
-            
-            users[username]["total"] += 1
-            if event.get("ErrorCode"):
-                users[username]["failed"] += 1
-            else:
-                users[username]["success"] += 1
-        
-        # Análise por IP
-        ips = {}
-        for event in events:
-            ip = event.get("SourceIPAddress", "unknown")
-            if ip not in ips:
-                ips[ip] = {"total": 0, "success": 0, "failed": 0}
-            
-            ips[ip]["total"] += 1
-            if event.get("ErrorCode"):
-                ips[ip]["failed"] += 1
-            else:
-                ips[ip]["success"] += 1
-        
-        return {
-            "total_events": total_events,
-            "successful_logins": successful_logins,
-            "failed_logins": failed_logins,
-            "failure_rate": round((failed_logins / total_events) * 100, 2) if total_events > 0 else 0,
-            "unique_users": len(users),
-            "unique_ips": len(ips),
-            "top_users": sorted(users.items(), key=lambda x: x[1]["total"], reverse=True)[:5],
-            "top_ips": sorted(ips.items(), key=lambda x: x[1]["total"], reverse=True)[:5]
-        }
+        return StreamingLoginAnalyzer.from_events(events).login_statistics()
     
     def _detect_brute_force_attacks(self, events: List[Dict]) -> List[Dict]:
         """Detectar ataques de força bruta"""
-        
-        threats = []
-        
-        # Agrupar por IP e usuário
-        ip_failures = {}
-        user_failures = {}
-        
-        for event in events:
-            if event.get("ErrorCode"):  # Login falhado
-                ip = event.get("SourceIPAddress")
-                user = event.get("UserIdentity", {}).get("userName")
-                event_time = datetime.fromisoformat(event["EventTime"].replace('Z', '+00:00'))
-                
-                # Contar falhas por IP
-                if ip not in ip_failures:
-                    ip_failures[ip] = []
-                ip_failures[ip].append(event_time)
-                
-                # Contar falhas por usuário
-                if user not in user_failures:
-                    user_failures[user] = []
-                user_failures[user].append(event_time)
-        
-        # Detectar brute force por IP
-        for ip, failure_times in ip_failures.items():
-            if len(failure_times) >= 5:  # 5+ falhas
-                # Verificar se ocorreram em janela de tempo pequena
-                failure_times.sort()
-                time_window = (failure_times[-1] - failure_times[0]).total_seconds()
-                
-                if time_window <= 300:  # 5 minutos
-                    threats.append({
-                        "type": "brute_force_ip",
-                        "severity": "high",
-                        "source_ip": ip,
-                        "failure_count": len(failure_times),
-                        "time_window_seconds": time_window,
-                        "description": f"Brute force attack from IP {ip}: {len(failure_times)} failed attempts in {time_window:.0f} seconds",
-                        "impact": "Potential account compromise, service disruption",
-                        "first_seen": failure_times[0].isoformat(),
-                        "last_seen": failure_times[-1].isoformat()
-                    })
-        
-        # Detectar brute force por usuário
-        for user, failure_times in user_failures.items():
-            if len(failure_times) >= 10:  # 10+ falhas para um usuário
-                failure_times.sort()
-                time_window = (failure_times[-1] - failure_times[0]).total_seconds()
-                
-                threats.append({
-                    "type": "brute_force_user",
-                    "severity": "medium",
-                    "target_user": user,
-                    "failure_count": len(failure_times),
-                    "time_window_seconds": time_window,
-                    "description": f"Multiple failed logins for user {user}: {len(failure_times)} attempts",
-                    "impact": "Account lockout risk, potential credential compromise",
-                    "first_seen": failure_times[0].isoformat(),
-                    "last_seen": failure_times[-1].isoformat()
-                })
-        
-        return threats
+        return self._new_stream_analyzer_from(events).brute_force_threats()
     
     def _analyze_geographic_patterns(self, events: List[Dict]) -> Dict:
         """Análise de padrões geográficos"""
-        
-        # Simular análise geográfica baseada em IPs
-        ip_locations = {
-            "203.0.113.12": {"country": "US", "city": "New York", "org": "Corporate Network"},
-            "1.2.3.4": {"country": "CN", "city": "Beijing", "org": "Unknown"},
-            "185.220.101.42": {"country": "DE", "city": "Frankfurt", "org": "Tor Exit Node"}
-        }
-        
-        geographic_stats = {}
-        suspicious_locations = []
-        
-        for event in events:
-            ip = event.get("SourceIPAddress")
-            location = ip_locations.get(ip, {"country": "Unknown", "city": "Unknown", "org": "Unknown"})
-            
-            country = location["country"]
-            if country not in geographic_stats:
-                geographic_stats[country] = {"count": 0, "ips": set(), "success": 0, "failed": 0}
-            
-            geographic_stats[country]["count"] += 1
-            geographic_stats[country]["ips"].add(ip)
-            
-            if event.get("ErrorCode"):
-                geographic_stats[country]["failed"] += 1
-            else:
-                geographic_stats[country]["success"] += 1
-            
-            # Detectar localizações suspeitas
-            if "Tor" in location["org"] or country in ["CN", "RU", "KP"]:
-                suspicious_locations.append({
-                    "ip": ip,
-                    "country": country,
-                    "city": location["city"],
-                    "organization": location["org"],
-                    "event_time": event["EventTime"],
-                    "user": event.get("UserIdentity", {}).get("userName"),
-                    "success": not bool(event.get("ErrorCode"))
-                })
-        
-        # Converter sets para listas para serialização JSON
-        for country_data in geographic_stats.values():
-            country_data["ips"] = list(country_data["ips"])
-        
-        return {
-            "countries_accessed": list(geographic_stats.keys()),
-            "geographic_distribution": geographic_stats,
-            "suspicious_locations": suspicious_locations,
-            "risk_score": len(suspicious_locations) * 10  # 10 pontos por localização suspeita
-        }
+        return StreamingLoginAnalyzer.from_events(events).geographic_analysis()
     
     def _detect_unusual_access_patterns(self, events: List[Dict]) -> List[Dict]:
         """Detectar padrões de acesso incomuns"""
-        
-        threats = []
-        
-        # Detectar acessos fora do horário comercial
-        business_hours = (9, 17)  # 9 AM - 5 PM
-        
-        for event in events:
-            event_time = datetime.fromisoformat(event["EventTime"].replace('Z', '+00:00'))
-            hour = event_time.hour
-            
-            # Acesso fora do horário comercial
-            if hour < business_hours[0] or hour > business_hours[1]:
-                if not event.get("ErrorCode"):  # Login bem-sucedido
-                    threats.append({
-                        "type": "off_hours_access",
-                        "severity": "low",
-                        "user": event.get("UserIdentity", {}).get("userName"),
-                        "source_ip": event.get("SourceIPAddress"),
-                        "access_time": event["EventTime"],
-                        "description": f"Successful login outside business hours at {hour:02d}:00",
-                        "impact": "Potential unauthorized access, insider threat"
-                    })
-        
-        # Detectar User-Agent suspeitos
-        suspicious_agents = ["curl", "wget", "python", "bot"]
-        
-        for event in events:
-            user_agent = event.get("UserAgent", "")
-            if any(agent in user_agent.lower() for agent in suspicious_agents):
-                threats.append({
-                    "type": "suspicious_user_agent",
-                    "severity": "medium",
-                    "user": event.get("UserIdentity", {}).get("userName"),
-                    "source_ip": event.get("SourceIPAddress"),
-                    "user_agent": user_agent,
-                    "event_time": event["EventTime"],
-                    "description": f"Login attempt with suspicious User-Agent: {user_agent}",
-                    "impact": "Potential automated attack, credential stuffing"
-                })
-        
-        return threats
+        return StreamingLoginAnalyzer.from_events(events).unusual_access_threats()
+    
+    def _new_stream_analyzer_from(self, events: Iterable[Dict]) -> StreamingLoginAnalyzer:
+        stream = self._new_stream_analyzer()
+        stream.consume(events)
+        return stream
     
     def _calculate_security_score(self, threats: List[Dict]) -> int:
         """Calcular score de segurança baseado nas ameaças"""
@@ -5,11 +5,12 @@ Comparação automática, classificação de drift, e auto-remediation
 """
 
 import json
+import re
 import boto3
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
-import hashlib
 import sys
 
 # Add existing components
@@ -18,12 +19,23 @@ sys.path.append(str(Path(__file__).parent))
 
 from resource_catalog import ResourceCatalog
 from advanced_validator import AdvancedValidator
+from drift.property_comparator import PropertyComparator
+from drift.drift_prefilter import DriftRuleEngine, VerdictCache, TriageMetrics, diff_fingerprint
 
 class SmartReconciler:
-    def __init__(self, region: str = "us-east-1"):
+    def __init__(self, region: str = "us-east-1", llm_batch_size: int = 8, llm_max_concurrency: int = 4):
         self.region = region
         self.resource_catalog = ResourceCatalog(region=region)
         self.validator = AdvancedValidator()
+        self.comparator = PropertyComparator()
+        
+        # Triagem determinística antes do LLM
+        self.rule_engine = DriftRuleEngine()
+        self.verdict_cache = VerdictCache()
+        self.triage_metrics = TriageMetrics()
+        self.llm_model_id = 'anthropic.claude-3-haiku-20240307-v1:0'
+        self.llm_batch_size = llm_batch_size
+        self.llm_max_concurrency = llm_max_concurrency
         
         # Initialize Bedrock for AI analysis
         try:
@@ -51,19 +63,104 @@ class SmartReconciler:
     
     def analyze_drift_with_ai(self, desired_resource: Dict, actual_resource: Dict) -> Dict:
         """Analisa drift usando IA (Bedrock)"""
-        if not self.ai_available:
-            return self._fallback_drift_analysis(desired_resource, actual_resource)
+        return self.analyze_drifts_batch([(desired_resource, actual_resource)])[0]
+    
+    def analyze_drifts_batch(self, pairs: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """Analisa vários pares desired/actual em pipeline de triagem
+        
+        1. Regras locais resolvem diffs cosméticos e padrões já classificados
+        2. Veredictos anteriores são reutilizados pelo fingerprint do diff
+        3. Apenas diffs ambíguos vão ao LLM, em lotes e concorrentemente
+        """
+        results: List[Optional[Dict]] = [None] * len(pairs)
+        pending = []
+        
+        for index, (desired, actual) in enumerate(pairs):
+            self.triage_metrics.incr('resources_analyzed')
+            resource_type = desired.get('type', 'unknown')
+            
+            desired_node = self.comparator.canonicalize(desired, resource_type)
+            actual_node = self.comparator.canonicalize(actual, resource_type)
+            changes = []
+            if desired_node.digest != actual_node.digest:
+                changes = self.comparator.compare(desired_node, actual_node, ignore_unspecified=True)
+            
+            verdict = self.rule_engine.classify(resource_type, changes)
+            if verdict:
+                self.triage_metrics.incr('resolved_by_rules')
+                results[index] = self._finalize_verdict(verdict, desired, changes)
+                continue
+            
+            fingerprint = diff_fingerprint(resource_type, changes)
+            cached = self.verdict_cache.get(fingerprint)
+            if cached:
+                self.triage_metrics.incr('cache_hits')
+                results[index] = self._finalize_verdict(dict(cached, cache_hit=True), desired, changes)
+                continue
+            
+            pending.append((index, desired, actual, changes, fingerprint))
+        
+        if pending and not self.ai_available:
+            for index, desired, actual, _, _ in pending:
+                results[index] = self._fallback_drift_analysis(desired, actual)
+        elif pending:
+            # Diffs idênticos na mesma reconciliação são enviados uma única vez
+            unique: Dict[str, Tuple] = {}
+            for item in pending:
+                unique.setdefault(item[4], item)
+            representatives = list(unique.values())
+            
+            self.triage_metrics.incr('sent_to_llm', len(representatives))
+            self.triage_metrics.incr('cache_hits', len(pending) - len(representatives))
+            batches = [representatives[i:i + self.llm_batch_size]
+                       for i in range(0, len(representatives), self.llm_batch_size)]
+            
+            verdicts_by_fingerprint: Dict[str, Optional[Dict]] = {}
+            with ThreadPoolExecutor(max_workers=min(self.llm_max_concurrency, len(batches))) as executor:
+                for batch, verdicts in zip(batches, executor.map(self._analyze_batch_with_ai, batches)):
+                    for item, verdict in zip(batch, verdicts):
+                        verdicts_by_fingerprint[item[4]] = verdict
+                        if verdict is not None:
+                            self.verdict_cache.put(item[4], verdict)
+            
+            for index, desired, actual, changes, fingerprint in pending:
+                verdict = verdicts_by_fingerprint.get(fingerprint)
+                if verdict is None:
+                    results[index] = self._fallback_drift_analysis(desired, actual)
+                else:
+                    results[index] = self._finalize_verdict(verdict, desired, changes)
         
+        return results
+    
+    def get_triage_metrics(self) -> Dict:
+        """Métricas da triagem: resolvidos por regra, cache e chamadas ao LLM"""
+        metrics = self.triage_metrics.snapshot()
+        metrics['verdict_cache_size'] = len(self.verdict_cache)
+        return metrics
+    
+    def _finalize_verdict(self, verdict: Dict, desired: Dict, changes: List[Dict]) -> Dict:
+        """Enriquece um veredicto com dados do recurso analisado"""
+        analysis = dict(verdict)
+        analysis['resource_id'] = desired.get('id', 'unknown')
+        analysis['resource_type'] = desired.get('type', 'unknown')
+        analysis.setdefault('changes', [
+            {'field': c['property'], 'desired': c['desired'], 'actual': c['current']}
+            for c in changes
+        ])
+        analysis['analyzed_at'] = datetime.utcnow().isoformat()
+        return analysis
+    
+    def _analyze_batch_with_ai(self, batch: List[Tuple]) -> List[Optional[Dict]]:
+        """Envia um lote de diffs ambíguos em um único prompt ao Bedrock"""
         try:
-            # Preparar prompt para análise
-            prompt = self._build_drift_analysis_prompt(desired_resource, actual_resource)
+            prompt = self._build_batch_drift_prompt(batch)
+            self.triage_metrics.incr('llm_calls')
             
-            # Chamar Bedrock
             response = self.bedrock.invoke_model(
-                modelId='anthropic.claude-3-haiku-20240307-v1:0',
+                modelId=self.llm_model_id,
                 body=json.dumps({
                     'anthropic_version': 'bedrock-2023-05-31',
-                    'max_tokens': 1000,
+                    'max_tokens': 400 * len(batch) + 200,
                     'messages': [
                         {
                             'role': 'user',
@@ -73,51 +170,45 @@ class SmartReconciler:
                 })
             )
             
-            # Processar resposta
             response_body = json.loads(response['body'].read())
             ai_analysis = response_body['content'][0]['text']
             
-            # Parsear análise estruturada
-            return self._parse_ai_analysis(ai_analysis, desired_resource, actual_resource)
+            return self._parse_batch_ai_analysis(ai_analysis, len(batch))
             
         except Exception as e:
+            self.triage_metrics.incr('llm_failures')
             print(f"⚠️ Erro na análise com IA: {e}")
-            return self._fallback_drift_analysis(desired_resource, actual_resource)
+            return [None] * len(batch)
     
-    def _build_drift_analysis_prompt(self, desired: Dict, actual: Dict) -> str:
-        """Constrói prompt para análise de drift"""
-        return f"""
-Analise as diferenças entre o estado desejado e atual de um recurso AWS.
-
-RECURSO: {desired.get('name', 'Unknown')}
+    def _build_batch_drift_prompt(self, batch: List[Tuple]) -> str:
+        """Constrói prompt com apenas as diferenças de vários recursos"""
+        sections = []
+        for position, (_, desired, _, changes, _) in enumerate(batch):
+            sections.append(f"""
+RECURSO [{position}]: {desired.get('name', 'Unknown')}
 TIPO: {desired.get('type', 'Unknown')}
+DIFERENÇAS (desired vs atual):
+{json.dumps(changes, indent=2, default=str)}
+""")
+        
+        return f"""
+Analise as diferenças entre o estado desejado e atual dos recursos AWS abaixo.
+{''.join(sections)}
+Responda com um array JSON contendo um objeto por recurso, no formato:
 
-ESTADO DESEJADO:
-{json.dumps(desired, indent=2)}
-
-ESTADO ATUAL:
-{json.dumps(actual, indent=2)}
-
-Por favor, forneça uma análise estruturada no seguinte formato JSON:
-
-{{
-    "drift_detected": true/false,
-    "severity": "critical/warning/info",
-    "drift_type": "configuration/security/data/network/metadata",
-    "changes": [
-        {{
-            "field": "nome_do_campo",
-            "desired": "valor_desejado",
-            "actual": "valor_atual",
-            "impact": "descrição_do_impacto"
-        }}
-    ],
-    "recommended_action": "deploy/update/review/ignore",
-    "confidence": 0.0-1.0,
-    "reasoning": "explicação_detalhada",
-    "auto_remediable": true/false,
-    "remediation_steps": ["passo1", "passo2"]
-}}
+[
+    {{
+        "index": 0,
+        "drift_detected": true/false,
+        "severity": "critical/warning/info",
+        "drift_type": "configuration/security/data/network/metadata",
+        "recommended_action": "deploy/update/review/ignore",
+        "confidence": 0.0-1.0,
+        "reasoning": "explicação_detalhada",
+        "auto_remediable": true/false,
+        "remediation_steps": ["passo1", "passo2"]
+    }}
+]
 
 Foque em:
 1. Identificar mudanças significativas vs. mudanças cosméticas
@@ -126,56 +217,39 @@ Foque em:
 4. Determinar se pode ser corrigido automaticamente
 """
     
-    def _parse_ai_analysis(self, ai_response: str, desired: Dict, actual: Dict) -> Dict:
-        """Parseia resposta da IA em formato estruturado"""
+    def _parse_batch_ai_analysis(self, ai_response: str, batch_size: int) -> List[Optional[Dict]]:
+        """Parseia resposta da IA em veredictos alinhados ao lote"""
+        verdicts: List[Optional[Dict]] = [None] * batch_size
         try:
-            # Tentar extrair JSON da resposta
-            import re
-            json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
+            json_match = re.search(r'\[.*\]', ai_response, re.DOTALL)
+            if not json_match:
+                return verdicts
             
-            if json_match:
-                analysis = json.loads(json_match.group())
-                
-                # Validar e enriquecer análise
-                analysis['resource_id'] = desired.get('id', 'unknown')
-                analysis['resource_type'] = desired.get('type', 'unknown')
-                analysis['analyzed_at'] = datetime.utcnow().isoformat()
-                analysis['analysis_method'] = 'ai_bedrock'
-                
-                return analysis
-            else:
-                # Fallback se não conseguir parsear JSON
-                return self._create_basic_analysis(ai_response, desired, actual)
-                
+            for position, analysis in enumerate(json.loads(json_match.group())):
+                if not isinstance(analysis, dict):
+                    continue
+                index = analysis.pop('index', position)
+                if isinstance(index, int) and 0 <= index < batch_size:
+                    analysis['analysis_method'] = 'ai_bedrock'
+                    verdicts[index] = analysis
+                    
         except Exception as e:
             print(f"⚠️ Erro ao parsear análise da IA: {e}")
-            return self._fallback_drift_analysis(desired, actual)
-    
-    def _create_basic_analysis(self, ai_text: str, desired: Dict, actual: Dict) -> Dict:
-        """Cria análise básica a partir de texto da IA"""
-        return {
-            'resource_id': desired.get('id', 'unknown'),
-            'resource_type': desired.get('type', 'unknown'),
-            'drift_detected': True,
-            'severity': 'warning',
-            'drift_type': 'configuration',
-            'recommended_action': 'review',
-            'confidence': 0.5,
-            'reasoning': ai_text,
-            'auto_remediable': False,
-            'analysis_method': 'ai_text_fallback',
-            'analyzed_at': datetime.utcnow().isoformat()
-        }
+        
+        return verdicts
     
     def _fallback_drift_analysis(self, desired: Dict, actual: Dict) -> Dict:
         """Análise de drift sem IA (fallback)"""
         resource_type = desired.get('type', 'unknown')
         
-        # Calcular hash dos metadados para comparação
-        desired_hash = self._calculate_resource_hash(desired)
-        actual_hash = self._calculate_resource_hash(actual)
+        # Comparação canônica (ordem de listas, tags, defaults, intrinsics)
+        desired_node = self.comparator.canonicalize(desired, resource_type)
+        actual_node = self.comparator.canonicalize(actual, resource_type)
+        desired_hash = desired_node.hexdigest
+        actual_hash = actual_node.hexdigest
         
         drift_detected = desired_hash != actual_hash
+        changes = self.comparator.compare(desired_node, actual_node) if drift_detected else []
         
         # Classificar severidade baseada no tipo de recurso
         severity = 'info'
@@ -194,6 +268,10 @@ Foque em:
             'drift_type': 'configuration',
             'recommended_action': 'update' if drift_detected else 'none',
             'confidence': 0.8,
+            'changes': [
+                {'field': c['property'], 'desired': c['desired'], 'actual': c['current']}
+                for c in changes
+            ],
             'reasoning': f"Comparação de hash: desired={desired_hash[:8]}, actual={actual_hash[:8]}",
             'auto_remediable': severity != 'critical',
             'analysis_method': 'hash_comparison',
@@ -201,13 +279,9 @@ Foque em:
         }
     
     def _calculate_resource_hash(self, resource: Dict) -> str:
-        """Calcula hash de um recurso para comparação"""
-        # Remover campos que mudam frequentemente
-        filtered_resource = {k: v for k, v in resource.items() 
-                           if k not in ['timestamp', 'updated_at', 'created_at', 'last_modified']}
-        
-        resource_str = json.dumps(filtered_resource, sort_keys=True)
-        return hashlib.sha256(resource_str.encode()).hexdigest()
+        """Calcula hash canônico de um recurso para comparação"""
+        # Campos voláteis (timestamp, updated_at, ...) são ignorados pelo comparador
+        return self.comparator.fingerprint(resource, resource.get('type'))
     
     def detect_all_drifts(self, desired_spec: Dict) -> List[Dict]:
         """Detecta todos os drifts comparando desired state com recursos deployados"""
@@ -220,6 +294,7 @@ Foque em:
         deployed_resources = {r['resource_id']: r for r in self.resource_catalog.list_resources(status='deployed')}
         
         # Analisar recursos desejados vs deployados
+        pairs_to_analyze = []
         for resource_id, desired in desired_resources.items():
             deployed = deployed_resources.get(resource_id)
             
@@ -238,10 +313,12 @@ Foque em:
                     'analysis_method': 'missing_resource_check'
                 })
             else:
-                # Comparar configurações
-                analysis = self.analyze_drift_with_ai(desired, deployed)
-                if analysis.get('drift_detected'):
-                    drift_results.append(analysis)
+                pairs_to_analyze.append((desired, deployed))
+        
+        # Comparar configurações (regras locais, cache e IA em lote)
+        for analysis in self.analyze_drifts_batch(pairs_to_analyze):
+            if analysis.get('drift_detected'):
+                drift_results.append(analysis)
         
         # Detectar recursos órfãos
         orphaned_resources = set(deployed_resources.keys()) - set(desired_resources.keys())
@@ -260,7 +337,10 @@ Foque em:
                 'analysis_method': 'orphaned_resource_check'
             })
         
-        print(f"📊 Detectados {len(drift_results)} drifts")
+        metrics = self.get_triage_metrics()
+        print(f"📊 Detectados {len(drift_results)} drifts "
+              f"(regras: {metrics['resolved_by_rules']}, cache: {metrics['cache_hits']}, "
+              f"chamadas IA: {metrics['llm_calls']})")
         return drift_results
     
     def classify_drifts_by_priority(self, drifts: List[Dict]) -> Dict[str, List[Dict]]:
@@ -493,7 +573,8 @@ Foque em:
             'drift_analysis': drifts,
             'remediation_plan': remediation_plan,
             'execution_result': execution_result,
-            'recommendations': self._generate_recommendations(drifts)
+            'recommendations': self._generate_recommendations(drifts),
+            'triage_metrics': self.get_triage_metrics()
         }
         
         return report
@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Static Analysis Engine - Análise estática single-pass dos templates de fase
+Cada arquivo é parseado uma única vez em um documento compartilhado, todas as
+regras registradas (IAM, SG, criptografia, WAF, schema, naming) rodam via
+visitor indexado por tipo de recurso, arquivos são processados em um process
+pool e os resultados por arquivo ficam em cache pelo hash do conteúdo.
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    from core.cf_yaml_loader import load_cf_yaml
+except ImportError:
+    from cf_yaml_loader import load_cf_yaml
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_PHASE_SCHEMA = PROJECT_ROOT / 'schemas' / 'phase.schema.json'
+
+# Incrementar quando a semântica do engine mudar (invalida o cache)
+ENGINE_VERSION = 1
+
+# Arquivos de metadados que não são templates
+NON_TEMPLATE_FILES = {'domain-metadata.yaml', 'deployment-order.yaml'}
+
+# Tipo de recurso coringa: regra visita todos os recursos
+ANY_RESOURCE = '*'
+
+
+class TemplateDocument:
+    """Documento parseado uma única vez e compartilhado por todas as regras"""
+
+    def __init__(self, path: str, content: bytes):
+        self.path = str(path)
+        self.content_hash = hashlib.sha256(content).hexdigest()
+        self.parse_error = None
+        try:
+            self.document = load_cf_yaml(content.decode('utf-8'))
+        except Exception as e:
+            self.document = None
+            self.parse_error = str(e)
+        self._by_type = None
+
+    @classmethod
+    def from_document(cls, path: str, document: Any) -> 'TemplateDocument':
+        """Documento já parseado (ex.: um único recurso)"""
+        doc = cls(path, b'')
+        doc.document = document
+        doc.content_hash = None
+        return doc
+
+    @property
+    def kind(self) -> str:
+        """'cloudformation', 'phase' ou 'empty'"""
+        if not isinstance(self.document, dict) or not self.document:
+            return 'empty'
+        if 'Resources' in self.document or 'AWSTemplateFormatVersion' in self.document:
+            return 'cloudformation'
+        return 'phase'
+
+    @property
+    def resources(self) -> Dict[str, Dict]:
+        resources = self.document.get('Resources') if isinstance(self.document, dict) else None
+        return resources if isinstance(resources, dict) else {}
+
+    def resources_of_type(self, *resource_types: str) -> List[tuple]:
+        """Recursos (nome, definição) dos tipos pedidos, via índice por tipo"""
+        if self._by_type is None:
+            self._by_type = {}
+            for name, resource in self.resources.items():
+                if isinstance(resource, dict):
+                    self._by_type.setdefault(resource.get('Type', ''), []).append((name, resource))
+        found = []
+        for resource_type in resource_types:
+            found.extend(self._by_type.get(resource_type, []))
+        return found
+
+
+class AnalysisRule:
+    """Regra base do engine
+
+    resource_types: tipos visitados por check_resource (ANY_RESOURCE = todos)
+    document_kinds: tipos de documento em que a regra roda
+    """
+
+    rule_id = 'base'
+    category = 'policy'
+    version = 1
+    resource_types: Sequence[str] = ()
+    document_kinds: Sequence[str] = ('cloudformation',)
+
+    def signature(self) -> str:
+        return f"{self.rule_id}@{self.version}"
+
+    def prepare(self):
+        """Pré-carrega estado caro (chamado antes de criar o pool de processos)"""
+
+    def check_resource(self, doc: TemplateDocument, name: str, resource: Dict) -> List[Dict]:
+        return []
+
+    def check_template(self, doc: TemplateDocument) -> List[Dict]:
+        return []
+
+    def finding(self, doc: TemplateDocument, finding_type: str, severity: str, message: str,
+                recommendation: str = '', resource: str = None, path: List = None) -> Dict:
+        result = {
+            'rule': self.rule_id,
+            'category': self.category,
+            'type': finding_type,
+            'severity': severity,
+            'file': doc.path,
+            'message': message,
+            'recommendation': recommendation
+        }
+        if resource is not None:
+            result['resource'] = resource
+        if path is not None:
+            result['path'] = path
+        return result
+
+
+def _as_list(value: Any) -> List:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _has_security_exception(properties: Dict, marker: str) -> bool:
+    return any(
+        isinstance(tag, dict) and tag.get('Key') == 'SecurityException' and marker in str(tag.get('Value', ''))
+        for tag in _as_list(properties.get('Tags'))
+    )
+
+
+class IAMWildcardRule(AnalysisRule):
+    """Ações/recursos coringa em policies inline de roles IAM"""
+
+    rule_id = 'iam-wildcards'
+    resource_types = ('AWS::IAM::Role',)
+
+    def check_resource(self, doc, name, resource):
+        findings = []
+        properties = resource.get('Properties') or {}
+
+        for policy in _as_list(properties.get('Policies')):
+            if not isinstance(policy, dict):
+                continue
+            policy_doc = policy.get('PolicyDocument') or {}
+            if not isinstance(policy_doc, dict):
+                continue
+
+            for statement in _as_list(policy_doc.get('Statement')):
+                if not isinstance(statement, dict):
+                    continue
+                actions = _as_list(statement.get('Action'))
+
+                if '*' in actions and not _has_security_exception(properties, 'wildcard-action'):
+                    findings.append(self.finding(
+                        doc, 'IAM_WILDCARD_ACTION', 'HIGH',
+                        'IAM policy contains wildcard (*) action without SecurityException tag',
+                        'Add SecurityException tag or use specific actions', resource=name))
+
+                read_only_identity = any(a in ('sts:GetCallerIdentity', 'sts:GetAccessKeyInfo') for a in actions)
+                for resource_arn in _as_list(statement.get('Resource')):
+                    if resource_arn == '*' and not read_only_identity:
+                        findings.append(self.finding(
+                            doc, 'IAM_WILDCARD_RESOURCE', 'MEDIUM',
+                            'IAM policy uses wildcard (*) resource',
+                            'Specify exact resource ARNs', resource=name))
+
+        return findings
+
+
+class SecurityGroupIngressRule(AnalysisRule):
+    """Security groups abertos para 0.0.0.0/0 ou ::/0"""
+
+    rule_id = 'sg-open-ingress'
+    resource_types = ('AWS::EC2::SecurityGroup',)
+
+    def check_resource(self, doc, name, resource):
+        findings = []
+        properties = resource.get('Properties') or {}
+
+        for rule in _as_list(properties.get('SecurityGroupIngress')):
+            if not isinstance(rule, dict):
+                continue
+            if rule.get('CidrIp') == '0.0.0.0/0' or rule.get('CidrIpv6') == '::/0':
+                if not _has_security_exception(properties, 'public-access'):
+                    findings.append(self.finding(
+                        doc, 'SG_OPEN_TO_WORLD', 'HIGH',
+                        f'Security Group allows access from 0.0.0.0/0 on port {rule.get("FromPort", "all")}',
+                        'Restrict to specific IP ranges or add SecurityException tag', resource=name))
+
+        return findings
+
+
+class EncryptionStandardsRule(AnalysisRule):
+    """Criptografia em repouso de buckets S3 e tabelas DynamoDB"""
+
+    rule_id = 'encryption-standards'
+    resource_types = ('AWS::S3::Bucket', 'AWS::DynamoDB::Table')
+
+    def check_resource(self, doc, name, resource):
+        properties = resource.get('Properties') or {}
+
+        if resource.get('Type') == 'AWS::S3::Bucket':
+            encryption = properties.get('BucketEncryption') or {}
+            if not encryption:
+                return [self.finding(
+                    doc, 'MISSING_ENCRYPTION', 'HIGH', 'S3 bucket lacks encryption configuration',
+                    'Enable SSE-KMS encryption', resource=name)]
+
+            uses_kms = any(
+                isinstance(rule, dict) and
+                (rule.get('ServerSideEncryptionByDefault') or {}).get('SSEAlgorithm') == 'aws:kms'
+                for rule in _as_list(encryption.get('ServerSideEncryptionConfiguration'))
+            )
+            if not uses_kms:
+                return [self.finding(
+                    doc, 'WEAK_ENCRYPTION', 'MEDIUM', 'S3 bucket not using KMS encryption',
+                    'Use SSE-KMS with customer-managed key', resource=name)]
+            return []
+
+        sse_spec = properties.get('SSESpecification') or {}
+        if not sse_spec.get('SSEEnabled'):
+            return [self.finding(
+                doc, 'MISSING_ENCRYPTION', 'HIGH', 'DynamoDB table lacks encryption at rest',
+                'Enable SSE with KMS', resource=name)]
+        return []
+
+
+class WAFCoverageRule(AnalysisRule):
+    """Distribuições CloudFront sem WebACL associada"""
+
+    rule_id = 'waf-coverage'
+
+    def check_template(self, doc):
+        findings = []
+        for name, resource in doc.resources_of_type('AWS::CloudFront::Distribution'):
+            dist_config = (resource.get('Properties') or {}).get('DistributionConfig') or {}
+            if not dist_config.get('WebACLId'):
+                findings.append(self.finding(
+                    doc, 'MISSING_WAF_PROTECTION', 'MEDIUM',
+                    'AWS::CloudFront::Distribution lacks WAF protection',
+                    'Associate with AWS WAF WebACL for security', resource=name))
+        return findings
+
+
+class PhaseSchemaRule(AnalysisRule):
+    """Valida manifestos de fase contra schemas/phase.schema.json"""
+
+    rule_id = 'phase-schema'
+    category = 'phase'
+    document_kinds = ('phase',)
+
+    def __init__(self, schema_path: Optional[str] = None):
+        self.schema_path = str(schema_path or DEFAULT_PHASE_SCHEMA)
+
+    def signature(self) -> str:
+        try:
+            with open(self.schema_path, 'rb') as f:
+                schema_hash = hashlib.sha256(f.read()).hexdigest()[:16]
+        except OSError:
+            schema_hash = 'missing'
+        return f"{self.rule_id}@{self.version}:{schema_hash}"
+
+    def _compiled(self):
+        # Validador compilado uma vez por processo no registro compartilhado
+        try:
+            from core.validators.schema_registry import get_schema_registry
+            return get_schema_registry().load(self.schema_path)
+        except ImportError:
+            return None
+
+    def prepare(self):
+        self._compiled()
+
+    def check_template(self, doc):
+        compiled = self._compiled()
+        if compiled is None:
+            return []
+        return [
+            self.finding(doc, 'PHASE_SCHEMA', 'HIGH', error['message'],
+                         'Adequar o manifesto ao phase.schema.json', path=error['path'])
+            for error in compiled.errors(doc.document)
+        ]
+
+
+class PhaseEnterpriseRule(AnalysisRule):
+    """Regras enterprise de manifestos de fase além do schema"""
+
+    rule_id = 'phase-enterprise'
+    category = 'phase'
+    document_kinds = ('phase',)
+
+    def check_template(self, doc):
+        findings = []
+        metadata = doc.document.get('metadata') or {}
+        outputs_contract = doc.document.get('outputs_contract') or {}
+
+        # Regra 1: nome deve começar com NN-
+        name = str(metadata.get('name', ''))
+        if not (len(name) > 2 and name[:2].isdigit() and name[2] == '-'):
+            findings.append(self.finding(
+                doc, 'PHASE_NAMING', 'HIGH', 'metadata.name deve começar com NN- (ex: 01-networking)',
+                path=['metadata', 'name']))
+
+        # Regra 2: mínimo de 3 pilares Well-Architected
+        if len(_as_list(metadata.get('wa_pillars'))) < 3:
+            findings.append(self.finding(
+                doc, 'PHASE_WA_PILLARS', 'HIGH', 'mínimo de 3 pilares Well-Architected necessários',
+                path=['metadata', 'wa_pillars']))
+
+        # Regra 3: outputs_contract.must_exist obrigatório
+        if len(_as_list(outputs_contract.get('must_exist'))) < 1:
+            findings.append(self.finding(
+                doc, 'PHASE_OUTPUTS_CONTRACT', 'HIGH', 'outputs_contract.must_exist precisa de pelo menos 1 item',
+                path=['outputs_contract', 'must_exist']))
+
+        # Regra 4: tags_must_include deve conter ial:managed
+        if not any('ial:managed' in str(tag) for tag in _as_list(outputs_contract.get('tags_must_include'))):
+            findings.append(self.finding(
+                doc, 'PHASE_TAGS', 'HIGH', "tags_must_include deve conter 'ial:managed'",
+                path=['outputs_contract', 'tags_must_include']))
+
+        return findings
+
+
+class RuleRegistry:
+    """Registro de regras com índice por tipo de recurso"""
+
+    def __init__(self, rules: Optional[Iterable[AnalysisRule]] = None):
+        self.rules: List[AnalysisRule] = []
+        self._by_type: Dict[str, List[AnalysisRule]] = {}
+        for rule in rules or []:
+            self.register(rule)
+
+    def register(self, rule: AnalysisRule) -> AnalysisRule:
+        self.rules.append(rule)
+        for resource_type in rule.resource_types:
+            self._by_type.setdefault(resource_type, []).append(rule)
+        return rule
+
+    def rules_for_type(self, resource_type: str, kind: str) -> List[AnalysisRule]:
+        rules = self._by_type.get(resource_type, []) + self._by_type.get(ANY_RESOURCE, [])
+        return [rule for rule in rules if kind in rule.document_kinds]
+
+    def signature(self) -> str:
+        payload = json.dumps([ENGINE_VERSION] + sorted(rule.signature() for rule in self.rules))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def analyze(self, doc: TemplateDocument) -> List[Dict]:
+        """Roda todas as regras em uma única passada sobre o documento"""
+        if doc.parse_error is not None:
+            return [{
+                'rule': 'parse',
+                'category': 'parse',
+                'type': 'PARSE_ERROR',
+                'severity': 'LOW',
+                'file': doc.path,
+                'message': f'Could not parse file: {doc.parse_error}',
+                'recommendation': 'Check YAML syntax'
+            }]
+
+        kind = doc.kind
+        findings = []
+        if kind == 'cloudformation':
+            for name, resource in doc.resources.items():
+                if not isinstance(resource, dict):
+                    continue
+                for rule in self.rules_for_type(resource.get('Type', ''), kind):
+                    findings.extend(rule.check_resource(doc, name, resource))
+
+        for rule in self.rules:
+            if kind in rule.document_kinds:
+                findings.extend(rule.check_template(doc))
+        return findings
+
+
+def default_registry(schema_path: Optional[str] = None) -> RuleRegistry:
+    """Registro com todas as regras builtin"""
+    return RuleRegistry([
+        IAMWildcardRule(),
+        SecurityGroupIngressRule(),
+        EncryptionStandardsRule(),
+        WAFCoverageRule(),
+        PhaseSchemaRule(schema_path),
+        PhaseEnterpriseRule()
+    ])
+
+
+# Estado por processo do pool de workers
+_worker_registry: Optional[RuleRegistry] = None
+
+
+def _init_worker(registry: RuleRegistry):
+    global _worker_registry
+    _worker_registry = registry
+
+
+def _analyze_in_worker(item: tuple) -> List[Dict]:
+    path, content = item
+    return _worker_registry.analyze(TemplateDocument(path, content))
+
+
+class StaticAnalysisEngine:
+    """Executa o registro de regras sobre arquivos com cache por hash de conteúdo"""
+
+    def __init__(self, registry: Optional[RuleRegistry] = None, cache_file: Optional[str] = None,
+                 max_workers: Optional[int] = None, parallel_threshold: int = 16):
+        self.registry = registry or default_registry()
+        self.cache_file = cache_file
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self._signature = self.registry.signature()
+        self._cache = self._load_cache()
+
+    def _load_cache(self) -> Dict[str, List[Dict]]:
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('signature') != self._signature:
+            return {}
+        return data.get('entries', {})
+
+    def _save_cache(self):
+        if not self.cache_file:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({'signature': self._signature, 'entries': self._cache}, f)
+        os.replace(tmp_file, self.cache_file)
+
+    def analyze_file(self, path) -> List[Dict]:
+        return self.analyze_paths([path])['files'][str(path)]
+
+    def analyze_paths(self, paths: Iterable, categories: Optional[Sequence[str]] = None,
+                      prune: bool = False) -> Dict[str, Any]:
+        """Analisa arquivos; apenas os de conteúdo novo/alterado são re-lintados
+
+        Com prune=True (chamador passou o conjunto completo de templates), o
+        cache mantém só as entradas destes arquivos: templates removidos e
+        versões antigas de arquivos editados saem do cache.
+        """
+        started = time.time()
+        per_file: Dict[str, List[Dict]] = {}
+        pending = []
+        cache_hits = 0
+        seen = set()
+
+        for path in paths:
+            path = str(path)
+            with open(path, 'rb') as f:
+                content = f.read()
+            # Chave inclui o caminho: findings carregam o nome do arquivo
+            key = hashlib.sha256(path.encode() + b'\0' + content).hexdigest()
+            seen.add(key)
+            cached = self._cache.get(key)
+            if cached is not None:
+                per_file[path] = cached
+                cache_hits += 1
+            else:
+                pending.append((key, path, content))
+
+        if pending:
+            items = [(path, content) for _, path, content in pending]
+            if len(pending) >= self.parallel_threshold and self.max_workers > 1:
+                # Workers herdam validadores já compilados (fork)
+                for rule in self.registry.rules:
+                    rule.prepare()
+                with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                         initargs=(self.registry,)) as executor:
+                    results = list(executor.map(_analyze_in_worker, items,
+                                                chunksize=max(1, len(items) // (self.max_workers * 4))))
+            else:
+                results = [self.registry.analyze(TemplateDocument(path, content)) for path, content in items]
+
+            for (key, path, _), findings in zip(pending, results):
+                per_file[path] = findings
+                self._cache[key] = findings
+
+        pruned = 0
+        if prune:
+            stale = [key for key in self._cache if key not in seen]
+            for key in stale:
+                del self._cache[key]
+            pruned = len(stale)
+        if pending or pruned:
+            self._save_cache()
+
+        if categories is not None:
+            per_file = {path: [f for f in findings if f['category'] in categories]
+                        for path, findings in per_file.items()}
+
+        return {
+            'files': per_file,
+            'findings': [finding for findings in per_file.values() for finding in findings],
+            'stats': {
+                'files': len(per_file),
+                'analyzed': len(pending),
+                'cache_hits': cache_hits,
+                'pruned': pruned,
+                'duration_ms': round((time.time() - started) * 1000, 2)
+            }
+        }
+
+
+def discover_phase_files(phases_dir) -> List[Path]:
+    """Lista templates YAML das fases, ignorando arquivos de metadados"""
+    phases_dir = Path(phases_dir)
+    return sorted(
+        f for d in phases_dir.iterdir() if d.is_dir() and not d.name.startswith('.')
+        for f in d.glob('*.yaml') if f.name not in NON_TEMPLATE_FILES
+    )
@@ -11,6 +11,13 @@ from datetime import datetime
 from typing import Dict, Any, Optional
 from dataclasses import dataclass
 
+try:
+    from core import tracing
+    from core.telemetry_sink import get_telemetry_sink
+except ImportError:
+    import tracing
+    from telemetry_sink import get_telemetry_sink
+
 @dataclass
 class TelemetryConfig:
     """Configuração de telemetria"""
@@ -118,17 +125,15 @@ class EnhancedTelemetrySystem:
             self._create_span(event_type, data, request_id)
     
     def _send_to_cloudwatch(self, log_entry: Dict[str, Any]):
-        """Envia log para CloudWatch"""
+        """Enfileira log para CloudWatch (publicado em lote pelo sink em background)"""
         try:
             import time
             
-            self.cloudwatch_client.put_log_events(
-                logGroupName=self.config.log_group_name,
-                logStreamName=f"ial-{datetime.now().strftime('%Y-%m-%d')}",
-                logEvents=[{
-                    'timestamp': int(time.time() * 1000),
-                    'message': json.dumps(log_entry)
-                }]
+            get_telemetry_sink(self.cloudwatch_client.meta.region_name).put_log_event(
+                self.config.log_group_name,
+                f"ial-{datetime.now().strftime('%Y-%m-%d')}",
+                json.dumps(log_entry),
+                int(time.time() * 1000)
             )
         except Exception as e:
             print(f"⚠️ Erro enviando para CloudWatch: {e}")
@@ -156,16 +161,8 @@ class EnhancedTelemetrySystem:
         """Cria span para operação (context manager)"""
         if self.config.opentelemetry_enabled and self.tracer:
             return self.tracer.start_as_current_span(operation_name)
-        else:
-            # Mock context manager se OpenTelemetry não disponível
-            class MockSpan:
-                def __enter__(self):
-                    return self
-                def __exit__(self, *args):
-                    pass
-                def set_attribute(self, key, value):
-                    pass
-            return MockSpan()
+        # Sem OpenTelemetry: span do tracing interno (no-op se IAL_TRACING desligado)
+        return tracing.span(operation_name, category='operation')
 
 # Instância global
 _telemetry_system = None
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Telemetry Sink - Publicação assíncrona e em lote de métricas e logs no CloudWatch
+O caminho quente apenas enfileira: métricas são agregadas em StatisticSets por
+(namespace, métrica, unidade, dimensões, minuto) e eventos de log são acumulados
+por log stream. Uma thread em background descarrega lotes máximos por tamanho ou
+intervalo, com flush final no encerramento do processo. Falhas de envio vão para
+um spool local (JSON lines) reenviado no próximo flush bem-sucedido.
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import boto3
+
+DEFAULT_FLUSH_INTERVAL = float(os.environ.get('IAL_TELEMETRY_FLUSH_INTERVAL', '5'))
+DEFAULT_SPOOL_DIR = os.environ.get(
+    'IAL_TELEMETRY_SPOOL_DIR', os.path.join(os.path.expanduser('~/.ial'), 'telemetry_spool')
+)
+
+# Limites das APIs do CloudWatch
+METRIC_DATA_BATCH = 1000          # PutMetricData: itens de MetricData por chamada
+LOG_EVENTS_BATCH = 10000          # PutLogEvents: eventos por chamada
+LOG_BATCH_BYTES = 1048576         # PutLogEvents: tamanho máximo do lote
+LOG_EVENT_OVERHEAD = 26           # bytes contabilizados por evento
+LOG_BATCH_SPAN_MS = 24 * 3600 * 1000
+
+MetricKey = Tuple[str, str, str, Tuple[Tuple[str, str], ...], int]
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _event_size(message: str) -> int:
+    return len(message.encode('utf-8')) + LOG_EVENT_OVERHEAD
+
+
+class TelemetrySink:
+    """Buffer compartilhado de telemetria com flush em background"""
+
+    def __init__(self, region: Optional[str] = None, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 spool_dir: Optional[str] = DEFAULT_SPOOL_DIR, max_buffered_events: int = 100000,
+                 cloudwatch_client: Any = None, logs_client: Any = None):
+        self.region = region
+        self.flush_interval = flush_interval
+        self.spool_dir = spool_dir
+        self.max_buffered_events = max_buffered_events
+        self._cloudwatch = cloudwatch_client
+        self._logs = logs_client
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._metrics: Dict[MetricKey, Dict[str, float]] = {}
+        self._logs_buffer: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._log_events = 0
+        self._log_bytes = 0
+        self._known_streams = set()
+
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            'metrics_received': 0, 'metric_datums_sent': 0, 'metric_api_calls': 0,
+            'log_events_received': 0, 'log_events_sent': 0, 'log_api_calls': 0,
+            'flushes': 0, 'spooled': 0, 'replayed': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Caminho quente
+    # ------------------------------------------------------------------
+
+    def put_metric(self, namespace: str, metric_name: str, value: float, unit: str = 'Count',
+                   dimensions: Optional[Dict[str, str]] = None, timestamp: Optional[float] = None):
+        """Enfileira um datapoint; agregado com os demais do mesmo minuto"""
+        dims = tuple(sorted((str(k), str(v)) for k, v in (dimensions or {}).items()))
+        minute = int((timestamp if timestamp is not None else time.time()) // 60 * 60)
+        key = (namespace, metric_name, unit, dims, minute)
+        value = float(value)
+
+        with self._lock:
+            self.stats['metrics_received'] += 1
+            stat = self._metrics.get(key)
+            if stat is None:
+                self._metrics[key] = {'SampleCount': 1.0, 'Sum': value, 'Minimum': value, 'Maximum': value}
+            else:
+                stat['SampleCount'] += 1
+                stat['Sum'] += value
+                if value < stat['Minimum']:
+                    stat['Minimum'] = value
+                if value > stat['Maximum']:
+                    stat['Maximum'] = value
+            full = len(self._metrics) >= METRIC_DATA_BATCH
+
+        self._ensure_started()
+        if full:
+            self._wake.set()
+
+    def put_log_event(self, log_group: str, log_stream: str, message: str, timestamp: Optional[int] = None):
+        """Enfileira um evento de log (timestamp em ms)"""
+        event = {'timestamp': timestamp if timestamp is not None else _now_ms(), 'message': message}
+        size = _event_size(message)
+
+        with self._lock:
+            self.stats['log_events_received'] += 1
+            overflow = self._log_events >= self.max_buffered_events
+            if not overflow:
+                self._logs_buffer.setdefault((log_group, log_stream), []).append(event)
+                self._log_events += 1
+                self._log_bytes += size
+            full = self._log_events >= LOG_EVENTS_BATCH or self._log_bytes >= LOG_BATCH_BYTES
+
+        if overflow:
+            # Backpressure: buffer cheio vai direto para o spool local
+            self._spool([{'kind': 'log', 'log_group': log_group, 'log_stream': log_stream, **event}])
+            return
+
+        self._ensure_started()
+        if full:
+            self._wake.set()
+
+    # ------------------------------------------------------------------
+    # Thread de flush
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ial-telemetry-sink', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            self.flush()
+
+    def close(self, timeout: float = 5.0):
+        """Para a thread de background e faz o flush final"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self.flush()
+
+    # ------------------------------------------------------------------
+    # Flush
+    # ------------------------------------------------------------------
+
+    def _drain(self) -> Tuple[Dict[MetricKey, Dict[str, float]], Dict[Tuple[str, str], List[Dict[str, Any]]]]:
+        with self._lock:
+            metrics, self._metrics = self._metrics, {}
+            logs, self._logs_buffer = self._logs_buffer, {}
+            self._log_events = 0
+            self._log_bytes = 0
+        return metrics, logs
+
+    def flush(self) -> Dict[str, int]:
+        """Envia tudo que está no buffer em lotes máximos; falhas vão para o spool"""
+        with self._flush_lock:
+            metrics, logs = self._drain()
+            sent = {'metrics': 0, 'log_events': 0}
+            if not metrics and not logs and not self._has_spool():
+                return sent
+
+            self.stats['flushes'] += 1
+            ok = True
+            if metrics:
+                sent['metrics'], metrics_ok = self._send_metrics(metrics)
+                ok = ok and metrics_ok
+            for (log_group, log_stream), events in logs.items():
+                count, logs_ok = self._send_logs(log_group, log_stream, events)
+                sent['log_events'] += count
+                ok = ok and logs_ok
+
+            # Reenviar o spool apenas quando o CloudWatch está respondendo
+            if ok:
+                self._replay_spool()
+            return sent
+
+    def _metric_datum(self, key: MetricKey, stat: Dict[str, float]) -> Dict[str, Any]:
+        _, metric_name, unit, dims, minute = key
+        datum = {
+            'MetricName': metric_name,
+            'Timestamp': minute,
+            'Unit': unit,
+            'StatisticValues': dict(stat)
+        }
+        if dims:
+            datum['Dimensions'] = [{'Name': name, 'Value': value} for name, value in dims]
+        return datum
+
+    def _send_metrics(self, metrics: Dict[MetricKey, Dict[str, float]]) -> Tuple[int, bool]:
+        by_namespace: Dict[str, List[Tuple[MetricKey, Dict[str, float]]]] = {}
+        for key, stat in metrics.items():
+            by_namespace.setdefault(key[0], []).append((key, stat))
+
+        sent, ok = 0, True
+        for namespace, items in by_namespace.items():
+            for start in range(0, len(items), METRIC_DATA_BATCH):
+                batch = items[start:start + METRIC_DATA_BATCH]
+                try:
+                    self._cloudwatch_client().put_metric_data(
+                        Namespace=namespace,
+                        MetricData=[self._metric_datum(key, stat) for key, stat in batch]
+                    )
+                    self.stats['metric_api_calls'] += 1
+                    self.stats['metric_datums_sent'] += len(batch)
+                    sent += len(batch)
+                except Exception as e:
+                    ok = False
+                    print(f"⚠️ Falha ao publicar métricas ({namespace}), enviando para spool: {e}")
+                    self._spool([{'kind': 'metric', 'namespace': key[0], 'metric_name': key[1],
+                                  'unit': key[2], 'dimensions': dict(key[3]), 'timestamp': key[4],
+                                  'stat': stat} for key, stat in batch])
+        return sent, ok
+
+    @staticmethod
+    def _log_batches(events: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Lotes em ordem cronológica respeitando eventos, bytes e janela de 24h"""
+        batches, batch, size = [], [], 0
+        for event in sorted(events, key=lambda e: e['timestamp']):
+            event_size = _event_size(event['message'])
+            if batch and (len(batch) >= LOG_EVENTS_BATCH or size + event_size > LOG_BATCH_BYTES or
+                          event['timestamp'] - batch[0]['timestamp'] >= LOG_BATCH_SPAN_MS):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(event)
+            size += event_size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _ensure_stream(self, log_group: str, log_stream: str):
+        if (log_group, log_stream) in self._known_streams:
+            return
+        client = self._logs_client()
+        try:
+            client.create_log_stream(logGroupName=log_group, logStreamName=log_stream)
+        except client.exceptions.ResourceAlreadyExistsException:
+            pass
+        except client.exceptions.ResourceNotFoundException:
+            client.create_log_group(logGroupName=log_group)
+            client.create_log_stream(logGroupName=log_group, logStreamName=log_stream)
+        self._known_streams.add((log_group, log_stream))
+
+    def _send_logs(self, log_group: str, log_stream: str, events: List[Dict[str, Any]]) -> Tuple[int, bool]:
+        sent = 0
+        batches = self._log_batches(events)
+        for index, batch in enumerate(batches):
+            try:
+                self._ensure_stream(log_group, log_stream)
+                self._logs_client().put_log_events(
+                    logGroupName=log_group, logStreamName=log_stream, logEvents=batch
+                )
+                self.stats['log_api_calls'] += 1
+                self.stats['log_events_sent'] += len(batch)
+                sent += len(batch)
+            except Exception as e:
+                self._known_streams.discard((log_group, log_stream))
+                print(f"⚠️ Falha ao enviar logs ({log_group}/{log_stream}), enviando para spool: {e}")
+                self._spool([{'kind': 'log', 'log_group': log_group, 'log_stream': log_stream, **event}
+                             for pending in batches[index:] for event in pending])
+                return sent, False
+        return sent, True
+
+    def _cloudwatch_client(self):
+        if self._cloudwatch is None:
+            self._cloudwatch = boto3.client('cloudwatch', region_name=self.region)
+        return self._cloudwatch
+
+    def _logs_client(self):
+        if self._logs is None:
+            self._logs = boto3.client('logs', region_name=self.region)
+        return self._logs
+
+    # ------------------------------------------------------------------
+    # Spool local
+    # ------------------------------------------------------------------
+
+    def _spool_path(self) -> Optional[str]:
+        if not self.spool_dir:
+            return None
+        return os.path.join(self.spool_dir, f"telemetry-{os.getpid()}.jsonl")
+
+    def _spool(self, records: List[Dict[str, Any]]):
+        path = self._spool_path()
+        if not path or not records:
+            return
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            with open(path, 'a') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            with self._lock:
+                self.stats['spooled'] += len(records)
+        except OSError as e:
+            print(f"❌ Erro ao gravar spool de telemetria: {e}")
+
+    def _has_spool(self) -> bool:
+        return bool(self.spool_dir) and bool(glob.glob(os.path.join(self.spool_dir, 'telemetry-*.jsonl')))
+
+    def _replay_spool(self):
+        """Reenfileira registros do spool (deste e de processos anteriores) e reenvia"""
+        if not self.spool_dir:
+            return
+        records = []
+        for path in glob.glob(os.path.join(self.spool_dir, 'telemetry-*.jsonl')):
+            claimed = f"{path}.{os.getpid()}.replay"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue  # outro processo já reivindicou o arquivo
+            with open(claimed) as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+            os.remove(claimed)
+
+        if not records:
+            return
+
+        metrics: Dict[MetricKey, Dict[str, float]] = {}
+        logs: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for record in records:
+            if record.get('kind') == 'metric':
+                dims = tuple(sorted(record.get('dimensions', {}).items()))
+                key = (record['namespace'], record['metric_name'], record['unit'], dims, record['timestamp'])
+                # Vários registros do mesmo minuto (ex.: flushes que falharam em sequência)
+                _merge_stat(metrics, key, record['stat'])
+            elif record.get('kind') == 'log':
+                logs.setdefault((record['log_group'], record['log_stream']), []).append(
+                    {'timestamp': record['timestamp'], 'message': record['message']}
+                )
+
+        self.stats['replayed'] += len(records)
+        if metrics:
+            self._send_metrics(metrics)
+        for (log_group, log_stream), events in logs.items():
+            self._send_logs(log_group, log_stream, events)
+
+
+def _merge_stat(metrics: Dict[MetricKey, Dict[str, float]], key: MetricKey, stat: Dict[str, float]):
+    """Combina StatisticSets como a agregação ao vivo: soma Sum/SampleCount, min/max dos extremos"""
+    current = metrics.get(key)
+    if current is None:
+        metrics[key] = dict(stat)
+        return
+    current['SampleCount'] += stat['SampleCount']
+    current['Sum'] += stat['Sum']
+    current['Minimum'] = min(current['Minimum'], stat['Minimum'])
+    current['Maximum'] = max(current['Maximum'], stat['Maximum'])
+
+
+_sinks: Dict[Optional[str], TelemetrySink] = {}
+_sinks_lock = threading.Lock()
+
+
+def get_telemetry_sink(region: Optional[str] = None) -> TelemetrySink:
+    """Sink compartilhado do processo (um por região), com flush final no atexit"""
+    with _sinks_lock:
+        sink = _sinks.get(region)
+        if sink is None:
+            sink = TelemetrySink(region=region)
+            _sinks[region] = sink
+            atexit.register(sink.close)
+        return sink
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Tracing - Camada leve de spans para o pipeline do IAL
+Decorator + context manager com propagação via contextvars (funciona entre
+tasks asyncio). Desligado por padrão: o custo é um teste de booleano por
+chamada. Quando ligado, spans finalizados vão para exporters: ring buffer em
+memória, arquivo JSONL, Chrome trace (chrome://tracing / Perfetto) e OTLP
+quando o OpenTelemetry estiver instalado.
+"""
+
+import atexit
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+DEFAULT_TRACE_DIR = os.path.join(os.path.expanduser('~/.ial'), 'traces')
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('ial_current_span', default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """Span finalizado ou em andamento (tempos em ns, via perf_counter_ns)"""
+
+    __slots__ = ('tracer', 'name', 'category', 'attributes', 'span_id', 'parent_id', 'trace_id',
+                 'path', 'start_ns', 'wall_start_ns', 'duration_ns', 'error', 'thread_id', '_token')
+
+    def __init__(self, tracer: 'Tracer', name: str, category: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.span_id = next(_span_ids)
+        self.parent_id = None
+        self.trace_id = self.span_id
+        self.path = (name,)
+        self.start_ns = 0
+        self.wall_start_ns = 0
+        self.duration_ns = 0
+        self.error = None
+        self.thread_id = 0
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is not None:
+            self.parent_id = parent.span_id
+            self.trace_id = parent.trace_id
+            self.path = parent.path + (self.name,)
+        self.thread_id = threading.get_ident()
+        self._token = _current_span.set(self)
+        self.wall_start_ns = time.time_ns()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ns = time.perf_counter_ns() - self.start_ns
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Saída em outro contexto (ex.: generator retomado em outra task)
+            _current_span.set(None)
+        self.tracer._finish(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'category': self.category,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'trace_id': self.trace_id,
+            'start_ns': self.start_ns,
+            'wall_start_ns': self.wall_start_ns,
+            'duration_ns': self.duration_ns,
+            'thread_id': self.thread_id,
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+
+class _NoopSpan:
+    """Span compartilhado quando o tracing está desligado"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+# ----------------------------------------------------------------------
+# Exporters
+# ----------------------------------------------------------------------
+
+class RingBufferExporter:
+    """Mantém os últimos N spans em memória"""
+
+    def __init__(self, capacity: int = 10000):
+        self._spans = deque(maxlen=capacity)
+
+    def export(self, span: Span):
+        self._spans.append(span)
+
+    def spans(self) -> List[Span]:
+        return list(self._spans)
+
+    def clear(self):
+        self._spans.clear()
+
+    def shutdown(self):
+        pass
+
+
+class JSONLExporter:
+    """Um span por linha (JSON) em arquivo local"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a')
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def shutdown(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class ChromeTraceExporter:
+    """Chrome Trace Event Format (eventos 'X'), gravado no shutdown"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._events = []
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+
+    def export(self, span: Span):
+        event = {
+            'name': span.name,
+            'cat': span.category,
+            'ph': 'X',
+            'ts': (span.start_ns - self._origin_ns) / 1000,
+            'dur': span.duration_ns / 1000,
+            'pid': os.getpid(),
+            'tid': span.thread_id,
+            'args': dict(span.attributes, **({'error': span.error} if span.error else {}))
+        }
+        with self._lock:
+            self._events.append(event)
+
+    def shutdown(self):
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+
+class OTLPExporter:
+    """Reemite traces completos como spans OpenTelemetry (OTLP se configurado)"""
+
+    def __init__(self, service_name: str = 'ial-system', endpoint: Optional[str] = None):
+        if otel_trace is None:
+            raise ImportError("opentelemetry não instalado")
+        self._provider = None
+        self._tracer = self._build_tracer(service_name, endpoint)
+        self._pending: Dict[int, List[Span]] = {}
+        self._lock = threading.Lock()
+
+    def _build_tracer(self, service_name: str, endpoint: Optional[str]):
+        try:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            # Sem SDK/exporter: usa o provider global já configurado pela aplicação
+            return otel_trace.get_tracer('ial.tracing')
+
+        self._provider = TracerProvider(resource=Resource.create({'service.name': service_name}))
+        self._provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint) if endpoint
+                                                             else OTLPSpanExporter()))
+        return self._provider.get_tracer('ial.tracing')
+
+    def export(self, span: Span):
+        # Filhos terminam antes dos pais: o trace é emitido quando a raiz termina
+        with self._lock:
+            self._pending.setdefault(span.trace_id, []).append(span)
+            if span.parent_id is not None:
+                return
+            spans = self._pending.pop(span.trace_id)
+
+        offset = span.wall_start_ns - span.start_ns
+        otel_spans = {}
+        for item in sorted(spans, key=lambda s: s.start_ns):
+            parent = otel_spans.get(item.parent_id)
+            context = otel_trace.set_span_in_context(parent) if parent is not None else None
+            otel_span = self._tracer.start_span(item.name, context=context, start_time=item.start_ns + offset,
+                                                attributes={k: v for k, v in item.attributes.items()
+                                                            if isinstance(v, (str, int, float, bool))})
+            if item.error:
+                otel_span.set_attribute('error', item.error)
+            otel_spans[item.span_id] = otel_span
+        for item in spans:
+            otel_spans[item.span_id].end(end_time=item.start_ns + offset + item.duration_ns)
+
+    def shutdown(self):
+        if self._provider is not None:
+            self._provider.shutdown()
+
+
+# ----------------------------------------------------------------------
+# Tracer
+# ----------------------------------------------------------------------
+
+class Tracer:
+    """Ponto único de criação de spans; desligado até enable()"""
+
+    def __init__(self):
+        self.enabled = False
+        self.exporters: List[Any] = []
+        self.ring_buffer: Optional[RingBufferExporter] = None
+
+    def enable(self, exporters: Optional[List[Any]] = None, ring_capacity: int = 10000):
+        self.ring_buffer = RingBufferExporter(ring_capacity)
+        self.exporters = [self.ring_buffer] + list(exporters or [])
+        self.enabled = True
+
+    def disable(self):
+        """Desliga e finaliza os exporters (grava arquivos pendentes)"""
+        self.enabled = False
+        for exporter in self.exporters:
+            try:
+                exporter.shutdown()
+            except Exception as e:
+                print(f"⚠️ Erro finalizando exporter de tracing: {e}")
+        self.exporters = []
+
+    def span(self, name: str, category: str = 'internal', **attributes):
+        """Context manager de span (no-op compartilhado quando desligado)"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, category, attributes)
+
+    def traced(self, name: Optional[str] = None, category: str = 'internal') -> Callable:
+        """Decorator para funções sync e async"""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    with Span(self, span_name, category, {}):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with Span(self, span_name, category, {}):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def current_span(self):
+        return _current_span.get() or _NOOP_SPAN
+
+    def _finish(self, span: Span):
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception:
+                pass  # tracing nunca derruba a operação
+
+
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+current_span = tracer.current_span
+
+
+def configure_from_env() -> bool:
+    """Liga o tracing a partir de IAL_TRACING / IAL_TRACE_FILE / IAL_TRACE_OTLP"""
+    if os.environ.get('IAL_TRACING', 'false').lower() not in ('1', 'true', 'yes'):
+        return False
+
+    exporters = []
+    trace_file = os.environ.get('IAL_TRACE_FILE')
+    if trace_file:
+        exporters.append(JSONLExporter(trace_file) if trace_file.endswith('.jsonl')
+                         else ChromeTraceExporter(trace_file))
+    if os.environ.get('IAL_TRACE_OTLP', 'false').lower() in ('1', 'true', 'yes'):
+        try:
+            exporters.append(OTLPExporter(os.environ.get('IAL_SERVICE_NAME', 'ial-system'),
+                                          os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT')))
+        except ImportError:
+            print("⚠️ IAL_TRACE_OTLP ativo mas opentelemetry não está instalado")
+    tracer.enable(exporters)
+    atexit.register(tracer.disable)
+    return True
+
+
+# ----------------------------------------------------------------------
+# Flame summary
+# ----------------------------------------------------------------------
+
+def flame_summary(spans: List[Span]) -> List[Dict[str, Any]]:
+    """Agrega spans por caminho (raiz;filho;...) com tempo total e próprio"""
+    children_ns: Dict[int, int] = {}
+    for item in spans:
+        if item.parent_id is not None:
+            children_ns[item.parent_id] = children_ns.get(item.parent_id, 0) + item.duration_ns
+
+    nodes: Dict[tuple, Dict[str, Any]] = {}
+    for item in spans:
+        node = nodes.setdefault(item.path, {
+            'path': item.path, 'category': item.category, 'count': 0,
+            'total_ns': 0, 'self_ns': 0, 'errors': 0
+        })
+        node['count'] += 1
+        node['total_ns'] += item.duration_ns
+        node['self_ns'] += max(item.duration_ns - children_ns.get(item.span_id, 0), 0)
+        if item.error:
+            node['errors'] += 1
+    return sorted(nodes.values(), key=lambda n: n['path'])
+
+
+def format_flame_summary(spans: List[Span], width: int = 30, min_percent: float = 0.5) -> str:
+    """Árvore de texto com barras proporcionais ao tempo total"""
+    nodes = flame_summary(spans)
+    if not nodes:
+        return "(nenhum span registrado)"
+
+    root_total = sum(n['total_ns'] for n in nodes if len(n['path']) == 1) or 1
+    lines = [f"{'span':<56} {'calls':>6} {'total ms':>10} {'self ms':>10}  %"]
+
+    # Ordem de árvore: irmãos por tempo total decrescente
+    by_parent: Dict[tuple, List[Dict[str, Any]]] = {}
+    for node in nodes:
+        by_parent.setdefault(node['path'][:-1], []).append(node)
+
+    def walk(prefix: tuple):
+        for node in sorted(by_parent.get(prefix, []), key=lambda n: -n['total_ns']):
+            percent = node['total_ns'] * 100 / root_total
+            if percent < min_percent:
+                continue
+            depth = len(node['path']) - 1
+            label = ('  ' * depth + node['path'][-1])[:56]
+            bar = '█' * max(1, int(percent * width / 100))
+            errors = f" ⚠️{node['errors']}" if node['errors'] else ''
+            lines.append(f"{label:<56} {node['count']:>6} {node['total_ns'] / 1e6:>10.2f} "
+                         f"{node['self_ns'] / 1e6:>10.2f}  {percent:5.1f}% {bar}{errors}")
+            walk(node['path'])
+
+    walk(())
+    return "\n".join(lines)
+
+
+def profile(func: Callable, *args, trace_file: Optional[str] = None, name: str = 'profile', **kwargs):
+    """Executa func com tracing ligado; retorna (resultado, spans)"""
+    previous = (tracer.enabled, tracer.exporters, tracer.ring_buffer)
+    exporters = [ChromeTraceExporter(trace_file)] if trace_file else []
+    tracer.enable(exporters)
+    try:
+        with tracer.span(name, category='cli'):
+            result = func(*args, **kwargs)
+        spans = tracer.ring_buffer.spans()
+    finally:
+        for exporter in exporters:
+            exporter.shutdown()
+        tracer.enabled, tracer.exporters, tracer.ring_buffer = previous
+    return result, spans
@@ -4,11 +4,18 @@ Validators package - Validação de contratos e compliance
 
 from .output_contract_validator import OutputContractValidator, ValidationResult, validate_stack_outputs
 from .contract_enforcer import ContractEnforcer, validate_phase_outputs
+from .contract_verification import ContractVerificationEngine
+from .schema_registry import SchemaRegistry, CompiledSchema, get_schema_registry, validate_many
 
 __all__ = [
     'OutputContractValidator',
     'ValidationResult', 
     'validate_stack_outputs',
     'ContractEnforcer',
-    'validate_phase_outputs'
+    'validate_phase_outputs',
+    'ContractVerificationEngine',
+    'SchemaRegistry',
+    'CompiledSchema',
+    'get_schema_registry',
+    'validate_many'
 ]
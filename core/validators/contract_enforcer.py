@@ -7,10 +7,30 @@ import yaml
 from pathlib import Path
 from typing import Dict, Any, List
 from .output_contract_validator import OutputContractValidator, ValidationResult
+from .contract_verification import ContractVerificationEngine
 
 class ContractEnforcer:
-    def __init__(self, region: str = 'us-east-1'):
+    def __init__(self, region: str = 'us-east-1', max_workers: int = 8):
+        self.region = region
+        self.max_workers = max_workers
         self.validator = OutputContractValidator(region)
+        self._verification_engine = None
+    
+    @property
+    def verification_engine(self) -> ContractVerificationEngine:
+        """Engine de verificação em lote (reutiliza os clients do validator)"""
+        if self._verification_engine is None:
+            self._verification_engine = ContractVerificationEngine(
+                self.region,
+                max_workers=self.max_workers,
+                clients={
+                    'cloudformation': self.validator.cf_client,
+                    's3': self.validator.s3_client,
+                    'rds': self.validator.rds_client,
+                    'ssm': self.validator.ssm_client
+                }
+            )
+        return self._verification_engine
         
     def enforce_phase_contract(self, phase_file: str, stack_name: str) -> ValidationResult:
         """Valida contrato de uma phase após deploy"""
@@ -60,18 +80,31 @@ class ContractEnforcer:
                 print(f"⚠️  {warning}")
     
     def validate_pipeline_contracts(self, phases_dir: str, stack_prefix: str) -> Dict[str, ValidationResult]:
-        """Valida contratos de todas as phases de um pipeline"""
+        """Valida contratos de todas as phases de um pipeline (consultas AWS em lote)"""
         results = {}
+        contracts = {}
+        phase_files = {}
         
         phases_path = Path(phases_dir)
-        for phase_file in phases_path.glob("*.yaml"):
+        for phase_file in sorted(phases_path.glob("*.yaml")):
             phase_name = phase_file.stem
-            stack_name = f"{stack_prefix}-{phase_name}"
-            
-            result = self.enforce_phase_contract(str(phase_file), stack_name)
-            results[phase_name] = result
+            phase_files[phase_name] = phase_file
+            contract = self._load_phase_contract(str(phase_file))
+            if not contract:
+                results[phase_name] = ValidationResult(
+                    success=False,
+                    errors=[f"Contrato não encontrado em {phase_file}"],
+                    warnings=[]
+                )
+                continue
+            contracts[phase_name] = (f"{stack_prefix}-{phase_name}", contract)
+        
+        if contracts:
+            results.update(self.verification_engine.verify(contracts))
+            for phase_name, (stack_name, _) in contracts.items():
+                self._log_validation_result(str(phase_files[phase_name]), stack_name, results[phase_name])
             
-        return results
+        return {phase_name: results[phase_name] for phase_name in phase_files}
     
     def block_on_contract_violation(self, result: ValidationResult, phase_name: str) -> bool:
         """Decide se deve bloquear pipeline baseado na violação"""
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Contract Verification Engine - Verificação de contratos de saída em lote
+Coleta todas as consultas AWS necessárias para todas as phases, deduplica,
+executa em paralelo por serviço (com lotes onde a API permite) e avalia os
+contratos a partir dos resultados pré-carregados.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import boto3
+
+from .output_contract_validator import (
+    OutputContractValidator, ValidationResult, classify_encrypted_output, encryption_error
+)
+
+# Limites de lote das APIs
+SSM_GET_PARAMETERS_BATCH = 10
+RDS_FILTER_VALUES_BATCH = 100
+
+
+def _chunks(items: List, size: int) -> List[List]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class ContractVerificationEngine:
+    """Verifica contratos de várias phases com consultas AWS deduplicadas e concorrentes"""
+
+    def __init__(self, region: str = 'us-east-1', max_workers: int = 8,
+                 bulk_describe_threshold: int = 20, clients: Optional[Dict[str, Any]] = None):
+        self.region = region
+        self.max_workers = max_workers
+        self.bulk_describe_threshold = bulk_describe_threshold
+        clients = clients or {}
+        self.cf_client = clients.get('cloudformation') or boto3.client('cloudformation', region_name=region)
+        self.s3_client = clients.get('s3') or boto3.client('s3', region_name=region)
+        self.rds_client = clients.get('rds') or boto3.client('rds', region_name=region)
+        self.ssm_client = clients.get('ssm') or boto3.client('ssm', region_name=region)
+        self.last_stats: Dict[str, Any] = {}
+
+    # ------------------------------------------------------------------
+    # Fase 1: stacks (outputs + tags em uma única consulta por stack)
+    # ------------------------------------------------------------------
+
+    def _describe_one(self, stack_name: str) -> Tuple[str, Any]:
+        try:
+            return stack_name, self.cf_client.describe_stacks(StackName=stack_name)['Stacks'][0]
+        except Exception as e:
+            return stack_name, e
+
+    def _prefetch_stacks(self, stack_names: List[str], executor: ThreadPoolExecutor) -> Dict[str, Any]:
+        if len(stack_names) >= self.bulk_describe_threshold:
+            # Muitos stacks: describe_stacks paginado traz todos em poucas chamadas
+            wanted = set(stack_names)
+            stacks = {}
+            pages = 0
+            for page in self.cf_client.get_paginator('describe_stacks').paginate():
+                pages += 1
+                for stack in page.get('Stacks', []):
+                    if stack['StackName'] in wanted:
+                        stacks[stack['StackName']] = stack
+            for name in wanted - set(stacks):
+                stacks[name] = Exception(f"Stack with id {name} does not exist")
+            self.last_stats['api_calls']['cloudformation:DescribeStacks'] = pages
+            return stacks
+
+        self.last_stats['api_calls']['cloudformation:DescribeStacks'] = len(stack_names)
+        return dict(executor.map(self._describe_one, stack_names))
+
+    # ------------------------------------------------------------------
+    # Fase 2: consultas de criptografia por serviço
+    # ------------------------------------------------------------------
+
+    def _s3_encrypted(self, bucket_name: str) -> Tuple[str, bool]:
+        try:
+            response = self.s3_client.get_bucket_encryption(Bucket=bucket_name)
+            return bucket_name, 'ServerSideEncryptionConfiguration' in response
+        except Exception:
+            # Sem configuração ou erro de acesso: assume não criptografado
+            return bucket_name, False
+
+    def _rds_encrypted(self, identifiers: List[str]) -> Dict[str, bool]:
+        results = {identifier: False for identifier in identifiers}
+        try:
+            paginator = self.rds_client.get_paginator('describe_db_instances')
+            for page in paginator.paginate(Filters=[{'Name': 'db-instance-id', 'Values': identifiers}]):
+                for instance in page.get('DBInstances', []):
+                    results[instance['DBInstanceIdentifier']] = bool(instance.get('StorageEncrypted', False))
+        except Exception:
+            pass
+        return results
+
+    def _ssm_secure(self, names: List[str]) -> Dict[str, bool]:
+        results = {name: False for name in names}
+        try:
+            response = self.ssm_client.get_parameters(Names=names)
+            for parameter in response.get('Parameters', []):
+                results[parameter['Name']] = parameter['Type'] == 'SecureString'
+        except Exception:
+            pass
+        return results
+
+    def _prefetch_encryption(self, lookups: Dict[str, set], executor: ThreadPoolExecutor) -> Dict[str, Dict]:
+        buckets = sorted(lookups['s3'])
+        db_identifiers = sorted(lookups['rds'])
+        parameters = sorted(lookups['ssm'])
+
+        s3_futures = [executor.submit(self._s3_encrypted, bucket) for bucket in buckets]
+        rds_futures = [executor.submit(self._rds_encrypted, batch)
+                       for batch in _chunks(db_identifiers, RDS_FILTER_VALUES_BATCH)]
+        ssm_futures = [executor.submit(self._ssm_secure, batch)
+                       for batch in _chunks(parameters, SSM_GET_PARAMETERS_BATCH)]
+
+        encryption = {'s3': dict(f.result() for f in s3_futures), 'rds': {}, 'ssm': {}}
+        for future in rds_futures:
+            encryption['rds'].update(future.result())
+        for future in ssm_futures:
+            encryption['ssm'].update(future.result())
+
+        self.last_stats['lookups'] = {
+            's3': len(buckets),
+            'rds': len(db_identifiers),
+            'ssm': len(parameters)
+        }
+        self.last_stats['api_calls'].update({
+            's3:GetBucketEncryption': len(s3_futures),
+            'rds:DescribeDBInstances': len(rds_futures),
+            'ssm:GetParameters': len(ssm_futures)
+        })
+        return encryption
+
+    @staticmethod
+    def _lookup_key(service: str, output_value: str) -> str:
+        # Identificador do RDS é o primeiro segmento do endpoint
+        return output_value.split('.')[0] if service == 'rds' else output_value
+
+    # ------------------------------------------------------------------
+    # Avaliação
+    # ------------------------------------------------------------------
+
+    def verify(self, contracts: Dict[str, Tuple[str, Dict[str, Any]]]) -> Dict[str, ValidationResult]:
+        """Verifica contratos {phase: (stack_name, contract)} com consultas em lote"""
+        started = time.time()
+        self.last_stats = {'phases': len(contracts), 'api_calls': {}}
+        results: Dict[str, ValidationResult] = {}
+
+        # Contratos malformados falham antes de qualquer consulta
+        pending = {}
+        for phase, (stack_name, contract) in contracts.items():
+            definition_errors = OutputContractValidator.validate_contract_definition(contract)
+            if definition_errors:
+                results[phase] = ValidationResult(success=False, errors=definition_errors, warnings=[])
+            else:
+                pending[phase] = (stack_name, contract)
+
+        stack_names = sorted({stack_name for stack_name, _ in pending.values()})
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            stacks = self._prefetch_stacks(stack_names, executor) if stack_names else {}
+
+            # Reunir todas as consultas de criptografia, deduplicadas por serviço
+            lookups = {'s3': set(), 'rds': set(), 'ssm': set()}
+            for stack_name, contract in pending.values():
+                stack = stacks.get(stack_name)
+                if isinstance(stack, Exception) or stack is None:
+                    continue
+                outputs = self._outputs(stack)
+                for output_key in contract.get('must_be_encrypted', []):
+                    service = classify_encrypted_output(output_key)
+                    if service and output_key in outputs:
+                        lookups[service].add(self._lookup_key(service, outputs[output_key]))
+
+            encryption = self._prefetch_encryption(lookups, executor)
+
+        for phase, (stack_name, contract) in pending.items():
+            results[phase] = self._evaluate(stack_name, contract, stacks.get(stack_name), encryption)
+
+        self.last_stats['duration_ms'] = round((time.time() - started) * 1000, 2)
+        return results
+
+    @staticmethod
+    def _outputs(stack: Dict) -> Dict[str, str]:
+        return {output['OutputKey']: output['OutputValue'] for output in stack.get('Outputs', [])}
+
+    def _evaluate(self, stack_name: str, contract: Dict[str, Any], stack: Any,
+                  encryption: Dict[str, Dict]) -> ValidationResult:
+        if isinstance(stack, Exception) or stack is None:
+            return ValidationResult(
+                success=False,
+                errors=[f"Erro na validação: Erro ao obter outputs do stack {stack_name}: {stack}"],
+                warnings=[]
+            )
+
+        outputs = self._outputs(stack)
+        errors = OutputContractValidator._validate_required_outputs(outputs, contract)
+
+        for output_key in contract.get('must_be_encrypted', []):
+            service = classify_encrypted_output(output_key)
+            if not service or output_key not in outputs:
+                continue
+            output_value = outputs[output_key]
+            if not encryption[service].get(self._lookup_key(service, output_value), False):
+                errors.append(encryption_error(service, output_value))
+
+        stack_tags = {tag['Key'] for tag in stack.get('Tags', [])}
+        for required_tag in contract.get('tags_must_include', []):
+            if required_tag not in stack_tags:
+                errors.append(f"Tag obrigatória '{required_tag}' não encontrada no stack")
+
+        return ValidationResult(success=len(errors) == 0, errors=errors, warnings=[])
@@ -8,12 +8,36 @@ import json
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 
+try:
+    from .schema_registry import get_schema_registry
+except ImportError:
+    get_schema_registry = None
+
 @dataclass
 class ValidationResult:
     success: bool
     errors: List[str]
     warnings: List[str]
 
+def classify_encrypted_output(output_key: str) -> Optional[str]:
+    """Serviço ('s3', 'rds', 'ssm') inferido do nome do output que deve ser criptografado"""
+    key = output_key.lower()
+    if key.endswith('bucketname') or 'bucket' in key:
+        return 's3'
+    if key.endswith('dbendpoint') or 'database' in key:
+        return 'rds'
+    if key.endswith('parameter') or 'param' in key:
+        return 'ssm'
+    return None
+
+def encryption_error(service: str, output_value: str) -> str:
+    """Mensagem de violação de criptografia por serviço"""
+    return {
+        's3': f"S3 bucket '{output_value}' não está criptografado",
+        'rds': f"RDS instance '{output_value}' não está criptografado",
+        'ssm': f"SSM Parameter '{output_value}' não é SecureString"
+    }[service]
+
 class OutputContractValidator:
     def __init__(self, region: str = 'us-east-1'):
         self.region = region
@@ -27,6 +51,11 @@ class OutputContractValidator:
         errors = []
         warnings = []
         
+        # 0. Validar o formato do contrato antes de chamar a AWS
+        contract_errors = self.validate_contract_definition(contract)
+        if contract_errors:
+            return ValidationResult(success=False, errors=contract_errors, warnings=warnings)
+        
         try:
             # 1. Obter outputs do stack
             stack_outputs = self._get_stack_outputs(stack_name)
@@ -56,6 +85,20 @@ class OutputContractValidator:
                 warnings=[]
             )
     
+    @staticmethod
+    def validate_contract_definition(contract: Dict[str, Any]) -> List[str]:
+        """Valida o contrato contra outputs_contract do phase.schema.json (validador compilado)"""
+        if get_schema_registry is None:
+            return []
+        try:
+            compiled = get_schema_registry().get('phase', 'properties/outputs_contract')
+        except (ImportError, OSError):
+            return []
+        return [
+            f"Contrato inválido em '{'.'.join(str(p) for p in error['path']) or 'outputs_contract'}': {error['message']}"
+            for error in compiled.errors(contract)
+        ]
+    
     def _get_stack_outputs(self, stack_name: str) -> Dict[str, str]:
         """Obtém outputs do CloudFormation stack"""
         try:
@@ -71,7 +114,8 @@ class OutputContractValidator:
         except Exception as e:
             raise Exception(f"Erro ao obter outputs do stack {stack_name}: {str(e)}")
     
-    def _validate_required_outputs(self, outputs: Dict[str, str], contract: Dict[str, Any]) -> List[str]:
+    @staticmethod
+    def _validate_required_outputs(outputs: Dict[str, str], contract: Dict[str, Any]) -> List[str]:
         """Valida se todos os outputs obrigatórios existem"""
         errors = []
         required = contract.get('must_exist', [])
@@ -96,17 +140,18 @@ class OutputContractValidator:
             output_value = outputs[output_key]
             
             # Detectar tipo de recurso e validar criptografia
-            if output_key.lower().endswith('bucketname') or 'bucket' in output_key.lower():
+            service = classify_encrypted_output(output_key)
+            if service == 's3':
                 if not self._validate_s3_encryption(output_value):
-                    errors.append(f"S3 bucket '{output_value}' não está criptografado")
+                    errors.append(encryption_error(service, output_value))
                     
-            elif output_key.lower().endswith('dbendpoint') or 'database' in output_key.lower():
+            elif service == 'rds':
                 if not self._validate_rds_encryption(output_value):
-                    errors.append(f"RDS instance '{output_value}' não está criptografado")
+                    errors.append(encryption_error(service, output_value))
                     
-            elif output_key.lower().endswith('parameter') or 'param' in output_key.lower():
+            elif service == 'ssm':
                 if not self._validate_ssm_encryption(output_value):
-                    errors.append(f"SSM Parameter '{output_value}' não é SecureString")
+                    errors.append(encryption_error(service, output_value))
                     
         return errors
     
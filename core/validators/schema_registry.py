@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Schema Registry - Validadores JSON-Schema compilados uma única vez
+Cada schema de schemas/ é compilado uma vez por processo (fastjsonschema
+quando disponível, jsonschema como fallback) e reutilizado entre arquivos;
+validate_many valida lotes de documentos com métricas de tempo.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import fastjsonschema
+    FASTJSONSCHEMA_AVAILABLE = True
+except ImportError:
+    fastjsonschema = None
+    FASTJSONSCHEMA_AVAILABLE = False
+
+try:
+    from jsonschema.validators import validator_for
+    JSONSCHEMA_AVAILABLE = True
+except ImportError:
+    validator_for = None
+    JSONSCHEMA_AVAILABLE = False
+
+SCHEMAS_DIR = Path(__file__).parent.parent.parent / 'schemas'
+
+
+def schema_digest(schema: Dict) -> str:
+    """Hash canônico de um schema (chave do cache de compilação)"""
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+
+class FastValidationError:
+    """Erro do fastjsonschema com os atributos usados de jsonschema.ValidationError"""
+
+    def __init__(self, message: str, path: List[Any]):
+        self.message = message
+        self.path = path
+
+    def __str__(self) -> str:
+        return self.message
+
+
+class CompiledSchema:
+    """Schema compilado: checagem rápida de validade + erros detalhados sob demanda"""
+
+    def __init__(self, schema: Dict, name: Optional[str] = None):
+        self.schema = schema
+        self.name = name or schema.get('title', 'schema')
+        self.digest = schema_digest(schema)
+        self._fast = None
+        self._validator = None
+
+        if JSONSCHEMA_AVAILABLE:
+            validator_cls = validator_for(schema)
+            validator_cls.check_schema(schema)
+            self._validator = validator_cls(schema)
+        if FASTJSONSCHEMA_AVAILABLE:
+            try:
+                self._fast = fastjsonschema.compile(schema)
+            except Exception:
+                # Recursos de schema não suportados pelo gerador de código
+                self._fast = None
+
+        if self._fast is None and self._validator is None:
+            raise ImportError("jsonschema ou fastjsonschema necessário para validação de schema")
+
+    @property
+    def backend(self) -> str:
+        return 'fastjsonschema' if self._fast is not None else 'jsonschema'
+
+    def is_valid(self, document: Any) -> bool:
+        if self._fast is not None:
+            try:
+                self._fast(document)
+                return True
+            except fastjsonschema.JsonSchemaException:
+                return False
+        return self._validator.is_valid(document)
+
+    def iter_errors(self, document: Any):
+        """Erros no formato jsonschema (ValidationError)
+
+        Só com fastjsonschema: no máximo um erro (o gerador para no primeiro).
+        """
+        if self._validator is None:
+            return iter(self._fast_errors(document))
+        return self._validator.iter_errors(document)
+
+    def _fast_errors(self, document: Any) -> List[FastValidationError]:
+        try:
+            self._fast(document)
+        except fastjsonschema.JsonSchemaValueException as e:
+            return [FastValidationError(e.message, list(e.path or [])[1:])]
+        return []
+
+    def errors(self, document: Any) -> List[Dict]:
+        """Lista de erros {'message', 'path'}; vazia se o documento é válido"""
+        # Caminho rápido: documentos válidos não pagam a coleta de erros
+        if self.is_valid(document):
+            return []
+        return [{'message': e.message, 'path': list(e.path)} for e in self.iter_errors(document)]
+
+
+class SchemaRegistry:
+    """Registro de schemas compilados, compartilhado por todo o processo"""
+
+    def __init__(self, schemas_dir: Optional[str] = None):
+        self.schemas_dir = Path(schemas_dir) if schemas_dir else SCHEMAS_DIR
+        self._compiled: Dict[str, CompiledSchema] = {}
+        self._by_name: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.compilations = 0
+
+    def compile(self, schema: Dict, name: Optional[str] = None) -> CompiledSchema:
+        """Compila o schema (ou reutiliza o compilado com o mesmo digest)"""
+        digest = schema_digest(schema)
+        compiled = self._compiled.get(digest)
+        if compiled is not None:
+            return compiled
+        with self._lock:
+            compiled = self._compiled.get(digest)
+            if compiled is None:
+                compiled = CompiledSchema(schema, name)
+                self._compiled[digest] = compiled
+                self.compilations += 1
+        return compiled
+
+    def load(self, schema_path, pointer: Optional[str] = None) -> CompiledSchema:
+        """Compila um schema a partir de arquivo, opcionalmente um fragmento ('properties/x')"""
+        key = f"{Path(schema_path).resolve()}#{pointer or ''}"
+        digest = self._by_name.get(key)
+        if digest is not None and digest in self._compiled:
+            return self._compiled[digest]
+
+        with open(schema_path, 'r', encoding='utf-8') as f:
+            schema = json.load(f)
+        if pointer:
+            for part in pointer.strip('/').split('/'):
+                schema = schema[part]
+
+        compiled = self.compile(schema, name=key)
+        self._by_name[key] = compiled.digest
+        return compiled
+
+    def get(self, name: str, pointer: Optional[str] = None) -> CompiledSchema:
+        """Schema pelo nome em schemas/ (ex.: 'phase' -> phase.schema.json)"""
+        return self.load(self.schemas_dir / f"{name}.schema.json", pointer)
+
+    def available(self) -> List[str]:
+        return sorted(p.name[:-len('.schema.json')] for p in self.schemas_dir.glob('*.schema.json'))
+
+    def warm(self):
+        """Pré-compila todos os schemas (antes de criar um pool de processos)"""
+        for name in self.available():
+            self.get(name)
+
+    def validate_many(self, schema, documents: Iterable[Any], pointer: Optional[str] = None) -> Dict[str, Any]:
+        """Valida um lote de documentos com o mesmo validador compilado"""
+        started = time.perf_counter()
+        if isinstance(schema, CompiledSchema):
+            compiled = schema
+        elif isinstance(schema, dict):
+            compiled = self.compile(schema)
+        else:
+            compiled = self.get(schema, pointer)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        results = []
+        invalid = 0
+        for document in documents:
+            errors = compiled.errors(document)
+            if errors:
+                invalid += 1
+            results.append({'valid': not errors, 'errors': errors})
+
+        total_ms = (time.perf_counter() - started) * 1000
+        return {
+            'results': results,
+            'stats': {
+                'schema': compiled.name,
+                'backend': compiled.backend,
+                'documents': len(results),
+                'invalid': invalid,
+                'compile_ms': round(compile_ms, 3),
+                'duration_ms': round(total_ms, 3),
+                'docs_per_second': round(len(results) / (total_ms / 1000), 1) if total_ms else None
+            }
+        }
+
+
+_registry: Optional[SchemaRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_schema_registry() -> SchemaRegistry:
+    """Registro global do processo (workers herdam os schemas já compilados via fork)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SchemaRegistry()
+    return _registry
+
+
+def validate_many(schema, documents: Iterable[Any], pointer: Optional[str] = None) -> Dict[str, Any]:
+    """Atalho para get_schema_registry().validate_many"""
+    return get_schema_registry().validate_many(schema, documents, pointer)
@@ -45,6 +45,24 @@ class ContextEngine:
         result = "\n".join(context_parts) if context_parts else ""
         return result
     
+    def get_context_items(self, user_query: str, history_limit: int = 50) -> Dict:
+        """Histórico (cronológico) e mensagens relacionadas como itens para o ContextAssembler"""
+        messages = self.memory.get_recent_context(limit=history_limit)
+        if any('timestamp' in msg for msg in messages):
+            messages = sorted(messages, key=lambda msg: str(msg.get('timestamp', '')))
+        
+        related = []
+        if self.embeddings.available:
+            similar = self.embeddings.find_similar_conversations(user_query, messages, limit=3)
+            recent = messages[-8:]
+            related = [msg for msg in similar if msg not in recent]
+        
+        return {
+            'history': [{'role': msg['role'], 'content': msg['content']} for msg in messages],
+            'memory': [{'content': msg['content'], 'score': float(msg.get('similarity', 0.5))} for msg in related],
+            'conversation_id': f"{self.memory.user_id}:all"
+        }
+    
     def save_interaction(self, user_input: str, assistant_response: str, metadata: Dict = None):
         """Salva interação completa"""
         # Salvar input do usuário
@@ -237,6 +237,11 @@ def delete_specific_phase(phase):
 def main():
     """Main entry point - CLI commands + conversational interface"""
     
+    # Tracing opcional (IAL_TRACING=1, IAL_TRACE_FILE=...)
+    from core.tracing import configure_from_env, tracer
+    if not tracer.enabled:
+        configure_from_env()
+    
     if len(sys.argv) > 1:
         command = sys.argv[1]
         
@@ -255,6 +260,10 @@ def main():
             # Remove 'destroy' from sys.argv and call destroy main
             sys.argv = ['ialctl'] + sys.argv[2:]
             return destroy_main()
+        elif command == 'ledger':
+            # Decision ledger queries (indexed)
+            from core.ledger_store import main as ledger_main
+            return ledger_main(sys.argv[2:])
         elif command == 'ci':
             # IAL CI Mode
             from core.ci_mode import main as ci_main
@@ -273,12 +282,28 @@ def main():
             return show_status()
         elif command == 'logs':
             return show_logs()
+        elif command == 'profile' and len(sys.argv) > 2:
+            return run_profile(sys.argv[2:])
         elif command == '--help' or command == '-h':
             return show_help()
     
     # Modo interativo conversacional (padrão)
     return run_interactive_mode()
 
+def run_profile(command_args: List[str]) -> int:
+    """Executa um comando do ialctl com tracing ligado e mostra o flame summary"""
+    import time
+    from core.tracing import DEFAULT_TRACE_DIR, format_flame_summary, profile
+
+    trace_file = os.path.join(DEFAULT_TRACE_DIR, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    sys.argv = ['ialctl'] + command_args
+    result, spans = profile(main, trace_file=trace_file, name=f"ialctl {' '.join(command_args)}")
+
+    print("\n🔥 Profile:")
+    print(format_flame_summary(spans))
+    print(f"\n📄 Chrome trace: {trace_file} (abrir em chrome://tracing ou ui.perfetto.dev)")
+    return result
+
 def list_phases():
     """Lista todas as fases disponíveis"""
     try:
@@ -352,11 +377,15 @@ COMANDOS CLI:
     ialctl ci drift         Detectar drift de infraestrutura
     ialctl ci mcp-test      Testar conectividade MCP
     ialctl ci test          Executar testes rápidos (< 5s)
+  ialctl ledger <subcomando> Consultar o decision ledger
+    ialctl ledger query --phase X --since 24h  Decisões por phase/status/período
+    ialctl ledger stats     Segmentos e tamanho do ledger
   ialctl list-phases        Lista todas as fases disponíveis
   ialctl deploy <fase>      Deploy uma fase específica (com conversão IAL)
   ialctl delete <fase>      Excluir uma fase específica (todos os stacks)
   ialctl status             Status do sistema
   ialctl logs               Logs recentes
+  ialctl profile <comando>  Executa comando com tracing e mostra flame summary
   ialctl --help             Esta ajuda
 
 MODO INTERATIVO:
@@ -28,8 +28,16 @@ def handler(event, context):
             "auto_heal_results": {...},
             "drift_detection_time": timestamp
         }
+    
+    Modo incremental:
+        - Eventos EventBridge "AWS API Call via CloudTrail" marcam recursos no dirty-set
+        - {"mode": "incremental"} (agendado) re-verifica apenas recursos sujos,
+          com varredura completa a cada DRIFT_FULL_SWEEP_HOURS
     """
     
+    if event.get('detail-type') == 'AWS API Call via CloudTrail' or event.get('mode') == 'incremental':
+        return _handle_incremental(event)
+    
     # Extrair body do Payload (Step Functions invoke retorna Payload)
     try:
         deployment_payload = event.get('deployment_result', {}).get('Payload', {})
@@ -153,3 +161,100 @@ def _is_safe_drift(drift: dict) -> bool:
     
     return (drift_type in safe_types or 
             resource_type in safe_resources and drift_type != 'DELETED')
+
+def _get_incremental_detector():
+    """Cria detector incremental com dirty-set persistente entre invocações
+
+    O dirty-set precisa ser compartilhado entre ambientes de execução: um arquivo
+    em /tmp é privado de cada ambiente e some na reciclagem, perdendo marcações.
+    """
+    from core.drift.incremental_drift import DynamoDBDirtySet, IncrementalDriftDetector, check_resource_drift_cfn
+    
+    region = os.environ.get('AWS_REGION', 'us-east-1')
+    table_name = os.environ.get('DRIFT_DIRTY_SET_TABLE')
+    if not table_name:
+        raise RuntimeError("DRIFT_DIRTY_SET_TABLE is required for incremental drift detection in Lambda")
+    dirty_set = DynamoDBDirtySet(table_name, region=region)
+    
+    cf_client = boto3.client('cloudformation', region_name=region)
+    return IncrementalDriftDetector(
+        dirty_set,
+        check_resource=lambda resource: check_resource_drift_cfn(resource, cf_client),
+        full_sweep=lambda: _full_sweep_stacks(cf_client),
+        full_sweep_interval=int(float(os.environ.get('DRIFT_FULL_SWEEP_HOURS', '24')) * 3600)
+    )
+
+def _handle_incremental(event):
+    """Registra eventos CloudTrail ou executa ciclo incremental de drift"""
+    detector = _get_incremental_detector()
+    
+    if event.get('detail-type') == 'AWS API Call via CloudTrail':
+        resources = detector.record_event(event)
+        return {
+            "statusCode": 200,
+            "body": {
+                "drift_status": "event_recorded" if resources else "event_ignored",
+                "resources_marked": [r['resource_id'] for r in resources],
+                "event_name": event.get('detail', {}).get('eventName')
+            }
+        }
+    
+    result = detector.run(force_full=bool(event.get('force_full_sweep')))
+    drifts = result['drifts']
+    return {
+        "statusCode": 200,
+        "body": {
+            "drift_status": "drift_detected" if drifts else "no_drift",
+            "mode": result['mode'],
+            "drifted_resources": drifts,
+            "resources_checked": result['resources_checked'],
+            "max_time_to_detect_seconds": result.get('max_time_to_detect_seconds'),
+            "drift_detection_time": int(time.time())
+        },
+        "correlation_id": event.get('correlation_id')
+    }
+
+def _full_sweep_stacks(cf_client, poll_interval: float = 5.0, max_wait: float = 600.0) -> list:
+    """Varredura completa de baixa frequência sobre os stacks IAL
+    
+    Dispara detect_stack_drift em todos os stacks e espera cada detecção
+    terminar; levanta erro se alguma não concluir, para que o dirty-set não
+    seja limpo com base em um status antigo.
+    """
+    detections = {}
+    paginator = cf_client.get_paginator('describe_stacks')
+    for page in paginator.paginate():
+        for stack in page.get('Stacks', []):
+            if stack['StackName'].startswith('ial-'):
+                detections[stack['StackName']] = cf_client.detect_stack_drift(
+                    StackName=stack['StackName']
+                )['StackDriftDetectionId']
+    
+    drifts, incomplete = [], []
+    deadline = time.time() + max_wait
+    pending = dict(detections)
+    while pending:
+        for stack_name, detection_id in list(pending.items()):
+            status = cf_client.describe_stack_drift_detection_status(StackDriftDetectionId=detection_id)
+            if status['DetectionStatus'] == 'DETECTION_IN_PROGRESS':
+                continue
+            del pending[stack_name]
+            if status['DetectionStatus'] == 'DETECTION_FAILED':
+                incomplete.append(f"{stack_name}: {status.get('DetectionStatusReason', 'failed')}")
+            if status.get('StackDriftStatus') == 'DRIFTED':
+                drifts.append({
+                    'resource_id': stack_name,
+                    'resource_type': 'AWS::CloudFormation::Stack',
+                    'drift_detected': True,
+                    'drift_status': 'DRIFTED',
+                    'drifted_resources': status.get('DriftedStackResourceCount', 0)
+                })
+        if pending:
+            if time.time() >= deadline:
+                incomplete.extend(f"{name}: timed out" for name in pending)
+                break
+            time.sleep(poll_interval)
+    
+    if incomplete:
+        raise RuntimeError(f"Full drift sweep incomplete: {'; '.join(incomplete)}")
+    return drifts
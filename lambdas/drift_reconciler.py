@@ -15,6 +15,7 @@ from core.drift.auto_healer import AutoHealer
 from core.drift.reverse_sync import ReverseSync
 from core.decision_ledger import DecisionLedger
 from core.drift_flag import DriftFlag, DriftState
+from utils.metrics_emitter import get_metrics_emitter
 
 def lambda_handler(event, context):
     """Main Lambda handler for drift detection and reconciliation"""
@@ -248,7 +249,8 @@ def publish_metrics(total_drift: int, safe_healed: int, prs_created: int):
     """Publish drift metrics to CloudWatch"""
     
     try:
-        cloudwatch = boto3.client('cloudwatch')
+        # EMF no stdout dentro do Lambda; PutMetricData fora dele
+        emitter = get_metrics_emitter('IaL')
         
         metrics = [
             {
@@ -268,7 +270,7 @@ def publish_metrics(total_drift: int, safe_healed: int, prs_created: int):
             }
         ]
         
-        cloudwatch.put_metric_data(
+        emitter.put_metric_data(
             Namespace='IaL',
             MetricData=metrics
         )
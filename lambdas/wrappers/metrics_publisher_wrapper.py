@@ -2,9 +2,10 @@ import json
 import boto3
 from datetime import datetime
 from utils.logger import get_logger
+from utils.metrics_emitter import MetricsEmitter
 
 logger = get_logger(__name__)
-cloudwatch = boto3.client('cloudwatch')
+cloudwatch = MetricsEmitter("IAL/Custom")
 
 def lambda_handler(event, context):
     """CloudWatch Metrics Publisher"""
@@ -24,13 +25,11 @@ def lambda_handler(event, context):
                 'Dimensions': metric.get('dimensions', [])
             })
         
-        # Publish metrics in batches of 20 (CloudWatch limit)
-        for i in range(0, len(metric_data), 20):
-            batch = metric_data[i:i+20]
-            cloudwatch.put_metric_data(
-                Namespace=namespace,
-                MetricData=batch
-            )
+        # EMF in Lambda; outside Lambda the emitter batches PutMetricData (1000 per call)
+        cloudwatch.put_metric_data(
+            Namespace=namespace,
+            MetricData=metric_data
+        )
         
         logger.info(f"Published {len(metric_data)} metrics successfully")
         return {
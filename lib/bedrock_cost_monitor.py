@@ -2,15 +2,40 @@
 """
 IaL Bedrock Cost Monitor
 Real-time cost tracking and optimization for Bedrock usage
+
+Contabilização write-behind: track_token_usage só agrega em memória por
+(usuário, modelo, hora) e avalia os limites de custo contra totais locais
+(baseline do DynamoDB carregado uma vez por usuário/mês). Uma thread em
+background grava os agregados periodicamente; contadores não gravados vão
+para um spool local no encerramento e são recarregados no próximo processo.
 """
 
+import atexit
 import boto3
+import glob
 import json
+import os
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_FLUSH_INTERVAL = float(os.environ.get('IAL_TOKEN_USAGE_FLUSH_INTERVAL', '30'))
+DEFAULT_SPOOL_DIR = os.environ.get(
+    'IAL_TOKEN_USAGE_SPOOL_DIR', os.path.join(os.path.expanduser('~/.ial'), 'token_usage_spool')
+)
+METRIC_DATA_BATCH = 1000  # PutMetricData: itens por chamada
+
+UsageKey = Tuple[str, str, str]  # (user_id, model_id, date_hour)
+
+
+def _model_name(model_id: str) -> str:
+    return model_id.split('.')[-1].split('-')[0]
+
 
 class BedrockCostMonitor:
-    def __init__(self, region='us-east-1'):
+    def __init__(self, region='us-east-1', flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_pending: int = 500, spool_dir: Optional[str] = DEFAULT_SPOOL_DIR,
+                 clock: Callable[[], datetime] = datetime.now):
         self.dynamodb = boto3.client('dynamodb', region_name=region)
         self.cloudwatch = boto3.client('cloudwatch', region_name=region)
         self.sns = boto3.client('sns', region_name=region)
@@ -34,11 +59,33 @@ class BedrockCostMonitor:
             'monthly_warning': 40.0, # $40/month
             'monthly_critical': 80.0 # $80/month
         }
+        
+        # Write-behind: agregados pendentes e totais locais para os limites
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.spool_dir = spool_dir
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[UsageKey, Dict] = {}
+        self._local_costs: Dict[Tuple[str, str, str], float] = {}   # (user, 'daily'|'monthly', período)
+        self._baseline_costs: Dict[Tuple[str, str, str], float] = {}
+        self._baseline_loaded = set()                                # (user, year_month)
+        self._flushed_costs: Dict[Tuple[str, str, str], float] = {}  # já gravado por este processo
+        self._alerted = set()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'tracked': 0, 'flushes': 0, 'items_written': 0, 'write_failures': 0,
+                      'metric_api_calls': 0, 'spooled': 0, 'restored': 0}
+        
+        self._restore_spool()
+        atexit.register(self.close)
 
     def track_token_usage(self, user_id: str, model_id: str, input_tokens: int, output_tokens: int):
-        """Track token usage for cost calculation"""
+        """Track token usage for cost calculation (somente memória; gravação em background)"""
         
-        now = datetime.now()
+        now = self._clock()
         date_hour = now.strftime('%Y-%m-%d-%H')
         
         # Calculate cost
@@ -47,54 +94,247 @@ class BedrockCostMonitor:
         output_cost = (output_tokens / 1_000_000) * model_pricing['output']
         total_cost = input_cost + output_cost
         
-        try:
-            # Store in DynamoDB
-            self.dynamodb.update_item(
-                TableName='ial-token-usage',
-                Key={
-                    'user_id': {'S': user_id},
-                    'date_hour': {'S': date_hour}
-                },
-                UpdateExpression='ADD input_tokens :input, output_tokens :output, total_cost :cost SET model_id = :model, updated_at = :timestamp',
-                ExpressionAttributeValues={
-                    ':input': {'N': str(input_tokens)},
-                    ':output': {'N': str(output_tokens)},
-                    ':cost': {'N': str(total_cost)},
-                    ':model': {'S': model_id},
-                    ':timestamp': {'S': now.isoformat()}
-                }
-            )
+        with self._lock:
+            self.stats['tracked'] += 1
+            self._accumulate((user_id, model_id, date_hour), {
+                'input_tokens': input_tokens, 'output_tokens': output_tokens,
+                'total_cost': total_cost, 'calls': 1, 'updated_at': now.isoformat()
+            })
+            full = len(self._pending) >= self.max_pending
+        
+        self._evaluate_thresholds(user_id, now)
+        self._ensure_started()
+        if full:
+            self._wake.set()
+
+    def _accumulate(self, key: UsageKey, usage: Dict, count_cost: bool = True):
+        """Soma usage no agregado pendente (chamar com self._lock)"""
+        bucket = self._pending.get(key)
+        if bucket is None:
+            self._pending[key] = dict(usage)
+        else:
+            for field in ('input_tokens', 'output_tokens', 'total_cost', 'calls'):
+                bucket[field] += usage[field]
+            bucket['updated_at'] = max(bucket['updated_at'], usage['updated_at'])
+        
+        if count_cost:
+            user_id, _, date_hour = key
+            for period, period_key in (('daily', date_hour[:10]), ('monthly', date_hour[:7])):
+                cost_key = (user_id, period, period_key)
+                self._local_costs[cost_key] = self._local_costs.get(cost_key, 0.0) + usage['total_cost']
+
+    def get_usage_totals(self, user_id: str) -> Dict:
+        """Custo diário/mensal corrente (baseline gravado + uso local ainda não gravado)"""
+        now = self._clock()
+        with self._lock:
+            totals = {}
+            for period, period_key in (('daily', now.strftime('%Y-%m-%d')), ('monthly', now.strftime('%Y-%m'))):
+                key = (user_id, period, period_key)
+                totals[f'{period}_cost'] = round(
+                    self._baseline_costs.get(key, 0.0) + self._local_costs.get(key, 0.0), 6)
+            totals['baseline_loaded'] = (user_id, now.strftime('%Y-%m')) in self._baseline_loaded
+            totals['pending_items'] = sum(1 for key in self._pending if key[0] == user_id)
+            return totals
+
+    def _evaluate_thresholds(self, user_id: str, now: Optional[datetime] = None):
+        """Limites avaliados contra os totais em memória; cada alerta dispara uma vez por período"""
+        now = now or self._clock()
+        totals = self.get_usage_totals(user_id)
+        for period, period_key in (('daily', now.strftime('%Y-%m-%d')), ('monthly', now.strftime('%Y-%m'))):
+            cost = totals[f'{period}_cost']
+            if cost >= self.thresholds[f'{period}_critical']:
+                severity = 'CRITICAL'
+            elif cost >= self.thresholds[f'{period}_warning']:
+                severity = 'WARNING'
+            else:
+                continue
+            alert_key = (user_id, period, period_key, severity)
+            with self._lock:
+                if alert_key in self._alerted:
+                    continue
+                self._alerted.add(alert_key)
+            self.send_cost_alert(user_id, severity, period, cost)
+
+    # ------------------------------------------------------------------
+    # Flush em background
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ial-token-usage', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            self.flush()
+
+    def close(self, timeout: float = 5.0):
+        """Para a thread, faz o flush final e grava no spool o que não foi persistido"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self.flush()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        self._spool(pending)
+
+    def flush(self) -> Dict[str, int]:
+        """Grava os agregados pendentes (um update_item por usuário+modelo+hora) e as métricas"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            result = {'written': 0, 'failed': 0}
+            if not pending:
+                return result
             
-            # Send metrics to CloudWatch
-            self.cloudwatch.put_metric_data(
-                Namespace='IaL/Conversations',
-                MetricData=[
-                    {
-                        'MetricName': 'TokensUsed',
-                        'Dimensions': [
-                            {'Name': 'Model', 'Value': model_id.split('.')[-1].split('-')[0]},
-                            {'Name': 'UserId', 'Value': user_id}
-                        ],
-                        'Value': input_tokens + output_tokens,
-                        'Unit': 'Count'
-                    },
-                    {
-                        'MetricName': 'CostIncurred',
-                        'Dimensions': [
-                            {'Name': 'Model', 'Value': model_id.split('.')[-1].split('-')[0]},
-                            {'Name': 'UserId', 'Value': user_id}
-                        ],
-                        'Value': total_cost,
-                        'Unit': 'None'
-                    }
-                ]
-            )
+            self.stats['flushes'] += 1
+            for user_id, year_month in {(key[0], key[2][:7]) for key in pending}:
+                self._load_baseline(user_id, year_month)
             
-            # Check thresholds
-            self.check_cost_thresholds(user_id)
+            failed = {}
+            for key, usage in pending.items():
+                try:
+                    self._write_usage(key, usage)
+                    result['written'] += 1
+                    self._record_flushed(key, usage)
+                except Exception as e:
+                    failed[key] = usage
+                    print(f"⚠️ Error flushing token usage ({key[0]}/{key[2]}): {e}")
             
-        except Exception as e:
-            print(f"Error tracking token usage: {e}")
+            if failed:
+                # Volta para o buffer; custo local já foi contabilizado
+                with self._lock:
+                    for key, usage in failed.items():
+                        self._accumulate(key, usage, count_cost=False)
+            
+            self.stats['items_written'] += result['written']
+            self.stats['write_failures'] += len(failed)
+            result['failed'] = len(failed)
+            self._put_metrics({key: usage for key, usage in pending.items() if key not in failed})
+            
+            for user_id in {key[0] for key in pending}:
+                self._evaluate_thresholds(user_id)
+            return result
+
+    def _write_usage(self, key: UsageKey, usage: Dict):
+        user_id, model_id, date_hour = key
+        self.dynamodb.update_item(
+            TableName='ial-token-usage',
+            Key={
+                'user_id': {'S': user_id},
+                'date_hour': {'S': date_hour}
+            },
+            UpdateExpression='ADD input_tokens :input, output_tokens :output, total_cost :cost SET model_id = :model, updated_at = :timestamp',
+            ExpressionAttributeValues={
+                ':input': {'N': str(usage['input_tokens'])},
+                ':output': {'N': str(usage['output_tokens'])},
+                ':cost': {'N': str(usage['total_cost'])},
+                ':model': {'S': model_id},
+                ':timestamp': {'S': usage['updated_at']}
+            }
+        )
+
+    def _put_metrics(self, written: Dict[UsageKey, Dict]):
+        """Métricas agregadas em lotes de até 1000 datums por PutMetricData"""
+        metric_data = []
+        for (user_id, model_id, _), usage in written.items():
+            dimensions = [
+                {'Name': 'Model', 'Value': _model_name(model_id)},
+                {'Name': 'UserId', 'Value': user_id}
+            ]
+            timestamp = datetime.fromisoformat(usage['updated_at'])
+            metric_data.append({'MetricName': 'TokensUsed', 'Dimensions': dimensions, 'Timestamp': timestamp,
+                                'Value': usage['input_tokens'] + usage['output_tokens'], 'Unit': 'Count'})
+            metric_data.append({'MetricName': 'CostIncurred', 'Dimensions': dimensions, 'Timestamp': timestamp,
+                                'Value': usage['total_cost'], 'Unit': 'None'})
+        
+        for start in range(0, len(metric_data), METRIC_DATA_BATCH):
+            try:
+                self.cloudwatch.put_metric_data(
+                    Namespace='IaL/Conversations',
+                    MetricData=metric_data[start:start + METRIC_DATA_BATCH]
+                )
+                self.stats['metric_api_calls'] += 1
+            except Exception as e:
+                print(f"⚠️ Error sending token usage metrics: {e}")
+
+    def _record_flushed(self, key: UsageKey, usage: Dict):
+        user_id, _, date_hour = key
+        with self._lock:
+            for period, period_key in (('daily', date_hour[:10]), ('monthly', date_hour[:7])):
+                cost_key = (user_id, period, period_key)
+                self._flushed_costs[cost_key] = self._flushed_costs.get(cost_key, 0.0) + usage['total_cost']
+
+    def _load_baseline(self, user_id: str, year_month: str):
+        """Custo já gravado no DynamoDB, consultado uma vez por usuário/mês
+
+        Se a consulta falhou antes, flushes deste processo já estão no DynamoDB
+        e também em _local_costs; o que este processo gravou é descontado do
+        baseline para não contar duas vezes.
+        """
+        if (user_id, year_month) in self._baseline_loaded:
+            return
+        monthly = self.get_monthly_usage(user_id, year_month)
+        if not monthly:
+            return
+        with self._lock:
+            baselines = {(user_id, 'monthly', year_month): monthly.get('total_cost', 0.0)}
+            for date, usage in monthly.get('daily_breakdown', {}).items():
+                baselines[(user_id, 'daily', date)] = usage.get('cost', 0.0)
+            for cost_key, cost in baselines.items():
+                self._baseline_costs[cost_key] = max(cost - self._flushed_costs.get(cost_key, 0.0), 0.0)
+            self._baseline_loaded.add((user_id, year_month))
+
+    # ------------------------------------------------------------------
+    # Spool local
+    # ------------------------------------------------------------------
+
+    def _spool(self, pending: Dict[UsageKey, Dict]):
+        if not pending or not self.spool_dir:
+            return
+        path = os.path.join(self.spool_dir, f"usage-{os.getpid()}.json")
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            records = [{'user_id': k[0], 'model_id': k[1], 'date_hour': k[2], **usage} for k, usage in pending.items()]
+            with open(path, 'w') as f:
+                json.dump(records, f)
+            self.stats['spooled'] += len(records)
+            print(f"💾 {len(records)} token usage counters saved to {path}")
+        except OSError as e:
+            print(f"❌ Error saving token usage spool: {e}")
+
+    def _restore_spool(self):
+        """Recarrega contadores de processos anteriores (arquivo reivindicado via rename)"""
+        if not self.spool_dir:
+            return
+        for path in glob.glob(os.path.join(self.spool_dir, 'usage-*.json')):
+            claimed = f"{path}.{os.getpid()}.restore"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            try:
+                with open(claimed) as f:
+                    records = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Ignoring corrupted token usage spool {path}: {e}")
+                records = []
+            os.remove(claimed)
+            with self._lock:
+                for record in records:
+                    key = (record.pop('user_id'), record.pop('model_id'), record.pop('date_hour'))
+                    self._accumulate(key, record)
+                    self.stats['restored'] += 1
 
     def get_daily_usage(self, user_id: str, date: str = None) -> Dict:
         """Get daily token usage and cost for a user"""
@@ -310,6 +550,7 @@ if __name__ == "__main__":
         input_tokens=1500,
         output_tokens=800
     )
+    monitor.flush()
     
     # Get usage reports
     daily_usage = monitor.get_daily_usage(test_user)
@@ -7,10 +7,25 @@ Response caching, rate limiting, and performance optimization
 import boto3
 import json
 import hashlib
+import os
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
+# Tokenizer local e cache de resumos incrementais
+try:
+    from core.context_assembler import SummaryCache, get_tokenizer
+    CONTEXT_ASSEMBLER_AVAILABLE = True
+except ImportError:
+    CONTEXT_ASSEMBLER_AVAILABLE = False
+
+# Rate limiting em memória (janela deslizante), opcionalmente reconciliado no DynamoDB
+try:
+    from core.rate_limiter import DynamoDBRateLimitStore, RateLimitWindow, SlidingWindowRateLimiter
+    RATE_LIMITER_AVAILABLE = True
+except ImportError:
+    RATE_LIMITER_AVAILABLE = False
+
 class OptimizationEngine:
     def __init__(self, region='us-east-1'):
         self.dynamodb = boto3.client('dynamodb', region_name=region)
@@ -30,6 +45,11 @@ class OptimizationEngine:
             'per_hour': 500,
             'per_day': 2000
         }
+        self.rate_limiter = self._build_rate_limiter()
+        
+        # Resumos de turnos antigos reaproveitados entre chamadas (só o delta é resumido)
+        self.summary_cache = SummaryCache() if CONTEXT_ASSEMBLER_AVAILABLE else None
+        self.tokenizer = get_tokenizer() if CONTEXT_ASSEMBLER_AVAILABLE else None
 
     def get_cache_key(self, user_input: str, user_id: str, context: str = '') -> str:
         """Generate cache key for conversation"""
@@ -106,8 +126,39 @@ class OptimizationEngine:
         except Exception as e:
             print(f"Error deleting cached response: {e}")
 
+    def _build_rate_limiter(self):
+        """Limiter local; IAL_RATE_LIMIT_MODE=shared|strict usa a tabela IAL_RATE_LIMIT_TABLE"""
+        if not RATE_LIMITER_AVAILABLE:
+            return None
+        
+        windows = [
+            RateLimitWindow('minute', 60, self.rate_limits['per_minute']),
+            RateLimitWindow('hour', 3600, self.rate_limits['per_hour']),
+            RateLimitWindow('day', 86400, self.rate_limits['per_day'])
+        ]
+        mode = os.environ.get('IAL_RATE_LIMIT_MODE', 'local')
+        store = None
+        if mode in ('shared', 'strict'):
+            try:
+                store = DynamoDBRateLimitStore(os.environ.get('IAL_RATE_LIMIT_TABLE', 'ial-rate-limits'),
+                                               client=self.dynamodb)
+                store.ensure_table()
+            except Exception as e:
+                print(f"⚠️ Rate limit store unavailable, using local limits: {e}")
+                mode, store = 'local', None
+        return SlidingWindowRateLimiter(windows, store=store, mode=mode,
+                                        sync_interval=float(os.environ.get('IAL_RATE_LIMIT_SYNC_INTERVAL', '5')))
+
     def check_rate_limit(self, user_id: str) -> Dict:
-        """Check if user has exceeded rate limits"""
+        """Check if user has exceeded rate limits (conta esta requisição quando permitida)"""
+        
+        if self.rate_limiter is not None:
+            try:
+                return self.rate_limiter.acquire(user_id)
+            except Exception as e:
+                # Mesmo comportamento da checagem original: falha no limiter não bloqueia a requisição
+                print(f"Error checking rate limit: {e}")
+                return {'rate_limited': False}
         
         now = datetime.now()
         
@@ -160,43 +211,58 @@ class OptimizationEngine:
         
         return reset_time.isoformat()
 
-    def optimize_conversation_context(self, conversation_history: List[Dict], max_tokens: int = 3000) -> List[Dict]:
+    def count_tokens(self, text: str) -> int:
+        """Conta tokens com o tokenizer local (fallback: 1 token ≈ 4 caracteres)"""
+        if self.tokenizer:
+            return self.tokenizer.count(text)
+        return len(text) // 4
+
+    def _turn_tokens(self, turn: Dict) -> int:
+        return self.count_tokens(turn.get('user_message', '')) + self.count_tokens(turn.get('assistant_response', ''))
+
+    def optimize_conversation_context(self, conversation_history: List[Dict], max_tokens: int = 3000,
+                                      conversation_id: str = None) -> List[Dict]:
         """Optimize conversation context to fit within token limits"""
         
         if not conversation_history:
             return []
         
-        # Estimate tokens (rough approximation: 1 token ≈ 4 characters)
-        total_chars = sum(len(turn.get('user_message', '') + turn.get('assistant_response', '')) 
-                         for turn in conversation_history)
-        
-        if total_chars <= max_tokens * 4:
+        turn_tokens = [self._turn_tokens(turn) for turn in conversation_history]
+        if sum(turn_tokens) <= max_tokens:
             return conversation_history
         
         # Keep most recent conversations and summarize older ones
         recent_turns = conversation_history[-5:]  # Keep last 5 turns
         older_turns = conversation_history[:-5]
         
+        optimized_history = []
         if older_turns:
-            # Create summary of older conversations
-            summary = self.summarize_conversation_history(older_turns)
+            # Create summary of older conversations (incremental via cache)
+            summary = self.summarize_conversation_history(older_turns, conversation_id)
             
             # Add summary as first turn
-            optimized_history = [{
+            optimized_history.append({
                 'user_message': '[Previous conversation summary]',
                 'assistant_response': summary,
                 'timestamp': older_turns[0].get('timestamp', ''),
                 'summarized': True
-            }]
-            
-            optimized_history.extend(recent_turns)
-            return optimized_history
+            })
         
-        return recent_turns
+        # Recent turns that still exceed the budget are dropped oldest-first (keep at least one)
+        used = sum(self._turn_tokens(turn) for turn in optimized_history)
+        recent_tokens = turn_tokens[-len(recent_turns):]
+        while len(recent_turns) > 1 and used + sum(recent_tokens) > max_tokens:
+            recent_turns, recent_tokens = recent_turns[1:], recent_tokens[1:]
+        
+        optimized_history.extend(recent_turns)
+        return optimized_history
 
-    def summarize_conversation_history(self, conversation_turns: List[Dict]) -> str:
+    def summarize_conversation_history(self, conversation_turns: List[Dict], conversation_id: str = None) -> str:
         """Create summary of conversation history"""
         
+        if self.summary_cache is not None:
+            return self.summary_cache.summarize(conversation_turns, conversation_id)
+        
         # Extract key topics and actions
         topics = set()
         actions = set()
@@ -1,25 +1,38 @@
 #!/usr/bin/env python3
+import argparse
 import boto3
 import json
+import os
+import sys
+import time
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
 dynamodb = boto3.client('dynamodb')
 bedrock = boto3.client('bedrock-runtime')
 sns = boto3.client('sns')
 
-def detect_drift():
+def load_checklist():
     response = dynamodb.query(
         TableName='mcp-provisioning-checklist',
         KeyConditionExpression='#proj = :p',
         ExpressionAttributeNames={'#proj': 'Project'},
         ExpressionAttributeValues={':p': {'S': 'mcp-spring-boot'}}
     )
+    return response.get('Items', [])
+
+def detect_drift(only_resources=None, items=None):
+    if items is None:
+        items = load_checklist()
     
     drifts = []
-    for item in response.get('Items', []):
+    for item in items:
         resource_name = item['ResourceName']['S']
         if resource_name == 'DEPLOYMENT_LOCK':
             continue
+        if only_resources is not None and resource_name not in only_resources:
+            continue
         
         desired = json.loads(item.get('DesiredState', {}).get('S', '{}'))
         current = get_aws_state(resource_name)
@@ -50,6 +63,52 @@ def detect_drift():
         notify_drifts(drifts)
     else:
         print("✅ No drifts detected")
+    return drifts
+
+def _identifier_candidates(resource_id):
+    """ID físico/ARN do CloudTrail -> formas comparáveis ao ResourceName do checklist"""
+    candidates = {resource_id}
+    tail = resource_id.split(':')[-1]
+    candidates.add(tail)
+    candidates.add(tail.split('/')[-1])
+    candidates.add(resource_id.rstrip('/').split('/')[-1])  # URL de fila SQS
+    return {c for c in candidates if c}
+
+def _item_identifiers(item):
+    """ResourceName e IDs físicos registrados no item do checklist"""
+    identifiers = {item['ResourceName']['S']}
+    for field in ('PhysicalId', 'ResourceId', 'ResourceArn'):
+        if field in item:
+            identifiers.add(item[field]['S'])
+    try:
+        properties = json.loads(item.get('Properties', {}).get('S', '{}'))
+    except ValueError:
+        properties = {}
+    if isinstance(properties, dict):
+        identifiers.update(v for v in properties.values() if isinstance(v, str))
+    return identifiers
+
+def map_to_checklist(dirty, items):
+    """Mapeia recursos sujos (IDs físicos) para ResourceName do checklist
+    
+    Retorna (nomes do checklist, recursos sem item correspondente).
+    """
+    index = {}
+    for item in items:
+        name = item['ResourceName']['S']
+        for identifier in _item_identifiers(item):
+            index.setdefault(identifier, set()).add(name)
+    
+    names, unmatched = set(), []
+    for resource in dirty:
+        matches = set()
+        for candidate in _identifier_candidates(resource['resource_id']):
+            matches.update(index.get(candidate, ()))
+        if matches:
+            names.update(matches)
+        else:
+            unmatched.append(resource)
+    return names, unmatched
 
 def get_aws_state(resource_name):
     """Get current state from AWS - placeholder"""
@@ -92,5 +151,47 @@ def notify_drifts(drifts):
     except Exception as e:
         print(f"⚠️  SNS error: {e}")
 
+def detect_drift_incremental(dirty_set_path, events_file=None, force_full=False, full_sweep_hours=24):
+    """Re-verifica apenas recursos tocados por eventos CloudTrail desde a última execução"""
+    from core.drift.incremental_drift import DirtySet, extract_touched_resources, iter_events_from_file
+    
+    dirty_set = DirtySet(dirty_set_path)
+    if events_file:
+        for event in iter_events_from_file(events_file):
+            dirty_set.mark(extract_touched_resources(event))
+    
+    if force_full or time.time() - dirty_set.last_full_sweep >= full_sweep_hours * 3600:
+        print("🔁 Full sweep (safety net)")
+        detect_drift()
+        dirty_set.record_full_sweep()
+        return
+    
+    dirty = dirty_set.pending()
+    if not dirty:
+        print("✅ No resources touched since last run")
+        return
+    
+    items = load_checklist()
+    names, unmatched = map_to_checklist(dirty, items)
+    for resource in unmatched:
+        print(f"⚠️  Untracked resource touched: {resource['resource_type']} {resource['resource_id']}")
+    
+    print(f"🔍 Incremental check of {len(names)} checklist resources ({len(dirty)} touched)")
+    if names:
+        detect_drift(only_resources=names, items=items)
+    # Só sai do dirty-set depois da verificação concluir
+    dirty_set.ack(dirty)
+
 if __name__ == '__main__':
-    detect_drift()
+    parser = argparse.ArgumentParser(description='IAL drift detection')
+    parser.add_argument('--incremental', action='store_true', help='Check only resources touched by CloudTrail events')
+    parser.add_argument('--events', help='CloudTrail/EventBridge events JSONL file to replay into the dirty-set')
+    parser.add_argument('--dirty-set', default=os.path.expanduser('~/.ial/drift-dirty-set.json'))
+    parser.add_argument('--full', action='store_true', help='Force a full sweep')
+    parser.add_argument('--full-sweep-hours', type=float, default=24)
+    args = parser.parse_args()
+    
+    if args.incremental or args.events:
+        detect_drift_incremental(args.dirty_set, args.events, args.full, args.full_sweep_hours)
+    else:
+        detect_drift()
@@ -7,6 +7,7 @@ import re
 import os
 import yaml
 import subprocess
+import sys
 from datetime import datetime
 from pathlib import Path
 
@@ -308,12 +309,52 @@ def auto_commit_universal(resource_info):
     except Exception as e:
         print(f"❌ Git error: {e}")
 
-def discover_untracked_resources():
-    """Discover existing resources via AWS APIs"""
+# Discoverable types -> (service, operation, properties copied from the inventory)
+DISCOVERY_TYPES = {
+    'AWS::S3::Bucket': ('s3', 'create-bucket', ['BucketName']),
+    'AWS::DynamoDB::Table': ('dynamodb', 'create-table', ['TableName']),
+    'AWS::Lambda::Function': ('lambda', 'create-function', ['FunctionName', 'Runtime']),
+    'AWS::SNS::Topic': ('sns', 'create-topic', ['TopicName']),
+}
+
+def discover_from_inventory(tracked):
+    """Discover untracked resources from the local inventory snapshot
+
+    Refreshes only stale service scopes (in parallel) and reads the rest from
+    SQLite. Returns None when the inventory store is not available.
+    """
     
-    print("🔍 Discovering untracked resources via APIs...")
+    try:
+        sys.path.insert(0, str(Path(__file__).parent.parent))
+        from core.inventory_store import InventoryCollector, get_inventory_store
+    except ImportError:
+        return None
+    
+    store = get_inventory_store()
+    services = [service for service, _, _ in DISCOVERY_TYPES.values()]
+    summary = InventoryCollector(store, services=services).refresh()
+    if summary['failed']:
+        print(f"⚠️ Inventory refresh failed for: {', '.join(summary['failed'])}")
+    
+    discovered = []
+    for resource_type, (service, operation, keys) in DISCOVERY_TYPES.items():
+        for resource in store.list_resources(resource_type=resource_type):
+            name = resource['name']
+            if name in tracked:
+                continue
+            discovered.append({
+                'name': name,
+                'type': resource_type,
+                'service': service,
+                'operation': operation,
+                'phase': SERVICE_PHASE_MAP[service],
+                'properties': {key: resource['properties'].get(key) for key in keys}
+            })
+    return discovered
+
+def discover_live(tracked):
+    """Discover resources calling each AWS list API directly"""
     
-    tracked = get_tracked_resource_names()
     discovered = []
     
     # S3 Buckets
@@ -391,6 +432,18 @@ def discover_untracked_resources():
     except Exception as e:
         print(f"⚠️ SNS discovery error: {e}")
     
+    return discovered
+
+def discover_untracked_resources():
+    """Discover existing resources via AWS APIs"""
+    
+    print("🔍 Discovering untracked resources via APIs...")
+    
+    tracked = get_tracked_resource_names()
+    discovered = discover_from_inventory(tracked)
+    if discovered is None:
+        discovered = discover_live(tracked)
+    
     print(f"📊 Discovered {len(discovered)} untracked resources")
     
     # Track discovered resources
@@ -8,6 +8,12 @@ import sys
 # Adicionar path do IAL
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+
+def pytest_configure(config):
+    """Registra os marcadores usados nos testes (pytest.ini usa [tool:pytest], que o pytest não lê)"""
+    config.addinivalue_line("markers", "performance: Performance tests")
+    config.addinivalue_line("markers", "e2e: End-to-end tests")
+
 @pytest.fixture(scope="session")
 def ial_config():
     """Configuração base do IAL para testes"""
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Testes para a contabilização write-behind de tokens do BedrockCostMonitor
+"""
+
+from datetime import datetime
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from lib.bedrock_cost_monitor import BedrockCostMonitor
+
+SONNET = 'anthropic.claude-3-5-sonnet-20241022-v2:0'
+HAIKU = 'anthropic.claude-3-haiku-20240307-v1:0'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2026, 10, 18, 14, 5)
+
+    def __call__(self):
+        return self.now
+
+
+class CallCounter:
+    """Conta chamadas a um método do cliente boto3 sem alterar o comportamento"""
+
+    def __init__(self, client, name, fail=False):
+        self.calls = 0
+        self.fail = fail
+        self._original = getattr(client, name)
+        setattr(client, name, self)
+
+    def __call__(self, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError('DynamoDB indisponível')
+        return self._original(**kwargs)
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        boto3.client('dynamodb', region_name='us-east-1').create_table(
+            TableName='ial-token-usage',
+            KeySchema=[{'AttributeName': 'user_id', 'KeyType': 'HASH'},
+                       {'AttributeName': 'date_hour', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'user_id', 'AttributeType': 'S'},
+                                  {'AttributeName': 'date_hour', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        yield
+
+
+@pytest.fixture
+def monitor(aws, tmp_path):
+    monitor = BedrockCostMonitor(flush_interval=3600, spool_dir=str(tmp_path), clock=FakeClock())
+    yield monitor
+    monitor.close()
+
+
+class TestWriteBehind:
+    def test_hot_path_makes_no_aws_calls(self, monitor):
+        """Teste: track_token_usage só agrega em memória"""
+        update = CallCounter(monitor.dynamodb, 'update_item')
+        query = CallCounter(monitor.dynamodb, 'query')
+        metrics = CallCounter(monitor.cloudwatch, 'put_metric_data')
+
+        for _ in range(100):
+            monitor.track_token_usage('alice', SONNET, 1500, 800)
+
+        assert (update.calls, query.calls, metrics.calls) == (0, 0, 0)
+        assert monitor.get_usage_totals('alice')['daily_cost'] == pytest.approx(100 * (0.0045 / 1000 + 0.012 / 1000))
+
+    def test_flush_writes_one_item_per_user_model_hour(self, monitor):
+        """Teste: flush grava um update_item por agregado e uma chamada de métricas"""
+        update = CallCounter(monitor.dynamodb, 'update_item')
+        metrics = CallCounter(monitor.cloudwatch, 'put_metric_data')
+        for _ in range(50):
+            monitor.track_token_usage('alice', SONNET, 1000, 500)
+            monitor.track_token_usage('bob', HAIKU, 200, 100)
+        monitor._clock.now = datetime(2026, 10, 18, 15, 1)
+        monitor.track_token_usage('alice', SONNET, 1000, 500)
+
+        result = monitor.flush()
+
+        assert result == {'written': 3, 'failed': 0}
+        assert update.calls == 3 and metrics.calls == 1
+        daily = monitor.get_daily_usage('alice', '2026-10-18')
+        assert daily['total_input_tokens'] == 51000 and daily['total_output_tokens'] == 25500
+        assert monitor.flush() == {'written': 0, 'failed': 0}
+
+
+class TestThresholds:
+    def test_thresholds_use_baseline_and_local_totals(self, monitor, capsys):
+        """Teste: baseline gravado + uso local dispara o alerta crítico uma única vez"""
+        monitor.dynamodb.put_item(TableName='ial-token-usage', Item={
+            'user_id': {'S': 'alice'}, 'date_hour': {'S': '2026-10-18-09'},
+            'input_tokens': {'N': '0'}, 'output_tokens': {'N': '0'},
+            'total_cost': {'N': '4.99'}, 'model_id': {'S': SONNET}
+        })
+        monitor.track_token_usage('alice', SONNET, 1_000_000, 1_000_000)  # $0.018
+        assert capsys.readouterr().out == ''  # baseline ainda não carregado
+
+        monitor.flush()
+        assert monitor.get_usage_totals('alice')['baseline_loaded']
+        for _ in range(3):
+            monitor.track_token_usage('alice', SONNET, 1_000_000, 1_000_000)
+
+        alerts = [line for line in capsys.readouterr().out.splitlines() if 'Cost alert sent' in line]
+        assert alerts == ['Cost alert sent: CRITICAL - daily cost $5.0080']
+        assert monitor.get_usage_totals('alice')['daily_cost'] == pytest.approx(4.99 + 4 * 0.018)
+
+    def test_late_baseline_does_not_double_count_flushed_usage(self, monitor):
+        """Teste: baseline carregado depois de um flush desconta o que este processo já gravou"""
+        monitor.dynamodb.put_item(TableName='ial-token-usage', Item={
+            'user_id': {'S': 'alice'}, 'date_hour': {'S': '2026-10-18-09'},
+            'input_tokens': {'N': '0'}, 'output_tokens': {'N': '0'},
+            'total_cost': {'N': '1.0'}, 'model_id': {'S': SONNET}
+        })
+        query = CallCounter(monitor.dynamodb, 'query', fail=True)
+        monitor.track_token_usage('alice', SONNET, 1_000_000, 1_000_000)  # $0.018
+        assert monitor.flush() == {'written': 1, 'failed': 0}
+        assert not monitor.get_usage_totals('alice')['baseline_loaded']
+
+        query.fail = False
+        monitor.track_token_usage('alice', SONNET, 1_000_000, 1_000_000)
+        monitor.flush()
+
+        totals = monitor.get_usage_totals('alice')
+        assert totals['baseline_loaded'] and query.calls == 2
+        assert totals['daily_cost'] == pytest.approx(1.0 + 2 * 0.018)
+        assert totals['monthly_cost'] == pytest.approx(1.0 + 2 * 0.018)
+
+
+class TestSpool:
+    def test_unflushed_counters_survive_restart(self, aws, tmp_path):
+        """Teste: falha de gravação vai para o spool no close e é recarregada no próximo processo"""
+        first = BedrockCostMonitor(flush_interval=3600, spool_dir=str(tmp_path), clock=FakeClock())
+        CallCounter(first.dynamodb, 'update_item', fail=True)
+        first.track_token_usage('alice', SONNET, 1000, 500)
+        first.track_token_usage('alice', SONNET, 1000, 500)
+        first.close()
+        assert first.stats['spooled'] == 1
+        assert len(list(tmp_path.glob('usage-*.json'))) == 1
+
+        second = BedrockCostMonitor(flush_interval=3600, spool_dir=str(tmp_path), clock=FakeClock())
+        assert second.stats['restored'] == 1
+        assert second.flush() == {'written': 1, 'failed': 0}
+        second.close()
+
+        assert list(tmp_path.glob('usage-*.json')) == []
+        assert second.get_daily_usage('alice', '2026-10-18')['total_input_tokens'] == 2000
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Testes para a análise de login em uma passada (core.cloudtrail_stream)
+"""
+
+import asyncio
+import gzip
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from core.cloudtrail_stream import StreamingLoginAnalyzer, iter_cloudtrail_export, iter_lookup_events
+from core.security_analyzer import SecurityAnalyzer
+
+BASE = datetime(2026, 3, 2, 12, 0, 0)
+# Início de minuto (UTC, ingênuo) poucas horas atrás: dentro da janela padrão de 24h
+RECENT = datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0) - timedelta(hours=2)
+
+
+def raw_login(ip, user, when, failed=False, agent='Mozilla/5.0'):
+    """Registro bruto como gravado pelo CloudTrail"""
+    return {
+        'eventTime': when.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'eventName': 'ConsoleLogin',
+        'sourceIPAddress': ip,
+        'userAgent': agent,
+        'userIdentity': {'type': 'IAMUser', 'userName': user},
+        'responseElements': {'ConsoleLogin': 'Failure' if failed else 'Success'}
+    }
+
+
+def login(ip, user, when, failed=False):
+    event = {'EventTime': when.isoformat(), 'EventName': 'ConsoleLogin', 'SourceIPAddress': ip,
+             'UserIdentity': {'userName': user}, 'UserAgent': 'Mozilla/5.0'}
+    if failed:
+        event['ErrorCode'] = 'SigninFailure'
+    return event
+
+
+class FakeCloudTrail:
+    """Cliente CloudTrail em memória: LookupEvents paginado, mais recente primeiro"""
+
+    def __init__(self, records, page_size=50):
+        self.records = sorted(records, key=lambda r: r['eventTime'], reverse=True)
+        self.page_size = page_size
+        self.requests = []
+
+    def get_paginator(self, operation):
+        assert operation == 'lookup_events'
+        return self
+
+    def paginate(self, LookupAttributes, StartTime, EndTime):
+        self.requests.append(LookupAttributes[0]['AttributeValue'])
+        for offset in range(0, len(self.records), self.page_size):
+            yield {'Events': [
+                {'EventName': r['eventName'], 'CloudTrailEvent': json.dumps(r)}
+                for r in self.records[offset:offset + self.page_size]
+            ]}
+
+
+class TestEventSources:
+    def test_export_records_and_gzipped_jsonl(self, tmp_path):
+        """Teste: diretório com log do CloudTrail e JSONL.gz; só ConsoleLogin"""
+        records = [raw_login('1.2.3.4', 'admin', BASE, failed=True),
+                   {**raw_login('1.2.3.4', 'admin', BASE), 'eventName': 'AssumeRole'}]
+        (tmp_path / 'a.json').write_text(json.dumps({'Records': records}))
+        with gzip.open(tmp_path / 'b.jsonl.gz', 'wt', encoding='utf-8') as handle:
+            handle.write(json.dumps(raw_login('203.0.113.12', 'ana', BASE)) + '\n\n')
+
+        events = list(iter_cloudtrail_export(str(tmp_path)))
+        assert [e['UserIdentity']['userName'] for e in events] == ['admin', 'ana']
+        assert events[0]['ErrorCode'] == 'SigninFailure' and 'ErrorCode' not in events[1]
+
+    def test_lookup_events_is_lazy_and_paginated(self):
+        """Teste: LookupEvents consumido página a página, sem materializar"""
+        client = FakeCloudTrail([raw_login('1.2.3.4', 'admin', BASE + timedelta(seconds=n)) for n in range(120)])
+        events = iter_lookup_events(client, BASE - timedelta(hours=1))
+        first = next(events)
+        assert first['EventTime'] == '2026-03-02T12:01:59Z'
+        assert sum(1 for _ in events) == 119
+        assert client.requests == ['ConsoleLogin']
+
+    def test_export_filtered_by_time_window(self, tmp_path):
+        """Teste: só eventos em [start_time, end_time] saem do export"""
+        records = [raw_login('1.2.3.4', 'admin', BASE + timedelta(hours=n)) for n in range(5)]
+        (tmp_path / 'trail.jsonl').write_text('\n'.join(json.dumps(r) for r in records))
+
+        events = list(iter_cloudtrail_export(str(tmp_path), start_time=BASE + timedelta(hours=1),
+                                             end_time=(BASE + timedelta(hours=3)).replace(tzinfo=timezone.utc)))
+        assert [e['EventTime'] for e in events] == ['2026-03-02T13:00:00Z', '2026-03-02T14:00:00Z',
+                                                    '2026-03-02T15:00:00Z']
+
+    def test_export_files_ordered_by_delivery_time(self, tmp_path):
+        """Teste: arquivos de regiões diferentes lidos pelo horário de entrega, não pelo caminho"""
+        for region, minute in (('us-east-1', 10), ('eu-west-1', 5), ('sa-east-1', 0)):
+            folder = tmp_path / 'AWSLogs' / '123456789012' / 'CloudTrail' / region / '2026' / '03' / '02'
+            folder.mkdir(parents=True)
+            name = f'123456789012_CloudTrail_{region}_20260302T12{minute:02d}Z_abc.json'
+            when = BASE + timedelta(minutes=minute)
+            (folder / name).write_text(json.dumps({'Records': [raw_login('1.2.3.4', region, when)]}))
+
+        events = list(iter_cloudtrail_export(str(tmp_path)))
+        assert [e['UserIdentity']['userName'] for e in events] == ['sa-east-1', 'eu-west-1', 'us-east-1']
+
+
+class TestStreamingDetections:
+    @pytest.mark.parametrize('descending', [False, True])
+    def test_brute_force_uses_sliding_window(self, descending):
+        """Teste: 5 falhas em 4 min detectadas; falhas espaçadas não (qualquer ordem)"""
+        burst = [login('9.9.9.9', 'bob', BASE + timedelta(minutes=n), failed=True) for n in range(5)]
+        spaced = [login('8.8.8.8', 'carol', BASE + timedelta(minutes=2 * n), failed=True) for n in range(8)]
+        events = sorted(burst + spaced, key=lambda e: e['EventTime'], reverse=descending)
+
+        threats = StreamingLoginAnalyzer.from_events(events).brute_force_threats()
+        by_ip = [t for t in threats if t['type'] == 'brute_force_ip']
+        assert [t['source_ip'] for t in by_ip] == ['9.9.9.9']
+        assert by_ip[0]['failure_count'] == 5 and by_ip[0]['time_window_seconds'] == 240
+        assert by_ip[0]['first_seen'] == BASE.isoformat()
+
+    def test_brute_force_tolerates_interleaved_events(self):
+        """Teste: falhas de duas regiões intercaladas fora de ordem ainda formam a rajada"""
+        region_a = [login('9.9.9.9', 'bob', BASE + timedelta(minutes=n), failed=True) for n in (0, 2, 4)]
+        region_b = [login('9.9.9.9', 'bob', BASE + timedelta(minutes=n), failed=True) for n in (1, 3)]
+
+        threats = StreamingLoginAnalyzer.from_events(region_a + region_b).brute_force_threats()
+        by_ip = [t for t in threats if t['type'] == 'brute_force_ip']
+        assert len(by_ip) == 1 and by_ip[0]['failure_count'] == 5
+        assert by_ip[0]['first_seen'] == BASE.isoformat() and by_ip[0]['time_window_seconds'] == 240
+
+    def test_memory_is_bounded(self):
+        """Teste: chaves e achados limitados; totais continuam exatos"""
+        events = [login(f'10.0.{n // 256}.{n % 256}', f'user{n}', BASE, failed=True) for n in range(500)]
+        events += [login('1.2.3.4', 'admin', BASE.replace(hour=23)) for _ in range(50)]
+        analyzer = StreamingLoginAnalyzer.from_events(events, max_keys=100, max_findings=10)
+
+        assert len(analyzer.users.items) <= 100 and len(analyzer._ip_bursts) <= 100
+        assert analyzer.login_statistics()['unique_users'] == 501
+        geo = analyzer.geographic_analysis()
+        assert len(geo['suspicious_locations']) == 10 and geo['suspicious_locations_total'] == 50
+        assert analyzer.summary()['suppressed_findings'] == 40 + 40
+
+    def test_unique_counts_do_not_double_count_evicted_keys(self):
+        """Teste: chave despejada que volta não é contada duas vezes"""
+        events = [login('1.2.3.4', f'user{n}', BASE) for n in range(5)]
+        events += [login('1.2.3.4', 'user0', BASE)]
+        analyzer = StreamingLoginAnalyzer.from_events(events, max_keys=2)
+
+        stats = analyzer.login_statistics()
+        assert analyzer.users.evicted > 0
+        assert stats['unique_users'] == 5 and stats['unique_ips'] == 1
+        assert stats['unique_counts_approximate'] is False
+
+    @pytest.mark.performance
+    def test_large_window_processed_in_one_pass(self):
+        """Teste: 200 mil eventos em menos de 5 s com memória limitada"""
+        def events():
+            for n in range(200_000):
+                yield login(f'10.{n % 50}.{n % 7}.{n % 250}', f'user{n % 3000}',
+                            BASE + timedelta(seconds=n), failed=n % 4 == 0)
+
+        start = time.perf_counter()
+        analyzer = StreamingLoginAnalyzer.from_events(events(), max_keys=1000)
+        assert analyzer.login_statistics()['failed_logins'] == 50_000
+        assert len(analyzer._user_failures) <= 1000
+        assert time.perf_counter() - start < 5.0
+
+
+class TestSecurityAnalyzerSources:
+    def test_export_path_feeds_login_analysis(self, tmp_path):
+        """Teste: analyze_login_security lê o export local em vez da simulação"""
+        records = [raw_login('185.220.101.42', 'admin', RECENT + timedelta(seconds=20 * n), failed=True)
+                   for n in range(6)]
+        # Fora da janela de 24h: ignorado
+        records.append(raw_login('185.220.101.42', 'admin', RECENT - timedelta(days=3), failed=True))
+        export = tmp_path / 'trail.jsonl'
+        export.write_text('\n'.join(json.dumps(r) for r in records))
+
+        result = asyncio.run(SecurityAnalyzer(export_path=str(export)).analyze_login_security())
+        assert result['login_statistics']['failed_logins'] == 6
+        assert result['threats_detected'][0]['type'] == 'brute_force_ip'
+        assert result['geographic_analysis']['risk_score'] == 60
+        assert result['stream_summary']['events_processed'] == 6
+
+    def test_cloudtrail_client_used_when_given(self, monkeypatch):
+        """Teste: com cliente CloudTrail os eventos vêm do LookupEvents"""
+        monkeypatch.delenv('IAL_CLOUDTRAIL_EXPORT', raising=False)
+        client = FakeCloudTrail([raw_login('203.0.113.12', 'ana', BASE + timedelta(hours=n)) for n in range(3)])
+        result = asyncio.run(SecurityAnalyzer(cloudtrail=client).analyze_login_security(time_window=72))
+        assert result['login_statistics']['successful_logins'] == 3
+        assert client.requests == ['ConsoleLogin']
+
+    def test_simulated_events_keep_previous_results(self, monkeypatch):
+        """Teste: sem fontes reais, resultado igual ao da análise anterior"""
+        monkeypatch.delenv('IAL_CLOUDTRAIL_EXPORT', raising=False)
+        result = asyncio.run(SecurityAnalyzer().analyze_login_security())
+        types = [t['type'] for t in result['threats_detected']]
+        assert 'brute_force_ip' not in types and types.count('brute_force_user') == 1
+        assert result['geographic_analysis']['risk_score'] == 160
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Testes para a montagem de contexto com orçamento de tokens e resumo incremental
+"""
+
+import pytest
+
+from core.context_assembler import (
+    ContextAssembler, ContextItem, SummaryCache, budget_for_model, extractive_summarize, get_tokenizer
+)
+
+
+def _turns(n, start=0):
+    return [{'user_message': f'deploy networking stack {i}', 'assistant_response': f'security check {i} ok ' * 5}
+            for i in range(start, start + n)]
+
+
+class TestTokenizer:
+    def test_count_and_truncate_respect_limit(self):
+        """Teste: truncate nunca passa do limite e preserva textos curtos"""
+        tokenizer = get_tokenizer()
+        text = 'Criar VPC com subnets privadas, NAT gateway e endpoints 10.0.0.0/16 ' * 40
+
+        assert tokenizer.count('') == 0
+        assert tokenizer.count('oi') >= 1
+        assert tokenizer.truncate('texto curto', 50) == 'texto curto'
+        truncated = tokenizer.truncate(text, 25)
+        assert truncated.endswith('...')
+        assert tokenizer.count(truncated) <= 25
+
+    def test_budget_capped_by_model_window(self):
+        """Teste: orçamento é limitado pela janela do modelo menos a reserva de resposta"""
+        assert budget_for_model('anthropic.claude-3-sonnet-20240229-v1:0', 3000) == 3000
+        assert budget_for_model('amazon.titan-text-express-v1', 50_000) == 8_000 - 4096
+        assert budget_for_model(None, 1234) == 1234
+
+
+class TestPacking:
+    def test_relevance_order_within_budget(self):
+        """Teste: itens mais relevantes entram primeiro e o total cabe no orçamento"""
+        assembler = ContextAssembler(max_tokens=60)
+        knowledge = [
+            {'text': 'snippet pouco relevante ' * 12, 'score': 0.2, 'source': 'a.md'},
+            {'text': 'VPC endpoints reduzem custo de NAT', 'score': 0.9, 'source': 'b.md'},
+            {'text': 'snippet médio ' * 6, 'score': 0.6, 'source': 'c.md'},
+            {'text': 'VPC endpoints reduzem custo de NAT', 'score': 0.8, 'source': 'dup.md'},
+        ]
+        packed = assembler.assemble(knowledge=knowledge)
+
+        sources = [item.source for item in packed['items']]
+        assert sources[0] == 'b.md'
+        assert 'dup.md' not in sources
+        assert 'a.md' in [item.source for item in packed['dropped']]
+        assert packed['tokens'] <= 60
+        assert packed['text'].startswith('CONTEXTO RELEVANTE (RAG):\n[1] (score: 0.90, source: b.md)')
+
+    def test_history_keeps_chronological_order_with_summary(self):
+        """Teste: turnos antigos viram resumo; recentes saem em ordem cronológica"""
+        assembler = ContextAssembler(max_tokens=2000)
+        packed = assembler.assemble(history=_turns(8), conversation_id='c1', keep_recent=3)
+
+        kinds = [item.kind for item in packed['items']]
+        assert kinds == ['summary', 'history', 'history', 'history']
+        assert 'stack 5' in packed['items'][1].text and 'stack 7' in packed['items'][3].text
+        assert 'Previous conversation included 5 exchanges' in packed['text']
+
+    def test_oversized_item_truncated(self):
+        """Teste: item maior que max_item_tokens é truncado em vez de descartado"""
+        assembler = ContextAssembler(max_tokens=500, max_item_tokens=20)
+        packed = assembler.pack([ContextItem('memory', 'palavra ' * 200, score=1.0)])
+        assert len(packed['items']) == 1
+        assert packed['items'][0].tokens <= 21
+
+
+class TestSummaryCache:
+    def test_only_delta_is_summarized(self):
+        """Teste: cada novo turno resume apenas os turnos ainda não resumidos"""
+        seen = []
+
+        def summarizer(state, new_turns):
+            seen.append(len(new_turns))
+            return extractive_summarize(state, new_turns)
+
+        cache = SummaryCache(summarizer)
+        history = _turns(20)
+        first = cache.summarize(history, 'conv')
+        history += _turns(1, start=20)
+        second = cache.summarize(history, 'conv')
+
+        assert seen == [20, 1]
+        assert cache.stats['incremental'] == 1
+        assert 'included 20 exchanges' in first and 'included 21 exchanges' in second
+        assert cache.summarize(history, 'conv') == second
+        assert cache.stats['hits'] == 1
+
+    def test_sliding_window_summarizes_only_new_turns(self):
+        """Teste: janela dos 50 mais recentes desliza e só os turnos novos são resumidos"""
+        cache = SummaryCache()
+        conversation = _turns(60)
+        for call in range(10):
+            cache.summarize(conversation[-50:], 'conv')
+            conversation += _turns(1, start=60 + call)
+
+        assert cache.stats['rebuilds'] == 1 and cache.stats['incremental'] == 9
+        assert cache.stats['turns_summarized'] == 50 + 9
+        assert 'included 59 exchanges' in cache.summarize(conversation[-51:-1], 'conv')
+        assert cache.stats['hits'] == 1
+
+    def test_edited_prefix_rebuilds(self):
+        """Teste: prefixo alterado invalida o resumo e refaz do início"""
+        cache = SummaryCache()
+        history = _turns(10)
+        cache.summarize(history, 'conv')
+        history[0] = {'user_message': 'rollback compute', 'assistant_response': 'ok'}
+
+        summary = cache.summarize(history + _turns(1, start=10), 'conv')
+        assert cache.stats['rebuilds'] == 2
+        assert 'rollback' in summary and 'included 11 exchanges' in summary
+
+
+class TestIntegrations:
+    def test_optimization_engine_uses_tokenizer_and_cache(self):
+        """Teste: optimize_conversation_context cabe no orçamento e resume incrementalmente"""
+        from lib.optimization_engine import OptimizationEngine
+
+        engine = OptimizationEngine()
+        history = _turns(30)
+        optimized = engine.optimize_conversation_context(history, max_tokens=200, conversation_id='s1')
+        engine.optimize_conversation_context(history + _turns(1, start=30), max_tokens=200, conversation_id='s1')
+
+        assert optimized[0]['summarized'] is True
+        assert sum(engine._turn_tokens(t) for t in optimized) <= 200
+        assert engine.summary_cache.stats['turns_summarized'] == 26
+        assert engine.optimize_conversation_context(_turns(2), max_tokens=5000) == _turns(2)
+
+    def test_build_enhanced_context_packs_knowledge(self, monkeypatch):
+        """Teste: context_builder limita snippets RAG ao orçamento"""
+        import core.context_builder as context_builder
+
+        snippets = [{'text': f'documento {i} ' * 30, 'score': 0.9 - i * 0.05, 'source': f'doc{i}'} for i in range(6)]
+        monkeypatch.setattr(context_builder, 'retrieve', lambda **kwargs: snippets)
+
+        result = context_builder.build_enhanced_context('deploy vpc', max_tokens=150)
+        assert 0 < len(result['knowledge']) < 6
+        assert result['knowledge'][0]['source'] == 'doc0'
+        assert result['tokens'] <= 150
+
+    def test_build_enhanced_context_packs_history_by_relevance(self, monkeypatch):
+        """Teste: context_builder empacota histórico real (mais novos preservados, antigos resumidos)"""
+        import sys
+        import types
+        import core.context_builder as context_builder
+
+        history = [{'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'turno {i} deploy security ' * 8}
+                   for i in range(40)]
+
+        class FakeEngine:
+            def get_context_items_optimized(self, query, user_id, session_id=None):
+                return {'history': history, 'memory': [{'content': 'vpc privada discutida antes', 'score': 0.9}],
+                        'conversation_id': f'{user_id}:all'}
+
+        module = types.ModuleType('ial.core.memory.context_engine_optimized')
+        module.OptimizedContextEngine = FakeEngine
+        monkeypatch.setitem(sys.modules, 'ial.core.memory.context_engine_optimized', module)
+        monkeypatch.setattr(context_builder, 'retrieve', lambda **kwargs: [])
+
+        result = context_builder.build_enhanced_context('deploy vpc', user_id='ana', max_tokens=300)
+        conversation = result['conversation']
+        assert conversation.startswith('## Resumo da Conversa:')
+        assert 'turno 39' in conversation and 'turno 0 ' not in conversation
+        assert 'vpc privada' in conversation
+        assert result['tokens'] <= 300
+
+        assembler = context_builder.get_context_assembler(max_tokens=300)
+        history.extend([{'role': 'user', 'content': 'turno 40 rollback'}])
+        context_builder.build_enhanced_context('deploy vpc', user_id='ana', max_tokens=300)
+        assert assembler.summary_cache.stats['incremental'] >= 1
+
+    def test_master_engine_assembles_conversation_items(self):
+        """Teste: engine principal obtém histórico estruturado do ContextEngine"""
+        from types import SimpleNamespace
+        from core.ial_master_engine_integrated import IALMasterEngineIntegrated
+
+        class FallbackEngine:
+            def get_context_items(self, query):
+                return {'history': [{'role': 'user', 'content': query}], 'memory': []}
+
+        items = IALMasterEngineIntegrated._conversation_items(
+            SimpleNamespace(context_engine=FallbackEngine(), user_id='u'), 'listar fases')
+        assert items['history'] == [{'role': 'user', 'content': 'listar fases'}]
+        assert IALMasterEngineIntegrated._conversation_items(SimpleNamespace(context_engine=None), 'x') == {}
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Testes para a verificação de contratos em lote (moto)
+"""
+
+import json
+
+import boto3
+import pytest
+import yaml
+from moto import mock_aws
+
+from core.validators.contract_enforcer import ContractEnforcer
+from core.validators.contract_verification import ContractVerificationEngine
+
+REGION = 'us-east-1'
+
+
+def _stack_template(outputs):
+    return json.dumps({
+        'AWSTemplateFormatVersion': '2010-09-09',
+        'Resources': {'Handle': {'Type': 'AWS::CloudFormation::WaitConditionHandle'}},
+        'Outputs': {key: {'Value': value} for key, value in outputs.items()}
+    })
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', REGION)
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        s3 = boto3.client('s3', region_name=REGION)
+        s3.create_bucket(Bucket='data-encrypted')
+        s3.put_bucket_encryption(Bucket='data-encrypted', ServerSideEncryptionConfiguration={
+            'Rules': [{'ApplyServerSideEncryptionByDefault': {'SSEAlgorithm': 'aws:kms'}}]
+        })
+        s3.create_bucket(Bucket='data-plain')
+
+        rds = boto3.client('rds', region_name=REGION)
+        for identifier, encrypted in (('db-enc', True), ('db-plain', False)):
+            rds.create_db_instance(DBInstanceIdentifier=identifier, DBInstanceClass='db.t3.micro',
+                                   Engine='postgres', MasterUsername='admin',
+                                   MasterUserPassword='password123', AllocatedStorage=20,
+                                   StorageEncrypted=encrypted)
+
+        ssm = boto3.client('ssm', region_name=REGION)
+        for i in range(12):
+            ssm.put_parameter(Name=f'/app/secure-{i}', Value='x', Type='SecureString')
+        ssm.put_parameter(Name='/app/plain', Value='x', Type='String')
+
+        cf = boto3.client('cloudformation', region_name=REGION)
+        for i in range(12):
+            cf.create_stack(StackName=f'app-{i:02d}-data', TemplateBody=_stack_template({
+                'DataBucketName': 'data-encrypted',
+                'DatabaseEndpoint': 'db-enc.abc.us-east-1.rds.amazonaws.com',
+                'SecretParameter': f'/app/secure-{i}'
+            }), Tags=[{'Key': 'ial:managed', 'Value': 'true'}])
+        cf.create_stack(StackName='app-99-bad', TemplateBody=_stack_template({
+            'DataBucketName': 'data-plain',
+            'DatabaseEndpoint': 'db-plain.abc.us-east-1.rds.amazonaws.com',
+            'SecretParameter': '/app/plain'
+        }))
+        yield
+
+
+class CountingClient:
+    """Proxy que conta chamadas de API por operação"""
+
+    def __init__(self, client):
+        self._client = client
+        self.calls = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if callable(attr) and not name.startswith(('get_paginator', 'get_waiter')):
+            def wrapper(*args, **kwargs):
+                self.calls[name] = self.calls.get(name, 0) + 1
+                return attr(*args, **kwargs)
+            return wrapper
+        return attr
+
+
+CONTRACT = {
+    'must_exist': ['DataBucketName', 'DatabaseEndpoint', 'SecretParameter'],
+    'must_be_encrypted': ['DataBucketName', 'DatabaseEndpoint', 'SecretParameter'],
+    'tags_must_include': ['ial:managed']
+}
+
+
+class TestContractVerificationEngine:
+    def setup_method(self):
+        self.clients = {}
+
+    def _engine(self, **kwargs):
+        self.clients = {name: CountingClient(boto3.client(name, region_name=REGION))
+                        for name in ('cloudformation', 's3', 'rds', 'ssm')}
+        return ContractVerificationEngine(REGION, clients=self.clients, **kwargs)
+
+    def test_lookups_deduplicated_and_batched(self, aws):
+        """Teste: 12 phases compartilham bucket/DB; SSM em lotes de 10"""
+        engine = self._engine()
+        contracts = {f'{i:02d}-data': (f'app-{i:02d}-data', CONTRACT) for i in range(12)}
+
+        results = engine.verify(contracts)
+
+        assert all(result.success for result in results.values()), results
+        assert self.clients['s3'].calls == {'get_bucket_encryption': 1}
+        assert self.clients['ssm'].calls == {'get_parameters': 2}
+        assert engine.last_stats['api_calls']['rds:DescribeDBInstances'] == 1
+        assert engine.last_stats['lookups'] == {'s3': 1, 'rds': 1, 'ssm': 12}
+
+    def test_violations_reported_per_phase(self, aws):
+        """Teste: violações de criptografia, tags e stack inexistente"""
+        engine = self._engine()
+        results = engine.verify({
+            'good': ('app-00-data', CONTRACT),
+            'bad': ('app-99-bad', CONTRACT),
+            'missing': ('app-does-not-exist', CONTRACT)
+        })
+
+        assert results['good'].success
+        assert sorted(results['bad'].errors) == sorted([
+            "S3 bucket 'data-plain' não está criptografado",
+            "RDS instance 'db-plain.abc.us-east-1.rds.amazonaws.com' não está criptografado",
+            "SSM Parameter '/app/plain' não é SecureString",
+            "Tag obrigatória 'ial:managed' não encontrada no stack"
+        ])
+        assert not results['missing'].success
+        assert 'app-does-not-exist' in results['missing'].errors[0]
+
+    def test_bulk_describe_matches_targeted(self, aws):
+        """Teste: describe_stacks paginado produz o mesmo resultado"""
+        contracts = {f'{i:02d}-data': (f'app-{i:02d}-data', CONTRACT) for i in range(12)}
+        contracts['bad'] = ('app-99-bad', CONTRACT)
+
+        targeted = self._engine().verify(contracts)
+        bulk_engine = self._engine(bulk_describe_threshold=1)
+        bulk = bulk_engine.verify(contracts)
+
+        assert {k: v.errors for k, v in bulk.items()} == {k: v.errors for k, v in targeted.items()}
+        assert self.clients['cloudformation'].calls.get('describe_stacks') is None
+
+    def test_invalid_contract_skips_lookups(self, aws):
+        """Teste: contrato malformado não gera consultas AWS"""
+        engine = self._engine()
+        results = engine.verify({'broken': ('app-00-data', {'must_exist': 'DataBucketName'})})
+
+        assert not results['broken'].success
+        assert self.clients['cloudformation'].calls == {}
+
+
+class TestContractEnforcerPipeline:
+    def test_pipeline_uses_batched_engine(self, aws, tmp_path):
+        """Teste: validate_pipeline_contracts avalia todas as phases em lote"""
+        for name, contract in (('00-data', CONTRACT), ('99-bad', CONTRACT), ('50-empty', None)):
+            (tmp_path / f'{name}.yaml').write_text(yaml.safe_dump({'outputs_contract': contract} if contract else {}))
+
+        enforcer = ContractEnforcer(REGION)
+        results = enforcer.validate_pipeline_contracts(str(tmp_path), 'app')
+
+        assert list(results) == ['00-data', '50-empty', '99-bad']
+        assert results['00-data'].success
+        assert not results['99-bad'].success
+        assert results['50-empty'].errors[0].startswith('Contrato não encontrado')
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Testes para o agendador concorrente de deploy de stacks
+"""
+
+import threading
+import time
+
+import pytest
+from core.deployment_scheduler import DeploymentScheduler, UnresolvedImportError
+
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+@pytest.fixture
+def phases_dir(tmp_path):
+    _write(tmp_path / '00-foundation' / '01-state.yaml', """
+Outputs:
+  TableName:
+    Value: !Ref Table
+    Export:
+      Name: !Sub '${ProjectName}-StateTableName'
+""")
+    _write(tmp_path / '00-foundation' / '02-logs.yaml', "Resources: {}\n")
+    _write(tmp_path / '10-security' / '01-kms.yaml', "Resources: {}\n")
+    _write(tmp_path / '20-network' / '01-vpc.yaml', """
+Resources:
+  Lookup:
+    Type: AWS::SSM::Parameter
+    Properties:
+      Value: !ImportValue
+        Fn::Sub: '${ProjectName}-StateTableName'
+""")
+    _write(tmp_path / 'deployment-order.yaml', """
+dependencies:
+  10-security/01-kms:
+    depends_on: ["00-foundation/02-logs", "99-missing/01-x"]
+""")
+    return str(tmp_path)
+
+
+class TestDeploymentScheduler:
+
+    def test_graph_from_order_and_imports(self, phases_dir):
+        """Teste: DAG combina deployment-order.yaml e Fn::ImportValue"""
+        nodes = DeploymentScheduler(phases_dir, phase_barrier=False).build_graph(
+            ['00-foundation', '10-security', '20-network'])
+
+        assert nodes['10-security/01-kms'].depends_on == {'00-foundation/02-logs'}
+        assert nodes['20-network/01-vpc'].depends_on == {'00-foundation/01-state'}
+        assert nodes['00-foundation/01-state'].depends_on == set()
+
+    def test_parallel_bounded_by_critical_path(self, phases_dir):
+        """Teste: Stacks independentes rodam em paralelo respeitando dependências"""
+        finished = []
+        lock = threading.Lock()
+
+        def fake_deploy(node):
+            time.sleep(0.1)
+            with lock:
+                finished.append(node.key)
+            return {'success': True, 'action': 'created'}
+
+        scheduler = DeploymentScheduler(phases_dir, max_concurrency=4, event_callback=lambda e: None,
+                                        phase_barrier=False)
+        summary = scheduler.deploy(['00-foundation', '10-security', '20-network'], deploy_fn=fake_deploy)
+
+        assert summary['success']
+        assert summary['successful'] == 4
+        assert finished.index('00-foundation/01-state') < finished.index('20-network/01-vpc')
+        assert summary['wall_clock_seconds'] < summary['sum_of_stack_seconds']
+        assert len(summary['critical_path']) == 2
+
+    def test_failure_blocks_dependents(self, phases_dir):
+        """Teste: Falha bloqueia apenas os dependentes"""
+        def fake_deploy(node):
+            if node.key == '00-foundation/01-state':
+                return {'success': False, 'error': 'boom'}
+            return {'success': True}
+
+        scheduler = DeploymentScheduler(phases_dir, max_concurrency=2, event_callback=lambda e: None,
+                                        phase_barrier=False)
+        summary = scheduler.deploy(['00-foundation', '10-security', '20-network'], deploy_fn=fake_deploy)
+
+        assert summary['results']['20-network/01-vpc']['action'] == 'blocked'
+        assert summary['results']['10-security/01-kms']['success']
+        assert any(e['status'] == 'BLOCKED' for e in scheduler.events)
+
+    def test_cycle_detected(self, phases_dir, tmp_path):
+        """Teste: Ciclos no grafo são rejeitados"""
+        _write(tmp_path / 'deployment-order.yaml', """
+dependencies:
+  00-foundation/01-state:
+    depends_on: ["20-network/01-vpc"]
+""")
+        with pytest.raises(ValueError):
+            DeploymentScheduler(phases_dir).build_graph(['00-foundation', '20-network'])
+
+    def test_phase_barrier_is_default(self, phases_dir):
+        """Teste: Por padrão cada stack espera todos os stacks das fases anteriores"""
+        nodes = DeploymentScheduler(phases_dir).build_graph(['00-foundation', '10-security', '20-network'])
+
+        assert nodes['10-security/01-kms'].depends_on == {'00-foundation/01-state', '00-foundation/02-logs'}
+        assert nodes['20-network/01-vpc'].depends_on >= {'10-security/01-kms', '00-foundation/01-state'}
+
+    def test_import_without_producer_fails(self, phases_dir, tmp_path):
+        """Teste: Fn::ImportValue sem produtor falha em vez de ser ignorado"""
+        _write(tmp_path / '30-compute' / '01-app.yaml', """
+Resources:
+  Sg:
+    Type: AWS::EC2::SecurityGroup
+    Properties:
+      VpcId: !ImportValue ial-fork-vpc-id
+      GroupDescription: !ImportValue
+        Fn::Sub: '${UnknownParam}-description'
+""")
+        phases = ['00-foundation', '20-network', '30-compute']
+        with pytest.raises(UnresolvedImportError) as excinfo:
+            DeploymentScheduler(phases_dir).build_graph(phases)
+        assert 'ial-fork-vpc-id' in excinfo.value.missing['30-compute/01-app']
+        assert len(excinfo.value.missing['30-compute/01-app']) == 2
+
+        # Exports já existentes na conta satisfazem o import estático
+        scheduler = DeploymentScheduler(phases_dir, external_exports=['ial-fork-vpc-id'])
+        with pytest.raises(UnresolvedImportError) as excinfo:
+            scheduler.build_graph(phases)
+        assert excinfo.value.missing == {'30-compute/01-app': ["{'Fn::Sub': '${UnknownParam}-description'}"]}
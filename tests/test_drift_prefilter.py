@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Testes para a triagem determinística de drift no SmartReconciler
+"""
+
+import io
+import json
+
+import pytest
+from unittest.mock import Mock, patch
+from core.drift.drift_prefilter import DriftRuleEngine, diff_fingerprint
+
+
+def _bedrock_response(verdicts):
+    text = json.dumps(verdicts)
+    return {'body': io.BytesIO(json.dumps({'content': [{'text': text}]}).encode())}
+
+
+def _resource(index, **properties):
+    return {'id': f'res-{index}', 'name': f'Res{index}', 'type': 'AWS::Lambda::Function',
+            'properties': properties}
+
+
+class TestDriftRuleEngine:
+
+    def setup_method(self):
+        self.engine = DriftRuleEngine()
+
+    def test_cosmetic_only(self):
+        """Teste: Diff apenas de tags é resolvido localmente"""
+        changes = [{'property': 'Properties.Tags.Env', 'desired': 'prod', 'current': 'dev'}]
+        verdict = self.engine.classify('AWS::S3::Bucket', changes)
+
+        assert verdict['severity'] == 'info'
+        assert verdict['analysis_method'] == 'rule_engine'
+
+    def test_security_pattern(self):
+        """Teste: Mudança em security group é classificada como crítica"""
+        changes = [{'property': 'Properties.SecurityGroupIngress[ab12cd34]', 'desired': None, 'current': {}}]
+        verdict = self.engine.classify('AWS::EC2::SecurityGroup', changes)
+
+        assert verdict['severity'] == 'critical'
+        assert verdict['auto_remediable'] is False
+
+    def test_ambiguous(self):
+        """Teste: Diff desconhecido fica para o LLM"""
+        changes = [{'property': 'properties.MemorySize', 'desired': '256', 'current': '512'}]
+        assert self.engine.classify('AWS::Lambda::Function', changes) is None
+
+    def test_fingerprint_order_independent(self):
+        """Teste: Fingerprint não depende da ordem das mudanças"""
+        a = {'property': 'x', 'desired': '1', 'current': '2'}
+        b = {'property': 'y', 'desired': '1', 'current': '2'}
+        assert diff_fingerprint('T', [a, b]) == diff_fingerprint('T', [b, a])
+
+
+class TestSmartReconcilerTriage:
+
+    def setup_method(self):
+        with patch('core.smart_reconciler.ResourceCatalog'), patch('core.smart_reconciler.AdvancedValidator'):
+            from core.smart_reconciler import SmartReconciler
+            self.reconciler = SmartReconciler(llm_batch_size=5, llm_max_concurrency=2)
+        self.reconciler.ai_available = True
+        self.reconciler.bedrock = Mock()
+
+    def test_batches_and_caches_llm_calls(self):
+        """Teste: Diffs ambíguos vão em lote e veredictos são reaproveitados"""
+        self.reconciler.bedrock.invoke_model.side_effect = lambda **kwargs: _bedrock_response([
+            {'index': i, 'drift_detected': True, 'severity': 'warning', 'recommended_action': 'update'}
+            for i in range(5)
+        ])
+
+        pairs = []
+        for i in range(10):
+            # Metade cosmético, metade ambíguo (com diff repetido entre pares)
+            if i % 2:
+                pairs.append((_resource(i, Tags={'a': '1'}), _resource(i, Tags={'a': '2'})))
+            else:
+                pairs.append((_resource(i, MemorySize=128 * (i % 4 + 1)), _resource(i, MemorySize=1024)))
+
+        results = self.reconciler.analyze_drifts_batch(pairs)
+        metrics = self.reconciler.get_triage_metrics()
+
+        assert len(results) == 10
+        assert all(r['drift_detected'] for r in results)
+        assert metrics['resolved_by_rules'] == 5
+        assert metrics['sent_to_llm'] == 2
+        assert metrics['llm_calls'] == 1
+
+        # Segunda reconciliação: nenhum novo round trip ao LLM
+        self.reconciler.analyze_drifts_batch(pairs)
+        assert self.reconciler.bedrock.invoke_model.call_count == 1
+        assert self.reconciler.get_triage_metrics()['cache_hits'] == 3 + 5
+
+    def test_llm_failure_uses_fallback(self):
+        """Teste: Falha do Bedrock recai na análise determinística"""
+        self.reconciler.bedrock.invoke_model.side_effect = Exception('throttled')
+
+        result = self.reconciler.analyze_drift_with_ai(_resource(1, MemorySize=128), _resource(1, MemorySize=256))
+
+        assert result['analysis_method'] == 'hash_comparison'
+        assert self.reconciler.get_triage_metrics()['llm_failures'] == 1
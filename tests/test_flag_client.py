@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Testes para o cliente de feature flags em memória (carga em lote, TTL, eventos)
+"""
+
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from core.flag_client import (
+    DynamoDBFlagBackend, FileFlagBackend, FlagClient, handle_change_event, reset_flag_clients
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingBackend:
+    def __init__(self, items):
+        self.items = items
+        self.loads = 0
+
+    def describe(self):
+        return 'memory'
+
+    def load(self):
+        self.loads += 1
+        return [dict(item) for item in self.items]
+
+
+@pytest.fixture(autouse=True)
+def isolated_clients(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.delenv('IAL_FLAGS_FILE', raising=False)
+    reset_flag_clients()
+    yield
+    reset_flag_clients()
+
+
+@pytest.fixture
+def flags_table():
+    with mock_aws():
+        client = boto3.client('dynamodb', region_name='us-east-1')
+        client.create_table(
+            TableName='ial-feature-flags',
+            KeySchema=[{'AttributeName': 'flag_name', 'KeyType': 'HASH'},
+                       {'AttributeName': 'environment', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'flag_name', 'AttributeType': 'S'},
+                                  {'AttributeName': 'environment', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        yield client
+
+
+def _put(client, flag_name, environment, **attrs):
+    item = {'flag_name': {'S': flag_name}, 'environment': {'S': environment}}
+    for name, value in attrs.items():
+        item[name] = {'BOOL': value} if isinstance(value, bool) else {'S': str(value)}
+    client.put_item(TableName='ial-feature-flags', Item=item)
+
+
+class TestFlagClient:
+    def test_reads_served_from_memory_within_ttl(self):
+        """Teste: várias leituras dentro do TTL fazem uma única carga"""
+        backend = CountingBackend([{'flag_name': 'A', 'enabled': True}, {'flag_name': 'B', 'enabled': False}])
+        client = FlagClient(backend, ttl=30, clock=FakeClock())
+
+        for _ in range(100):
+            assert client.get('A')['enabled'] is True
+            assert client.get('missing') is None
+        assert backend.loads == 1
+
+    def test_stale_snapshot_revalidated_and_listeners_notified(self):
+        """Teste: após o TTL serve o snapshot antigo e recarrega; mudanças notificam"""
+        clock = FakeClock()
+        backend = CountingBackend([{'flag_name': 'A', 'enabled': True}])
+        client = FlagClient(backend, ttl=30, background_refresh=False, clock=clock)
+        changes = []
+        client.subscribe(changes.append)
+
+        assert client.get('A')['enabled'] is True
+        backend.items = [{'flag_name': 'A', 'enabled': False}]
+        clock.now += 31
+
+        assert client.get('A')['enabled'] is False
+        assert backend.loads == 2
+        assert changes == [{'A': ({'flag_name': 'A', 'enabled': True}, {'flag_name': 'A', 'enabled': False})}]
+
+    def test_failed_refresh_keeps_last_snapshot(self):
+        """Teste: falha do backend mantém os valores já carregados"""
+        clock = FakeClock()
+        backend = CountingBackend([{'flag_name': 'A', 'enabled': True}])
+        client = FlagClient(backend, ttl=30, background_refresh=False, clock=clock)
+        assert client.get('A')['enabled'] is True
+
+        backend.load = lambda: (_ for _ in ()).throw(RuntimeError('throttled'))
+        clock.now += 31
+        assert client.get('A')['enabled'] is True
+        assert client.stats['load_errors'] == 1
+        assert client.loaded
+
+    def test_change_events_force_reload(self):
+        """Teste: evento SSM sob o prefixo recarrega; outros parâmetros são ignorados"""
+        backend = CountingBackend([{'flag_name': 'A', 'enabled': True}])
+        client = FlagClient(backend, ttl=3600, clock=FakeClock())
+        client.get('A')
+
+        ignored = {'source': 'aws.ssm', 'detail-type': 'Parameter Store Change',
+                   'detail': {'name': '/other/param', 'operation': 'Update'}}
+        relevant = dict(ignored, detail={'name': '/ial/feature-flags/version', 'operation': 'Update'})
+
+        assert client.handle_change_event(ignored) is False
+        assert client.handle_change_event(relevant) is True
+        assert backend.loads == 2
+
+
+class TestBackends:
+    def test_dynamodb_backend_loads_environment_in_one_pass(self, flags_table):
+        """Teste: scan paginado filtrado pelo ambiente (environment é sort key)"""
+        for i in range(30):
+            _put(flags_table, f'FLAG_{i}', 'prod', enabled=i % 2 == 0)
+        _put(flags_table, 'FLAG_0', 'dev', enabled=False)
+
+        client = FlagClient(DynamoDBFlagBackend('ial-feature-flags', {'environment': 'prod'}, client=flags_table))
+        snapshot = client.snapshot()
+
+        assert len(snapshot) == 30
+        assert snapshot['FLAG_0']['enabled'] is True
+        assert client.stats['loads'] == 1
+
+    def test_file_backend_formats(self, tmp_path):
+        """Teste: arquivo local aceita lista de itens ou dict nome -> valor"""
+        listed = tmp_path / 'list.json'
+        listed.write_text(json.dumps([{'flag_name': 'X', 'environment': 'dev', 'enabled': True},
+                                      {'flag_name': 'X', 'environment': 'prod', 'enabled': False}]))
+        mapped = tmp_path / 'map.json'
+        mapped.write_text(json.dumps({'X': True, 'Y': {'enabled': False}}))
+
+        assert FileFlagBackend(str(listed), {'environment': 'prod'}).load() == [
+            {'flag_name': 'X', 'environment': 'prod', 'enabled': False}]
+        assert {i['flag_name']: i['enabled'] for i in FileFlagBackend(str(mapped)).load()} == {'X': True, 'Y': False}
+
+
+class TestManagers:
+    def test_feature_flags_manager_offline_file(self, tmp_path, monkeypatch):
+        """Teste: IAL_FLAGS_FILE troca o DynamoDB por arquivo local, com defaults"""
+        flags_file = tmp_path / 'flags.json'
+        flags_file.write_text(json.dumps([{'flag_name': 'BUDGET_ENFORCEMENT_ENABLED', 'environment': 'default',
+                                           'enabled': False}]))
+        monkeypatch.setenv('IAL_FLAGS_FILE', str(flags_file))
+        from core.feature_flags import FeatureFlagsManager
+
+        manager = FeatureFlagsManager()
+        assert manager.get_flag('BUDGET_ENFORCEMENT_ENABLED') is False
+        assert manager.get_flag('SECURITY_SERVICES_ENABLED') is True
+        assert manager.get_all_flags()['BUDGET_ENFORCEMENT_ENABLED'] is False
+
+    def test_drift_flag_shares_snapshot_across_instances(self, flags_table):
+        """Teste: DriftFlag carrega todos os escopos numa Query e reaproveita entre instâncias"""
+        _put(flags_table, 'drift_control', 'prod', scope='prod', state='PAUSED')
+        _put(flags_table, 'drift_control', 'dev', scope='dev', state='DISABLED')
+        _put(flags_table, 'OTHER_FLAG', 'prod', enabled=True)
+        from core.drift_flag import DriftFlag, DriftState
+
+        first = DriftFlag()
+        assert first.get_drift_state('prod') == DriftState.PAUSED
+        assert DriftFlag().get_drift_state('dev') == DriftState.DISABLED
+        assert DriftFlag().get_drift_state('staging') == DriftState.ENABLED
+        assert first.flags.stats['loads'] == 1
+
+        result = handle_change_event({'source': 'ial.feature-flags', 'detail': {'flag_name': 'drift_control'}})
+        assert result['refreshed'] == 1
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Testes para o planejador de queries multi-fonte do IALQueryEngine
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from core.ial_query_engine import IALQueryEngine, MCPClient, QueryPlanner
+
+
+class SlowMCPClient(MCPClient):
+    """Cliente MCP simulado com latência fixa e contagem de chamadas"""
+
+    def __init__(self, server_name, delay=0.0):
+        super().__init__(server_name, {})
+        self.delay = delay
+        self.calls = []
+
+    async def call_tool(self, tool_name, parameters):
+        self.calls.append((tool_name, parameters.get('resource_type')))
+        await asyncio.sleep(self.delay)
+        return await super().call_tool(tool_name, parameters)
+
+
+@pytest.fixture
+def engine():
+    engine = IALQueryEngine(account_id='111111111111', region='us-east-1')
+    engine.mcp_clients = {
+        name: SlowMCPClient(name, delay=0.1)
+        for name in ('aws-core', 'aws-cost-explorer', 'aws-cloudtrail', 'aws-cloudwatch')
+    }
+    return engine
+
+
+class TestQueryPlanner:
+    def test_decomposes_multi_topic_question(self, engine):
+        """Teste: cada assunto citado vira uma sub-query independente"""
+        plan = QueryPlanner().plan('liste buckets, instâncias ec2 e o custo atual', engine)
+        assert [sq.source for sq in plan] == ['s3', 'ec2', 'cost']
+        assert [sq.cacheable for sq in plan] == [True, True, False]
+
+    def test_unknown_topic_falls_back_to_general(self, engine):
+        """Teste: pergunta sem fonte reconhecida vai para a query geral"""
+        plan = QueryPlanner().plan('olá', engine)
+        assert [sq.source for sq in plan] == ['general']
+
+    def test_single_source_keeps_original_result_shape(self, engine):
+        """Teste: uma única fonte devolve o resultado dela, sem envelope"""
+        result = asyncio.run(engine.process_query('liste todos os buckets'))
+        assert result['type'] == 's3_buckets' and result['status'] == 'success'
+
+
+class TestParallelExecution:
+    def test_sources_run_concurrently_and_merge(self, engine):
+        """Teste: três fontes de 100 ms respondem em ~1 round-trip"""
+        start = time.perf_counter()
+        result = asyncio.run(engine.process_query('buckets s3, ec2 e custo'))
+        elapsed = time.perf_counter() - start
+
+        assert result['type'] == 'multi_source' and result['status'] == 'success'
+        assert set(result['results']) == {'s3', 'ec2', 'cost'}
+        assert result['results']['ec2']['type'] == 'ec2_instances'
+        assert elapsed < 0.25
+
+    def test_slow_source_times_out_without_failing_others(self):
+        """Teste: timeout por fonte gera resposta parcial"""
+        engine = IALQueryEngine(source_timeouts={'cost': 0.05})
+        engine.mcp_clients = {'aws-core': SlowMCPClient('aws-core', delay=0.01),
+                              'aws-cost-explorer': SlowMCPClient('aws-cost-explorer', delay=1.0)}
+
+        result = asyncio.run(engine.process_query('buckets e custo'))
+        assert result['status'] == 'partial'
+        assert result['results']['s3']['status'] == 'success'
+        assert 'Timeout' in result['errors']['cost']
+
+
+class TestInventoryCache:
+    def test_inventory_cached_per_account_and_region(self, engine):
+        """Teste: inventário repetido vem do cache; outra região consulta de novo"""
+        core = engine.mcp_clients['aws-core']
+
+        async def scenario():
+            first = await engine.process_query('buckets s3')
+            second = await engine.process_query('buckets s3')
+            other = await engine.process_query('buckets s3', region='eu-west-1')
+            return first, second, other
+
+        first, second, other = asyncio.run(scenario())
+        assert 'cached' not in first and second['cached'] is True
+        assert 'cached' not in other
+        assert len(core.calls) == 2
+
+        engine.invalidate_inventory(region='us-east-1')
+        asyncio.run(engine.process_query('buckets s3'))
+        assert len(core.calls) == 3
+
+    def test_concurrent_identical_questions_share_one_call(self, engine):
+        """Teste: perguntas simultâneas sobre o mesmo inventário fazem uma chamada"""
+        core = engine.mcp_clients['aws-core']
+
+        async def scenario():
+            return await asyncio.gather(*(engine.process_query('quantas ec2') for _ in range(5)))
+
+        results = asyncio.run(scenario())
+        assert all(r['type'] == 'ec2_instances' for r in results)
+        assert core.calls == [('list_resources', 'AWS::EC2::Instance')]
+
+    def test_errors_are_not_cached(self, engine):
+        """Teste: falha de inventário não fica em cache"""
+        engine.mcp_clients.pop('aws-core')
+        assert asyncio.run(engine.process_query('buckets s3'))['type'] == 'error'
+        assert len(engine.inventory_cache) == 0
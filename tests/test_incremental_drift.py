@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Testes para detecção incremental de drift orientada a eventos CloudTrail
+"""
+
+import gzip
+import json
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+from core.drift.incremental_drift import (
+    DirtySet, IncrementalDriftDetector, check_resource_drift_cfn, extract_touched_resources,
+    iter_events_from_file
+)
+
+
+def _cloudtrail(event_name, read_only=False, **request_parameters):
+    return {
+        'source': 'aws.ec2',
+        'detail-type': 'AWS API Call via CloudTrail',
+        'detail': {
+            'eventName': event_name,
+            'eventTime': '2025-11-12T10:00:00Z',
+            'awsRegion': 'us-east-1',
+            'readOnly': read_only,
+            'requestParameters': request_parameters
+        }
+    }
+
+
+EVENTS = [
+    _cloudtrail('AuthorizeSecurityGroupIngress', groupId='sg-123'),
+    _cloudtrail('DescribeSecurityGroups', read_only=True, groupId='sg-123'),
+    _cloudtrail('PutBucketPolicy', bucketName='ial-logs'),
+    _cloudtrail('RevokeSecurityGroupIngress', groupId='sg-123'),
+    _cloudtrail('GetBucketPolicy', read_only=True, bucketName='ial-logs'),
+]
+
+
+class TestIncrementalDrift:
+
+    def test_extract_mutating_only(self):
+        """Teste: Apenas eventos mutáveis marcam recursos"""
+        assert extract_touched_resources(EVENTS[1]) == []
+
+        touched = extract_touched_resources(EVENTS[0])
+        assert touched[0]['resource_type'] == 'AWS::EC2::SecurityGroup'
+        assert touched[0]['resource_id'] == 'sg-123'
+
+    def test_resources_arn_not_marked_twice(self):
+        """Teste: ARN em resources[] não duplica o recurso já identificado nos parâmetros"""
+        event = _cloudtrail('PutBucketPolicy', bucketName='ial-logs')
+        event['detail']['resources'] = [{'type': 'AWS::S3::Bucket', 'ARN': 'arn:aws:s3:::ial-logs'}]
+        assert [r['resource_id'] for r in extract_touched_resources(event)] == ['ial-logs']
+
+        event = _cloudtrail('TerminateInstances')
+        event['detail']['resources'] = [
+            {'type': 'AWS::EC2::Instance', 'ARN': 'arn:aws:ec2:us-east-1:123456789012:instance/i-0abc'},
+            {'type': 'AWS::IAM::Role', 'ARN': 'arn:aws:iam::123456789012:role/service/app-role'},
+            {'type': 'AWS::SNS::Topic', 'ARN': 'arn:aws:sns:us-east-1:123456789012:alerts'}
+        ]
+        assert [r['resource_id'] for r in extract_touched_resources(event)] == [
+            'i-0abc', 'app-role', 'arn:aws:sns:us-east-1:123456789012:alerts']
+
+    def test_failed_calls_ignored(self):
+        """Teste: Chamadas com erro não causam drift"""
+        event = _cloudtrail('DeleteBucket', bucketName='b')
+        event['detail']['errorCode'] = 'AccessDenied'
+        assert extract_touched_resources(event) == []
+
+    def test_replay_jsonl_checks_only_dirty(self, tmp_path):
+        """Teste: Replay de JSONL re-verifica apenas recursos tocados"""
+        events_file = tmp_path / 'events.jsonl.gz'
+        with gzip.open(events_file, 'wt') as handle:
+            handle.write('\n'.join(json.dumps(e) for e in EVENTS))
+
+        checked = []
+        detector = IncrementalDriftDetector(
+            DirtySet(str(tmp_path / 'dirty.json')),
+            check_resource=lambda r: checked.append(r['resource_id']) or {'drift_detected': r['resource_id'] == 'sg-123'},
+            full_sweep=lambda: [],
+        )
+        detector.dirty_set.record_full_sweep()
+
+        assert detector.replay(iter_events_from_file(str(events_file))) == 5
+        result = detector.run()
+
+        assert result['mode'] == 'incremental'
+        assert sorted(checked) == ['ial-logs', 'sg-123']
+        assert len(result['drifts']) == 1
+        assert detector.stats['events_ignored'] == 2
+
+        # Dirty-set drenado: próximo ciclo não verifica nada
+        assert detector.run()['resources_checked'] == 0
+
+    def test_dirty_set_persists(self, tmp_path):
+        """Teste: Dirty-set sobrevive entre instâncias (invocações)"""
+        path = str(tmp_path / 'dirty.json')
+        DirtySet(path).mark(extract_touched_resources(EVENTS[0]))
+
+        assert len(DirtySet(path)) == 1
+
+    def test_full_sweep_safety_net(self, tmp_path):
+        """Teste: Varredura completa periódica quando vencida"""
+        sweeps = []
+        detector = IncrementalDriftDetector(
+            DirtySet(str(tmp_path / 'dirty.json')),
+            check_resource=lambda r: None,
+            full_sweep=lambda: sweeps.append(1) or [],
+            full_sweep_interval=3600
+        )
+
+        assert detector.run()['mode'] == 'full_sweep'
+        assert detector.run()['mode'] == 'incremental'
+        assert detector.full_sweep_due(time.time() + 7200)
+        assert len(sweeps) == 1
+
+    def test_failed_check_stays_dirty(self, tmp_path):
+        """Teste: Recurso cuja verificação falhou continua no dirty-set"""
+        def flaky(resource):
+            if resource['resource_id'] == 'sg-123':
+                raise RuntimeError('Throttling')
+            return {'drift_detected': False}
+
+        detector = IncrementalDriftDetector(DirtySet(str(tmp_path / 'dirty.json')), check_resource=flaky)
+        detector.replay(EVENTS)
+        result = detector.run()
+
+        assert result['resources_checked'] == 1
+        assert result['failed_checks'] == [{'resource_id': 'sg-123', 'error': 'Throttling'}]
+        assert [r['resource_id'] for r in DirtySet(str(tmp_path / 'dirty.json')).pending()] == ['sg-123']
+
+    def test_api_errors_are_not_unmanaged(self, tmp_path):
+        """Teste: Throttling não vira UNMANAGED; só "Stack ... does not exist" vira"""
+        class FakeCloudFormation:
+            def __init__(self, code, message):
+                self.error = {'Error': {'Code': code, 'Message': message}}
+
+            def describe_stack_resources(self, PhysicalResourceId):
+                raise ClientError(self.error, 'DescribeStackResources')
+
+        resource = {'resource_type': 'AWS::EC2::SecurityGroup', 'resource_id': 'sg-123'}
+        throttled = FakeCloudFormation('Throttling', 'Rate exceeded')
+        with pytest.raises(ClientError):
+            check_resource_drift_cfn(resource, throttled)
+
+        missing = FakeCloudFormation('ValidationError', 'Stack for sg-123 does not exist')
+        assert check_resource_drift_cfn(resource, missing)['drift_status'] == 'UNMANAGED'
+
+        detector = IncrementalDriftDetector(DirtySet(str(tmp_path / 'dirty.json')),
+                                            check_resource=lambda r: check_resource_drift_cfn(r, throttled))
+        detector.record_event(EVENTS[0])
+        result = detector.run()
+        assert result['drifts'] == [] and len(result['failed_checks']) == 1
+        assert [r['resource_id'] for r in detector.dirty_set.pending()] == ['sg-123']
+
+    def test_mark_during_check_survives_ack(self, tmp_path):
+        """Teste: Evento marcado durante a verificação não é descartado"""
+        dirty_set = DirtySet(str(tmp_path / 'dirty.json'))
+
+        def check(resource):
+            dirty_set.mark(extract_touched_resources(EVENTS[3]))
+            return {'drift_detected': False}
+
+        detector = IncrementalDriftDetector(dirty_set, check_resource=check)
+        detector.record_event(EVENTS[0])
+        assert detector.run()['resources_checked'] == 1
+        assert [r['events'] for r in dirty_set.pending()] == [2]
+
+    def test_force_full_requires_sweep(self, tmp_path):
+        """Teste: force_full sem full_sweep gera erro claro"""
+        detector = IncrementalDriftDetector(DirtySet(), check_resource=lambda r: None)
+        with pytest.raises(ValueError, match='full_sweep'):
+            detector.run(force_full=True)
+
+    def test_full_sweep_keeps_marks_made_during_sweep(self, tmp_path):
+        """Teste: Varredura completa limpa só o que foi marcado antes de começar"""
+        dirty_set = DirtySet(str(tmp_path / 'dirty.json'))
+        dirty_set.mark(extract_touched_resources(EVENTS[2]))
+
+        def sweep():
+            time.sleep(0.01)
+            dirty_set.mark(extract_touched_resources(EVENTS[0]))
+            return []
+
+        IncrementalDriftDetector(dirty_set, check_resource=lambda r: None, full_sweep=sweep).run(force_full=True)
+        assert [r['resource_id'] for r in dirty_set.pending()] == ['sg-123']
+
+    def test_dynamodb_dirty_set_conditional_ack(self, monkeypatch):
+        """Teste: Dirty-set DynamoDB remove só entradas não re-marcadas"""
+        boto3 = pytest.importorskip('boto3')
+        moto = pytest.importorskip('moto')
+        from core.drift.incremental_drift import DynamoDBDirtySet
+
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+        monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+        with moto.mock_aws():
+            boto3.client('dynamodb', region_name='us-east-1').create_table(
+                TableName='dirty', BillingMode='PAY_PER_REQUEST',
+                KeySchema=[{'AttributeName': 'resource_key', 'KeyType': 'HASH'}],
+                AttributeDefinitions=[{'AttributeName': 'resource_key', 'AttributeType': 'S'}]
+            )
+            dirty_set = DynamoDBDirtySet('dirty')
+            dirty_set.mark(extract_touched_resources(EVENTS[0]) + extract_touched_resources(EVENTS[2]))
+            snapshot = dirty_set.pending()
+            dirty_set.mark(extract_touched_resources(EVENTS[3]))
+
+            assert dirty_set.ack(snapshot) == 1
+            assert [r['resource_id'] for r in dirty_set.pending()] == ['sg-123']
+
+            dirty_set.record_full_sweep(time.time() - 60)
+            assert len(dirty_set) == 2  # entrada marcada depois do início + marcador da varredura
+            dirty_set.record_full_sweep()
+            assert [r['resource_id'] for r in dirty_set.pending()] == []
+
+
+class FakeDriftCloudFormation:
+    """CloudFormation em memória: detecção termina após N consultas de status"""
+
+    def __init__(self, polls_until_done=2, final_status='DETECTION_COMPLETE'):
+        self.polls = {}
+        self.polls_until_done = polls_until_done
+        self.final_status = final_status
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self):
+        yield {'Stacks': [{'StackName': 'ial-network'}, {'StackName': 'other-app'}]}
+
+    def detect_stack_drift(self, StackName):
+        return {'StackDriftDetectionId': f'det-{StackName}'}
+
+    def describe_stack_drift_detection_status(self, StackDriftDetectionId):
+        self.polls[StackDriftDetectionId] = self.polls.get(StackDriftDetectionId, 0) + 1
+        if self.polls[StackDriftDetectionId] < self.polls_until_done:
+            return {'DetectionStatus': 'DETECTION_IN_PROGRESS'}
+        return {'DetectionStatus': self.final_status, 'StackDriftStatus': 'DRIFTED',
+                'DriftedStackResourceCount': 1}
+
+
+class TestFullSweepAndChecklist:
+
+    def test_full_sweep_waits_for_detection(self):
+        """Teste: Varredura completa espera o resultado da detecção iniciada"""
+        from lambdas.drift_detection_handler import _full_sweep_stacks
+
+        cf_client = FakeDriftCloudFormation(polls_until_done=3)
+        drifts = _full_sweep_stacks(cf_client, poll_interval=0)
+        assert [d['resource_id'] for d in drifts] == ['ial-network']
+        assert cf_client.polls == {'det-ial-network': 3}
+
+        with pytest.raises(RuntimeError):
+            _full_sweep_stacks(FakeDriftCloudFormation(final_status='DETECTION_FAILED'), poll_interval=0)
+
+    def test_lambda_requires_dirty_set_table(self, monkeypatch):
+        """Teste: Sem DRIFT_DIRTY_SET_TABLE o Lambda falha em vez de usar /tmp"""
+        from lambdas.drift_detection_handler import _get_incremental_detector
+
+        monkeypatch.delenv('DRIFT_DIRTY_SET_TABLE', raising=False)
+        with pytest.raises(RuntimeError, match='DRIFT_DIRTY_SET_TABLE'):
+            _get_incremental_detector()
+
+    def test_physical_ids_mapped_to_checklist_names(self, monkeypatch):
+        """Teste: IDs físicos/ARNs do CloudTrail viram ResourceName do checklist"""
+        import importlib.util
+        from pathlib import Path
+
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        path = Path(__file__).resolve().parents[1] / 'scripts' / 'detect-drift.py'
+        spec = importlib.util.spec_from_file_location('detect_drift_script', path)
+        script = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(script)
+
+        items = [
+            {'ResourceName': {'S': 'web-sg'}, 'Properties': {'S': json.dumps({'GroupId': 'sg-123'})}},
+            {'ResourceName': {'S': 'ial-logs'}},
+            {'ResourceName': {'S': 'orders-queue'}},
+        ]
+        dirty = [
+            {'resource_type': 'AWS::EC2::SecurityGroup', 'resource_id': 'sg-123'},
+            {'resource_type': 'AWS::S3::Bucket', 'resource_id': 'arn:aws:s3:::ial-logs'},
+            {'resource_type': 'AWS::SQS::Queue',
+             'resource_id': 'https://sqs.us-east-1.amazonaws.com/123456789012/orders-queue'},
+            {'resource_type': 'AWS::EC2::Instance', 'resource_id': 'i-999'},
+        ]
+        names, unmatched = script.map_to_checklist(dirty, items)
+        assert names == {'web-sg', 'ial-logs', 'orders-queue'}
+        assert [r['resource_id'] for r in unmatched] == ['i-999']
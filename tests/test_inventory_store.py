@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Testes para o inventário local (SQLite) e o coletor paralelo por serviço/região
+"""
+
+import asyncio
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from core import inventory_store
+from core.inventory_store import InventoryCollector, InventoryStore
+
+
+class FakeClock:
+    def __init__(self, now=1_800_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        session = boto3.session.Session(region_name='us-east-1')
+        for region in ('us-east-1', 'eu-west-1'):
+            ec2 = session.client('ec2', region_name=region)
+            image = ec2.describe_images()['Images'][0]['ImageId']
+            ec2.run_instances(ImageId=image, MinCount=2, MaxCount=2, InstanceType='t3.small',
+                              TagSpecifications=[{'ResourceType': 'instance',
+                                                  'Tags': [{'Key': 'Environment', 'Value': 'production'}]}])
+        s3 = session.client('s3')
+        for name in ('ial-artifacts', 'ial-logs'):
+            s3.create_bucket(Bucket=name)
+        yield session
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = InventoryStore(str(tmp_path / 'inventory.db'))
+    yield store
+    store.close()
+
+
+class TestCollector:
+    def test_parallel_collection_per_service_and_region(self, aws, store):
+        """Teste: um escopo por serviço/região; S3 coletado uma vez (global)"""
+        collector = InventoryCollector(store, services=['ec2', 's3'], regions=['us-east-1', 'eu-west-1'],
+                                       session=aws)
+        summary = collector.refresh()
+
+        assert set(summary['collected']) == {'ec2/us-east-1', 'ec2/eu-west-1', 's3/global'}
+        assert summary['collected']['ec2/eu-west-1']['added'] == 2
+        assert len(store.list_resources(resource_type='AWS::EC2::Instance')) == 4
+        assert len(store.list_resources(resource_type='AWS::EC2::Instance', region='eu-west-1')) == 2
+        assert store.names(service='s3') == {'ial-artifacts', 'ial-logs'}
+
+    def test_refresh_is_incremental(self, aws, store):
+        """Teste: escopos frescos são pulados; recoleta detecta alterados e removidos"""
+        collector = InventoryCollector(store, services=['ec2', 's3'], session=aws)
+        collector.refresh()
+        assert collector.refresh()['collected'] == {}
+
+        ec2 = aws.client('ec2', region_name='us-east-1')
+        instance_id = store.list_resources(resource_type='AWS::EC2::Instance')[0]['resource_id']
+        ec2.stop_instances(InstanceIds=[instance_id])
+        aws.client('s3').delete_bucket(Bucket='ial-logs')
+
+        summary = collector.refresh(force=True)
+        assert summary['collected']['ec2/us-east-1'] == {'added': 0, 'updated': 1, 'unchanged': 1, 'removed': 0}
+        assert summary['collected']['s3/global']['removed'] == 1
+        assert [r['resource_id'] for r in store.list_resources(state='stopped')] == [instance_id]
+
+    def test_failed_scope_keeps_previous_snapshot(self, aws, store, monkeypatch):
+        """Teste: falha de coleta mantém o snapshot anterior e registra o erro"""
+        collector = InventoryCollector(store, services=['s3'], session=aws, max_age=0)
+        collector.refresh()
+
+        def denied(client):
+            raise RuntimeError('AccessDenied')
+
+        monkeypatch.setitem(inventory_store.SERVICE_COLLECTORS, 's3', ('s3', ('AWS::S3::Bucket',), denied))
+        summary = collector.refresh()
+        assert summary['failed'] == {'s3/global': 'AccessDenied'}
+        assert store.names(service='s3') == {'ial-artifacts', 'ial-logs'}
+        assert store.stats()['failed_scopes'][0]['status'] == 'failed'
+
+
+class TestStore:
+    def test_freshness_and_sql_queries(self, tmp_path):
+        """Teste: list_resources com max_age devolve None quando o snapshot envelheceu"""
+        clock = FakeClock()
+        store = InventoryStore(str(tmp_path / 'inventory.db'), clock=clock)
+        store.replace_scope('111', 'us-east-1', 'ec2', [{
+            'resource_type': 'AWS::EC2::Instance', 'resource_id': 'i-1', 'name': 'web', 'state': 'running',
+            'tags': {'Environment': 'staging'}, 'properties': {'InstanceType': 't3.micro'}
+        }])
+        assert len(store.list_resources(resource_type='AWS::EC2::Instance', max_age=60)) == 1
+
+        rows = store.query("SELECT resource_id FROM resources WHERE json_extract(tags, '$.Environment') = ?",
+                           ('staging',))
+        assert rows == [{'resource_id': 'i-1'}]
+        with pytest.raises(ValueError):
+            store.query('DELETE FROM resources')
+
+        clock.now += 120
+        assert store.list_resources(resource_type='AWS::EC2::Instance', max_age=60) is None
+        store.record_failure('111', 'us-east-1', 'ec2', 'Throttling')
+        assert store.stats()['failed_scopes'][0]['error'] == 'Throttling'
+        assert store.list_resources(resource_type='AWS::EC2::Instance')[0]['name'] == 'web'
+        store.close()
+
+
+class TestEngines:
+    def test_query_engine_answers_from_inventory(self, aws, store):
+        """Teste: IALQueryEngine responde EC2/S3 pelo inventário sem chamar MCP"""
+        from core.ial_query_engine import IALQueryEngine
+
+        InventoryCollector(store, services=['ec2', 's3'], session=aws).refresh()
+        engine = IALQueryEngine(region='us-east-1', inventory=store)
+        engine.mcp_clients = {}
+
+        ec2 = asyncio.run(engine.process_query('quantas ec2'))
+        assert ec2['source'] == 'inventory' and ec2['prod_count'] == 2
+        s3 = asyncio.run(engine.process_query('liste buckets'))
+        assert s3['source'] == 'inventory' and s3['total'] == 2
+
+    def test_cost_engine_idle_resources_from_inventory(self, aws, store):
+        """Teste: volumes soltos e instâncias paradas vêm do inventário"""
+        from core.cost_optimization_engine import CostOptimizationEngine
+
+        ec2 = aws.client('ec2', region_name='us-east-1')
+        ec2.create_volume(AvailabilityZone='us-east-1a', Size=100, VolumeType='gp3')
+        instance_id = ec2.describe_instances()['Reservations'][0]['Instances'][0]['InstanceId']
+        ec2.stop_instances(InstanceIds=[instance_id])
+        InventoryCollector(store, services=['ec2', 'ebs'], session=aws).refresh()
+
+        engine = CostOptimizationEngine(inventory=store)
+        opportunities = asyncio.run(engine._analyze_idle_resources())
+        by_type = {opp['type']: opp for opp in opportunities}
+        assert by_type['unattached_volume']['monthly_savings'] == 8.0
+        assert by_type['idle_instance']['resource_id'] == instance_id
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Testes para o ledger segmentado (writer único, rotação, índice e consultas)
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from core.ledger_store import LedgerStore, main, parse_time
+
+BASE_TS = 1_700_000_000_000
+PHASES = ['00-foundation', '10-security', '20-network', '30-compute']
+
+
+def _entry(i, phase=None, status=None):
+    return {'id': f'e{i}', 'ts': BASE_TS + i * 1000, 'phase': phase or PHASES[i % len(PHASES)],
+            'mcp': 'test', 'tool': 'op', 'rationale': 'r' * 50, 'status': status or ('OK' if i % 5 else 'ERROR')}
+
+
+class TestLedgerStore:
+    def test_buffered_writes_are_jsonl_compatible(self, tmp_path):
+        """Teste: segmento ativo continua em JSON lines no caminho original"""
+        store = LedgerStore(str(tmp_path), flush_interval=3600)
+        for i in range(10):
+            store.append(_entry(i))
+        assert not (tmp_path / 'decisions.log').exists() or (tmp_path / 'decisions.log').read_text() == ''
+
+        assert store.flush() == 10
+        lines = [json.loads(line) for line in (tmp_path / 'decisions.log').read_text().splitlines()]
+        assert [line['id'] for line in lines] == [f'e{i}' for i in range(10)]
+        store.close()
+
+    def test_concurrent_writers_do_not_interleave(self, tmp_path):
+        """Teste: várias threads escrevendo produzem apenas linhas completas"""
+        store = LedgerStore(str(tmp_path), flush_interval=0.01, max_pending=7)
+
+        def writer(offset):
+            for i in range(200):
+                store.append(_entry(offset + i, status='X' * (i % 40)))
+
+        threads = [threading.Thread(target=writer, args=(n * 1000,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        store.close()
+
+        lines = (tmp_path / 'decisions.log').read_text().splitlines()
+        assert len(lines) == 1600
+        assert all(json.loads(line)['mcp'] == 'test' for line in lines)
+
+    def test_rotation_compresses_and_indexes_segments(self, tmp_path):
+        """Teste: segmento ativo é selado em blocos gzip com índice e manifesto"""
+        store = LedgerStore(str(tmp_path), segment_bytes=20_000, block_records=50, flush_interval=3600)
+        for i in range(500):
+            store.append(_entry(i))
+            if i % 37 == 0:
+                store.flush()
+        store.flush()
+
+        stats = store.stats()
+        assert stats['segments'] >= 2
+        assert stats['sealed_entries'] + stats['active_entries'] == 500
+        assert stats['sealed_bytes'] < stats['sealed_raw_bytes']
+
+        ledger_dir = tmp_path / 'ledger'
+        segment = sorted(ledger_dir.glob('segment-*.log.gz'))[0]
+        with gzip.open(segment, 'rt') as f:
+            assert json.loads(f.readline())['id'] == 'e0'
+        assert (ledger_dir / f"{segment.name}.idx.json").exists()
+        store.close()
+
+    def test_query_uses_index_and_matches_scan(self, tmp_path):
+        """Teste: consulta indexada pula blocos e retorna o mesmo que o scan completo"""
+        store = LedgerStore(str(tmp_path), segment_bytes=50_000, block_records=100, flush_interval=3600)
+        for i in range(2000):
+            store.append(_entry(i, phase=PHASES[(i // 250) % len(PHASES)]))
+            if i % 100 == 99:
+                store.flush()  # lotes fixos: layout de segmentos/blocos determinístico
+
+        since = BASE_TS + 1500 * 1000
+        indexed = store.query(phase='20-network', since=since)
+        expected = [e for e in store.scan_all() if e['phase'] == '20-network' and e['ts'] >= since]
+
+        assert indexed == expected
+        assert indexed
+        query_stats = store.last_query_stats
+        assert query_stats['segments_scanned'] < query_stats['segments_total']
+        assert query_stats['blocks_skipped'] > 0
+
+        assert store.query(status='ERROR', limit=3) == [e for e in store.scan_all() if e['status'] == 'ERROR'][:3]
+        store.close()
+
+    def test_external_appends_and_replaced_file(self, tmp_path):
+        """Teste: linhas gravadas fora do store e arquivo substituído continuam consultáveis"""
+        store = LedgerStore(str(tmp_path), flush_interval=3600)
+        for i in range(5):
+            store.append(_entry(i))
+        store.flush()
+
+        with open(tmp_path / 'decisions.log', 'a') as f:
+            f.write(json.dumps(_entry(99, phase='99-legacy')) + '\n')
+        assert [e['id'] for e in store.query(phase='99-legacy')] == ['e99']
+
+        (tmp_path / 'decisions.log').write_text(json.dumps(_entry(7, phase='77-reset')) + '\n')
+        assert [e['id'] for e in store.query()] == ['e7']
+        store.close()
+
+    def test_parse_time_formats(self):
+        """Teste: epoch em s/ms, ISO-8601 e relativo"""
+        assert parse_time(1_700_000_000) == 1_700_000_000_000
+        assert parse_time('1700000000000') == 1_700_000_000_000
+        assert parse_time('2023-11-14T22:13:20Z') == 1_700_000_000_000
+        assert abs(parse_time('1h') - (time.time() - 3600) * 1000) < 5000
+
+    def test_cli_query(self, tmp_path, capsys):
+        """Teste: 'ledger query --phase X --since T' em JSON lines"""
+        store = LedgerStore(str(tmp_path), flush_interval=3600)
+        for i in range(40):
+            store.append(_entry(i))
+        store.close()
+
+        assert main(['--dir', str(tmp_path), 'query', '--phase', '10-security',
+                     '--since', str(BASE_TS + 20_000), '--json']) == 0
+        ids = [json.loads(line)['id'] for line in capsys.readouterr().out.splitlines()]
+        assert ids == [f'e{i}' for i in range(21, 40, 4)]
+
+    def test_cli_query_text_with_null_fields(self, tmp_path, capsys):
+        """Teste: saída em texto tolera campos presentes com valor None"""
+        store = LedgerStore(str(tmp_path), flush_interval=3600)
+        store.append(dict(_entry(0), phase=None, rationale=None, status=None, mcp=None))
+        store.close()
+
+        assert main(['--dir', str(tmp_path), 'query']) == 0
+        line = capsys.readouterr().out.splitlines()[0]
+        assert line.split()[2:5] == ['-', '-', '-/op']
+
+    @pytest.mark.performance
+    def test_benchmark_indexed_query(self, tmp_path, capsys):
+        """Teste: benchmark query indexada vs scan (ledger sintético)"""
+        assert main(['bench', '--entries', '30000', '--segment-mb', '2', '--dir', str(tmp_path / 'bench')]) == 0
+        print(capsys.readouterr().out)
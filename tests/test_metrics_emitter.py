@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Testes para o emissor de métricas EMF (Embedded Metric Format)
+"""
+
+import importlib
+import io
+import json
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+
+@pytest.fixture
+def emf(monkeypatch):
+    """Módulo do emissor (utils cria clientes boto3 na importação)"""
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.delenv('AWS_LAMBDA_FUNCTION_NAME', raising=False)
+    monkeypatch.delenv('IAL_METRICS_MODE', raising=False)
+    return importlib.import_module('utils.metrics_emitter')
+
+
+class TestMetricsEmitter:
+    def test_put_custom_metric_writes_emf_line(self, emf):
+        """Teste: modo EMF escreve JSON parseável e não chama a API"""
+        stream, client = io.StringIO(), MagicMock()
+        emitter = emf.MetricsEmitter('IaL/Test', mode='emf', stream=stream, cloudwatch_client=client)
+
+        emitter.put_custom_metric('DeploymentDuration', 12.5, 'Seconds',
+                                  dimensions={'Project': 'ial', 'Phase': '10'})
+
+        client.put_metric_data.assert_not_called()
+        points = emf.parse_emf_lines(stream.getvalue())
+        assert points == [{
+            'namespace': 'IaL/Test', 'metric_name': 'DeploymentDuration', 'value': 12.5,
+            'unit': 'Seconds', 'dimensions': {'Project': 'ial', 'Phase': '10'},
+            'timestamp': points[0]['timestamp']
+        }]
+
+    def test_datums_grouped_by_dimensions_and_timestamp(self, emf):
+        """Teste: datums com mesmas dimensões viram um documento; repetições viram array"""
+        ts = datetime(2025, 1, 1, 12, 0, 0)
+        dims = [{'Name': 'Service', 'Value': 'bedrock'}]
+        data = [
+            {'MetricName': 'Calls', 'Value': 1, 'Unit': 'Count', 'Dimensions': dims, 'Timestamp': ts},
+            {'MetricName': 'Calls', 'Value': 1, 'Unit': 'Count', 'Dimensions': dims, 'Timestamp': ts},
+            {'MetricName': 'Latency', 'Values': [10, 20], 'Unit': 'Milliseconds', 'Dimensions': dims, 'Timestamp': ts},
+            {'MetricName': 'Calls', 'Value': 1, 'Unit': 'Count', 'Timestamp': ts}
+        ]
+        documents = emf.MetricsEmitter.build_emf_documents('IaL/Test', data)
+
+        assert len(documents) == 2
+        grouped = next(d for d in documents if 'Service' in d)
+        assert grouped['Calls'] == [1, 1]
+        assert grouped['Latency'] == [10, 20]
+        assert grouped['_aws']['Timestamp'] == 1735732800000
+        assert grouped['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['Service']]
+
+    def test_emf_limits_split_documents(self, emf):
+        """Teste: mais de 100 métricas ou 100 valores geram documentos adicionais"""
+        data = [{'MetricName': f'M{i}', 'Value': i, 'Timestamp': 0} for i in range(150)]
+        data += [{'MetricName': 'M0', 'Value': 0, 'Timestamp': 0} for _ in range(120)]
+        documents = emf.MetricsEmitter.build_emf_documents('IaL/Test', data)
+
+        assert all(len(d['_aws']['CloudWatchMetrics'][0]['Metrics']) <= emf.EMF_MAX_METRICS for d in documents)
+        assert all(len(v) <= emf.EMF_MAX_VALUES for d in documents for v in d.values() if isinstance(v, list))
+        points = emf.parse_emf_lines([json.dumps(d) for d in documents])
+        assert len(points) == 270
+
+    def test_auto_mode_detects_lambda(self, emf, monkeypatch):
+        """Teste: modo auto usa EMF no Lambda e PutMetricData fora dele"""
+        client = MagicMock()
+        api = emf.MetricsEmitter(cloudwatch_client=client)
+        assert api.mode == 'api'
+        api.put_metric_data(Namespace='IaL', MetricData=[{'MetricName': 'X', 'Value': 1}] * 1500)
+        assert [len(c.kwargs['MetricData']) for c in client.put_metric_data.call_args_list] == [1000, 500]
+
+        monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'ial-drift-reconciler')
+        assert emf.MetricsEmitter().mode == 'emf'
+
+    def test_statistic_sets_fall_back_to_api(self, emf):
+        """Teste: StatisticValues não existe em EMF e segue pela API"""
+        stream, client = io.StringIO(), MagicMock()
+        emitter = emf.MetricsEmitter(mode='emf', stream=stream, cloudwatch_client=client)
+        stat = {'MetricName': 'S', 'StatisticValues': {'SampleCount': 2, 'Sum': 3, 'Minimum': 1, 'Maximum': 2}}
+        emitter.put_metric_data(Namespace='IaL', MetricData=[stat, {'MetricName': 'V', 'Value': 1}])
+
+        client.put_metric_data.assert_called_once_with(Namespace='IaL', MetricData=[stat])
+        assert [p['metric_name'] for p in emf.parse_emf_lines(stream.getvalue())] == ['V']
+
+
+class TestLambdaHandlers:
+    def test_circuit_breaker_metrics_emitted_as_emf(self, emf, monkeypatch, capsys):
+        """Teste: metrics_publisher emite EMF no stdout, misturado com prints normais"""
+        publisher = importlib.import_module('core.lambdas.metrics_publisher')
+        monkeypatch.setattr(publisher, 'cloudwatch', emf.MetricsEmitter(mode='emf'))
+
+        assert publisher.publish_circuit_breaker_metrics('bedrock', 'closed', 'open', datetime.utcnow())
+
+        points = emf.parse_emf_lines(capsys.readouterr().out)
+        by_name = {p['metric_name']: p for p in points}
+        assert set(by_name) == {'CircuitBreakerState', 'StateTransition', 'CircuitBreakerOpened'}
+        assert by_name['CircuitBreakerState']['value'] == 1.0
+        assert by_name['StateTransition']['dimensions']['ToState'] == 'open'
+        assert all(p['namespace'] == 'IAL/CircuitBreaker' for p in points)
+
+    def test_drift_reconciler_metrics_in_lambda(self, emf, monkeypatch, capsys):
+        """Teste: publish_metrics do drift_reconciler não chama PutMetricData no Lambda"""
+        monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'ial-drift-reconciler')
+        monkeypatch.setattr(emf, '_emitters', {})
+        reconciler = importlib.import_module('lambdas.drift_reconciler')
+
+        reconciler.publish_metrics(total_drift=4, safe_healed=3, prs_created=1)
+
+        points = emf.parse_emf_lines(capsys.readouterr().out)
+        assert {p['metric_name']: p['value'] for p in points} == {
+            'Drift/Detected': 4, 'Drift/AutoHealed': 3, 'Drift/PRsCreated': 1
+        }
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Testes para o comparador canônico de propriedades CloudFormation
+"""
+
+import random
+import time
+
+import pytest
+from core.drift.property_comparator import PropertyComparator, compare_properties
+
+
+def _iam_policy(statements: int) -> dict:
+    return {
+        'PolicyDocument': {
+            'Version': '2012-10-17',
+            'Statement': [
+                {
+                    'Sid': f'Stmt{i}',
+                    'Effect': 'Allow',
+                    'Action': ['s3:GetObject', 's3:PutObject', 'kms:Decrypt'],
+                    'Resource': [f'arn:aws:s3:::bucket-{i}/*', f'arn:aws:s3:::bucket-{i}']
+                }
+                for i in range(statements)
+            ]
+        }
+    }
+
+
+def _security_group(rules: int) -> dict:
+    return {
+        'GroupDescription': 'bench',
+        'SecurityGroupIngress': [
+            {'IpProtocol': 'tcp', 'FromPort': 1000 + i, 'ToPort': 1000 + i, 'CidrIp': f'10.{i % 250}.0.0/16'}
+            for i in range(rules)
+        ]
+    }
+
+
+def _shuffled(document: dict) -> dict:
+    shuffled = dict(document)
+    if 'SecurityGroupIngress' in shuffled:
+        rules = [dict(r, FromPort=str(r['FromPort']), ToPort=str(r['ToPort'])) for r in shuffled['SecurityGroupIngress']]
+        random.Random(7).shuffle(rules)
+        shuffled['SecurityGroupIngress'] = rules
+    if 'PolicyDocument' in shuffled:
+        statements = [dict(s, Action=list(reversed(s['Action']))) for s in shuffled['PolicyDocument']['Statement']]
+        random.Random(7).shuffle(statements)
+        shuffled['PolicyDocument'] = dict(shuffled['PolicyDocument'], Statement=statements)
+    return shuffled
+
+
+class TestPropertyComparator:
+
+    def setup_method(self):
+        self.comparator = PropertyComparator()
+
+    def test_tags_order_insensitive(self):
+        """Teste: Tags em lista Key/Value equivalem independente da ordem"""
+        desired = {'Tags': [{'Key': 'Env', 'Value': 'prod'}, {'Key': 'Team', 'Value': 'core'}]}
+        current = {'Tags': [{'Key': 'Team', 'Value': 'core'}, {'Key': 'Env', 'Value': 'prod'}]}
+
+        assert compare_properties(desired, current) == []
+
+    def test_tag_drift_path(self):
+        """Teste: Diferença de tag reportada no caminho correto"""
+        desired = {'tags': {'Env': 'prod'}}
+        current = {'tags': {'Env': 'dev'}}
+
+        differences = compare_properties(desired, current)
+        assert len(differences) == 1
+        assert differences[0]['property'] == 'tags.Env'
+        assert differences[0]['type'] == 'tag_drift'
+
+    def test_default_value_elision(self):
+        """Teste: Valores default do CloudFormation não geram drift"""
+        desired = {'CidrBlock': '10.0.0.0/16'}
+        current = {'CidrBlock': '10.0.0.0/16', 'EnableDnsSupport': 'true', 'InstanceTenancy': 'default'}
+
+        assert compare_properties(desired, current, resource_type='AWS::EC2::VPC') == []
+
+    def test_intrinsic_normalization(self):
+        """Teste: Formas equivalentes de intrinsics são iguais"""
+        desired = {'Arn': {'Fn::GetAtt': 'Bucket.Arn'}, 'Name': {'Fn::Join': ['-', ['ial', 'bucket']]}}
+        current = {'Arn': {'Fn::GetAtt': ['Bucket', 'Arn']}, 'Name': 'ial-bucket'}
+
+        assert compare_properties(desired, current) == []
+
+    def test_iam_action_string_and_case(self):
+        """Teste: Action string equivale a lista e é case-insensitive"""
+        desired = {'Statement': [{'Effect': 'Allow', 'Action': 's3:GetObject', 'Resource': '*'}]}
+        current = {'Statement': [{'Effect': 'Allow', 'Action': ['S3:getobject'], 'Resource': ['*']}]}
+
+        assert compare_properties(desired, current) == []
+
+    def test_ignore_unspecified(self):
+        """Teste: Propriedades apenas no estado atual são ignoradas quando solicitado"""
+        desired = {'name': 'vpc'}
+        current = {'name': 'vpc', 'arn': 'arn:aws:ec2:vpc'}
+
+        assert compare_properties(desired, current, ignore_unspecified=True) == []
+        assert compare_properties(desired, current)[0]['change'] == 'added'
+
+    def test_intrinsic_tag_keys(self):
+        """Teste: Tag com Key intrínseca ({"Ref": ...}) é canonicalizada sem erro"""
+        desired = {'Tags': [{'Key': {'Ref': 'TagName'}, 'Value': 'a'},
+                            {'Key': {'Fn::Join': ['-', ['cost', 'center']]}, 'Value': 'b'}]}
+        current = {'Tags': [{'Key': 'cost-center', 'Value': 'b'},
+                            {'Key': {'Ref': 'TagName'}, 'Value': 'changed'}]}
+
+        differences = compare_properties(desired, current)
+        assert [d['property'] for d in differences] == ['Tags.{"Ref":"TagName"}']
+        assert differences[0]['type'] == 'tag_drift'
+
+    def test_unordered_list_added_rule(self):
+        """Teste: Regra extra em security group é reportada como adicionada"""
+        desired = _security_group(3)
+        current = _security_group(4)
+
+        differences = compare_properties(desired, current)
+        assert len(differences) == 1
+        assert differences[0]['change'] == 'added'
+        assert differences[0]['current']['FromPort'] == '1003'
+
+    @pytest.mark.performance
+    def test_benchmark_large_documents(self):
+        """Teste: Benchmark em políticas IAM e security groups grandes"""
+        for desired in (_iam_policy(2000), _security_group(2000)):
+            current = _shuffled(desired)
+
+            desired_node = self.comparator.canonicalize(desired)
+            current_node = self.comparator.canonicalize(current)
+
+            start = time.perf_counter()
+            for _ in range(1000):
+                assert self.comparator.compare(desired_node, current_node) == []
+            compare_us = (time.perf_counter() - start) * 1000
+
+            assert compare_us < 1000
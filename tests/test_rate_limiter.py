@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Testes para o rate limiter de janela deslizante (local, compartilhado e estrito)
+"""
+
+import time
+
+import pytest
+from moto import mock_aws
+
+from core.rate_limiter import DynamoDBRateLimitStore, RateLimitWindow, SlidingWindowRateLimiter
+
+WINDOWS = [RateLimitWindow('minute', 60, 30), RateLimitWindow('hour', 3600, 500)]
+
+
+class FakeClock:
+    def __init__(self, now=1_800_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        store = DynamoDBRateLimitStore('ial-rate-limits-test', region='us-east-1')
+        store.ensure_table()
+        yield store
+
+
+def _allowed(limiter, key, n):
+    return sum(not limiter.acquire(key)['rate_limited'] for _ in range(n))
+
+
+class TestLocalMode:
+    def test_sliding_window_weights_previous_window(self):
+        """Teste: janela anterior conta proporcionalmente ao tempo restante"""
+        clock = FakeClock(1_800_000_000.0)  # início exato de um minuto
+        limiter = SlidingWindowRateLimiter(WINDOWS, clock=clock)
+
+        assert _allowed(limiter, 'alice', 40) == 30
+        result = limiter.acquire('alice')
+        assert result['rate_limited'] and result['window'] == 'minute'
+        assert result['current_count'] == 30 and result['retry_after'] == 60
+
+        clock.now += 90  # metade do minuto seguinte: 30 * 0.5 ainda contam
+        assert _allowed(limiter, 'alice', 40) == 15
+        assert _allowed(limiter, 'bob', 5) == 5
+
+    def test_limited_request_consumes_no_window(self):
+        """Teste: requisição recusada não consome as outras janelas"""
+        clock = FakeClock()
+        limiter = SlidingWindowRateLimiter(WINDOWS, clock=clock)
+        _allowed(limiter, 'alice', 100)
+        assert limiter.peek('alice') == {'minute': 30, 'hour': 30}
+        assert limiter.stats == {'allowed': 30, 'limited': 70, 'syncs': 0, 'sync_errors': 0, 'store_calls': 0,
+                                 'store_errors': 0}
+
+    def test_hot_path_is_sub_millisecond(self):
+        """Teste: acquire local custa bem menos de 1 ms"""
+        limiter = SlidingWindowRateLimiter(WINDOWS)
+        start = time.perf_counter()
+        for i in range(20000):
+            limiter.acquire(f'user-{i % 500}')
+        assert (time.perf_counter() - start) / 20000 < 0.001
+
+
+class TestSharedMode:
+    def test_processes_see_each_other_after_sync(self, store):
+        """Teste: reconciliação soma o consumo de outro processo na janela atual"""
+        clock = FakeClock()
+        first = SlidingWindowRateLimiter(WINDOWS, store=store, mode='shared', sync_interval=3600, clock=clock)
+        second = SlidingWindowRateLimiter(WINDOWS, store=store, mode='shared', sync_interval=3600, clock=clock)
+
+        assert _allowed(first, 'alice', 20) == 20
+        assert _allowed(second, 'alice', 5) == 5
+        assert first.sync() == 2 and second.sync() == 2
+
+        assert second.peek('alice')['minute'] == 25
+        assert first.peek('alice')['minute'] == 20  # ainda não viu o sync do segundo
+        first.sync()
+        assert _allowed(first, 'alice', 10) == 5
+        first.close()
+        second.close()
+
+    def test_sync_failure_keeps_deltas(self, store):
+        """Teste: falha no store mantém os deltas para o próximo sync"""
+        clock = FakeClock()
+        limiter = SlidingWindowRateLimiter(WINDOWS, store=store, mode='shared', sync_interval=3600, clock=clock)
+        _allowed(limiter, 'alice', 3)
+
+        def offline(*args):
+            raise RuntimeError('offline')
+
+        original, store.add_counts = store.add_counts, offline
+        assert limiter.sync() == 0 and limiter.stats['sync_errors'] == 1
+        store.add_counts = original
+
+        assert limiter.sync() == 2
+        bucket = ('alice', 'minute', int(clock.now // 60 * 60))
+        assert store.get_counts([bucket]) == {bucket: 3}
+        limiter.close()
+
+    def test_partial_sync_failure_requeues_only_unwritten_deltas(self, store):
+        """Teste: falha no meio do add_counts não reenvia os buckets já gravados"""
+        clock = FakeClock()
+        limiter = SlidingWindowRateLimiter(WINDOWS, store=store, mode='shared', sync_interval=3600, clock=clock)
+        _allowed(limiter, 'alice', 3)
+
+        original, calls = store.client.update_item, []
+
+        def flaky(**kwargs):
+            calls.append(kwargs['Key'])
+            if len(calls) == 2:
+                raise RuntimeError('throttled')
+            return original(**kwargs)
+
+        store.client.update_item = flaky
+        assert limiter.sync() == 0 and limiter.stats['sync_errors'] == 1
+        store.client.update_item = original
+        assert limiter.sync() == 1
+
+        buckets = [('alice', 'minute', int(clock.now // 60 * 60)), ('alice', 'hour', int(clock.now // 3600 * 3600))]
+        assert store.get_counts(buckets) == {bucket: 3 for bucket in buckets}
+        assert limiter.peek('alice') == {'minute': 3, 'hour': 3}
+        limiter.close()
+
+
+class TestStrictMode:
+    def test_conditional_updates_enforce_exact_limit(self, store):
+        """Teste: dois processos em modo estrito nunca passam do limite somados"""
+        clock = FakeClock()
+        first = SlidingWindowRateLimiter(WINDOWS, store=store, mode='strict', clock=clock)
+        second = SlidingWindowRateLimiter(WINDOWS, store=store, mode='strict', clock=clock)
+
+        allowed = 0
+        for _ in range(25):
+            allowed += not first.acquire('alice')['rate_limited']
+            allowed += not second.acquire('alice')['rate_limited']
+        assert allowed == 30
+
+        bucket = ('alice', 'hour', int(clock.now // 3600 * 3600))
+        assert store.get_counts([bucket])[bucket] == 30
+
+    def test_store_outage_falls_back_to_local_window(self, store):
+        """Teste: erro do DynamoDB no modo estrito não escapa; decide pela janela local"""
+        clock = FakeClock()
+        limiter = SlidingWindowRateLimiter(WINDOWS, store=store, mode='strict', clock=clock)
+
+        def offline(*args, **kwargs):
+            raise RuntimeError('DynamoDB indisponível')
+
+        store.get_counts = store.increment_if_below = offline
+        results = [limiter.acquire('alice') for _ in range(31)]
+        assert not any(r['rate_limited'] for r in results[:30])
+        assert results[30]['rate_limited'] and results[30]['window'] == 'minute'
+        assert limiter.stats['store_errors'] == 31
+
+
+class TestOptimizationEngine:
+    def test_check_rate_limit_uses_local_limiter(self, store):
+        """Teste: check_rate_limit não consulta o DynamoDB no caminho quente"""
+        from lib.optimization_engine import OptimizationEngine
+
+        engine = OptimizationEngine()
+        queries = []
+        engine.dynamodb.query = lambda **kwargs: queries.append(kwargs)
+
+        results = [engine.check_rate_limit('alice') for _ in range(31)]
+        assert not any(r['rate_limited'] for r in results[:30])
+        assert results[30]['rate_limited'] and results[30]['window'] == 'minute'
+        assert queries == []
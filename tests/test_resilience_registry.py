@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Testes para o registro de resiliência: breakers por taxa de falha e concorrência adaptativa
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.circuit_breaker import CircuitBreaker
+from core.resilience.registry import (
+    AdaptiveConcurrencyLimiter, ConcurrencyLimitExceeded, ResilienceRegistry, get_circuit_breaker, get_registry
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingSink:
+    def __init__(self):
+        self.points = []
+
+    def put_metric(self, namespace, name, value, unit='Count', dimensions=None):
+        self.points.append((namespace, name, value, dimensions))
+
+    def flush(self):
+        self.flushed = True
+
+
+class TestSlidingWindowBreaker:
+    def test_opens_on_failure_rate_not_consecutive_count(self):
+        """Teste: falhas intercaladas com sucessos abrem pela taxa na janela"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=4, failure_rate_threshold=0.5, window_seconds=10, clock=clock)
+
+        for _ in range(3):
+            breaker.record_success()
+            breaker.record_failure()
+            clock.now += 1
+        assert breaker.state.value == 'OPEN'
+        assert breaker.get_metrics()['window_failure_rate'] == 0.5
+
+    def test_old_failures_leave_the_window(self):
+        """Teste: falhas fora da janela não contam mais"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, window_seconds=10, clock=clock)
+        breaker.record_failure()
+        breaker.record_failure()
+        clock.now += 30
+        breaker.record_failure()
+        breaker.record_success()
+        assert breaker.state.value == 'CLOSED'
+        assert breaker.get_metrics()['window_calls'] == 2
+
+    def test_half_open_allows_single_probe_and_notifies(self):
+        """Teste: HALF_OPEN libera uma chamada de prova; listener recebe as transições"""
+        clock = FakeClock()
+        transitions = []
+        breaker = CircuitBreaker(failure_threshold=2, timeout=30, name='dep', clock=clock)
+        breaker.add_listener(lambda *t: transitions.append(t))
+        breaker.record_failure()
+        breaker.record_failure()
+        assert not breaker.can_execute()
+
+        clock.now += 31
+        assert breaker.can_execute()
+        assert not breaker.can_execute()
+        breaker.record_success()
+        assert breaker.can_execute()
+        assert transitions == [('dep', 'CLOSED', 'OPEN'), ('dep', 'OPEN', 'HALF_OPEN'), ('dep', 'HALF_OPEN', 'CLOSED')]
+
+    def test_rejected_probe_is_released_or_expires(self):
+        """Teste: prova rejeitada devolve a vaga; prova esquecida expira após o timeout"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, timeout=30, clock=clock)
+        breaker.record_failure()
+        clock.now += 31
+
+        assert breaker.can_execute()
+        breaker.release_probe()
+        assert breaker.can_execute()
+        assert not breaker.can_execute()
+
+        # Vaga nunca devolvida (ex.: tarefa cancelada)
+        clock.now += 29
+        assert not breaker.can_execute()
+        clock.now += 1
+        assert breaker.can_execute()
+        breaker.record_success()
+        assert breaker.state.value == 'CLOSED'
+
+    def test_llm_provider_releases_probe_on_concurrency_rejection(self):
+        """Teste: LLMProvider devolve a prova HALF_OPEN quando o limite de concorrência rejeita"""
+        pytest.importorskip('aiohttp')
+        from core.llm_provider import LLMProvider
+
+        clock = FakeClock()
+        provider = LLMProvider()
+        breaker = CircuitBreaker(failure_threshold=1, timeout=30, clock=clock)
+        provider.circuit_breakers = {provider.current_provider: breaker}
+        provider.fallback_order = []
+        breaker.record_failure()
+        clock.now += 31
+
+        async def rejected(name, text):
+            raise ConcurrencyLimitExceeded(name)
+
+        provider._call_limited_async = rejected
+        for _ in range(3):
+            asyncio.run(provider.process_natural_language_async('listar buckets'))
+            assert breaker.state.value == 'HALF_OPEN'
+            assert breaker._half_open_calls == 0
+        assert breaker.can_execute()
+
+    def test_mcp_load_rejection_is_not_a_failure(self):
+        """Teste: MCP rejeitado pelo limite de concorrência devolve a prova sem contar falha"""
+        pytest.importorskip('aiohttp')
+        from core.mcp_orchestrator_upgraded import MCPOrchestratorUpgraded
+
+        clock = FakeClock()
+        orchestrator = MCPOrchestratorUpgraded.__new__(MCPOrchestratorUpgraded)
+        orchestrator.loaded_mcps = {}
+        breaker = CircuitBreaker(failure_threshold=1, timeout=30, clock=clock)
+        orchestrator.circuit_breakers = {'aws-ecs-mcp': breaker}
+        breaker.record_failure()
+        clock.now += 31
+
+        async def rejected(mcp_config):
+            raise ConcurrencyLimitExceeded(mcp_config['name'])
+
+        orchestrator._load_mcp_limited_async = rejected
+        for _ in range(3):
+            assert asyncio.run(orchestrator.lazy_load_mcps_async([{'name': 'aws-ecs-mcp'}])) == {}
+            assert breaker.state.value == 'HALF_OPEN'
+            assert breaker._half_open_calls == 0
+        assert breaker.failed_requests == 1
+
+
+class TestAdaptiveConcurrency:
+    def test_aimd_grows_when_used_and_backs_off_on_drop(self):
+        """Teste: AIMD cresce sob uso e reduz multiplicativamente em throttling"""
+        limiter = AdaptiveConcurrencyLimiter('dep', initial_limit=4, max_limit=6, backoff_ratio=0.5)
+        for _ in range(4):
+            assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+        for _ in range(4):
+            limiter.release(latency=0.01)
+        assert limiter.limit == 6
+
+        with pytest.raises(RuntimeError):
+            with limiter.slot():
+                raise RuntimeError('ThrottlingException: Rate exceeded')
+        assert limiter.limit == 3
+        assert limiter.get_metrics()['dropped'] == 1
+
+    def test_gradient_shrinks_when_latency_rises(self):
+        """Teste: gradiente reduz o limite quando a latência sobe acima da mínima"""
+        limiter = AdaptiveConcurrencyLimiter('dep', initial_limit=20, max_limit=40, algorithm='gradient')
+        for _ in range(5):
+            limiter.try_acquire()
+            limiter.release(latency=0.1)
+        baseline = limiter.limit
+        for _ in range(20):
+            limiter.try_acquire()
+            limiter.release(latency=0.5)
+        assert limiter.limit < baseline
+
+    def test_threads_never_exceed_limit(self):
+        """Teste: várias threads respeitam o limite de chamadas simultâneas"""
+        limiter = AdaptiveConcurrencyLimiter('dep', initial_limit=3, max_limit=3)
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def call():
+            with limiter.slot(timeout=5):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.01)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=call) for _ in range(12)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert peak[0] <= 3 and limiter.in_flight == 0
+
+    def test_async_slot_rejects_after_timeout(self):
+        """Teste: async_slot desiste após o timeout sem bloquear o event loop"""
+        limiter = AdaptiveConcurrencyLimiter('dep', initial_limit=1, max_limit=1)
+        assert limiter.try_acquire()
+
+        async def wait_slot():
+            async with limiter.async_slot(timeout=0.05):
+                pass
+
+        with pytest.raises(ConcurrencyLimitExceeded):
+            asyncio.run(wait_slot())
+        assert limiter.get_metrics()['rejected'] == 1
+
+
+class TestRegistry:
+    def test_named_instances_are_shared(self):
+        """Teste: mesmo nome devolve o mesmo breaker/limiter com defaults por dependência"""
+        registry = ResilienceRegistry()
+        first = registry.circuit_breaker('llm-bedrock', failure_threshold=5)
+        assert registry.circuit_breaker('llm-bedrock', failure_threshold=99) is first
+        assert first.failure_threshold == 5
+
+        limiter = registry.concurrency_limiter('mcp-aws-cloudformation')
+        assert (limiter.limit, limiter.max_limit) == (4, 16)
+        assert registry.concurrency_limiter('cloudformation').max_limit == 10
+
+    def test_llm_provider_uses_shared_breakers(self):
+        """Teste: LLMProvider registra seus breakers no registro do processo"""
+        pytest.importorskip('aiohttp')
+        from core.llm_provider import LLMProvider
+
+        provider = LLMProvider()
+        for name, breaker in provider.circuit_breakers.items():
+            assert get_circuit_breaker(f"llm-{name}") is breaker
+        assert LLMProvider().circuit_breakers == provider.circuit_breakers
+
+    def test_metrics_exported_through_circuit_breaker_metrics(self):
+        """Teste: snapshot e transições publicados via sink"""
+        from core.resilience import circuit_breaker_metrics
+
+        registry, sink = ResilienceRegistry(), RecordingSink()
+        circuit_breaker_metrics.enable_transition_metrics(registry, sink)
+        breaker = registry.circuit_breaker('dynamodb', failure_threshold=1)
+        registry.concurrency_limiter('dynamodb')
+        breaker.record_failure()
+
+        assert circuit_breaker_metrics.publish_metrics(registry, sink)
+        by_name = {name: (value, dims) for _, name, value, dims in sink.points}
+        assert by_name['CircuitBreakerState'][0] == 1.0
+        assert by_name['StateTransition'][1] == {'Service': 'dynamodb', 'FromState': 'CLOSED', 'ToState': 'OPEN'}
+        assert by_name['ConcurrencyLimit'] == (32, {'Service': 'dynamodb'})
+        assert all(namespace == 'IAL/CircuitBreaker' for namespace, *_ in sink.points)
+        assert get_registry() is not registry
+
+    def test_cumulative_counters_published_as_deltas(self):
+        """Teste: rejeições publicadas como delta desde a última publicação"""
+        from core.resilience import circuit_breaker_metrics
+
+        registry, sink = ResilienceRegistry(), RecordingSink()
+        breaker = registry.circuit_breaker('mcp-x', failure_threshold=1)
+        breaker.record_failure()
+        rejected = []
+        for extra in (3, 0, 2):
+            for _ in range(extra):
+                assert not breaker.can_execute()
+            sink.points.clear()
+            circuit_breaker_metrics.publish_metrics(registry, sink)
+            rejected.append({name: value for _, name, value, _ in sink.points}['RejectedRequests'])
+        assert rejected == [3, 0, 2]
+
+    def test_lambda_handler_exports_process_registry(self, monkeypatch):
+        """Teste: lambda_handler publica o registro do processo; transições já têm listener"""
+        from core import telemetry_sink
+        from core.resilience import circuit_breaker_metrics
+
+        sink = RecordingSink()
+        monkeypatch.setattr(telemetry_sink, 'get_telemetry_sink', lambda region=None: sink)
+        get_circuit_breaker('dynamodb-handler-test')
+
+        assert circuit_breaker_metrics.lambda_handler({}, None)['statusCode'] == 200
+        assert sink.flushed
+        assert any(name == 'CircuitBreakerState' and dims == {'Service': 'dynamodb-handler-test'}
+                   for _, name, _, dims in sink.points)
+        assert any(listener.__qualname__.startswith('enable_transition_metrics')
+                   for listener in get_registry()._listeners)
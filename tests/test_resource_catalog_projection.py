@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Testes para a projeção de estado atual do ResourceCatalog (ponteiros, GSI, watermark)
+"""
+
+import json
+import time
+
+import boto3
+import pytest
+from moto import mock_aws
+
+TABLE = 'ial-state-projection'
+
+
+def _create_table(client, with_latest_index):
+    params = dict(
+        TableName=TABLE,
+        KeySchema=[{'AttributeName': 'resource_id', 'KeyType': 'HASH'},
+                   {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}],
+        AttributeDefinitions=[{'AttributeName': 'resource_id', 'AttributeType': 'S'},
+                              {'AttributeName': 'timestamp', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    if with_latest_index:
+        params['AttributeDefinitions'] += [{'AttributeName': 'latest_shard', 'AttributeType': 'S'},
+                                           {'AttributeName': 'last_updated', 'AttributeType': 'S'}]
+        params['GlobalSecondaryIndexes'] = [{
+            'IndexName': 'latest-updated-index',
+            'KeySchema': [{'AttributeName': 'latest_shard', 'KeyType': 'HASH'},
+                          {'AttributeName': 'last_updated', 'KeyType': 'RANGE'}],
+            'Projection': {'ProjectionType': 'ALL'}
+        }]
+    client.create_table(**params)
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        yield boto3.client('dynamodb', region_name='us-east-1')
+
+
+def _catalog():
+    from core.resource_catalog_threadsafe import ThreadSafeResourceCatalog
+    return ThreadSafeResourceCatalog(table_name=TABLE, region='us-east-1')
+
+
+def _legacy_row(client, resource_id, timestamp, data):
+    client.put_item(TableName=TABLE, Item={
+        'resource_id': {'S': resource_id}, 'timestamp': {'S': timestamp},
+        'resource_type': {'S': data.get('type', 'unknown')}, 'status': {'S': 'active'},
+        'metadata': {'S': json.dumps(data)}, 'last_updated': {'S': timestamp}
+    })
+
+
+class TestLatestProjection:
+    def test_cold_load_reads_only_pointers_from_index(self, aws):
+        """Teste: com o GSI, carga a frio lê só ponteiros (não o histórico)"""
+        _create_table(aws, with_latest_index=True)
+        writer = _catalog()
+        for version in range(3):
+            writer.register_resources({f'r{i}': {'type': 'bucket', 'v': version} for i in range(40)})
+            time.sleep(0.002)
+
+        reader = _catalog()
+        resources = reader.get_all_resources()
+
+        assert len(resources) == 40
+        assert all(data['v'] == 2 for data in resources.values())
+        assert reader.projection_stats['items_read'] == 40
+
+    def test_incremental_refresh_pulls_only_changes(self, aws, monkeypatch):
+        """Teste: refresh após o watermark traz só recursos alterados por outro writer"""
+        import core.resource_catalog_threadsafe as catalog_module
+        monkeypatch.setattr(catalog_module, 'WATERMARK_OVERLAP_SECONDS', 0)
+        _create_table(aws, with_latest_index=True)
+        _catalog().register_resources({f'r{i}': {'v': 0} for i in range(50)})
+
+        reader = _catalog()
+        assert len(reader.get_all_resources()) == 50
+        time.sleep(0.01)
+        _catalog().register_resources({'r7': {'v': 1}, 'new': {'v': 1}})
+
+        result = reader.refresh_current_state()
+        resources = reader.get_all_resources()
+        assert result['mode'] == 'incremental'
+        assert result['items_read'] == 2
+        assert resources['r7'] == {'v': 1} and resources['new'] == {'v': 1}
+        assert len(resources) == 51
+
+    def test_local_writes_update_projection_without_rescan(self, aws):
+        """Teste: escrita do próprio processo não deixa get_all_resources obsoleto"""
+        _create_table(aws, with_latest_index=True)
+        catalog = _catalog()
+        catalog.register_resources({'a': {'v': 0}})
+        assert catalog.get_all_resources() == {'a': {'v': 0}}
+
+        catalog.register_resource('a', {'v': 1})
+        catalog.register_resource('b', {'v': 0})
+        assert catalog.get_all_resources() == {'a': {'v': 1}, 'b': {'v': 0}}
+        assert catalog.projection_stats['cold_loads'] == 1
+
+    def test_batch_get_resources_uses_pointers(self, aws):
+        """Teste: get_resources busca ponteiros em lote e cai em Query para legados"""
+        _create_table(aws, with_latest_index=True)
+        catalog = _catalog()
+        catalog.register_resources({f'r{i}': {'v': i} for i in range(120)})
+        _legacy_row(aws, 'legacy', '2024-01-01T00:00:00', {'v': 'old'})
+        catalog._cache.clear()
+
+        found = catalog.get_resources([f'r{i}' for i in range(120)] + ['legacy', 'missing'])
+        assert len(found) == 121
+        assert found['legacy'] == {'v': 'old'} and found['r119'] == {'v': 119}
+
+
+class TestLegacyTables:
+    def test_segmented_scan_keeps_newest_version(self, aws):
+        """Teste: sem GSI, scan segmentado paralelo mantém a versão mais nova por recurso"""
+        _create_table(aws, with_latest_index=False)
+        for i in range(30):
+            _legacy_row(aws, f'r{i}', '2024-01-01T00:00:00', {'v': 'old'})
+            _legacy_row(aws, f'r{i}', '2024-06-01T00:00:00', {'v': 'new'})
+            _legacy_row(aws, f'r{i}', '2024-03-01T00:00:00', {'v': 'mid'})
+
+        catalog = _catalog()
+        resources = catalog.get_all_resources(parallel_segments=4)
+        assert len(resources) == 30
+        assert {data['v'] for data in resources.values()} == {'new'}
+
+    def test_backfill_and_index_migration(self, aws):
+        """Teste: backfill cria ponteiros e o GSI passa a servir a carga a frio"""
+        _create_table(aws, with_latest_index=False)
+        for i in range(20):
+            _legacy_row(aws, f'r{i}', '2024-01-01T00:00:00', {'v': 'old'})
+            _legacy_row(aws, f'r{i}', '2024-02-01T00:00:00', {'v': 'new'})
+
+        catalog = _catalog()
+        assert catalog.ensure_latest_index() is True
+        result = catalog.backfill_latest_pointers()
+        assert result['resources'] == 20 and result['pointers_written'] == 20
+        assert catalog.backfill_latest_pointers()['pointers_written'] == 0
+
+        reader = _catalog()
+        assert reader.refresh_current_state()['source'] == 'index'
+        assert {data['v'] for data in reader.get_all_resources().values()} == {'new'}
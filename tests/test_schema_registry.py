@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Testes para o registro de validadores JSON-Schema compilados
+"""
+
+import json
+
+import pytest
+
+from core.validators.schema_registry import SchemaRegistry, CompiledSchema
+
+VALID_PHASE = {
+    'apiVersion': 'ial/v1',
+    'kind': 'Phase',
+    'metadata': {
+        'name': '20-network',
+        'domain': '20-network',
+        'priority': 1,
+        'wa_pillars': ['security', 'reliability', 'performance']
+    },
+    'spec': {'description': 'VPC base com subnets privadas', 'parameters': {},
+             'artifacts': {'cloudformation': {'template': 'phases/20-network/01-vpc.yaml'}}}
+}
+
+
+class TestSchemaRegistry:
+    def setup_method(self):
+        self.registry = SchemaRegistry()
+
+    def test_schema_compiled_once(self):
+        """Teste: o mesmo schema é compilado uma única vez"""
+        first = self.registry.get('phase')
+        second = self.registry.get('phase')
+        same_content = self.registry.compile(json.loads(json.dumps(first.schema)))
+
+        assert first is second is same_content
+        assert self.registry.compilations == 1
+        assert 'phase' in self.registry.available()
+
+    def test_errors_include_message_and_path(self):
+        """Teste: documento inválido retorna mensagens e caminhos"""
+        compiled = self.registry.get('phase')
+        document = dict(VALID_PHASE, kind='Stack')
+
+        errors = compiled.errors(document)
+        assert errors and errors[0]['path'] == ['kind']
+        assert compiled.errors({'kind': 'Phase'}) != []
+
+    def test_fastjsonschema_only_still_reports_errors(self, monkeypatch):
+        """Teste: sem jsonschema, iter_errors usa o erro do fastjsonschema"""
+        pytest.importorskip('fastjsonschema')
+        from core.validators import schema_registry
+
+        monkeypatch.setattr(schema_registry, 'JSONSCHEMA_AVAILABLE', False)
+        schema = {'type': 'object', 'properties': {'kind': {'const': 'Phase'}}, 'required': ['kind']}
+        compiled = CompiledSchema(schema)
+
+        errors = list(compiled.iter_errors({'kind': 'Stack'}))
+        assert compiled.backend == 'fastjsonschema' and len(errors) == 1
+        assert errors[0].path == ['kind'] and errors[0].message
+        assert list(compiled.iter_errors({'kind': 'Phase'})) == []
+
+    def test_pointer_selects_subschema(self):
+        """Teste: fragmento do schema (outputs_contract) compilado separadamente"""
+        compiled = self.registry.get('phase', 'properties/outputs_contract')
+
+        assert compiled.is_valid({'must_exist': ['VpcId']})
+        assert not compiled.is_valid({'must_exist': []})
+
+    def test_validate_many_batch(self):
+        """Teste: validate_many valida um lote reutilizando o validador"""
+        documents = [VALID_PHASE] * 50 + [{'apiVersion': 'ial/v2'}]
+        report = self.registry.validate_many('phase', documents)
+
+        assert report['stats']['documents'] == 51
+        assert report['stats']['invalid'] == 1
+        assert report['stats']['duration_ms'] >= 0
+        assert report['results'][0] == {'valid': True, 'errors': []}
+        assert report['results'][-1]['valid'] is False
+        assert self.registry.compilations == 1
+
+    def test_inline_schema(self):
+        """Teste: schema em memória aceito por validate_many"""
+        schema = {'type': 'object', 'required': ['id']}
+        report = self.registry.validate_many(schema, [{'id': 1}, {}])
+
+        assert [r['valid'] for r in report['results']] == [True, False]
+        assert isinstance(self.registry.compile(schema), CompiledSchema)
+
+
+class TestContractDefinition:
+    def test_invalid_contract_fails_before_aws(self):
+        """Teste: contrato malformado falha sem chamadas à AWS"""
+        from unittest.mock import Mock
+        from core.validators.output_contract_validator import OutputContractValidator
+
+        validator = OutputContractValidator.__new__(OutputContractValidator)
+        validator.cf_client = Mock()
+
+        result = validator.validate_stack_contract('stack', {'must_exist': 'VpcId'})
+
+        assert result.success is False
+        assert 'must_exist' in result.errors[0]
+        validator.cf_client.describe_stacks.assert_not_called()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Testes para detecção de no-op via fingerprint de template e change sets
+"""
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from core.phase_parser import PhaseParser, TEMPLATE_FINGERPRINT_TAG, template_fingerprint
+
+TEMPLATE = """
+AWSTemplateFormatVersion: '2010-09-09'
+Resources:
+  Topic:
+    Type: AWS::SNS::Topic
+"""
+
+CHANGED_TEMPLATE = """
+AWSTemplateFormatVersion: '2010-09-09'
+Resources:
+  Topic:
+    Type: AWS::SNS::Topic
+  Queue:
+    Type: AWS::SQS::Queue
+"""
+
+
+class CountingClient:
+    """Proxy do client CloudFormation que conta as chamadas de API"""
+
+    def __init__(self, client):
+        self._client = client
+        self.calls = []
+        self.kwargs = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if callable(attr) and not name.startswith('get_'):
+            def wrapper(*args, **kwargs):
+                self.calls.append(name)
+                self.kwargs[name] = kwargs
+                return attr(*args, **kwargs)
+            return wrapper
+        return attr
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with mock_aws():
+        yield
+
+
+class TestTemplateFingerprint:
+    def test_stable_and_parameter_order_independent(self):
+        """Teste: fingerprint independe da ordem dos parâmetros"""
+        a = [{'ParameterKey': 'A', 'ParameterValue': '1'}, {'ParameterKey': 'B', 'ParameterValue': '2'}]
+        assert template_fingerprint(TEMPLATE, a) == template_fingerprint(TEMPLATE, list(reversed(a)))
+        assert template_fingerprint(TEMPLATE, a) != template_fingerprint(CHANGED_TEMPLATE, a)
+        assert template_fingerprint(TEMPLATE, a) != template_fingerprint(
+            TEMPLATE, [{'ParameterKey': 'A', 'ParameterValue': '9'}])
+
+
+class TestIdempotentDeploy:
+    def setup_method(self):
+        self.stack_name = 'ial-test-topic'
+
+    def _parser(self):
+        parser = PhaseParser(phases_dir='.')
+        parser.cf_client = CountingClient(boto3.client('cloudformation', region_name='us-east-1'))
+        return parser
+
+    def test_create_sets_fingerprint_tag(self, aws):
+        """Teste: stack novo é criado com a tag de fingerprint"""
+        parser = self._parser()
+        result = parser._create_or_update_stack_idempotent(self.stack_name, TEMPLATE, [], 'ial')
+
+        assert result['action'] == 'created'
+        stack = parser.cf_client.describe_stacks(StackName=self.stack_name)['Stacks'][0]
+        tags = {t['Key']: t['Value'] for t in stack['Tags']}
+        assert tags[TEMPLATE_FINGERPRINT_TAG] == template_fingerprint(TEMPLATE, [])
+
+    def test_unchanged_stack_skipped_with_single_batched_describe(self, aws):
+        """Teste: stack inalterado é pulado sem describe por stack nem change set"""
+        self._parser()._create_or_update_stack_idempotent(self.stack_name, TEMPLATE, [], 'ial')
+
+        parser = self._parser()
+        assert parser.prefetch_stacks() == 1
+        parser.cf_client.calls.clear()
+
+        result = parser._create_or_update_stack_idempotent(self.stack_name, TEMPLATE, [], 'ial')
+        missing = parser._get_stack('ial-never-deployed')
+
+        assert result['action'] == 'skipped'
+        assert missing is None
+        assert parser.cf_client.calls == []
+
+    def test_changed_template_updates_via_change_set(self, aws):
+        """Teste: template alterado gera change set executado"""
+        self._parser()._create_or_update_stack_idempotent(self.stack_name, TEMPLATE, [], 'ial')
+
+        parser = self._parser()
+        parser.prefetch_stacks()
+        result = parser._create_or_update_stack_idempotent(self.stack_name, CHANGED_TEMPLATE, [], 'ial')
+
+        assert result['action'] == 'updated'
+        assert 'create_change_set' in parser.cf_client.calls
+        assert 'execute_change_set' in parser.cf_client.calls
+
+        # Change set carrega o novo fingerprint e o cache do stack é invalidado
+        tags = {t['Key']: t['Value'] for t in parser.cf_client.kwargs['create_change_set']['Tags']}
+        assert tags[TEMPLATE_FINGERPRINT_TAG] == template_fingerprint(CHANGED_TEMPLATE, [])
+        assert self.stack_name in parser._stale_stacks
+
+    def test_empty_change_set_records_fingerprint_for_legacy_stack(self, aws):
+        """Teste: stack sem tag e sem mudanças recebe o fingerprint e cai no skip rápido depois"""
+        boto3.client('cloudformation', region_name='us-east-1').create_stack(
+            StackName=self.stack_name, TemplateBody=TEMPLATE)
+
+        parser = self._parser()
+        result = parser._create_or_update_stack_idempotent(self.stack_name, TEMPLATE, [], 'ial')
+        assert result['action'] == 'skipped' and result['fingerprint_recorded']
+        assert 'update_stack' in parser.cf_client.calls
+
+        parser = self._parser()
+        parser.prefetch_stacks()
+        parser.cf_client.calls.clear()
+        assert parser._create_or_update_stack_idempotent(self.stack_name, TEMPLATE, [], 'ial')['action'] == 'skipped'
+        assert parser.cf_client.calls == []
+
+    def test_prefetch_runs_once_per_parser(self, aws, tmp_path):
+        """Teste: fases seguintes reutilizam o describe_stacks em lote"""
+        from core.phase_parser import deploy_phase_resources
+
+        self._parser()._create_or_update_stack_idempotent(self.stack_name, TEMPLATE, [], 'ial')
+        parser = self._parser()
+        parser.phases_dir = str(tmp_path)
+        paginators = []
+        get_paginator = parser.cf_client.get_paginator
+        parser.cf_client.get_paginator = lambda name: paginators.append(name) or get_paginator(name)
+        for phase in ('00-foundation', '10-security'):
+            (tmp_path / phase).mkdir()
+            deploy_phase_resources(phase, parser=parser)
+
+        assert paginators == ['describe_stacks']
+        assert parser.prefetch_stacks(force=True) == 1
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Testes para o engine de análise estática single-pass
+"""
+
+from core.static_analysis import (
+    AnalysisRule, RuleRegistry, StaticAnalysisEngine, default_registry, discover_phase_files
+)
+
+CFN_TEMPLATE = """
+AWSTemplateFormatVersion: '2010-09-09'
+Resources:
+  Role:
+    Type: AWS::IAM::Role
+    Properties:
+      RoleName: !Sub '${AWS::StackName}-role'
+      Policies:
+        - PolicyName: admin
+          PolicyDocument:
+            Statement:
+              - Effect: Allow
+                Action: '*'
+                Resource: '*'
+  OpenSG:
+    Type: AWS::EC2::SecurityGroup
+    Properties:
+      SecurityGroupIngress:
+        - IpProtocol: tcp
+          FromPort: 22
+          ToPort: 22
+          CidrIp: 0.0.0.0/0
+  Bucket:
+    Type: AWS::S3::Bucket
+  Table:
+    Type: AWS::DynamoDB::Table
+    Properties:
+      SSESpecification:
+        SSEEnabled: true
+  Cdn:
+    Type: AWS::CloudFront::Distribution
+    Properties:
+      DistributionConfig:
+        Enabled: true
+"""
+
+PHASE_MANIFEST = """
+apiVersion: ial/v1
+kind: Phase
+metadata:
+  name: networking
+  wa_pillars: [security]
+outputs_contract:
+  must_exist: []
+"""
+
+
+class CountingRule(AnalysisRule):
+    """Regra de teste que registra os recursos visitados"""
+
+    rule_id = 'counting'
+    resource_types = ('AWS::S3::Bucket',)
+
+    def __init__(self):
+        self.visited = []
+
+    def check_resource(self, doc, name, resource):
+        self.visited.append(name)
+        return []
+
+
+def _phase_tree(tmp_path, files):
+    for relative, content in files.items():
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+
+class TestStaticAnalysisEngine:
+    def setup_method(self):
+        self.registry = default_registry()
+
+    def test_single_pass_runs_all_policy_rules(self, tmp_path):
+        """Teste: IAM, SG, criptografia e WAF em uma única passada"""
+        path = _phase_tree(tmp_path, {'20-network/01-app.yaml': CFN_TEMPLATE}) / '20-network/01-app.yaml'
+        findings = StaticAnalysisEngine(self.registry).analyze_file(path)
+
+        found = {(f['type'], f.get('resource')) for f in findings}
+        assert found == {
+            ('IAM_WILDCARD_ACTION', 'Role'),
+            ('IAM_WILDCARD_RESOURCE', 'Role'),
+            ('SG_OPEN_TO_WORLD', 'OpenSG'),
+            ('MISSING_ENCRYPTION', 'Bucket'),
+            ('MISSING_WAF_PROTECTION', 'Cdn')
+        }
+        assert all(f['category'] == 'policy' for f in findings)
+
+    def test_phase_rules_only_on_phase_manifests(self, tmp_path):
+        """Teste: schema e regras enterprise rodam apenas em manifestos de fase"""
+        root = _phase_tree(tmp_path, {'phase.yaml': PHASE_MANIFEST, 'cfn.yaml': CFN_TEMPLATE})
+        results = StaticAnalysisEngine(self.registry).analyze_paths(
+            [root / 'phase.yaml', root / 'cfn.yaml'], categories=('phase',))
+
+        assert results['files'][str(root / 'cfn.yaml')] == []
+        phase_types = {f['type'] for f in results['files'][str(root / 'phase.yaml')]}
+        assert {'PHASE_SCHEMA', 'PHASE_NAMING', 'PHASE_WA_PILLARS',
+                'PHASE_OUTPUTS_CONTRACT', 'PHASE_TAGS'} <= phase_types
+
+    def test_parse_error_reported(self, tmp_path):
+        """Teste: YAML inválido vira finding PARSE_ERROR"""
+        path = _phase_tree(tmp_path, {'bad.yaml': 'Resources: [unclosed'}) / 'bad.yaml'
+        findings = StaticAnalysisEngine(self.registry).analyze_file(path)
+
+        assert [f['type'] for f in findings] == ['PARSE_ERROR']
+
+    def test_rules_dispatched_by_resource_type(self, tmp_path):
+        """Teste: regra só visita recursos do tipo registrado"""
+        rule = CountingRule()
+        path = _phase_tree(tmp_path, {'cfn.yaml': CFN_TEMPLATE}) / 'cfn.yaml'
+        StaticAnalysisEngine(RuleRegistry([rule])).analyze_file(path)
+
+        assert rule.visited == ['Bucket']
+
+    def test_cache_only_relints_changed_files(self, tmp_path):
+        """Teste: segunda execução re-linta só o arquivo alterado"""
+        root = _phase_tree(tmp_path, {
+            'phases/00-foundation/01-a.yaml': CFN_TEMPLATE,
+            'phases/00-foundation/02-b.yaml': CFN_TEMPLATE,
+            'phases/00-foundation/deployment-order.yaml': 'dependencies: {}\n'
+        })
+        cache_file = str(tmp_path / 'cache.json')
+        files = discover_phase_files(root / 'phases')
+        assert [f.name for f in files] == ['01-a.yaml', '02-b.yaml']
+
+        first = StaticAnalysisEngine(self.registry, cache_file=cache_file).analyze_paths(files)
+        (root / 'phases/00-foundation/02-b.yaml').write_text(CFN_TEMPLATE.replace('0.0.0.0/0', '10.0.0.0/8'))
+        second = StaticAnalysisEngine(self.registry, cache_file=cache_file).analyze_paths(files)
+
+        assert first['stats']['analyzed'] == 2
+        assert second['stats'] == dict(second['stats'], analyzed=1, cache_hits=1)
+        assert len(second['findings']) == len(first['findings']) - 1
+
+    def test_prune_drops_removed_and_stale_entries(self, tmp_path):
+        """Teste: prune remove do cache templates apagados e versões antigas"""
+        root = _phase_tree(tmp_path, {'01-a.yaml': CFN_TEMPLATE, '02-b.yaml': CFN_TEMPLATE})
+        cache_file = str(tmp_path / 'cache.json')
+        files = [root / '01-a.yaml', root / '02-b.yaml']
+        StaticAnalysisEngine(self.registry, cache_file=cache_file).analyze_paths(files)
+
+        (root / '02-b.yaml').unlink()
+        (root / '01-a.yaml').write_text(CFN_TEMPLATE.replace('0.0.0.0/0', '10.0.0.0/8'))
+        engine = StaticAnalysisEngine(self.registry, cache_file=cache_file)
+        results = engine.analyze_paths(files[:1], prune=True)
+
+        assert results['stats']['pruned'] == 2 and results['stats']['analyzed'] == 1
+        reloaded = StaticAnalysisEngine(self.registry, cache_file=cache_file)
+        assert len(reloaded._cache) == 1
+        assert reloaded.analyze_paths(files[:1])['stats']['cache_hits'] == 1
+
+    def test_process_pool_matches_inline(self, tmp_path):
+        """Teste: execução no process pool produz os mesmos findings"""
+        root = _phase_tree(tmp_path, {f'phase-{i}.yaml': CFN_TEMPLATE for i in range(4)})
+        files = sorted(root.glob('*.yaml'))
+
+        inline = StaticAnalysisEngine(self.registry, max_workers=1).analyze_paths(files)
+        pooled = StaticAnalysisEngine(self.registry, max_workers=2, parallel_threshold=1).analyze_paths(files)
+
+        assert pooled['files'] == inline['files']
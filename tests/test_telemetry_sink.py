@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Testes para o sink assíncrono de telemetria (CloudWatch metrics + logs)
+"""
+
+import json
+import time
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from core.telemetry_sink import LOG_EVENTS_BATCH, METRIC_DATA_BATCH, TelemetrySink
+
+REGION = 'us-east-1'
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', REGION)
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        boto3.client('logs', region_name=REGION).create_log_group(logGroupName='/ial/test')
+        yield
+
+
+class RecordingClient:
+    """Proxy que registra os kwargs de cada chamada"""
+
+    def __init__(self, client, fail=False):
+        self._client = client
+        self.fail = fail
+        self.calls = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith(('put_', 'create_')):
+            def wrapper(**kwargs):
+                self.calls.append((name, kwargs))
+                if self.fail:
+                    raise RuntimeError('CloudWatch indisponível')
+                return attr(**kwargs)
+            return wrapper
+        return attr
+
+
+class TestTelemetrySink:
+    def _sink(self, tmp_path, fail=False):
+        self.cloudwatch = RecordingClient(boto3.client('cloudwatch', region_name=REGION), fail)
+        self.logs = RecordingClient(boto3.client('logs', region_name=REGION), fail)
+        return TelemetrySink(region=REGION, flush_interval=3600, spool_dir=str(tmp_path),
+                             cloudwatch_client=self.cloudwatch, logs_client=self.logs)
+
+    def test_metrics_aggregated_into_statistic_sets(self, aws, tmp_path):
+        """Teste: datapoints do mesmo minuto viram um único StatisticSet"""
+        sink = self._sink(tmp_path)
+        now = time.time()
+        for value in (1, 5, 3):
+            sink.put_metric('IAL/Test', 'Latency', value, 'Milliseconds', {'Phase': '10'}, timestamp=now)
+        sink.put_metric('IAL/Test', 'Latency', 7, 'Milliseconds', {'Phase': '20'}, timestamp=now)
+
+        sink.flush()
+
+        assert [name for name, _ in self.cloudwatch.calls] == ['put_metric_data']
+        data = {d['Dimensions'][0]['Value']: d['StatisticValues'] for d in self.cloudwatch.calls[0][1]['MetricData']}
+        assert data['10'] == {'SampleCount': 3.0, 'Sum': 9.0, 'Minimum': 1.0, 'Maximum': 5.0}
+        assert data['20']['SampleCount'] == 1.0
+        assert sink.stats['metrics_received'] == 4
+        assert sink.stats['metric_datums_sent'] == 2
+        sink.close()
+
+    def test_metric_batches_respect_api_limit(self, aws, tmp_path):
+        """Teste: mais de 1000 séries distintas geram chamadas de até 1000 itens"""
+        sink = self._sink(tmp_path)
+        for i in range(METRIC_DATA_BATCH + 5):
+            sink.put_metric('IAL/Test', 'Count', 1, dimensions={'Id': str(i)})
+        sink.flush()
+
+        sizes = [len(kwargs['MetricData']) for _, kwargs in self.cloudwatch.calls]
+        assert sizes == [METRIC_DATA_BATCH, 5]
+        sink.close()
+
+    def test_logs_batched_sorted_and_stream_created_once(self, aws, tmp_path):
+        """Teste: eventos em ordem cronológica, stream criado uma vez, lotes de até 10k"""
+        sink = self._sink(tmp_path)
+        base = int(time.time() * 1000)
+        for i in reversed(range(LOG_EVENTS_BATCH + 10)):
+            sink.put_log_event('/ial/test', 'stream-a', f'event-{i}', base + i)
+        sink.flush()
+        sink.put_log_event('/ial/test', 'stream-a', 'later', base + LOG_EVENTS_BATCH + 20)
+        sink.flush()
+
+        names = [name for name, _ in self.logs.calls]
+        assert names.count('create_log_stream') == 1
+        puts = [kwargs['logEvents'] for name, kwargs in self.logs.calls if name == 'put_log_events']
+        assert [len(batch) for batch in puts] == [LOG_EVENTS_BATCH, 10, 1]
+        timestamps = [event['timestamp'] for event in puts[0]]
+        assert timestamps == sorted(timestamps)
+
+        events = boto3.client('logs', region_name=REGION).get_log_events(
+            logGroupName='/ial/test', logStreamName='stream-a', limit=5)['events']
+        assert events
+        sink.close()
+
+    def test_failures_spool_and_replay(self, aws, tmp_path):
+        """Teste: falha de envio grava spool local, reenviado no próximo flush bem-sucedido"""
+        sink = self._sink(tmp_path, fail=True)
+        sink.put_metric('IAL/Test', 'Errors', 2)
+        sink.put_log_event('/ial/test', 'stream-b', 'lost?')
+        sink.flush()
+
+        spooled = [json.loads(line) for path in tmp_path.glob('telemetry-*.jsonl') for line in path.open()]
+        assert sorted(record['kind'] for record in spooled) == ['log', 'metric']
+        assert sink.stats['spooled'] == 2
+
+        self.cloudwatch.fail = self.logs.fail = False
+        sink.flush()
+
+        assert not list(tmp_path.glob('telemetry-*'))
+        assert sink.stats['replayed'] == 2
+        assert sink.stats['log_events_sent'] == 1
+        assert sink.stats['metric_datums_sent'] == 1
+        sink.close()
+
+    def test_replay_merges_spooled_statistic_sets(self, aws, tmp_path):
+        """Teste: registros do spool com a mesma chave são combinados, não sobrescritos"""
+        sink = self._sink(tmp_path, fail=True)
+        now = time.time()
+        for values in ((1, 5), (10,), (0.5, 2)):
+            for value in values:
+                sink.put_metric('IAL/Test', 'Latency', value, 'Milliseconds', timestamp=now)
+            sink.flush()
+        assert sink.stats['spooled'] == 3
+
+        self.cloudwatch.fail = False
+        sink.flush()
+
+        replayed = [kwargs for name, kwargs in self.cloudwatch.calls if name == 'put_metric_data'][-1]
+        assert replayed['MetricData'][0]['StatisticValues'] == {
+            'SampleCount': 5.0, 'Sum': 18.5, 'Minimum': 0.5, 'Maximum': 10.0
+        }
+        sink.close()
+
+    def test_background_thread_flushes_on_interval(self, aws, tmp_path):
+        """Teste: thread em background descarrega sem chamada explícita; close faz flush final"""
+        sink = self._sink(tmp_path)
+        sink.flush_interval = 0.05
+        sink.put_metric('IAL/Test', 'Tick', 1)
+
+        deadline = time.time() + 5
+        while sink.stats['metric_datums_sent'] == 0 and time.time() < deadline:
+            time.sleep(0.02)
+        assert sink.stats['metric_datums_sent'] == 1
+
+        sink.put_metric('IAL/Test', 'Tick', 1, dimensions={'Final': 'yes'})
+        sink.close()
+        assert sink.stats['metric_datums_sent'] == 2
+
+    def test_hot_path_makes_no_api_calls(self, aws, tmp_path):
+        """Teste: put_metric/put_log_event apenas enfileiram"""
+        sink = self._sink(tmp_path)
+        for i in range(500):
+            sink.put_metric('IAL/Test', 'Hot', i)
+            sink.put_log_event('/ial/test', 'stream-c', f'line {i}')
+
+        assert self.cloudwatch.calls == []
+        assert self.logs.calls == []
+        sink.close()
+        assert sink.stats['log_api_calls'] == 1
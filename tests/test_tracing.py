@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Testes para a camada de tracing (spans, exporters, flame summary)
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from core.tracing import (
+    ChromeTraceExporter, JSONLExporter, Tracer, flame_summary, format_flame_summary, profile, tracer
+)
+
+
+@pytest.fixture
+def local_tracer():
+    t = Tracer()
+    t.enable()
+    yield t
+    t.disable()
+
+
+class TestSpans:
+    def test_disabled_tracer_is_noop(self):
+        """Teste: desligado, span e decorator não criam spans"""
+        t = Tracer()
+
+        @t.traced('work')
+        def work(x):
+            return x * 2
+
+        with t.span('outer') as s:
+            s.set_attribute('ignored', True)
+            assert work(2) == 4
+        assert t.ring_buffer is None
+
+    def test_nested_spans_record_parent_and_path(self, local_tracer):
+        """Teste: spans aninhados registram pai, trace e caminho"""
+        @local_tracer.traced('inner', category='llm')
+        def inner():
+            time.sleep(0.002)
+
+        with local_tracer.span('outer', category='routing', request='x'):
+            inner()
+            inner()
+
+        spans = local_tracer.ring_buffer.spans()
+        outer = next(s for s in spans if s.name == 'outer')
+        inners = [s for s in spans if s.name == 'inner']
+        assert len(inners) == 2
+        assert all(s.parent_id == outer.span_id and s.trace_id == outer.trace_id for s in inners)
+        assert inners[0].path == ('outer', 'inner')
+        assert outer.attributes == {'request': 'x'}
+        assert outer.duration_ns >= sum(s.duration_ns for s in inners)
+
+    def test_context_propagates_across_asyncio_tasks(self, local_tracer):
+        """Teste: tasks asyncio herdam o span corrente via contextvars"""
+        @local_tracer.traced('mcp.call', category='mcp')
+        async def call(i):
+            await asyncio.sleep(0.001)
+            return i
+
+        @local_tracer.traced('route')
+        async def route():
+            return await asyncio.gather(*(asyncio.create_task(call(i)) for i in range(3)))
+
+        assert asyncio.run(route()) == [0, 1, 2]
+
+        spans = local_tracer.ring_buffer.spans()
+        root = next(s for s in spans if s.name == 'route')
+        calls = [s for s in spans if s.name == 'mcp.call']
+        assert len(calls) == 3
+        assert {s.parent_id for s in calls} == {root.span_id}
+
+    def test_errors_recorded_and_propagated(self, local_tracer):
+        """Teste: exceção é registrada no span e relançada"""
+        with pytest.raises(ValueError):
+            with local_tracer.span('failing'):
+                raise ValueError('boom')
+        assert local_tracer.ring_buffer.spans()[0].error == 'ValueError: boom'
+
+
+class TestExporters:
+    def test_jsonl_and_chrome_trace_files(self, tmp_path):
+        """Teste: JSONL por span e Chrome trace com eventos 'X'"""
+        jsonl, chrome = tmp_path / 'spans.jsonl', tmp_path / 'trace.json'
+        t = Tracer()
+        t.enable([JSONLExporter(str(jsonl)), ChromeTraceExporter(str(chrome))])
+        with t.span('deploy', category='cloudformation', stack='app'):
+            with t.span('change_set', category='cloudformation'):
+                pass
+        t.disable()
+
+        lines = [json.loads(line) for line in jsonl.read_text().splitlines()]
+        assert [line['name'] for line in lines] == ['change_set', 'deploy']
+        events = json.loads(chrome.read_text())['traceEvents']
+        assert {e['ph'] for e in events} == {'X'}
+        assert next(e for e in events if e['name'] == 'deploy')['args'] == {'stack': 'app'}
+
+
+class TestFlameSummary:
+    def test_self_time_excludes_children(self, local_tracer):
+        """Teste: tempo próprio desconta filhos; chamadas agregadas por caminho"""
+        with local_tracer.span('root'):
+            for _ in range(3):
+                with local_tracer.span('child'):
+                    time.sleep(0.002)
+
+        nodes = {n['path']: n for n in flame_summary(local_tracer.ring_buffer.spans())}
+        root, child = nodes[('root',)], nodes[('root', 'child')]
+        assert child['count'] == 3
+        assert root['self_ns'] == root['total_ns'] - child['total_ns']
+
+        text = format_flame_summary(local_tracer.ring_buffer.spans())
+        assert 'root' in text and '  child' in text
+
+    def test_profile_restores_global_tracer(self, tmp_path):
+        """Teste: profile liga o tracer global só durante a execução"""
+        from core.phase_parser import template_fingerprint
+
+        assert not tracer.enabled
+        trace_file = tmp_path / 'profile.json'
+        result, spans = profile(lambda: template_fingerprint('body', []), trace_file=str(trace_file), name='cli')
+
+        assert result == template_fingerprint('body', [])
+        assert [s.name for s in spans] == ['cli']
+        assert trace_file.exists()
+        assert not tracer.enabled
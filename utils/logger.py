@@ -9,6 +9,11 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+try:
+    from core.telemetry_sink import get_telemetry_sink
+except ImportError:
+    get_telemetry_sink = None
+
 class IaLLogger:
     """Enterprise-grade logging for Infrastructure as Language"""
     
@@ -81,8 +86,16 @@ class IaLLogger:
                 })
             }
             
-            # Create log stream if needed
             stream_name = f"ial-{datetime.now().strftime('%Y/%m/%d')}"
+            
+            if get_telemetry_sink is not None:
+                # Queue the event; the background sink batches PutLogEvents
+                get_telemetry_sink(self.cloudwatch.meta.region_name).put_log_event(
+                    self.log_group, stream_name, log_event['message'], log_event['timestamp']
+                )
+                return
+            
+            # Create log stream if needed
             try:
                 self.cloudwatch.create_log_stream(
                     logGroupName=self.log_group,
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""CloudWatch metrics emitter with Embedded Metric Format (EMF) output for Lambda
+
+Inside Lambda, metrics are written to stdout as EMF JSON lines and extracted
+asynchronously by CloudWatch Logs, so handlers pay no PutMetricData latency or
+API cost. Outside Lambda the same calls go to PutMetricData.
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, IO, List, Optional, Tuple
+
+import boto3
+
+# EMF limits
+EMF_MAX_METRICS = 100
+EMF_MAX_DIMENSIONS = 30
+EMF_MAX_VALUES = 100
+PUT_METRIC_DATA_BATCH = 1000
+
+
+def running_in_lambda() -> bool:
+    """True when executing inside an AWS Lambda runtime"""
+    return bool(os.environ.get('AWS_LAMBDA_FUNCTION_NAME'))
+
+
+def _resolve_mode(mode: Optional[str]) -> str:
+    mode = (mode or os.environ.get('IAL_METRICS_MODE', 'auto')).lower()
+    if mode == 'auto':
+        return 'emf' if running_in_lambda() else 'api'
+    if mode not in ('emf', 'api'):
+        raise ValueError(f"Invalid metrics mode: {mode}")
+    return mode
+
+
+def _timestamp_ms(timestamp: Any) -> int:
+    if timestamp is None:
+        return int(time.time() * 1000)
+    if isinstance(timestamp, datetime):
+        # Naive datetimes are UTC, as in botocore
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return int(timestamp.timestamp() * 1000)
+    return int(float(timestamp) * 1000)
+
+
+class MetricsEmitter:
+    """Metrics client that writes EMF in Lambda and calls PutMetricData elsewhere"""
+
+    def __init__(self, namespace: str = "IaL/Operations", mode: Optional[str] = None,
+                 stream: Optional[IO[str]] = None, cloudwatch_client: Any = None):
+        self.namespace = namespace
+        self.mode = _resolve_mode(mode)
+        self._stream = stream
+        self._cloudwatch = cloudwatch_client
+
+    @property
+    def cloudwatch(self):
+        if self._cloudwatch is None:
+            self._cloudwatch = boto3.client('cloudwatch')
+        return self._cloudwatch
+
+    def put_custom_metric(self, metric_name: str, value: float, unit: str = "Count",
+                          namespace: str = None, dimensions: Dict[str, str] = None,
+                          timestamp: Any = None):
+        """Same surface as IaLObservability.put_custom_metric"""
+        datum = {'MetricName': metric_name, 'Value': value, 'Unit': unit}
+        if dimensions:
+            datum['Dimensions'] = [{'Name': k, 'Value': v} for k, v in dimensions.items()]
+        if timestamp is not None:
+            datum['Timestamp'] = timestamp
+        self.put_metric_data(Namespace=namespace or self.namespace, MetricData=[datum])
+
+    def put_metric_data(self, Namespace: str, MetricData: List[Dict[str, Any]]):
+        """Drop-in replacement for cloudwatch.put_metric_data"""
+        if self.mode == 'api':
+            for i in range(0, len(MetricData), PUT_METRIC_DATA_BATCH):
+                self.cloudwatch.put_metric_data(
+                    Namespace=Namespace, MetricData=MetricData[i:i + PUT_METRIC_DATA_BATCH]
+                )
+            return
+
+        # EMF has no StatisticSet/Counts; those datums still go through the API
+        api_only = [d for d in MetricData if 'StatisticValues' in d or 'Counts' in d]
+        if api_only:
+            self.cloudwatch.put_metric_data(Namespace=Namespace, MetricData=api_only)
+
+        stream = self._stream or sys.stdout
+        for document in self.build_emf_documents(
+                Namespace, [d for d in MetricData if not ('StatisticValues' in d or 'Counts' in d)]):
+            stream.write(json.dumps(document, separators=(',', ':'), default=str) + '\n')
+        stream.flush()
+
+    @staticmethod
+    def build_emf_documents(namespace: str, metric_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Group datums by dimension set and timestamp into EMF documents"""
+        groups: Dict[Tuple, Dict[str, Any]] = {}
+        for datum in metric_data:
+            dims = tuple((d['Name'], str(d['Value'])) for d in datum.get('Dimensions', []))
+            if len(dims) > EMF_MAX_DIMENSIONS:
+                raise ValueError(f"EMF supports at most {EMF_MAX_DIMENSIONS} dimensions per metric")
+            key = (tuple(sorted(dims)), _timestamp_ms(datum.get('Timestamp')))
+            group = groups.setdefault(key, {'dims': dims, 'metrics': {}})
+
+            name = datum['MetricName']
+            values = list(datum['Values']) if 'Values' in datum else [datum['Value']]
+            metric = group['metrics'].setdefault(name, {'Unit': datum.get('Unit', 'None'), 'Values': []})
+            metric['Values'].extend(values)
+
+        documents = []
+        for (_, timestamp), group in groups.items():
+            metrics = list(group['metrics'].items())
+            for start in range(0, len(metrics), EMF_MAX_METRICS):
+                chunk = metrics[start:start + EMF_MAX_METRICS]
+                # Same metric repeated beyond the array limit goes to additional documents
+                while chunk:
+                    document = {
+                        '_aws': {
+                            'Timestamp': timestamp,
+                            'CloudWatchMetrics': [{
+                                'Namespace': namespace,
+                                'Dimensions': [[name for name, _ in group['dims']]],
+                                'Metrics': [{'Name': name, 'Unit': m['Unit']} for name, m in chunk]
+                            }]
+                        }
+                    }
+                    document.update(dict(group['dims']))
+                    remaining = []
+                    for name, m in chunk:
+                        values = m['Values'][:EMF_MAX_VALUES]
+                        document[name] = values[0] if len(values) == 1 else values
+                        if len(m['Values']) > EMF_MAX_VALUES:
+                            remaining.append((name, {'Unit': m['Unit'], 'Values': m['Values'][EMF_MAX_VALUES:]}))
+                    documents.append(document)
+                    chunk = remaining
+        return documents
+
+
+def parse_emf_lines(lines) -> List[Dict[str, Any]]:
+    """Parse EMF output back into flat datapoints (used by tests and local tooling)
+
+    Non-EMF lines (regular prints) are ignored.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+
+    datapoints = []
+    for line in lines:
+        line = line.strip()
+        if not line.startswith('{'):
+            continue
+        try:
+            document = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        aws = document.get('_aws') if isinstance(document, dict) else None
+        if not aws:
+            continue
+
+        for directive in aws.get('CloudWatchMetrics', []):
+            for dimension_set in directive.get('Dimensions', [[]]):
+                dimensions = {name: document[name] for name in dimension_set}
+                for metric in directive.get('Metrics', []):
+                    raw = document.get(metric['Name'])
+                    for value in raw if isinstance(raw, list) else [raw]:
+                        datapoints.append({
+                            'namespace': directive['Namespace'],
+                            'metric_name': metric['Name'],
+                            'value': value,
+                            'unit': metric.get('Unit', 'None'),
+                            'dimensions': dimensions,
+                            'timestamp': aws['Timestamp']
+                        })
+    return datapoints
+
+
+_emitters: Dict[str, MetricsEmitter] = {}
+
+
+def get_metrics_emitter(namespace: str = "IaL/Operations") -> MetricsEmitter:
+    """Shared emitter per namespace (reused across warm Lambda invocations)"""
+    emitter = _emitters.get(namespace)
+    if emitter is None:
+        emitter = _emitters[namespace] = MetricsEmitter(namespace)
+    return emitter
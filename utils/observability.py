@@ -7,6 +7,12 @@ import time
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional
 from .logger import get_logger
+from .metrics_emitter import get_metrics_emitter, running_in_lambda
+
+try:
+    from core.telemetry_sink import get_telemetry_sink
+except ImportError:
+    get_telemetry_sink = None
 
 # AWS clients
 cloudwatch = boto3.client('cloudwatch')
@@ -30,21 +36,29 @@ class IaLObservability:
             namespace = namespace or self.namespace_operations
             dimensions = dimensions or {"Project": self.project_name}
             
-            # Convert dimensions to CloudWatch format
-            cw_dimensions = [{"Name": k, "Value": v} for k, v in dimensions.items()]
-            
-            cloudwatch.put_metric_data(
-                Namespace=namespace,
-                MetricData=[
-                    {
-                        'MetricName': metric_name,
-                        'Value': value,
-                        'Unit': unit,
-                        'Dimensions': cw_dimensions,
-                        'Timestamp': datetime.now(timezone.utc)
-                    }
-                ]
-            )
+            if running_in_lambda():
+                # Dentro do Lambda: EMF no stdout, extraído pelo CloudWatch Logs
+                get_metrics_emitter(namespace).put_custom_metric(
+                    metric_name, value, unit, namespace, dimensions
+                )
+            elif get_telemetry_sink is not None:
+                # Enfileirado; publicado em lote (StatisticSet) pelo sink em background
+                get_telemetry_sink(cloudwatch.meta.region_name).put_metric(
+                    namespace, metric_name, value, unit, dimensions
+                )
+            else:
+                cloudwatch.put_metric_data(
+                    Namespace=namespace,
+                    MetricData=[
+                        {
+                            'MetricName': metric_name,
+                            'Value': value,
+                            'Unit': unit,
+                            'Dimensions': [{"Name": k, "Value": v} for k, v in dimensions.items()],
+                            'Timestamp': datetime.now(timezone.utc)
+                        }
+                    ]
+                )
             
             logger.info(f"Custom metric sent: {metric_name}={value}", 
                        metric_name=metric_name, 